@@ -19,6 +19,13 @@ from flask_limiter.util import get_remote_address
 # Importación de Servicios y Repositorios (esto está bien aquí)
 from .config import Config
 from .database.connector import init_app_db
+from .infrastructure.storage.blob_store import BlobStore
+from .infrastructure.storage.compression import DocumentCompressor
+from .infrastructure.storage.resumable_upload import ResumableUploadStore
+from .infrastructure.persistence.catalog_cache import CATALOG_CACHE, warm_up_catalogs
+from .infrastructure.persistence.job_store import JobStore
+from .infrastructure.persistence.legajo_cache import LEGAJO_CACHE
+from .infrastructure.persistence.user_cache import USER_CACHE
 from .domain.models.usuario import Usuario
 from .application.services.email_service import EmailService
 from .application.services.usuario_service import UsuarioService
@@ -27,6 +34,9 @@ from .application.services.audit_service import AuditService
 from .application.services.solicitud_service import SolicitudService 
 from .application.services.backup_service import BackupService 
 from .application.services.monitoring_service import MonitoringService 
+from .application.services.pdf_split_pool import ParallelPdfSplitter
+from .application.services.batch_digitization_service import BatchDigitizationService
+from .application.services.job_service import JobService
 from .infrastructure.persistence.sqlserver_repository import (
     SqlServerUsuarioRepository, 
     SqlServerPersonalRepository, 
@@ -34,6 +44,13 @@ from .infrastructure.persistence.sqlserver_repository import (
     SqlServerBackupRepository, 
     SqlServerSolicitudRepository 
 )
+from .infrastructure.persistence.sqlite_repository import (
+    SqliteUsuarioRepository,
+    SqlitePersonalRepository,
+    SqliteAuditoriaRepository,
+    SqliteBackupRepository,
+    SqliteSolicitudRepository
+)
 
 # Inicialización de extensiones de Flask (sin la app)
 login_manager = LoginManager()
@@ -53,7 +70,9 @@ talisman = Talisman()
 def load_user(user_id):
     repo = current_app.config.get('USUARIO_REPOSITORY')
     if repo:
-        return repo.find_by_id(int(user_id)) 
+        # Caché por id con versión por usuario: las escrituras del repositorio la invalidan.
+        user_id = int(user_id)
+        return USER_CACHE.load(user_id, lambda: repo.find_by_id(user_id))
     return None
 
 def configure_logging(app):
@@ -81,6 +100,28 @@ def configure_logging(app):
         app.logger.setLevel(logging.INFO)
         app.logger.info('Aplicación iniciada')
 
+def seed_sqlite_database(app):
+    """Carga datos sintéticos en el backend SQLite si está vacío (SQLITE_SEED_PERSONAL > 0)."""
+    if app.config.get('SQLITE_SEED_PERSONAL', 0) <= 0:
+        return
+    from .database import sqlite_backend
+    from .core.security import generate_password_hash
+
+    conn = sqlite_backend.connect(app.config['SQLITE_DATABASE'])
+    try:
+        if conn.cursor().execute('SELECT COUNT(*) FROM personal').fetchval():
+            return
+        password = app.config.get('SQLITE_SEED_PASSWORD')
+        n_personal, n_docs = sqlite_backend.seed_demo_data(
+            conn,
+            personal_count=app.config['SQLITE_SEED_PERSONAL'],
+            documents_per_person=app.config.get('SQLITE_SEED_DOCUMENTS', 3),
+            admin_password_hash=generate_password_hash(password) if password else None,
+        )
+        app.logger.info(f"Base SQLite sembrada: {n_personal} empleados, {n_docs} documentos.")
+    finally:
+        conn.close()
+
 def create_app():
     app = Flask(
         __name__,
@@ -171,16 +212,45 @@ def create_app():
         return {'csp_nonce': csp_nonce}
 
     with app.app_context():
-        # --- Inyección de Dependencias (sin cambios) ---
-        usuario_repo = SqlServerUsuarioRepository()
-        personal_repo = SqlServerPersonalRepository()
-        audit_repo = SqlServerAuditoriaRepository()
-        backup_repo = SqlServerBackupRepository() 
-        solicitud_repo = SqlServerSolicitudRepository()
+        # --- Inyección de Dependencias ---
+        # Almacén de archivos por hash (opcional): lo comparten personal y solicitudes.
+        blob_store = None
+        if app.config.get('BLOB_STORE_ENABLED'):
+            blob_store = BlobStore(app.config['BLOB_STORE_PATH'], fsync=app.config.get('BLOB_STORE_FSYNC', True))
+        compressor = None
+        if app.config.get('DOCUMENT_COMPRESSION_ENABLED'):
+            compressor = DocumentCompressor(app.config['DOCUMENT_COMPRESSION_LEVEL'],
+                                            app.config['DOCUMENT_COMPRESSION_MIN_SAVING'])
+
+        # Se elige la implementación de los repositorios según DB_BACKEND.
+        if app.config.get('DB_BACKEND') == 'sqlite':
+            usuario_repo = SqliteUsuarioRepository()
+            personal_repo = SqlitePersonalRepository(blob_store, compressor)
+            audit_repo = SqliteAuditoriaRepository()
+            backup_repo = SqliteBackupRepository()
+            solicitud_repo = SqliteSolicitudRepository(blob_store, compressor)
+            seed_sqlite_database(app)
+        else:
+            usuario_repo = SqlServerUsuarioRepository()
+            personal_repo = SqlServerPersonalRepository(blob_store, compressor)
+            audit_repo = SqlServerAuditoriaRepository()
+            backup_repo = SqlServerBackupRepository() 
+            solicitud_repo = SqlServerSolicitudRepository(blob_store, compressor)
         
+        app.config['BLOB_STORE'] = blob_store
+        # Pool de procesos para separar PDFs; los procesos se crean al primer uso.
+        app.config['PDF_SPLITTER'] = (ParallelPdfSplitter(app.config['PDF_SPLIT_WORKERS'], timeout=app.config['PDF_SPLIT_TIMEOUT'])
+                                      if app.config['PDF_SPLIT_WORKERS'] > 0 else None)
+        app.config['UPLOAD_SESSION_STORE'] = ResumableUploadStore(
+            app.config['RESUMABLE_UPLOAD_PATH'],
+            chunk_size=app.config['RESUMABLE_UPLOAD_CHUNK_SIZE'],
+            ttl=app.config['RESUMABLE_UPLOAD_TTL'],
+            max_size=app.config['MAX_CONTENT_LENGTH'],
+        )
         app.config['USUARIO_REPOSITORY'] = usuario_repo
         app.config['PERSONAL_REPOSITORY'] = personal_repo
         app.config['AUDIT_REPOSITORY'] = audit_repo
+        app.config['BACKUP_REPOSITORY'] = backup_repo
         
         email_service = EmailService(mail)
         audit_service = AuditService(audit_repo)
@@ -192,6 +262,31 @@ def create_app():
         app.config['AUDIT_SERVICE'] = audit_service
         app.config['LEGAJO_SERVICE'] = LegajoService(personal_repo, audit_service, app.config['USUARIO_SERVICE'])
         app.config['MONITORING_SERVICE'] = MonitoringService(personal_repo)
+        os.makedirs(app.config['JOBS_PATH'], exist_ok=True)
+        app.config['JOB_SERVICE'] = JobService(
+            app,
+            JobStore(os.path.join(app.config['JOBS_PATH'], 'tareas.sqlite3')),
+            app.config['JOBS_PATH'],
+            workers=app.config['JOBS_WORKERS'],
+            ttl=app.config['JOBS_TTL'],
+        )
+        app.config['BATCH_DIGITIZATION_SERVICE'] = BatchDigitizationService(
+            personal_repo,
+            app.config['JOB_SERVICE'],
+            app.config['BATCH_DIGITIZATION_PATH'],
+            source_dir=app.config['BATCH_DIGITIZATION_SOURCE_DIR'],
+            max_concurrency=app.config['BATCH_DIGITIZATION_CONCURRENCY'],
+            max_files=app.config['BATCH_DIGITIZATION_MAX_FILES'],
+            max_file_size=app.config['MAX_CONTENT_LENGTH'],
+        )
+
+        # Cachés en memoria; la de catálogos se precarga para que los primeros formularios no esperen a la BD.
+        CATALOG_CACHE.configure(ttl=app.config['CATALOG_CACHE_TTL'])
+        USER_CACHE.configure(ttl=app.config['USER_CACHE_TTL'], max_entries=app.config['USER_CACHE_MAX_ENTRIES'])
+        LEGAJO_CACHE.configure(max_bytes=app.config['LEGAJO_CACHE_MAX_MB'] * 1024 * 1024,
+                               ttl=app.config['LEGAJO_CACHE_TTL'])
+        if app.config['CATALOG_CACHE_TTL'] > 0 and app.config.get('CATALOG_CACHE_WARMUP'):
+            warm_up_catalogs(personal_repo, usuario_repo)
 
         # Seguridad: Mover la importación de blueprints aquí para evitar importaciones circulares
         from .presentation.routes.auth_routes import auth_bp
@@ -201,6 +296,8 @@ def create_app():
         from .presentation.routes.error_routes import error_bp
         from .presentation.routes.personal_routes import personal_bp # <-- Nuevo blueprint para empleados
         from .presentation.routes.pdf_upload_routes import pdf_bp # <-- Nuevo blueprint para PDF
+        from .presentation.routes.subida_routes import subida_bp
+        from .presentation.routes.job_routes import tareas_bp
         # Registrar Blueprints
         app.register_blueprint(auth_bp)
         app.register_blueprint(legajo_bp)
@@ -209,6 +306,8 @@ def create_app():
         app.register_blueprint(error_bp)
         app.register_blueprint(personal_bp) # <-- Registrar blueprint de empleados
         app.register_blueprint(pdf_bp) # <-- Registrar blueprint de PDF
+        app.register_blueprint(subida_bp)
+        app.register_blueprint(tareas_bp)
 
         @app.route('/')
         def index():
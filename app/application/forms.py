@@ -274,13 +274,25 @@ class ActualizarPersonalForm(FlaskForm):
     submit = SubmitField('Guardar Cambios')
 
 class BulkUploadForm(FlaskForm):
-    """Formulario para la subida masiva de personal desde un archivo Excel."""
-    excel_file = FileField('Archivo Excel (.xlsx)', validators=[
+    """Formulario para la subida masiva de personal desde un archivo Excel o CSV."""
+    excel_file = FileField('Archivo Excel (.xlsx) o CSV (.csv, .tsv)', validators=[
         DataRequired(message="Por favor, seleccione un archivo."),
-        FileAllowed(['xlsx'], '¡Solo se permiten archivos de Excel (.xlsx)!')
+        FileAllowed(['xlsx', 'csv', 'tsv'], '¡Solo se permiten archivos Excel (.xlsx) o CSV (.csv, .tsv)!')
     ])
     submit = SubmitField('Procesar Archivo')
 
+class BatchDigitizationForm(FlaskForm):
+    """Formulario para digitalizar un lote de legajos (ZIP de PDFs y/o manifiesto CSV)."""
+    archivo_zip = FileField('Archivo ZIP con los PDFs', validators=[
+        Optional(),
+        FileAllowed(['zip'], '¡Solo se permiten archivos ZIP!')
+    ])
+    manifiesto = FileField('Manifiesto CSV (archivo, dni)', validators=[
+        Optional(),
+        FileAllowed(['csv'], '¡Solo se permiten archivos CSV!')
+    ])
+    submit = SubmitField('Iniciar Lote')
+
 class ContratoInicialForm(FlaskForm):
     """Formulario para registrar el primer contrato y cargo."""
     # Datos del Contrato
@@ -19,10 +19,11 @@ class BackupService:
         self.base_backup_dir = "C:\\LEGAJO_BACKUPS_FINAL"
         
 
-    def execute_full_backup(self):
+    def execute_full_backup(self, user_id=None):
         """
         Ejecuta la lógica de la capa de persistencia para iniciar el proceso de backup 
-        y registra el evento en la Bitácora.
+        y registra el evento en la Bitácora. `user_id` es quien lo pidió; hace falta
+        cuando corre como tarea en segundo plano, fuera de la petición.
         """
         if not self.db_name:
             raise Exception("No se pudo determinar el nombre de la base de datos para el backup.")
@@ -35,7 +36,8 @@ class BackupService:
         
         # 2. REGISTRO EN LA BITÁCORA
         try:
-            user_id = current_user.id if current_user.is_authenticated else None
+            if user_id is None and current_user and current_user.is_authenticated:
+                user_id = current_user.id
             
             self.audit_service.log(
                 user_id, 
@@ -0,0 +1,393 @@
+# RUTA: app/application/services/batch_digitization_service.py
+"""
+Digitalización por lotes: PDFs de legajo de muchos trabajadores en un solo trabajo.
+
+Entradas aceptadas:
+
+- Un ZIP con los PDFs. El trabajador de cada PDF se toma de un manifiesto CSV
+  (`manifiesto.csv` dentro del ZIP o subido aparte) o, si no hay manifiesto,
+  del primer grupo de 8 dígitos del nombre del archivo.
+- Solo un manifiesto CSV, con rutas relativas a BATCH_DIGITIZATION_SOURCE_DIR
+  (carpeta del servidor donde el equipo de archivo deja los escaneos). Sirve
+  para lotes que no caben en MAX_CONTENT_LENGTH.
+
+El manifiesto tiene las columnas `archivo` y `dni` (separadas por coma o punto
+y coma). Todos los DNI del lote se resuelven con una sola consulta en la
+petición; después el lote corre como una tarea de JobService (tipo
+'digitalizacion_lote'): cada archivo se separa y se guarda con `procesar(ruta,
+id_personal)`, que recibe el servicio al crear el lote, como máximo
+`max_concurrency` archivos a la vez dentro del lote. El estado de cada archivo
+se guarda como resultado parcial de la tarea (JobStore) y, al terminar, el
+informe CSV queda como su archivo descargable.
+
+Como toda tarea, un lote sobrevive a un reinicio del servidor como
+'interrumpida', con el estado de los archivos que alcanzó a procesar.
+"""
+
+import csv
+import io
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+TIPO_TAREA = 'digitalizacion_lote'
+MANIFIESTO_EN_ZIP = 'manifiesto.csv'
+_INFORME = 'informe.csv'
+_ZIP = 'lote.zip'
+_MAX_MANIFIESTO = 5 * 1024 * 1024
+_DNI_EN_NOMBRE = re.compile(r'(?<!\d)(\d{8})(?!\d)')
+
+# Estados de cada archivo del lote.
+PENDIENTE = 'pendiente'
+PROCESANDO = 'procesando'
+GUARDADO = 'guardado'
+PARCIAL = 'parcial'                 # algunas partes del PDF no se pudieron separar
+SIN_PERSONAL = 'sin_personal'       # sin DNI o DNI sin personal activo
+RECHAZADO = 'rechazado'             # falta en el ZIP, no es PDF o es demasiado grande
+ERROR = 'error'
+
+_FINALES = (GUARDADO, PARCIAL, SIN_PERSONAL, RECHAZADO, ERROR)
+
+
+def normalizar_dni(valor):
+    """DNI como texto de 8 dígitos (Excel suele quitar los ceros a la izquierda); None si está vacío."""
+    dni = (valor or '').strip()
+    if dni.isdigit() and len(dni) < 8:
+        dni = dni.zfill(8)
+    return dni or None
+
+
+def leer_manifiesto(stream):
+    """Lista [(archivo, dni), ...] de un CSV con columnas 'archivo' y 'dni'; ValueError si no es válido."""
+    datos = stream.read(_MAX_MANIFIESTO + 1)
+    if len(datos) > _MAX_MANIFIESTO:
+        raise ValueError("El manifiesto supera 5 MB.")
+    try:
+        texto = datos.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        texto = datos.decode('latin-1')     # CSV guardado desde Excel en Windows
+    primera_linea = texto.split('\n', 1)[0]
+    separador = ';' if primera_linea.count(';') > primera_linea.count(',') else ','
+
+    lector = csv.reader(io.StringIO(texto), delimiter=separador)
+    cabecera = [columna.strip().lower() for columna in next(lector, [])]
+    if 'archivo' not in cabecera or 'dni' not in cabecera:
+        raise ValueError("El manifiesto debe tener las columnas 'archivo' y 'dni'.")
+    i_archivo, i_dni = cabecera.index('archivo'), cabecera.index('dni')
+
+    filas = []
+    vistos = set()
+    for numero, fila in enumerate(lector, start=2):
+        if not any(campo.strip() for campo in fila):
+            continue
+        archivo = fila[i_archivo].strip() if len(fila) > i_archivo else ''
+        if not archivo:
+            raise ValueError(f"Fila {numero} del manifiesto sin nombre de archivo.")
+        if archivo.lower() in vistos:
+            raise ValueError(f"El archivo '{archivo}' aparece dos veces en el manifiesto.")
+        vistos.add(archivo.lower())
+        filas.append((archivo, normalizar_dni(fila[i_dni] if len(fila) > i_dni else '')))
+    return filas
+
+
+class BatchDigitizationService:
+    """Valida y registra lotes de digitalización; cada lote se procesa como una tarea de JobService."""
+
+    def __init__(self, personal_repository, job_service, work_dir, source_dir=None, max_concurrency=2,
+                 max_files=5000, max_file_size=100 * 1024 * 1024):
+        self._personal_repo = personal_repository
+        self._job_service = job_service
+        self.work_dir = os.path.abspath(work_dir)     # preparación del ZIP mientras se valida el lote
+        self.source_dir = os.path.realpath(source_dir) if source_dir else None
+        self.max_concurrency = max_concurrency
+        self.max_files = max_files
+        self.max_file_size = max_file_size
+        os.makedirs(self.work_dir, exist_ok=True)
+        self._limpiar_preparacion()
+
+    # --- LOTES ---
+
+    def crear_lote(self, owner_id, procesar, archivo_zip=None, manifiesto=None):
+        """
+        Valida el lote y lo registra como tarea; devuelve su id (el de la tarea).
+        `archivo_zip` y `manifiesto` son archivos abiertos (al menos uno). Lanza
+        ValueError si la entrada no es válida.
+        """
+        if archivo_zip is None and manifiesto is None:
+            raise ValueError("Debe subir un ZIP o un manifiesto CSV.")
+        if archivo_zip is None and self.source_dir is None:
+            raise ValueError("La carga desde la carpeta del servidor no está habilitada (BATCH_DIGITIZATION_SOURCE_DIR).")
+
+        preparacion = os.path.join(self.work_dir, uuid.uuid4().hex)
+        os.makedirs(preparacion)
+        try:
+            filas = leer_manifiesto(manifiesto) if manifiesto is not None else None
+            if archivo_zip is not None:
+                archivos = self._archivos_zip(archivo_zip, preparacion, filas)
+            else:
+                archivos = self._archivos_origen(filas)
+            if not archivos:
+                raise ValueError("El lote no contiene archivos PDF.")
+            if len(archivos) > self.max_files:
+                raise ValueError(f"El lote supera el máximo de {self.max_files} archivos.")
+
+            # Todos los DNI del lote en una consulta (por bloques), no una por archivo.
+            ids = self._personal_repo.find_ids_by_dni({a['dni'] for a in archivos if a['dni']})
+            for archivo in archivos:
+                if archivo['estado'] != PENDIENTE:
+                    continue
+                archivo['id_personal'] = ids.get(archivo['dni'])
+                if archivo['id_personal'] is None:
+                    archivo['estado'] = SIN_PERSONAL
+                    archivo['error'] = ("DNI no encontrado en el personal activo" if archivo['dni']
+                                        else "Sin DNI en el manifiesto ni en el nombre")
+
+            # El ZIP pasa al directorio de la tarea (enlace duro); la preparación se borra igual.
+            lote_id = self._job_service.enviar(
+                TIPO_TAREA, owner_id, f"Digitalización por lotes ({len(archivos)} archivos)",
+                lambda tarea: self._procesar_lote(tarea, archivos, procesar),
+                entradas={_ZIP: os.path.join(preparacion, _ZIP)} if archivo_zip is not None else None,
+                resultado=self._resultado(archivos),
+            )
+        finally:
+            shutil.rmtree(preparacion, ignore_errors=True)
+
+        logger.info(f"Lote de digitalización {lote_id} creado por el usuario {owner_id}: {len(archivos)} "
+                    f"archivo(s), {sum(1 for a in archivos if a['estado'] == PENDIENTE)} por procesar")
+        return lote_id
+
+    def estado(self, lote_id, owner_id=None):
+        """Estado del lote con el resumen por estado; None si no existe o es de otro usuario."""
+        tarea = self._job_service.estado(lote_id, owner_id)
+        if tarea is None or tarea['tipo'] != TIPO_TAREA:
+            return None
+        return self._estado_de(tarea)
+
+    def listar(self, owner_id=None):
+        """Lotes del usuario (o todos), del más reciente al más antiguo, sin el detalle por archivo."""
+        return [dict(self._estado_de(tarea), archivos=None)
+                for tarea in self._job_service.listar(owner_id, tipo=TIPO_TAREA)]
+
+    def ruta_informe(self, lote_id, owner_id=None):
+        """Ruta del informe CSV de un lote terminado, o None."""
+        if self.estado(lote_id, owner_id) is None:
+            return None
+        artefacto = self._job_service.artefacto(lote_id, owner_id)
+        return artefacto[0] if artefacto else None
+
+    @staticmethod
+    def _estado_de(tarea):
+        archivos = (tarea['resultado'] or {}).get('archivos') or []
+        if tarea['finalizada']:
+            # Lote fallido o interrumpido por un reinicio: lo que no llegó a procesarse queda con error.
+            motivo = tarea['error'] or "El lote no terminó"
+            archivos = [archivo if archivo['estado'] in _FINALES else dict(archivo, estado=ERROR, error=motivo)
+                        for archivo in archivos]
+        resumen = dict.fromkeys((PENDIENTE, PROCESANDO) + _FINALES, 0)
+        for archivo in archivos:
+            resumen[archivo['estado']] += 1
+        return {
+            'id': tarea['id'],
+            'creado': tarea['creada'],
+            'terminado': tarea['terminada'] if tarea['finalizada'] else None,
+            'estado_tarea': tarea['estado'],
+            'descargable': tarea['descargable'],
+            'total': len(archivos),
+            'procesados': sum(resumen[e] for e in _FINALES),
+            'documentos': sum(archivo['documentos'] for archivo in archivos),
+            'resumen': resumen,
+            'archivos': archivos,
+        }
+
+    def _limpiar_preparacion(self):
+        # Al arrancar no hay peticiones en curso: lo que quede es de una subida interrumpida.
+        for nombre in os.listdir(self.work_dir):
+            ruta = os.path.join(self.work_dir, nombre)
+            if os.path.isdir(ruta):
+                shutil.rmtree(ruta, ignore_errors=True)
+
+    # --- ENTRADAS ---
+
+    def _archivos_zip(self, archivo_zip, lote_dir, filas):
+        ruta_zip = os.path.join(lote_dir, _ZIP)
+        with open(ruta_zip, 'wb') as destino:
+            shutil.copyfileobj(archivo_zip, destino, 1024 * 1024)
+        if not zipfile.is_zipfile(ruta_zip):
+            raise ValueError("El archivo subido no es un ZIP válido.")
+
+        with zipfile.ZipFile(ruta_zip) as zf:
+            miembros = {}
+            for info in zf.infolist():
+                nombre = info.filename
+                if info.is_dir() or nombre.startswith('__MACOSX/'):
+                    continue
+                if os.path.basename(nombre).lower() == MANIFIESTO_EN_ZIP:
+                    if filas is None:
+                        with zf.open(info) as contenido:
+                            filas = leer_manifiesto(contenido)
+                    continue
+                if nombre.lower().endswith('.pdf'):
+                    miembros[nombre] = info
+
+        # El manifiesto puede nombrar la ruta dentro del ZIP o solo el nombre del archivo.
+        por_nombre = {}
+        for nombre in miembros:
+            por_nombre.setdefault(nombre.lower(), nombre)
+            por_nombre.setdefault(os.path.basename(nombre).lower(), nombre)
+
+        archivos = []
+        if filas is None:
+            for nombre, info in miembros.items():
+                coincidencia = _DNI_EN_NOMBRE.search(os.path.basename(nombre))
+                archivos.append(self._archivo(nombre, coincidencia.group(1) if coincidencia else None,
+                                              miembro=nombre, tamano=info.file_size))
+            return archivos
+
+        usados = set()
+        for archivo, dni in filas:
+            nombre = por_nombre.get(archivo.replace('\\', '/').lower())
+            if nombre is None:
+                archivos.append(self._archivo(archivo, dni, error="No está en el ZIP o no es un PDF"))
+                continue
+            usados.add(nombre)
+            archivos.append(self._archivo(archivo, dni, miembro=nombre, tamano=miembros[nombre].file_size))
+        archivos.extend(self._archivo(nombre, None, error="No figura en el manifiesto")
+                        for nombre in miembros if nombre not in usados)
+        return archivos
+
+    def _archivos_origen(self, filas):
+        archivos = []
+        for archivo, dni in filas:
+            ruta = os.path.realpath(os.path.join(self.source_dir, archivo))
+            if not ruta.startswith(self.source_dir + os.sep) or not ruta.lower().endswith('.pdf'):
+                archivos.append(self._archivo(archivo, dni, error="Ruta no permitida o no es un PDF"))
+            elif not os.path.isfile(ruta):
+                archivos.append(self._archivo(archivo, dni, error="No existe en la carpeta de origen"))
+            else:
+                archivos.append(self._archivo(archivo, dni, ruta=ruta, tamano=os.path.getsize(ruta)))
+        return archivos
+
+    def _archivo(self, nombre, dni, miembro=None, ruta=None, tamano=None, error=None):
+        if error is None and tamano is not None and tamano > self.max_file_size:
+            error = f"Archivo demasiado grande (máx {self.max_file_size // (1024 * 1024)} MB)"
+        return {
+            'archivo': nombre,
+            'dni': dni,
+            'id_personal': None,
+            'estado': RECHAZADO if error else PENDIENTE,
+            'documentos': 0,
+            'fallidos': 0,
+            'segundos': None,
+            'error': error,
+            '_miembro': miembro,        # nombre dentro del ZIP
+            '_ruta': ruta,              # ruta en la carpeta de origen
+        }
+
+    @staticmethod
+    def _resultado(archivos):
+        # Las claves con '_' (rutas en el servidor) no se guardan en la tarea.
+        return {'archivos': [{clave: valor for clave, valor in archivo.items() if not clave.startswith('_')}
+                             for archivo in archivos]}
+
+    # --- PROCESAMIENTO (dentro de la tarea) ---
+
+    def _procesar_lote(self, tarea, archivos, procesar):
+        pendientes = [indice for indice, archivo in enumerate(archivos) if archivo['estado'] == PENDIENTE]
+        lock = threading.Lock()
+        procesados = 0
+
+        def registrar(cambios, archivo, terminado):
+            # El estado de cada archivo se guarda en la tarea (agrupado por TareaEnCurso.avanzar).
+            nonlocal procesados
+            with lock:
+                archivo.update(cambios)
+                procesados += terminado
+                tarea.avanzar(procesados * 100 / len(pendientes),
+                              f"{procesados} de {len(pendientes)} archivos procesados",
+                              resultado=self._resultado(archivos))
+
+        def procesar_uno(indice):
+            archivo = archivos[indice]
+            registrar({'estado': PROCESANDO}, archivo, 0)
+            registrar(self._procesar_archivo(tarea, indice, archivo, procesar), archivo, 1)
+
+        if pendientes:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(pendientes)),
+                                    thread_name_prefix='lote-digitalizacion') as pool:
+                list(pool.map(procesar_uno, pendientes))
+        try:
+            os.remove(tarea.ruta(_ZIP))
+        except FileNotFoundError:
+            pass
+
+        resultado = self._resultado(archivos)
+        self._escribir_informe(tarea.ruta(_INFORME), resultado['archivos'])
+        tarea.publicar(_INFORME, f"informe_lote_{tarea.id[:8]}.csv")
+        guardados = sum(1 for a in archivos if a['estado'] in (GUARDADO, PARCIAL))
+        documentos = sum(a['documentos'] for a in archivos)
+        logger.info(f"Lote de digitalización {tarea.id} terminado: {guardados} de {len(archivos)} archivo(s), "
+                    f"{documentos} documento(s) guardados")
+        resultado['mensaje'] = (f"{guardados} de {len(archivos)} archivos guardados, "
+                                f"{documentos} documentos en total.")
+        return resultado
+
+    def _procesar_archivo(self, tarea, indice, archivo, procesar):
+        """Procesa un archivo del lote y devuelve los cambios de su estado."""
+        inicio = time.perf_counter()
+        cambios = {}
+        ruta_temporal = None
+        try:
+            ruta = archivo['_ruta']
+            if ruta is None:
+                ruta = ruta_temporal = self._extraer(tarea, indice, archivo)
+            resumen = procesar(ruta, archivo['id_personal'])
+            cambios['documentos'] = resumen['guardados']
+            cambios['fallidos'] = resumen['fallidos']
+            cambios['estado'] = PARCIAL if resumen['fallidos'] else GUARDADO
+        except ValueError as ve:
+            cambios.update(estado=RECHAZADO, error=str(ve))
+        except Exception as e:
+            logger.error(f"Lote {tarea.id}: error procesando '{archivo['archivo']}': {e}", exc_info=True)
+            cambios.update(estado=ERROR, error="Error inesperado al procesar el archivo")
+        finally:
+            if ruta_temporal:
+                try:
+                    os.remove(ruta_temporal)
+                except OSError:
+                    pass
+        cambios['segundos'] = round(time.perf_counter() - inicio, 2)
+        return cambios
+
+    def _extraer(self, tarea, indice, archivo):
+        """Copia el PDF del ZIP a un archivo propio (cada hilo abre el ZIP por su cuenta)."""
+        destino = tarea.ruta(f"{indice}.pdf")
+        with zipfile.ZipFile(tarea.ruta(_ZIP)) as zf:
+            with zf.open(archivo['_miembro']) as origen, open(destino, 'wb') as salida:
+                copiados = 0
+                # El tamaño declarado en el ZIP no es confiable: se corta al superar el máximo.
+                for bloque in iter(lambda: origen.read(1024 * 1024), b''):
+                    copiados += len(bloque)
+                    if copiados > self.max_file_size:
+                        raise ValueError(f"Archivo demasiado grande (máx {self.max_file_size // (1024 * 1024)} MB)")
+                    salida.write(bloque)
+        return destino
+
+    @staticmethod
+    def _escribir_informe(ruta, archivos):
+        with open(ruta, 'w', newline='', encoding='utf-8-sig') as informe:
+            escritor = csv.writer(informe)
+            escritor.writerow(['archivo', 'dni', 'id_personal', 'estado', 'documentos', 'partes_fallidas',
+                               'segundos', 'error'])
+            for archivo in archivos:
+                escritor.writerow([archivo['archivo'], archivo['dni'] or '', archivo['id_personal'] or '',
+                                   archivo['estado'], archivo['documentos'], archivo['fallidos'],
+                                   archivo['segundos'] if archivo['segundos'] is not None else '',
+                                   archivo['error'] or ''])
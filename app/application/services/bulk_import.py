@@ -0,0 +1,251 @@
+# RUTA: app/application/services/bulk_import.py
+"""
+Lectura por tramos de archivos de carga masiva (Excel .xlsx, .csv y .tsv).
+
+`leer_filas` devuelve el encabezado y un iterador perezoso de filas: el Excel
+se abre con openpyxl en modo `read_only` (las filas se leen del XML a medida
+que se piden, sin construir todas las celdas en memoria) y los CSV/TSV se leen
+con el módulo csv línea a línea. `en_lotes` agrupa las filas en lotes de tamaño
+fijo para el pipeline validar → transformar → persistir de
+`LegajoService.process_bulk_upload`, de modo que la memoria depende del tamaño
+del lote y no del archivo.
+
+`prevalidar_lote` revisa cada lote con pandas antes de escribir nada (ver
+`process_bulk_upload`: una primera pasada valida todo el archivo y la segunda
+solo persiste las filas limpias).
+
+`ImportProgress` guarda los contadores de una carga en curso; la tarea en
+segundo plano de la carga masiva (JobService) los convierte en su avance y
+escribe todos los errores en su informe.
+"""
+
+import codecs
+import csv
+import itertools
+import threading
+import time
+
+# Se guardan los primeros errores; del resto solo se cuentan.
+MAX_ERRORES = 200
+
+# Columnas que la prevalidación exige y cómo se nombran en los mensajes.
+CAMPOS_OBLIGATORIOS = {'DNI': 'DNI', 'Nombres': 'Nombres', 'Apellidos': 'Apellidos',
+                       'UnidadAdministrativa': 'Unidad Administrativa'}
+CAMPOS_FECHA = {'FechaNacimiento': 'Fecha de Nacimiento', 'FechaIngreso': 'Fecha de Ingreso'}
+
+
+def leer_filas(stream, filename):
+    """
+    (encabezado, filas) del archivo. `filas` produce (número de fila, tupla de
+    valores) desde la fila 2; las celdas vacías son None. El Excel queda
+    abierto hasta agotar las filas o llamar a `filas.close()`.
+    """
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'xlsx':
+        return _filas_excel(stream)
+    if extension in ('csv', 'tsv'):
+        return _filas_texto(stream, '\t' if extension == 'tsv' else None)
+    raise ValueError(f"Formato no soportado para la carga masiva: .{extension or '?'}")
+
+
+def en_lotes(filas, tamano):
+    """Agrupa un iterable en listas de `tamano` elementos (la última puede ser menor)."""
+    filas = iter(filas)
+    while True:
+        lote = list(itertools.islice(filas, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def _filas_excel(stream):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    filas = workbook.active.iter_rows(values_only=True)
+    encabezado = next(filas, None)
+    if encabezado is None:
+        workbook.close()
+        raise ValueError("El archivo está vacío.")
+
+    def generar():
+        for numero, fila in enumerate(filas, start=2):
+            # read_only devuelve las filas vacías del final del rango usado.
+            if any(valor is not None and valor != '' for valor in fila):
+                yield numero, fila
+
+    return list(encabezado), _Filas(generar(), workbook.close)
+
+
+def _filas_texto(stream, separador):
+    texto = codecs.getreader('utf-8-sig')(stream, errors='replace')
+    primera_linea = texto.readline()
+    if not primera_linea.strip():
+        raise ValueError("El archivo está vacío.")
+    if separador is None:
+        # CSV guardado desde Excel en configuración regional peruana: separador ';'.
+        separador = ';' if primera_linea.count(';') > primera_linea.count(',') else ','
+    encabezado = next(csv.reader([primera_linea], delimiter=separador))
+
+    def generar():
+        lector = csv.reader(texto, delimiter=separador)
+        for numero, fila in enumerate(lector, start=2):
+            valores = tuple(valor.strip() or None for valor in fila)
+            if any(valores):
+                yield numero, valores
+
+    return [columna.strip() for columna in encabezado], _Filas(generar())
+
+
+class _Filas:
+    """Iterador de filas que libera el archivo al agotarse o con close(), aunque no se haya empezado."""
+
+    def __init__(self, filas, cerrar=None):
+        self._filas = filas
+        self._cerrar = cerrar
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._filas)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        cerrar, self._cerrar = self._cerrar, None
+        if cerrar:
+            cerrar()
+
+
+def texto_dni(valor):
+    """DNI de una celda como texto: Excel guarda los DNI numéricos como 40000001.0 y sin ceros a la izquierda."""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    if isinstance(valor, int):
+        return str(valor).zfill(8)
+    return str(valor).strip() if valor is not None else None
+
+
+def prevalidar_lote(lote, columnas, unidades_map, dnis_vistos, buscar_existentes):
+    """
+    Valida un lote [(número de fila, valores)] con pandas, por columnas y no
+    fila a fila: obligatorios, formato del DNI, DNI repetidos en el archivo
+    (`dnis_vistos` acumula los de lotes anteriores), unidad administrativa y
+    fechas. `buscar_existentes(dnis)` devuelve, en una sola consulta, los DNI
+    que ya están registrados. Devuelve (números de fila rechazados, mensajes).
+    """
+    import pandas as pd
+
+    ancho = len(columnas)
+    df = pd.DataFrame.from_records(
+        [tuple(fila[:ancho]) + (None,) * (ancho - len(fila)) for _, fila in lote],
+        columns=columnas, index=[numero for numero, _ in lote],
+    )
+    # Celdas con solo espacios cuentan como vacías.
+    df = df.replace(r'^\s*$', None, regex=True)
+    # {mensaje: máscara booleana}; el texto solo se arma para las filas rechazadas.
+    problemas = {}
+
+    def marcar(mascara, mensaje):
+        problemas[mensaje] = mascara.fillna(False).astype(bool)
+
+    for columna, etiqueta in CAMPOS_OBLIGATORIOS.items():
+        marcar(df[columna].isna(), f"{etiqueta} es obligatorio.")
+
+    dni = df['DNI'].map(texto_dni, na_action='ignore').astype('string')
+    dni_valido = dni.str.fullmatch(r'\d{8}').fillna(False).astype(bool)
+    marcar(dni.notna() & ~dni_valido, "El DNI debe tener 8 dígitos.")
+    marcar(dni_valido & (dni.duplicated(keep='first') | dni.isin(dnis_vistos)), "DNI repetido en el archivo.")
+    nuevos = set(dni[dni_valido].tolist()) - dnis_vistos
+    if nuevos:
+        marcar(dni_valido & dni.isin(buscar_existentes(nuevos)), "El DNI ya está registrado.")
+        dnis_vistos |= nuevos
+
+    unidad = df['UnidadAdministrativa']
+    marcar(unidad.notna() & ~unidad.isin(list(unidades_map)), "La unidad administrativa no es válida.")
+
+    for columna, etiqueta in CAMPOS_FECHA.items():
+        # Excel entrega fechas (datetime); CSV, texto YYYY-MM-DD.
+        fechas = pd.to_datetime(df[columna], format='%Y-%m-%d', errors='coerce')
+        marcar(df[columna].notna() & fechas.isna(), f"{etiqueta} no es una fecha válida (YYYY-MM-DD).")
+
+    marcas = pd.DataFrame(problemas, index=df.index)
+    marcas = marcas[marcas.any(axis=1)]
+    mensajes = [f"Fila {numero}: {' '.join(marcas.columns[fila])}"
+                for numero, fila in zip(marcas.index, marcas.to_numpy())]
+    return set(marcas.index), mensajes
+
+
+class ImportProgress:
+    """Contadores de una carga masiva; `snapshot` puede llamarse desde otro hilo."""
+
+    def __init__(self, nombre_archivo=None, informe=None, al_avanzar=None):
+        self.nombre_archivo = nombre_archivo
+        self._informe = informe             # informe(mensaje) recibe todos los errores, sin tope
+        self._al_avanzar = al_avanzar       # al_avanzar(snapshot) tras cada lote y cambio de fase
+        self.leidas = 0
+        self.exitosos = 0
+        self.fallidos = 0
+        self.lotes = 0
+        self.fase = 'validando'             # 'validando' (1.ª pasada) o 'guardando' (2.ª)
+        self.errores = []
+        self.terminado = False
+        self.inicio = time.time()
+        self.fin = None
+        self._lock = threading.Lock()
+
+    def avanzar(self, leidas=0, exitosos=0, errores=()):
+        """Suma un lote procesado; `errores` son mensajes de filas fallidas."""
+        with self._lock:
+            self.leidas += leidas
+            self.exitosos += exitosos
+            self.fallidos += len(errores)
+            self.lotes += 1
+            espacio = MAX_ERRORES - len(self.errores)
+            if espacio > 0:
+                self.errores.extend(errores[:espacio])
+        if self._informe:
+            for mensaje in errores:
+                self._informe(mensaje)
+        self._notificar()
+
+    def guardando(self):
+        with self._lock:
+            self.fase = 'guardando'
+        self._notificar()
+
+    def _notificar(self):
+        if self._al_avanzar:
+            self._al_avanzar(self.snapshot())
+
+    def terminar(self):
+        with self._lock:
+            self.terminado = True
+            self.fin = time.time()
+
+    def resultado(self):
+        """Resumen final con el formato de siempre: exitosos, fallidos y errores."""
+        with self._lock:
+            errores = list(self.errores)
+            omitidos = self.fallidos - len(errores)
+            if omitidos > 0:
+                errores.append(f"... y {omitidos} error(es) más")
+            return {"exitosos": self.exitosos, "fallidos": self.fallidos, "errores": errores}
+
+    def snapshot(self):
+        with self._lock:
+            fin = self.fin or time.time()
+            return {
+                'nombre_archivo': self.nombre_archivo,
+                'leidas': self.leidas,
+                'exitosos': self.exitosos,
+                'fallidos': self.fallidos,
+                'lotes': self.lotes,
+                'fase': self.fase,
+                'terminado': self.terminado,
+                'segundos': round(fin - self.inicio, 1),
+                'filas_por_segundo': round(self.leidas / (fin - self.inicio), 1) if fin > self.inicio else None,
+            }
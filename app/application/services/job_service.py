@@ -0,0 +1,226 @@
+# RUTA: app/application/services/job_service.py
+"""
+Tareas en segundo plano para operaciones largas (carga masiva, exportación a
+Excel, separación de PDFs, copias de seguridad).
+
+La petición registra la tarea y responde enseguida con su id; la tarea corre
+en un hilo del pool (`workers` como máximo a la vez) dentro de un contexto de
+aplicación propio. Estado, avance y resultado
+se guardan en la tabla de tareas (JobStore, SQLite en JOBS_PATH) y los archivos
+de entrada y de resultado en el directorio de cada tarea, así que el usuario
+puede consultar la tarea o descargar su resultado más tarde.
+
+`funcion(tarea)` recibe un TareaEnCurso: `tarea.ruta(nombre)` para los archivos
+de la tarea, `tarea.avanzar(porcentaje, mensaje)` para el avance y
+`tarea.publicar(nombre, nombre_descarga)` para el archivo que se podrá
+descargar. Lo que devuelve (un dict JSON: 'mensaje', 'errores', contadores...)
+queda como resultado de la tarea; si lanza una excepción, la tarea falla con
+ese mensaje.
+
+Tras un reinicio del servidor, las tareas que no terminaron quedan como
+'interrumpida'.
+"""
+
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Estados de una tarea.
+EN_COLA = 'en_cola'
+EN_PROCESO = 'en_proceso'
+COMPLETADA = 'completada'
+FALLIDA = 'fallida'
+INTERRUMPIDA = 'interrumpida'
+
+FINALES = (COMPLETADA, FALLIDA, INTERRUMPIDA)
+
+
+class TareaEnCurso:
+    """Lo que ve la función de una tarea mientras se ejecuta."""
+
+    # Segundos mínimos entre dos escrituras del avance en la tabla.
+    INTERVALO_AVANCE = 0.5
+
+    def __init__(self, store, tarea_id, id_usuario, directorio):
+        self._store = store
+        self.id = tarea_id
+        self.id_usuario = id_usuario
+        self.directorio = directorio
+        self.artefacto = None
+        self.nombre_descarga = None
+        self._ultimo_avance = 0.0
+
+    def ruta(self, nombre):
+        """Ruta de un archivo dentro del directorio de la tarea."""
+        return os.path.join(self.directorio, nombre)
+
+    def avanzar(self, porcentaje, mensaje=None, resultado=None):
+        """
+        Registra el avance (0-100); las llamadas muy seguidas se agrupan.
+        `resultado` guarda un resultado parcial (p. ej. el estado de cada archivo
+        de un lote) que se consulta mientras la tarea corre.
+        """
+        ahora = time.monotonic()
+        if ahora - self._ultimo_avance < self.INTERVALO_AVANCE and porcentaje < 100:
+            return
+        self._ultimo_avance = ahora
+        campos = {'progreso': round(max(0.0, min(100.0, porcentaje)), 1), 'estado': EN_PROCESO}
+        if mensaje is not None:
+            campos['mensaje'] = mensaje
+        if resultado is not None:
+            campos['resultado'] = resultado
+        self._store.actualizar(self.id, **campos)
+
+    def publicar(self, nombre, nombre_descarga=None):
+        """Marca `nombre` (ya escrito en el directorio de la tarea) como el resultado descargable."""
+        self.artefacto = nombre
+        self.nombre_descarga = nombre_descarga or nombre
+
+
+class JobService:
+    """Registra tareas en segundo plano, las ejecuta en un pool de hilos y consulta su estado."""
+
+    def __init__(self, app, store, work_dir, workers=2, ttl=7 * 24 * 3600):
+        self._app = app
+        self._store = store
+        self.work_dir = os.path.abspath(work_dir)
+        self.workers = workers
+        self.ttl = ttl                      # segundos que se conserva una tarea terminada
+        os.makedirs(self.work_dir, exist_ok=True)
+        self._cola = queue.Queue()
+        self._hilos = []
+        self._lock = threading.Lock()
+        interrumpidas = store.marcar_interrumpidas("La tarea se interrumpió al reiniciarse el servidor.")
+        if interrumpidas:
+            logger.warning(f"{interrumpidas} tarea(s) en segundo plano quedaron interrumpidas por un reinicio")
+
+    # --- TAREAS ---
+
+    def enviar(self, tipo, id_usuario, descripcion, funcion, entradas=None, resultado=None):
+        """
+        Registra una tarea y la encola; devuelve su id. `entradas` es
+        {nombre: archivo subido o ruta} y se guardan en el directorio de la tarea
+        antes de encolarla (la petición termina y su archivo temporal se borra).
+        Una ruta se enlaza (o se copia, si está en otro disco) y el original queda
+        intacto hasta que el llamador lo borre. `resultado` es el resultado
+        inicial que se muestra mientras la tarea espera en la cola.
+        """
+        self.purge_expired()
+        tarea_id = uuid.uuid4().hex
+        directorio = os.path.join(self.work_dir, tarea_id)
+        os.makedirs(directorio)
+        try:
+            for nombre, archivo in (entradas or {}).items():
+                destino = os.path.join(directorio, nombre)
+                if isinstance(archivo, str):
+                    _enlazar_o_copiar(archivo, destino)
+                else:
+                    archivo.save(destino)
+            self._store.crear({
+                'id': tarea_id,
+                'tipo': tipo,
+                'descripcion': descripcion,
+                'id_usuario': id_usuario,
+                'estado': EN_COLA,
+                'progreso': 0,
+                'resultado': resultado,
+                'creada': time.time(),
+            })
+        except Exception:
+            shutil.rmtree(directorio, ignore_errors=True)
+            raise
+        logger.info(f"Tarea {tipo} {tarea_id} registrada por el usuario {id_usuario}")
+        self._iniciar_hilos()
+        self._cola.put((tarea_id, id_usuario, directorio, funcion))
+        return tarea_id
+
+    def estado(self, tarea_id, id_usuario=None):
+        """Estado de la tarea para la vista y la API; None si no existe o es de otro usuario."""
+        tarea = self._store.obtener(tarea_id)
+        if tarea is None or (id_usuario is not None and tarea['id_usuario'] != id_usuario):
+            return None
+        return self._publico(tarea)
+
+    def listar(self, id_usuario=None, limite=50, tipo=None):
+        """Tareas recientes del usuario (o de todos), de todos los tipos o solo de `tipo`."""
+        return [self._publico(tarea) for tarea in self._store.listar(id_usuario, limite, tipo)]
+
+    def activa_de_tipo(self, tipo):
+        """Id de una tarea de ese tipo que aún no terminó (para no lanzar dos a la vez), o None."""
+        return self._store.activa_de_tipo(tipo)
+
+    def artefacto(self, tarea_id, id_usuario=None):
+        """(ruta, nombre de descarga) del resultado de una tarea completada, o None."""
+        tarea = self._store.obtener(tarea_id)
+        if (tarea is None or (id_usuario is not None and tarea['id_usuario'] != id_usuario)
+                or tarea['estado'] != COMPLETADA or not tarea['artefacto']):
+            return None
+        ruta = os.path.join(self.work_dir, tarea_id, tarea['artefacto'])
+        return (ruta, tarea['nombre_descarga']) if os.path.exists(ruta) else None
+
+    def purge_expired(self):
+        """Borra las tareas terminadas hace más de `ttl` segundos y sus directorios."""
+        limite = time.time() - self.ttl
+        for tarea_id in self._store.eliminar_terminadas_antes_de(limite):
+            shutil.rmtree(os.path.join(self.work_dir, tarea_id), ignore_errors=True)
+
+    # --- EJECUCIÓN ---
+
+    def _ejecutar(self, tarea_id, id_usuario, directorio, funcion):
+        tarea = TareaEnCurso(self._store, tarea_id, id_usuario, directorio)
+        self._store.actualizar(tarea_id, estado=EN_PROCESO, iniciada=time.time())
+        inicio = time.perf_counter()
+        try:
+            # Contexto propio: las conexiones de la tarea se devuelven al pool al salir.
+            with self._app.app_context():
+                resultado = funcion(tarea)
+        except Exception as e:
+            logger.error(f"Tarea {tarea_id} fallida: {e}", exc_info=True)
+            self._store.actualizar(tarea_id, estado=FALLIDA, error=str(e) or type(e).__name__,
+                                   terminada=time.time())
+            return
+        self._store.actualizar(tarea_id, estado=COMPLETADA, progreso=100, resultado=resultado,
+                               mensaje=(resultado or {}).get('mensaje'), artefacto=tarea.artefacto,
+                               nombre_descarga=tarea.nombre_descarga, terminada=time.time())
+        logger.info(f"Tarea {tarea_id} completada en {time.perf_counter() - inicio:.1f} s")
+
+    def _iniciar_hilos(self):
+        # Hilos daemon: al detener el servidor no se espera a la cola; lo
+        # pendiente queda 'interrumpida'.
+        with self._lock:
+            while len(self._hilos) < self.workers:
+                hilo = threading.Thread(target=self._trabajar, name=f'tarea-{len(self._hilos)}', daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def _trabajar(self):
+        while True:
+            tarea_id, id_usuario, directorio, funcion = self._cola.get()
+            try:
+                self._ejecutar(tarea_id, id_usuario, directorio, funcion)
+            except Exception as e:
+                logger.error(f"Tarea {tarea_id}: no se pudo registrar su estado: {e}", exc_info=True)
+            finally:
+                self._cola.task_done()
+
+    @staticmethod
+    def _publico(tarea):
+        # El nombre interno del archivo de resultado no sale del servicio.
+        publico = {clave: valor for clave, valor in tarea.items() if clave != 'artefacto'}
+        publico['descargable'] = tarea['estado'] == COMPLETADA and bool(tarea['artefacto'])
+        publico['finalizada'] = tarea['estado'] in FINALES
+        return publico
+
+
+def _enlazar_o_copiar(origen, destino):
+    # Un enlace duro evita copiar archivos grandes cuando ambos directorios están en el mismo disco.
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copyfile(origen, destino)
@@ -1,19 +1,39 @@
 # app/application/services/legajo_service.py
-# Importa la librería para calcular hashes de archivos.
-import hashlib
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill
 from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.datavalidation import DataValidation
+import csv
 import io
+import json
+import os
+from types import SimpleNamespace
 from flask import current_app
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 import secrets
 import string
 import logging
+import threading
+import time
+from app.application.services.bulk_import import ImportProgress, en_lotes, leer_filas, prevalidar_lote, texto_dni
+from app.application.services.upload_ingest import ingest_upload
+from app.core.security import generate_password_hashes
+from app.database.row_mapper import values_getter
+from app.domain.repositories.i_personal_repository import LEGAJO_SECTIONS
+from app.infrastructure.persistence import catalog_cache
+from app.infrastructure.persistence.catalog_cache import CATALOG_CACHE, invalidate_catalogs, warm_up_catalogs
+from app.utils.pagination import KeysetPagination, decode_cursor, encode_cursor
 
 logger = logging.getLogger(__name__)
 
+# Columnas de la plantilla de carga masiva de personal, en orden.
+BULK_UPLOAD_HEADERS = [
+    "DNI", "Nombres", "Apellidos", "Sexo", "FechaNacimiento", "Telefono",
+    "Email", "Direccion", "EstadoCivil", "Nacionalidad", "UnidadAdministrativa",
+    "FechaIngreso"
+]
+
 
 # Define el servicio que contiene la lógica de negocio para los legajos.
 class LegajoService:
@@ -22,6 +42,10 @@ class LegajoService:
         self._personal_repo = personal_repository
         self._audit_service = audit_service
         self._usuario_service = usuario_service
+        # Totales del listado de personal por filtro: {filtro: (total, instante)}.
+        self._count_cache = {}
+        self._count_lock = threading.Lock()
+        self._count_refreshing = set()
 
     # --- MÉTODOS DE CONSULTA (GETTERS) ---
 
@@ -37,6 +61,24 @@ class LegajoService:
         # El SP devuelve una fila con (nombre_archivo, archivo_binario)
         return {"filename": document_row[0], "data": document_row[1]}
 
+    def get_document_stream(self, document_id, chunk_size=None):
+        """
+        Prepara la descarga en streaming de un documento: nombre, tamaño, hash
+        (para el ETag) y una función read(inicio, fin) que devuelve un generador
+        que lee ese rango del binario por tramos (memoria constante por descarga).
+        """
+        metadata = self._personal_repo.get_document_metadata(document_id)
+        if not metadata or not metadata.tamanio:
+            return None
+        chunk_size = chunk_size or current_app.config.get('DOCUMENT_STREAM_CHUNK_SIZE', 1024 * 1024)
+        repo = self._personal_repo
+        return {
+            "filename": metadata.nombre_archivo,
+            "size": metadata.tamanio,
+            "hash": metadata.hash_archivo,
+            "read": lambda start, end: repo.iter_document_chunks(document_id, chunk_size, start, end),
+        }
+
     def check_if_dni_exists(self, dni):
         """Orquesta la verificación de la existencia de un DNI."""
         return self._personal_repo.check_dni_exists(dni)
@@ -45,24 +87,160 @@ class LegajoService:
         """Obtiene una lista paginada y filtrada de personal."""
         return self._personal_repo.get_all_paginated(page, per_page, filters)
 
-    def get_personal_details(self, personal_id, current_user):
+    def get_personal_list_page(self, filters=None, page=1, cursor=None, per_page=15):
+        """
+        Página del listado de personal según PERSONAL_PAGINATION_MODE: 'keyset'
+        (por defecto, navegación con cursor) u 'offset' (números de página con el SP).
+        """
+        if current_app.config.get('PERSONAL_PAGINATION_MODE', 'keyset') == 'offset':
+            return self.get_all_personal_paginated(page, per_page, filters)
+        return self.get_personal_page_keyset(per_page, filters, cursor)
+
+    def get_personal_page_keyset(self, per_page, filters=None, cursor=None):
+        """
+        Obtiene una página del listado por clave. `cursor` es el token opaco de
+        next_cursor/prev_cursor de la página anterior (None = primera página).
+        Un cursor inválido o que ya no devuelve filas vuelve a la primera página.
+        """
+        decoded = decode_cursor(cursor)
+        key, direction, page = decoded if decoded else (None, 'next', 1)
+        rows, has_more = self._personal_repo.get_personal_keyset(per_page, filters, key, direction)
+        if key and not rows:
+            key, direction, page = None, 'next', 1
+            rows, has_more = self._personal_repo.get_personal_keyset(per_page, filters)
+
+        if direction == 'next':
+            has_next, has_prev = has_more, key is not None
+        else:
+            has_next, has_prev = True, has_more
+        next_cursor = encode_cursor(self._personal_key(rows[-1]), 'next', page + 1) if has_next and rows else None
+        prev_cursor = encode_cursor(self._personal_key(rows[0]), 'prev', page - 1) if has_prev and rows else None
+
+        total, estimated = self._get_personal_total(filters)
+        return KeysetPagination(rows, per_page, total, next_cursor, prev_cursor, page, estimated)
+
+    @staticmethod
+    def _personal_key(row):
+        return (row.apellidos, row.nombres, row.id_personal)
+
+    def _get_personal_total(self, filters):
         """
-        Obtiene todos los detalles del legajo de una persona por su ID,
-        aplicando reglas de control de acceso.
+        Total del listado, cacheado por filtro durante PERSONAL_COUNT_CACHE_TTL
+        segundos. Un valor vencido se sigue mostrando mientras un hilo lo recalcula,
+        así ninguna página espera al COUNT. Devuelve (total, es_aproximado).
         """
-        legajo = self._personal_repo.get_full_legajo_by_id(personal_id)
+        cache_key = ((filters or {}).get('dni') or '', (filters or {}).get('nombres') or '')
+        ttl = current_app.config.get('PERSONAL_COUNT_CACHE_TTL', 300)
+        with self._count_lock:
+            cached = self._count_cache.get(cache_key)
+        if cached is None:
+            total = self._personal_repo.count_personal(filters, approximate=True)
+            self._store_personal_total(cache_key, total)
+            return total, not any(cache_key)
+        if time.monotonic() - cached[1] >= ttl:
+            self._refresh_personal_total_async(cache_key, filters)
+        return cached[0], True
+
+    def _store_personal_total(self, cache_key, total):
+        with self._count_lock:
+            if len(self._count_cache) >= 256 and cache_key not in self._count_cache:
+                # Filtros de búsqueda libres: se descarta el total más antiguo.
+                oldest = min(self._count_cache, key=lambda k: self._count_cache[k][1])
+                del self._count_cache[oldest]
+            self._count_cache[cache_key] = (total, time.monotonic())
+
+    def _refresh_personal_total_async(self, cache_key, filters):
+        with self._count_lock:
+            if cache_key in self._count_refreshing:
+                return
+            self._count_refreshing.add(cache_key)
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                # Contexto propio: la conexión del hilo se devuelve al pool al salir.
+                with app.app_context():
+                    self._store_personal_total(cache_key, self._personal_repo.count_personal(filters, approximate=True))
+            except Exception as e:
+                logger.warning(f"No se pudo recalcular el total del listado de personal: {e}")
+            finally:
+                with self._count_lock:
+                    self._count_refreshing.discard(cache_key)
+
+        threading.Thread(target=refresh, name='conteo-personal', daemon=True).start()
+
+    def get_legajo_header(self, personal_id, current_user):
+        """
+        Cabecera del legajo (datos de la persona) y documentos por sección, sin
+        leer el resto: las secciones del acordeón se piden luego por separado
+        (get_legajo_section).
+        """
+        legajo = self._personal_repo.get_legajo_projection(personal_id, ('personal',))
         if not legajo:
             return None
 
         # Seguridad: Los roles 'RRHH', 'Sistemas' y 'AdministradorLegajos' tienen permitido ver cualquier legajo.
-        # Se mantiene la estructura por si se necesita añadir lógica de permisos más granular en el futuro.
+        # (Actualmente, los decoradores de ruta ya previenen esto, pero es una doble capa de seguridad).
         if current_user.rol not in ['RRHH', 'Sistemas', 'AdministradorLegajos']:
-            # Si el rol no es uno de los permitidos, se deniega el acceso.
-            # (Actualmente, los decoradores de ruta ya previenen esto, pero es una doble capa de seguridad).
             raise PermissionError("No tiene permiso para ver este legajo.")
-
+        legajo['documentos_por_seccion'] = self.count_documents_by_seccion(personal_id)
         return legajo
 
+    def count_documents_by_seccion(self, personal_id):
+        """Documentos activos por sección ({id_seccion: cantidad}), para los contadores del acordeón."""
+        return self._personal_repo.count_documents_by_seccion(personal_id)
+
+    def get_legajo_projection(self, personal_id, sections):
+        """Solo las partes indicadas del legajo (p. ej. ('personal', 'contratos'))."""
+        return self._personal_repo.get_legajo_projection(personal_id, sections)
+
+    def get_legajo_section(self, personal_id, section, id_seccion=None, days_to_expire=30):
+        """
+        Una parte del legajo lista para JSON: fechas en ISO 8601 y, en los
+        documentos, 'estado_vencimiento' ('vencido', 'por_vencer' o None).
+        `id_seccion` limita los documentos a una sección del legajo.
+        """
+        if section not in LEGAJO_SECTIONS:
+            raise ValueError(f"Sección del legajo desconocida: {section}")
+        legajo = self._personal_repo.get_legajo_projection(personal_id, (section,), id_seccion=id_seccion)
+        if legajo is None:
+            return None
+        data = legajo[section]
+        if section == 'personal':
+            return self._jsonable(data)
+
+        rows = [self._jsonable(row) for row in data]
+        if section == 'documentos':
+            today = datetime.now().date()
+            threshold = today + timedelta(days=days_to_expire)
+            for row, record in zip(rows, data):
+                vencimiento = record.get('fecha_vencimiento')
+                if isinstance(vencimiento, datetime):
+                    vencimiento = vencimiento.date()
+                if not vencimiento:
+                    row['estado_vencimiento'] = None
+                elif vencimiento < today:
+                    row['estado_vencimiento'] = 'vencido'
+                elif vencimiento <= threshold:
+                    row['estado_vencimiento'] = 'por_vencer'
+                else:
+                    row['estado_vencimiento'] = None
+        return rows
+
+    @staticmethod
+    def _jsonable(record):
+        # Fechas en ISO 8601 y decimales como texto (jsonify usa el formato HTTP para las fechas).
+        result = {}
+        for key, value in record.items():
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            elif isinstance(value, (bytes, bytearray, memoryview)):
+                continue
+            result[key] = value
+        return result
+
     def get_documents_by_personal_id(self, personal_id):
         """Obtiene los documentos de un empleado."""
         return self._personal_repo.find_documents_by_personal_id(personal_id)
@@ -78,6 +256,11 @@ class LegajoService:
     def get_tipos_documento_for_select(self):
         return self._personal_repo.get_tipos_documento_for_select()
 
+    def refresh_catalogs(self):
+        """Descarta la caché de catálogos y la vuelve a cargar desde la BD."""
+        invalidate_catalogs()
+        return warm_up_catalogs(self._personal_repo, current_app.config['USUARIO_REPOSITORY'])
+
     # --- MÉTODOS DE OPERACIONES (CUD) ---
 
     def register_new_personal(self, form_data, creating_user_id):
@@ -204,6 +387,13 @@ class LegajoService:
         return random_password
 
     def _get_personal_role_id(self) -> int:
+        """
+        Obtiene el ID del rol 'Personal' (o su alternativo) desde la caché de
+        catálogos; solo consulta la BD la primera vez o tras invalidar los roles.
+        """
+        return CATALOG_CACHE.get_or_load((catalog_cache.ROL_PERSONAL,), self._query_personal_role_id)
+
+    def _query_personal_role_id(self) -> int:
         """
         Obtiene el ID del rol 'Personal' de la BD.
         Si no existe, busca un rol alternativo válido.
@@ -247,7 +437,12 @@ class LegajoService:
             return None
 
     def upload_document_to_personal(self, form_data, file_storage, current_user_id):
-        """Gestiona la validación y subida de un nuevo documento."""
+        """
+        Gestiona la validación y subida de un nuevo documento. El archivo se lee
+        una sola vez (upload_ingest.py): tipo real, contenido activo en PDFs,
+        tamaño y sha256 se comprueban mientras se copia a un archivo temporal,
+        desde el que el repositorio lo guarda por tramos.
+        """
         if not file_storage or not file_storage.filename:
             raise ValueError("No se proporcionó ningún archivo para subir.")
 
@@ -257,21 +452,14 @@ class LegajoService:
         if '.' not in filename or filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
             raise ValueError(f"Tipo de archivo no permitido. Solo se aceptan: {', '.join(allowed_extensions)}")
 
-        file_bytes = file_storage.read()
-        if len(file_bytes) > current_app.config['MAX_CONTENT_LENGTH']:
-            max_size_mb = current_app.config['MAX_CONTENT_LENGTH'] / (1024 * 1024)
-            raise ValueError(f"El archivo es demasiado grande. El tamaño máximo es de {max_size_mb:.0f} MB.")
-        
-        file_storage.seek(0)
-        
-        file_hash = hashlib.sha256(file_bytes).hexdigest()
-        
-        doc_data = form_data.copy()
-        doc_data['nombre_archivo'] = filename
-        doc_data['hash_archivo'] = file_hash
-        id_personal = doc_data.get('id_personal')
+        with ingest_upload(file_storage, allowed_extensions, current_app.config['MAX_CONTENT_LENGTH'],
+                           max_memory=current_app.config.get('UPLOAD_SPOOL_MAX_MEMORY', 1024 * 1024)) as upload:
+            doc_data = form_data.copy()
+            doc_data['nombre_archivo'] = filename
+            doc_data['hash_archivo'] = upload.sha256
+            id_personal = doc_data.get('id_personal')
 
-        self._personal_repo.add_document(doc_data, file_bytes)
+            self._personal_repo.add_document_stream(doc_data, upload)
         
         self._audit_service.log(
             current_user_id,
@@ -280,6 +468,31 @@ class LegajoService:
             f"Subió el archivo '{filename}' al legajo del personal ID {id_personal}"
         )
 
+    def upload_documents_bulk(self, documents, current_user_id):
+        """
+        Guarda en una sola transacción documentos ya validados
+        [(form_data, IngestedUpload), ...], p. ej. las partes de un PDF de
+        legajo separado en memoria. Devuelve los segundos que tomó la BD.
+        """
+        if not documents:
+            return 0.0
+        for doc_data, upload in documents:
+            doc_data['nombre_archivo'] = upload.filename
+            doc_data['hash_archivo'] = upload.sha256
+        inicio = time.perf_counter()
+        self._personal_repo.add_documents_bulk(documents)
+        segundos = round(time.perf_counter() - inicio, 4)
+
+        personal_ids = sorted({doc_data.get('id_personal') for doc_data, _ in documents})
+        self._audit_service.log(
+            current_user_id,
+            'Documentos',
+            'SUBIR',
+            f"Subió {len(documents)} documento(s) al legajo del personal ID {', '.join(map(str, personal_ids))}",
+            {'archivos': [upload.filename for _, upload in documents], 'segundos_bd': segundos}
+        )
+        return segundos
+
     def delete_personal_by_id(self, personal_id, deleting_user_id):
         """Desactiva un legajo de personal, su usuario asociado (si existe), y audita la acción."""
         persona = self._personal_repo.find_by_id(personal_id)
@@ -363,74 +576,182 @@ class LegajoService:
             f"Se marcó como eliminado el documento con ID {document_id}"
         )
 
-    def process_bulk_upload(self, file_storage, creating_user_id):
+    def process_bulk_upload(self, file_storage, creating_user_id, batch_size=500, progress=None):
         """
-        Procesa un archivo Excel para la carga masiva de personal.
-        Valida cada fila y registra a los nuevos empleados.
+        Procesa un archivo de carga masiva de personal (Excel .xlsx, .csv o .tsv)
+        en dos pasadas por lotes de `batch_size` filas (bulk_import.leer_filas):
+        la primera valida todo el archivo con pandas (prevalidar_lote), incluidos
+        los DNI ya registrados, sin escribir nada; la segunda registra solo las
+        filas limpias, una transacción por lote (_persist_bulk_rows).
+        `progress` (ImportProgress) recibe los contadores.
         """
-        import openpyxl
-        
-        workbook = openpyxl.load_workbook(file_storage)
-        sheet = workbook.active
-        
-        # Se asume que la primera fila es el encabezado.
-        headers = [cell.value for cell in sheet[1]]
-        
-        # Columnas esperadas en la plantilla.
-        expected_headers = [
-            "DNI", "Nombres", "Apellidos", "Sexo", "FechaNacimiento", "Telefono",
-            "Email", "Direccion", "EstadoCivil", "Nacionalidad", "UnidadAdministrativa",
-            "FechaIngreso"
-        ]
-
-        # Validación simple de encabezados.
-        if headers[:len(expected_headers)] != expected_headers:
-            raise ValueError("El formato del archivo Excel es incorrecto. Las columnas no coinciden con la plantilla.")
-
-        unidades_map = {nombre: id_ for id_, nombre in self._personal_repo.get_unidades_for_select()}
-
-        registros_exitosos = 0
-        registros_fallidos = 0
-        errores = []
+        progress = progress or ImportProgress(file_storage.filename)
+        filename = file_storage.filename or ''
+        try:
+            unidades_map = {nombre: id_ for id_, nombre in self._personal_repo.get_unidades_for_select()}
 
-        # Itera sobre las filas, omitiendo el encabezado.
-        for row_index, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-            row_data = dict(zip(headers, row))
-            
+            # 1. Prevalidación de todo el archivo.
+            headers, filas = leer_filas(file_storage.stream, filename)
             try:
-                # --- Validación de Datos ---
-                if not all([row_data.get('DNI'), row_data.get('Nombres'), row_data.get('Apellidos')]):
-                    raise ValueError("DNI, Nombres y Apellidos son obligatorios.")
-                
-                unidad_nombre = row_data.get('UnidadAdministrativa')
-                if not unidad_nombre or unidad_nombre not in unidades_map:
-                    raise ValueError(f"La unidad administrativa '{unidad_nombre}' no es válida.")
-
-                # --- Mapeo de Datos para el Formulario ---
-                form_data = {
-                    'dni': str(row_data['DNI']),
-                    'nombres': row_data['Nombres'],
-                    'apellidos': row_data['Apellidos'],
-                    'sexo': row_data.get('Sexo'),
-                    'fecha_nacimiento': row_data.get('FechaNacimiento'),
-                    'telefono': row_data.get('Telefono'),
-                    'email': row_data.get('Email'),
-                    'direccion': row_data.get('Direccion'),
-                    'estado_civil': row_data.get('EstadoCivil'),
-                    'nacionalidad': row_data.get('Nacionalidad', 'Peruana'),
-                    'id_unidad': unidades_map[unidad_nombre],
-                    'fecha_ingreso': row_data.get('FechaIngreso')
-                }
-                
-                # Llama al método de registro existente.
-                self.register_new_personal(form_data, creating_user_id)
-                registros_exitosos += 1
-
-            except Exception as e:
-                registros_fallidos += 1
-                errores.append(f"Fila {row_index}: {e}")
-        
-        return {"exitosos": registros_exitosos, "fallidos": registros_fallidos, "errores": errores}
+                # Validación simple de encabezados.
+                if [str(h).strip() if h is not None else None for h in headers[:len(BULK_UPLOAD_HEADERS)]] != BULK_UPLOAD_HEADERS:
+                    raise ValueError("El formato del archivo es incorrecto. Las columnas no coinciden con la plantilla.")
+                rechazadas = set()
+                dnis_vistos = set()
+                for lote in en_lotes(filas, batch_size):
+                    malas, errores = prevalidar_lote(lote, BULK_UPLOAD_HEADERS, unidades_map, dnis_vistos,
+                                                     self._registered_dnis)
+                    rechazadas |= malas
+                    progress.avanzar(leidas=len(lote), errores=errores)
+            finally:
+                filas.close()
+            logger.info(f"Carga masiva '{progress.nombre_archivo}': {progress.leidas} filas validadas, "
+                        f"{len(rechazadas)} rechazadas")
+
+            # 2. Registro de las filas limpias.
+            progress.guardando()
+            file_storage.stream.seek(0)
+            _, filas = leer_filas(file_storage.stream, filename)
+            try:
+                for lote in en_lotes(filas, batch_size):
+                    validas = [(row_index, self._bulk_row_to_form(dict(zip(BULK_UPLOAD_HEADERS, row)), unidades_map))
+                               for row_index, row in lote if row_index not in rechazadas]
+                    errores = []
+                    exitosos = self._persist_bulk_rows(validas, creating_user_id, errores)
+                    progress.avanzar(exitosos=exitosos, errores=errores)
+                    logger.info(f"Carga masiva '{progress.nombre_archivo}': {progress.exitosos} registradas, "
+                                f"{progress.fallidos} con error")
+            finally:
+                filas.close()
+        finally:
+            progress.terminar()
+
+        return progress.resultado()
+
+    def _registered_dnis(self, dnis):
+        """DNI del conjunto que ya existen en personal (activo o no), con consultas IN por bloque."""
+        return set(self._personal_repo.find_ids_by_dni(dnis, only_active=False))
+
+    def process_bulk_upload_job(self, tarea, entrada, nombre_archivo, creating_user_id, batch_size=500):
+        """
+        Carga masiva como tarea en segundo plano (JobService): procesa el archivo
+        guardado en `tarea.ruta(entrada)`. El avance se calcula con la posición de
+        lectura (validación 0-50 %, registro 50-100 %) y todas las filas con
+        error, sin el tope de MAX_ERRORES, quedan en un CSV descargable.
+        """
+        ruta = tarea.ruta(entrada)
+        tamano = os.path.getsize(ruta) or 1
+        with open(ruta, 'rb') as stream, \
+                open(tarea.ruta('errores.csv'), 'w', newline='', encoding='utf-8-sig') as informe:
+            escritor = csv.writer(informe)
+            escritor.writerow(['detalle'])
+
+            fase = {'actual': 'validando'}
+
+            def al_avanzar(snapshot):
+                if snapshot['fase'] == 'validando':
+                    mensaje = f"Validando: {snapshot['leidas']} filas revisadas, {snapshot['fallidos']} con error"
+                    tarea.avanzar(50 * min(stream.tell(), tamano) / tamano, mensaje)
+                    return
+                mensaje = f"Guardando: {snapshot['exitosos']} filas registradas, {snapshot['fallidos']} con error"
+                if fase['actual'] == 'validando':
+                    # Aviso del cambio de fase: el archivo aún no volvió al inicio.
+                    fase['actual'] = 'guardando'
+                    tarea.avanzar(50, mensaje)
+                else:
+                    tarea.avanzar(50 + 50 * min(stream.tell(), tamano) / tamano, mensaje)
+
+            progreso = ImportProgress(nombre_archivo, informe=lambda mensaje: escritor.writerow([mensaje]),
+                                      al_avanzar=al_avanzar)
+            resultado = self.process_bulk_upload(SimpleNamespace(filename=nombre_archivo, stream=stream),
+                                                 creating_user_id, batch_size=batch_size, progress=progreso)
+        if resultado['fallidos']:
+            tarea.publicar('errores.csv', f"errores_{os.path.splitext(nombre_archivo)[0]}.csv")
+        return dict(resultado, mensaje=f"Carga masiva completada. Registros exitosos: {resultado['exitosos']}, "
+                                       f"fallidos: {resultado['fallidos']}.")
+
+    @staticmethod
+    def _bulk_row_to_form(row_data, unidades_map):
+        """Datos de una fila ya validada con el formato del formulario de registro."""
+        return {
+            'dni': texto_dni(row_data['DNI']),
+            'nombres': row_data['Nombres'],
+            'apellidos': row_data['Apellidos'],
+            'sexo': row_data.get('Sexo'),
+            'fecha_nacimiento': row_data.get('FechaNacimiento'),
+            'telefono': row_data.get('Telefono'),
+            'email': row_data.get('Email'),
+            'direccion': row_data.get('Direccion'),
+            'estado_civil': row_data.get('EstadoCivil'),
+            'nacionalidad': row_data.get('Nacionalidad') or 'Peruana',
+            'id_unidad': unidades_map[row_data['UnidadAdministrativa']],
+            'fecha_ingreso': row_data.get('FechaIngreso')
+        }
+
+    def _persist_bulk_rows(self, rows, creating_user_id, errores):
+        """
+        Registra las filas válidas de un lote con una sola transacción
+        (register_personal_bulk: personal, usuario con el DNI como username y
+        contraseña, y bitácora), en lugar de register_new_personal fila a fila.
+        Las comprobaciones de create_user (email obligatorio, username y email
+        libres) se hacen antes para todo el lote. Añade a `errores` las filas que
+        fallen y devuelve cuántas se registraron.
+        """
+        if not rows:
+            return 0
+        id_rol_personal = self._get_personal_role_id()
+        if not id_rol_personal:
+            logger.error("No se encontró ningún rol disponible en la base de datos")
+            raise Exception("Error de configuración: No hay roles disponibles en el sistema")
+
+        usernames, emails = self._personal_repo.find_taken_logins(
+            [form_data['dni'] for _, form_data in rows],
+            [(form_data.get('email') or '').strip() for _, form_data in rows]
+        )
+        filas, altas = [], []
+        for row_index, form_data in rows:
+            dni = form_data['dni']
+            email = (form_data.get('email') or '').strip()
+            if not email:
+                motivo = "Todos los campos son obligatorios"
+            elif dni in usernames:
+                motivo = f"El nombre de usuario '{dni}' ya existe en el sistema"
+            elif email in emails:
+                motivo = f"El correo electrónico '{email}' ya está registrado"
+            else:
+                motivo = None
+            if motivo:
+                errores.append(f"Fila {row_index}: No se pudo crear el usuario automáticamente: {motivo}")
+                continue
+            usernames.add(dni)
+            emails.add(email)
+
+            audit_data = dict(form_data, username_generado=dni,
+                              nota=f"Usuario creado automáticamente con DNI {dni} como username y contraseña")
+            altas.append(dict(
+                form_data,
+                username=dni,
+                email=email,
+                descripcion=f"Se creó el legajo para el DNI {dni} con usuario {dni}",
+                detalle_json=json.dumps(audit_data, default=str),
+            ))
+            filas.append(row_index)
+
+        if not altas:
+            return 0
+        # scrypt domina el costo de la carga: los hashes del lote se calculan en paralelo.
+        for alta, password_hash in zip(altas, generate_password_hashes([alta['username'] for alta in altas])):
+            alta['password_hash'] = password_hash
+        resultados = self._personal_repo.register_personal_bulk(altas, id_rol_personal, creating_user_id)
+        registradas = []
+        for row_index, alta, error in zip(filas, altas, resultados):
+            if error:
+                errores.append(f"Fila {row_index}: {error}")
+            else:
+                registradas.append(alta)
+        if self._usuario_service and registradas:
+            self._usuario_service.send_welcome_emails([(alta['email'], alta['username']) for alta in registradas])
+        return len(registradas)
 
     def generate_bulk_upload_template(self, unidades):
         """
@@ -440,11 +761,7 @@ class LegajoService:
         ws = wb.active
         ws.title = "Plantilla de Carga de Personal"
 
-        headers = [
-            "DNI", "Nombres", "Apellidos", "Sexo", "FechaNacimiento", "Telefono",
-            "Email", "Direccion", "EstadoCivil", "Nacionalidad", "UnidadAdministrativa",
-            "FechaIngreso"
-        ]
+        headers = BULK_UPLOAD_HEADERS
         ws.append(headers)
 
         # Estilo para el encabezado.
@@ -483,8 +800,11 @@ class LegajoService:
 
     # --- MÉTODOS DE REPORTES Y ESTADO ---
     
-    def generate_general_report_excel(self):
-        """Genera un reporte general de personal en un archivo Excel."""
+    def generate_general_report_excel(self, al_avanzar=None):
+        """
+        Genera un reporte general de personal en un archivo Excel.
+        `al_avanzar(fraccion)` se llama cada 500 filas escritas.
+        """
         personal_data = self._personal_repo.get_all_for_report()
         wb = Workbook()
         ws = wb.active
@@ -504,16 +824,22 @@ class LegajoService:
             cell.fill = header_fill
             cell.alignment = Alignment(horizontal="center", vertical="center")
 
-        for persona in personal_data:
-            row_data = [
-                persona.get('dni'), persona.get('apellidos'), persona.get('nombres'),
-                persona.get('sexo'), persona.get('fecha_nacimiento'), persona.get('email'),
-                persona.get('telefono'), persona.get('nombre_unidad'),
-                persona.get('fecha_ingreso'), 'Activo' if persona.get('activo') else 'Inactivo',
-                persona.get('cargo'), persona.get('tipo_contrato'), persona.get('modalidad'),
-                persona.get('sueldo'), persona.get('resolucion')
-            ]
+        # Las columnas se extraen con un getter compilado una vez para la forma del
+        # result set, en lugar de 15 llamadas a .get() por fila.
+        columnas = (
+            'dni', 'apellidos', 'nombres', 'sexo', 'fecha_nacimiento', 'email',
+            'telefono', 'nombre_unidad', 'fecha_ingreso', 'activo',
+            'cargo', 'tipo_contrato', 'modalidad', 'sueldo', 'resolucion'
+        )
+        idx_activo = columnas.index('activo')
+        extraer = values_getter(personal_data, columnas)
+        total = len(personal_data)
+        for numero, persona in enumerate(personal_data, start=1):
+            row_data = list(extraer(persona))
+            row_data[idx_activo] = 'Activo' if row_data[idx_activo] else 'Inactivo'
             ws.append(row_data)
+            if al_avanzar and numero % 500 == 0:
+                al_avanzar(numero / total)
 
         for column_cells in ws.columns:
             length = max(len(str(cell.value or "")) for cell in column_cells)
@@ -525,26 +851,28 @@ class LegajoService:
         
         return excel_stream
 
-    def check_document_status_for_all_personal(self, days_to_expire=30):
-        """Revisa documentos con fecha de vencimiento y resume el estado por persona."""
-        all_docs = self._personal_repo.get_all_documents_with_expiration()
-        status_summary = {}
+    def generate_general_report_job(self, tarea, nombre_descarga):
+        """Reporte general en Excel como tarea en segundo plano: el archivo queda para descargar."""
+        tarea.avanzar(5, "Consultando el personal")
+        excel_stream = self.generate_general_report_excel(
+            al_avanzar=lambda fraccion: tarea.avanzar(10 + 80 * fraccion, "Escribiendo el reporte"))
+        tarea.avanzar(90, "Guardando el archivo")
+        with open(tarea.ruta('reporte.xlsx'), 'wb') as archivo:
+            archivo.write(excel_stream.getbuffer())
+        tarea.publicar('reporte.xlsx', nombre_descarga)
+        return {'mensaje': "Reporte generado. Ya puede descargarlo."}
+
+    def get_document_status_for_page(self, personas, days_to_expire=30):
+        """
+        Resume el estado de los documentos (vencidos / por vencer) solo de las
+        personas de la página actual, con una consulta agrupada por sus IDs. Las
+        fechas límite se calculan en cada llamada, así que el cambio de día no
+        requiere recalcular nada guardado.
+        """
+        personal_ids = [persona.id_personal for persona in personas]
         today = datetime.now().date()
-        expiration_threshold = today + timedelta(days=days_to_expire)
-
-        for doc in all_docs:
-            personal_id = doc['id_personal']
-            vencimiento = doc['fecha_vencimiento']
-
-            if personal_id not in status_summary:
-                status_summary[personal_id] = {'expired': 0, 'expiring_soon': 0}
-
-            if vencimiento < today:
-                status_summary[personal_id]['expired'] += 1
-            elif vencimiento <= expiration_threshold:
-                status_summary[personal_id]['expiring_soon'] += 1
-        
-        return status_summary
+        return self._personal_repo.get_expiry_summary(personal_ids, today,
+                                                      today + timedelta(days=days_to_expire))
 
     def get_expiring_documents_notifications(self, days_threshold=30):
         """
@@ -1,10 +1,12 @@
 # RUTA: app/application/services/monitoring_service.py
 
 import psutil
-import pyodbc
 from datetime import datetime
 from flask import current_app
 import logging
+from app.database.connector import get_db_admin, get_pool_stats, get_query_stats
+from app.database.instrumentation import HISTOGRAM_BUCKETS_MS
+from app.utils.cache import all_cache_stats
 
 logger = logging.getLogger(__name__)
 
@@ -69,9 +71,8 @@ class MonitoringService:
             if not self._personal_repo:
                 return self._get_default_db_metrics()
             
-            # Conectar a SQL Server para obtener información de conexiones
-            connection_string = self._build_connection_string()
-            conn = pyodbc.connect(connection_string)
+            # Usar la conexión de administrador de la petición (tomada del pool)
+            conn = get_db_admin()
             cursor = conn.cursor()
             
             # Obtener número de conexiones activas
@@ -93,7 +94,6 @@ class MonitoringService:
             db_size_gb = round(db_size_mb / 1024, 2) if db_size_mb else 0
             
             cursor.close()
-            conn.close()
             
             return {
                 'active_connections': int(active_connections),
@@ -105,16 +105,79 @@ class MonitoringService:
             logger.error(f"Error obteniendo métricas de BD: {e}")
             return self._get_default_db_metrics()
     
-    def _build_connection_string(self):
-        """Construye la cadena de conexión a SQL Server."""
-        driver = current_app.config.get('DB_DRIVER', '{ODBC Driver 17 for SQL Server}')
-        server = current_app.config.get('DB_SERVER')
-        database = current_app.config.get('DB_DATABASE')
-        username = current_app.config.get('DB_USERNAME_SYSTEMS_ADMIN')
-        password = current_app.config.get('DB_PASSWORD_SYSTEMS_ADMIN')
-        
-        return f'DRIVER={driver};SERVER={server};DATABASE={database};UID={username};PWD={password}'
+    def get_pool_metrics(self):
+        """
+        Obtiene las estadísticas de los pools de conexiones:
+        - Conexiones abiertas, libres y en uso por pool
+        - Checkouts, esperas y tiempos de espera agotados
+        - Conexiones recicladas y descartadas
+        """
+        try:
+            pools = get_pool_stats()
+            for pool in pools:
+                usage = (pool['in_use'] / pool['max_size'] * 100) if pool['max_size'] else 0
+                pool['usage_percent'] = round(usage, 2)
+                pool['status'] = self._get_health_status(usage, 75, 95)
+            return {
+                'pool_enabled': current_app.config.get('DB_POOL_ENABLED', True),
+                'pools': pools,
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo métricas del pool de conexiones: {e}")
+            return {'pool_enabled': False, 'pools': []}
     
+    def get_query_metrics(self, limit=10):
+        """
+        Obtiene las sentencias que más pesan en la base de datos:
+        - Top por tiempo total acumulado
+        - Top por percentil 95 de la ventana reciente
+        """
+        try:
+            registry = get_query_stats()
+            if registry is None:
+                return {'query_stats_enabled': False, 'top_by_total': [], 'top_by_p95': []}
+            labels = [f"≤{limit_ms}" for limit_ms in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}"]
+            return {
+                'query_stats_enabled': True,
+                'top_by_total': registry.top(limit, order_by='total_ms'),
+                'top_by_p95': registry.top(limit, order_by='p95_ms'),
+                'histogram_labels': labels,
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo estadísticas de consultas: {e}")
+            return {'query_stats_enabled': False, 'top_by_total': [], 'top_by_p95': []}
+
+    def get_compression_metrics(self):
+        """
+        Obtiene el efecto de la compresión del binario de los documentos:
+        - Documentos con binario en la BD y cuántos están comprimidos
+        - Bytes almacenados frente a originales y ahorro
+        """
+        enabled = current_app.config.get('DOCUMENT_COMPRESSION_ENABLED', False)
+        try:
+            stats = self._personal_repo.get_compression_stats()
+            saved = stats['bytes_originales'] - stats['bytes_almacenados']
+            stats['bytes_ahorrados'] = saved
+            stats['mb_almacenados'] = round(stats['bytes_almacenados'] / (1024 ** 2), 2)
+            stats['mb_originales'] = round(stats['bytes_originales'] / (1024 ** 2), 2)
+            stats['mb_ahorrados'] = round(saved / (1024 ** 2), 2)
+            stats['porcentaje_ahorro'] = round(saved / stats['bytes_originales'] * 100, 2) if stats['bytes_originales'] else 0
+            return {'compression_enabled': enabled, 'compression_stats': stats}
+        except Exception as e:
+            logger.error(f"Error obteniendo estadísticas de compresión: {e}")
+            return {'compression_enabled': enabled, 'compression_stats': None}
+
+    def get_cache_metrics(self):
+        """
+        Obtiene las estadísticas de las cachés en memoria del proceso:
+        - Entradas vigentes, aciertos, fallos e invalidaciones por caché
+        """
+        try:
+            return {'cache_stats': all_cache_stats()}
+        except Exception as e:
+            logger.error(f"Error obteniendo estadísticas de caché: {e}")
+            return {'cache_stats': []}
+
     def _get_health_status(self, percent, warning_threshold=80, critical_threshold=95):
         """Determina el estado de salud basado en un porcentaje."""
         if percent >= critical_threshold:
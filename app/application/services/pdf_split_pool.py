@@ -0,0 +1,177 @@
+# RUTA: app/application/services/pdf_split_pool.py
+"""
+Separación de PDFs en paralelo con un pool de procesos (PDF_SPLIT_WORKERS).
+
+Extraer páginas con pypdf es trabajo de CPU en Python puro: dentro de un hilo
+de Waitress retiene el GIL y frena a las demás peticiones. Aquí cada rango de
+páginas (de uno o de varios PDFs) se envía a un ProcessPoolExecutor con un
+número acotado de procesos; el hilo de la petición solo espera resultados, que
+se entregan a medida que terminan.
+
+- Un PDF malformado falla solo en su rango: la excepción vuelve como resultado.
+- Si un proceso muere (p. ej. sin memoria), el pool se recrea y los rangos que
+  estaban en vuelo se reintentan una vez.
+- Si ningún rango termina en `timeout` segundos, los pendientes se dan por
+  vencidos y el pool se recrea para no dejar procesos atascados.
+
+Los procesos se crean con 'spawn' (igual en Windows y Linux, y seguro con los
+hilos de Waitress), la primera vez que se usan.
+"""
+
+import atexit
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Último PDF abierto en cada proceso hijo: los rangos de un mismo archivo que
+# caen en el mismo proceso no vuelven a leer su tabla de referencias.
+_LECTOR = {'clave': None, 'reader': None}
+
+
+def _extraer_rango(ruta, inicio, fin):
+    """Se ejecuta en el proceso hijo: bytes del PDF con las páginas inicio..fin y segundos."""
+    from pypdf import PdfReader, PdfWriter
+
+    reloj = time.perf_counter()
+    clave = (ruta, os.path.getmtime(ruta))
+    if _LECTOR['clave'] != clave:
+        _LECTOR['clave'], _LECTOR['reader'] = clave, PdfReader(ruta)
+    reader = _LECTOR['reader']
+    total_paginas = len(reader.pages)
+    if inicio < 1 or fin > total_paginas or inicio > fin:
+        raise ValueError(f"Rango de páginas inválido ({inicio}-{fin}), total={total_paginas}")
+    writer = PdfWriter()
+    for i in range(inicio - 1, fin):
+        writer.add_page(reader.pages[i])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue(), round(time.perf_counter() - reloj, 4)
+
+
+def rango_paginas(valor):
+    """(inicio, fin) de una entrada de la estructura: diccionario o tupla (inicio, fin)."""
+    if isinstance(valor, dict):
+        return valor.get('pagina_inicio'), valor.get('pagina_fin')
+    inicio, fin = valor
+    return inicio, fin
+
+
+class ParallelPdfSplitter:
+    """Pool de procesos compartido por la aplicación para separar PDFs."""
+
+    def __init__(self, workers, timeout=120, max_tasks_per_child=50):
+        self.workers = workers
+        self.timeout = timeout                      # segundos sin que termine ningún rango
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor = None
+        self._lock = threading.Lock()
+        self._atexit = False
+
+    def iter_split(self, trabajos):
+        """
+        Separa varios PDFs a la vez. `trabajos` es un iterable de
+        (clave, ruta, estructura_legajo); produce (clave, nombre_doc, resultado)
+        en el orden en que terminan, con resultado = {"contenido": bytes o None,
+        "paginas": (inicio, fin), "segundos": s, "exito": bool, "error": ...}.
+        """
+        pendientes = {}
+        for clave, ruta, estructura in trabajos:
+            for nombre_doc, valor in estructura.items():
+                try:
+                    inicio, fin = rango_paginas(valor)
+                except Exception as e:
+                    yield clave, nombre_doc, _fallo((None, None), str(e))
+                    continue
+                self._enviar(pendientes, (clave, nombre_doc, ruta, inicio, fin, 0))
+
+        while pendientes:
+            hechos, _ = wait(list(pendientes), timeout=self.timeout, return_when=FIRST_COMPLETED)
+            if not hechos:
+                logger.error(f"Separación en paralelo sin avance en {self.timeout} s; "
+                             f"{len(pendientes)} rango(s) vencidos, se reinicia el pool")
+                for futuro, ((clave, nombre_doc, _, inicio, fin, _), executor) in pendientes.items():
+                    futuro.cancel()
+                    self._reiniciar(executor, terminar=True)
+                    yield clave, nombre_doc, _fallo((inicio, fin), "Tiempo de espera agotado al separar el PDF")
+                pendientes.clear()
+                break
+
+            for futuro in hechos:
+                tarea, executor = pendientes.pop(futuro)
+                clave, nombre_doc, ruta, inicio, fin, intentos = tarea
+                try:
+                    contenido, segundos = futuro.result()
+                except BrokenProcessPool:
+                    self._reiniciar(executor)
+                    if intentos == 0:
+                        self._enviar(pendientes, (clave, nombre_doc, ruta, inicio, fin, 1))
+                        continue
+                    logger.error(f"[{clave}] El proceso que separaba '{nombre_doc}' terminó inesperadamente")
+                    yield clave, nombre_doc, _fallo((inicio, fin), "El proceso de separación terminó inesperadamente")
+                except Exception as e:
+                    logger.error(f"[{clave}] Error procesando '{nombre_doc}': {e}")
+                    yield clave, nombre_doc, _fallo((inicio, fin), str(e))
+                else:
+                    yield clave, nombre_doc, {"contenido": contenido, "paginas": (inicio, fin),
+                                              "segundos": segundos, "exito": True}
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- POOL ---
+
+    def _enviar(self, pendientes, tarea):
+        _, _, ruta, inicio, fin, _ = tarea
+        executor = self._pool()
+        try:
+            futuro = executor.submit(_extraer_rango, ruta, inicio, fin)
+        except BrokenProcessPool:
+            self._reiniciar(executor)
+            executor = self._pool()
+            futuro = executor.submit(_extraer_rango, ruta, inicio, fin)
+        pendientes[futuro] = (tarea, executor)
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+                if not self._atexit:
+                    atexit.register(self.shutdown)
+                    self._atexit = True
+            return self._executor
+
+    def _reiniciar(self, executor, terminar=False):
+        """
+        Descarta `executor` si sigue siendo el pool actual (el siguiente envío
+        crea otro); varias peticiones pueden ver el mismo pool roto y solo la
+        primera lo reemplaza. Con terminar=True (pool atascado) además se
+        terminan sus procesos.
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+            elif not terminar:
+                return
+        if terminar:
+            # ProcessPoolExecutor no cancela tareas en curso: se terminan sus procesos.
+            for proceso in list((getattr(executor, '_processes', None) or {}).values()):
+                proceso.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _fallo(paginas, error):
+    return {"contenido": None, "paginas": paginas, "exito": False, "error": error}
@@ -6,9 +6,15 @@ basándose en rangos de páginas. Útil para procesar legajos completos.
 
 import os
 import logging
+import shutil
+import tempfile
+import time
 from pypdf import PdfReader, PdfWriter
 from datetime import datetime
 
+from app.application.services.upload_ingest import IngestWriter
+from app.infrastructure.storage.spool import DEFAULT_CHUNK_SIZE
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,9 +29,6 @@ class PdfSplitService:
             temp_folder: Carpeta donde se guardarán los PDFs temporales
         """
         self.temp_folder = temp_folder
-        if not os.path.exists(self.temp_folder):
-            os.makedirs(self.temp_folder)
-            logger.info(f"Carpeta temporal creada: {self.temp_folder}")
 
     def separar_legajo(self, archivo_origen, estructura_legajo, id_personal=None):
         """
@@ -54,6 +57,11 @@ class PdfSplitService:
             logger.error(f"Archivo no encontrado: {archivo_origen}")
             return {"error": f"Archivo '{archivo_origen}' no encontrado"}
 
+        # La carpeta solo hace falta aquí: la separación en memoria no escribe en ella.
+        if not os.path.exists(self.temp_folder):
+            os.makedirs(self.temp_folder)
+            logger.info(f"Carpeta temporal creada: {self.temp_folder}")
+
         try:
             # Leer el PDF original
             reader = PdfReader(archivo_origen)
@@ -141,6 +149,129 @@ class PdfSplitService:
             logger.error(f"[ID {id_personal}] Error general al procesar PDF: {e}")
             return {"error": f"Error al procesar PDF: {str(e)}"}
 
+    def separar_legajo_en_memoria(self, archivo_origen, estructura_legajo, id_personal=None,
+                                  max_size=50 * 1024 * 1024, max_memory=DEFAULT_CHUNK_SIZE):
+        """
+        Igual que separar_legajo, pero cada parte se escribe en un SpooledBlob
+        propio (memoria hasta `max_memory` bytes, luego un temporal anónimo) en
+        lugar de en temp_folder, así que dos separaciones simultáneas no
+        comparten archivos. Mientras PdfWriter escribe, la parte se valida como
+        una subida (tipo, tamaño, contenido activo) y se calcula su sha256.
+
+        `archivo_origen` puede ser una ruta o un archivo abierto en modo binario.
+
+        Returns:
+            {"nombre_doc": {"contenido": IngestedUpload, "nombre_archivo": ...,
+                            "paginas": (inicio, fin), "segundos": s, "exito": True}}
+            o {"error": ...} si el PDF no se pudo leer. Quien recibe las partes
+            debe cerrar cada "contenido".
+        """
+        resultados = {}
+        try:
+            reader = PdfReader(archivo_origen)
+            total_paginas = len(reader.pages)
+        except Exception as e:
+            logger.error(f"[ID {id_personal}] Error general al procesar PDF: {e}")
+            return {"error": f"Error al procesar PDF: {str(e)}"}
+        logger.info(f"[ID {id_personal}] Separando PDF en memoria ({total_paginas} páginas)")
+
+        for nombre_doc, valor in estructura_legajo.items():
+            inicio_reloj = time.perf_counter()
+            inicio = fin = None
+            try:
+                # Mismos dos formatos que separar_legajo: diccionario o tupla (inicio, fin).
+                if isinstance(valor, dict):
+                    inicio, fin = valor.get('pagina_inicio'), valor.get('pagina_fin')
+                else:
+                    inicio, fin = valor
+                if inicio < 1 or fin > total_paginas or inicio > fin:
+                    logger.warning(
+                        f"[ID {id_personal}] Rango inválido para '{nombre_doc}': "
+                        f"({inicio}-{fin}), total={total_paginas}"
+                    )
+                    resultados[nombre_doc] = {"contenido": None, "paginas": (inicio, fin), "exito": False,
+                                              "error": "Rango de páginas inválido"}
+                    continue
+
+                writer = PdfWriter()
+                for i in range(inicio - 1, fin):
+                    writer.add_page(reader.pages[i])
+                nombre_archivo = f"{nombre_doc}_{id_personal}.pdf" if id_personal else f"{nombre_doc}.pdf"
+                destino = IngestWriter(nombre_archivo, {'pdf'}, max_size, max_memory=max_memory)
+                writer.write(destino)
+                contenido = destino.finish()
+
+                resultados[nombre_doc] = {
+                    "contenido": contenido,
+                    "nombre_archivo": nombre_archivo,
+                    "paginas": (inicio, fin),
+                    "segundos": round(time.perf_counter() - inicio_reloj, 4),
+                    "exito": True,
+                }
+                logger.info(
+                    f"[ID {id_personal}] Separado: {nombre_archivo} (págs {inicio}-{fin}, "
+                    f"{contenido.size} bytes, {resultados[nombre_doc]['segundos']} s)"
+                )
+            except Exception as e:
+                logger.error(f"[ID {id_personal}] Error procesando '{nombre_doc}': {e}")
+                resultados[nombre_doc] = {"contenido": None, "paginas": (inicio, fin), "exito": False,
+                                          "error": str(e)}
+        return resultados
+
+    def separar_legajo_en_paralelo(self, archivo_origen, estructura_legajo, splitter, id_personal=None,
+                                   max_size=50 * 1024 * 1024, max_memory=DEFAULT_CHUNK_SIZE):
+        """
+        Igual que separar_legajo_en_memoria, pero las páginas se extraen en los
+        procesos de `splitter` (ParallelPdfSplitter) y este hilo solo valida y
+        copia cada parte al SpooledBlob a medida que llega. Las partes se
+        devuelven en el orden de la estructura.
+        """
+        ruta, temporal = self._ruta_local(archivo_origen)
+        resultados = dict.fromkeys(estructura_legajo)
+        try:
+            for _, nombre_doc, resultado in splitter.iter_split([(id_personal, ruta, estructura_legajo)]):
+                if resultado["exito"]:
+                    nombre_archivo = f"{nombre_doc}_{id_personal}.pdf" if id_personal else f"{nombre_doc}.pdf"
+                    try:
+                        destino = IngestWriter(nombre_archivo, {'pdf'}, max_size, max_memory=max_memory)
+                        destino.write(resultado.pop("contenido"))
+                        resultado.update(contenido=destino.finish(), nombre_archivo=nombre_archivo)
+                    except ValueError as e:
+                        logger.error(f"[ID {id_personal}] Parte '{nombre_doc}' rechazada: {e}")
+                        resultado = {"contenido": None, "paginas": resultado["paginas"], "exito": False,
+                                     "error": str(e)}
+                resultados[nombre_doc] = resultado
+        except Exception:
+            for resultado in resultados.values():
+                if resultado and resultado.get("contenido"):
+                    resultado["contenido"].close()
+            raise
+        finally:
+            if temporal:
+                os.remove(ruta)
+        if resultados and not any(r["exito"] for r in resultados.values()):
+            # Ninguna parte salió: igual que en memoria, se informa como PDF ilegible.
+            return {"error": next(iter(resultados.values()))["error"]}
+        logger.info(
+            f"[ID {id_personal}] PDF separado en paralelo: "
+            f"{sum(1 for r in resultados.values() if r and r['exito'])}/{len(resultados)} partes"
+        )
+        return resultados
+
+    @staticmethod
+    def _ruta_local(archivo_origen):
+        """
+        Los procesos del pool abren el PDF por ruta: un archivo abierto se copia
+        a un temporal propio (nombre único, se borra al terminar).
+        Devuelve (ruta, es_temporal).
+        """
+        if isinstance(archivo_origen, (str, os.PathLike)):
+            return os.fspath(archivo_origen), False
+        archivo_origen.seek(0)
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as destino:
+            shutil.copyfileobj(archivo_origen, destino, DEFAULT_CHUNK_SIZE)
+        return destino.name, True
+
     def limpiar_temporales(self):
         """
         Elimina todos los archivos temporales (opcional).
@@ -0,0 +1,303 @@
+# RUTA: app/application/services/upload_ingest.py
+"""
+Ingesta de archivos subidos en una sola lectura.
+
+El archivo se lee una vez, por tramos, y cada tramo pasa por todas las
+comprobaciones a la vez: tipo real por Magic Number (primer KB), límite de
+tamaño (se corta en cuanto se supera), búsqueda de claves de JavaScript en PDFs
+en todo el archivo (no solo en los primeros KB), sha256 y copia a un SpooledBlob.
+Lo que sigue (almacén de blobs o BD) relee esa copia por tramos, así que la
+memoria por subida queda acotada a unos pocos tramos.
+
+    with ingest_upload(archivo, {'pdf', 'png'}, max_size) as upload:
+        repo.add_document_stream(datos, upload)     # upload.sha256, upload.size
+"""
+
+import logging
+import re
+
+from app.application.services.file_validation_service import FileValidationService
+from app.infrastructure.storage.spool import DEFAULT_CHUNK_SIZE, SpooledBlob
+
+logger = logging.getLogger(__name__)
+
+# Nombres PDF de contenido activo que no se aceptan (/S /JavaScript, /JS (...)).
+PDF_ACTIVE_CONTENT_NAMES = frozenset((b'JavaScript', b'JS'))
+
+# Bytes que se juntan antes de decidir el tipo del archivo.
+_HEADER_SIZE = 1024
+# Últimos bytes que se guardan del archivo (pie de JPEG).
+_TAIL_SIZE = 2
+
+
+class IngestedUpload(SpooledBlob):
+    """Archivo subido ya validado: SpooledBlob con nombre y tipo detectado."""
+
+    def __init__(self, filename, max_memory=DEFAULT_CHUNK_SIZE):
+        super().__init__(max_memory=max_memory)
+        self.filename = filename
+        self.detected_type = None
+
+
+def ingest_upload(file_storage, allowed_types, max_size, chunk_size=DEFAULT_CHUNK_SIZE,
+                  max_memory=DEFAULT_CHUNK_SIZE):
+    """
+    Lee, valida y copia el archivo en una sola pasada. Devuelve un IngestedUpload
+    (cerrarlo, o usarlo con `with`, libera la copia) o lanza ValueError con un
+    mensaje para el usuario si el archivo no es aceptable.
+    """
+    upload = IngestedUpload(file_storage.filename, max_memory=max_memory)
+    try:
+        _Ingestor(upload, allowed_types, max_size).run(_source_chunks(file_storage, chunk_size))
+    except BaseException:
+        upload.close()
+        raise
+    return upload
+
+
+class IngestWriter:
+    """
+    Destino de escritura (write/tell) con las mismas comprobaciones que
+    ingest_upload, para archivos que genera la propia aplicación (p. ej. las
+    partes de un PDF separado con PdfWriter): se validan, se hashean y se copian
+    a medida que se escriben. `finish()` devuelve el IngestedUpload.
+    """
+
+    def __init__(self, filename, allowed_types, max_size, max_memory=DEFAULT_CHUNK_SIZE):
+        self._upload = IngestedUpload(filename, max_memory=max_memory)
+        self._ingestor = _Ingestor(self._upload, allowed_types, max_size)
+        self._written = 0
+
+    def write(self, data):
+        data = bytes(data)
+        try:
+            self._ingestor.feed(data)
+        except BaseException:
+            self._upload.close()
+            raise
+        self._written += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._written
+
+    def flush(self):
+        # PdfWriter.write llama a flush() al terminar; lo escrito ya está en el IngestedUpload.
+        pass
+
+    def finish(self):
+        try:
+            self._ingestor.finish()
+        except BaseException:
+            self._upload.close()
+            raise
+        return self._upload
+
+
+def _source_chunks(file_storage, chunk_size):
+    # FileStorage de Werkzeug expone el archivo en .stream; cualquier objeto con read(n) sirve.
+    source = getattr(file_storage, 'stream', None) or file_storage
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _matching_types(header):
+    """Tipos cuya firma coincide con el inicio del archivo (DOCX y XLSX comparten la de ZIP)."""
+    return [
+        file_type
+        for file_type, magic_numbers in FileValidationService.ALLOWED_MAGIC_NUMBERS.items()
+        if any(magic and header.startswith(magic) for magic in magic_numbers)
+    ]
+
+
+class _Ingestor:
+    """Estado de una ingesta: tipo detectado, límite de tamaño y final del tramo anterior."""
+
+    def __init__(self, upload, allowed_types, max_size):
+        self.upload = upload
+        self.allowed_types = set(allowed_types)
+        self.max_size = max_size
+        self.limit = max_size
+        self.header = b''
+        self.pending = []           # tramos recibidos antes de conocer el tipo
+        self.tail = b''             # últimos bytes del archivo
+        self.pdf_scanner = None
+
+    def run(self, chunks):
+        for chunk in chunks:
+            self.feed(chunk)
+        self.finish()
+
+    def feed(self, chunk):
+        if self.pending is None:
+            self._accept(chunk)
+            return
+        self.header += chunk[:_HEADER_SIZE - len(self.header)]
+        self.pending.append(chunk)
+        if len(self.header) < _HEADER_SIZE:
+            return
+        self._detect(self.header)
+        pending, self.pending = self.pending, None
+        for item in pending:
+            self._accept(item)
+
+    def finish(self):
+        if self.pending is not None:
+            # Archivo más corto que la cabecera.
+            if not self.header:
+                raise ValueError("Archivo vacío")
+            self._detect(self.header)
+            pending, self.pending = self.pending, None
+            for item in pending:
+                self._accept(item)
+        if self.pdf_scanner is not None:
+            self._check_pdf_name(self.pdf_scanner.finish())
+        self._check_format(self.header)
+
+    def _detect(self, header):
+        filename = self.upload.filename
+        matches = _matching_types(header)
+        allowed = [file_type for file_type in matches if file_type in self.allowed_types]
+        if not allowed:
+            detected = matches[0] if matches else None
+            logger.warning(f"SEGURIDAD: Magic Number mismatch - Nombre: {filename}, Detectado: {detected}")
+            raise ValueError(f"Tipo de archivo no permitido. Detectado: {detected}")
+        self.upload.detected_type = allowed[0]
+        type_limit = FileValidationService.MAX_FILE_SIZES.get(allowed[0], 50 * 1024 * 1024)
+        self.limit = min(self.max_size, type_limit)
+        if allowed[0] == 'pdf':
+            self.pdf_scanner = _PdfActiveContentScanner()
+
+    def _accept(self, chunk):
+        if self.upload.size + len(chunk) > self.limit:
+            mb_limit = self.limit / (1024 * 1024)
+            raise ValueError(f"Archivo demasiado grande (máx {int(mb_limit)} MB)")
+        if self.pdf_scanner is not None:
+            self._check_pdf_name(self.pdf_scanner.feed(chunk))
+        self.tail = (self.tail + chunk[-_TAIL_SIZE:])[-_TAIL_SIZE:]
+        self.upload.write(chunk)
+
+    def _check_pdf_name(self, name):
+        if name is not None:
+            logger.warning(f"SEGURIDAD: PDF contiene JavaScript (/{name.decode('latin-1')}, potencial malware): "
+                           f"{self.upload.filename}")
+            raise ValueError("PDF contiene contenido potencialmente peligroso")
+
+    def _check_format(self, header):
+        # Mismas comprobaciones de formato que FileValidationService, con el final real del archivo.
+        if self.upload.detected_type in ('jpg', 'jpeg', 'png', 'gif'):
+            if self.upload.size < 8:
+                raise ValueError("Imagen demasiado pequeña")
+            if header.startswith(b'\x89PNG') and self.upload.size < 24:
+                raise ValueError("PNG inválido")
+            if header.startswith(b'\xFF\xD8\xFF') and not self.tail.endswith(b'\xFF\xD9'):
+                logger.warning(f"SEGURIDAD: JPEG sin footer válido (posible truncado o malware): {self.upload.filename}")
+
+
+# Estados del recorrido de un PDF.
+_CODE, _STRING, _HEX, _COMMENT, _STREAM = range(5)
+
+_REGULAR = rb'[^\x00\t\n\x0c\r ()<>\[\]{}/%]'
+_DELIMITED = rb'(?=[\x00\t\n\x0c\r ()<>\[\]{}/%])'
+# Un nombre o una palabra solo se da por completo cuando le sigue un delimitador;
+# '<' necesita el byte siguiente para distinguir una cadena hex de un diccionario.
+_PDF_TOKEN = re.compile(
+    rb'[\x00\t\n\x0c\r ]+'
+    rb'|/(?P<name>' + _REGULAR + rb'*)' + _DELIMITED +
+    rb'|(?P<comment>%)'
+    rb'|(?P<string>\()'
+    rb'|(?P<hex><)(?=[^<])'
+    rb'|<<|>>|[\[\]{})>]'
+    rb'|(?P<word>' + _REGULAR + rb'+)' + _DELIMITED
+)
+_EOL = re.compile(rb'[\r\n]')
+_STRING_SPECIAL = re.compile(rb'[()\\]')
+_NAME_ESCAPE = re.compile(rb'#([0-9A-Fa-f]{2})')
+# Un token sin delimitador más largo que esto no es un nombre de PDF: se descarta.
+_MAX_TOKEN = 4096
+
+
+class _PdfActiveContentScanner:
+    """
+    Busca los nombres de PDF_ACTIVE_CONTENT_NAMES recorriendo los tokens del PDF
+    por tramos. Solo cuenta un nombre completo (/JS seguido de un delimitador,
+    también escrito con escapes #xx); los cuerpos stream…endstream (imágenes,
+    fuentes, páginas), las cadenas y los comentarios se saltan, porque ahí esos
+    bytes son datos y no claves del PDF. Los flujos no se descomprimen.
+    """
+
+    def __init__(self):
+        self.state = _CODE
+        self.depth = 0          # paréntesis abiertos de la cadena literal actual
+        self.pending = b''      # token o fin de stream partido entre tramos
+
+    def feed(self, chunk):
+        """Procesa el tramo y devuelve el nombre de contenido activo encontrado, o None."""
+        data = self.pending + chunk if self.pending else chunk
+        self.pending = b''
+        pos, size = 0, len(data)
+        while pos < size:
+            if self.state == _STREAM:
+                end = data.find(b'endstream', pos)
+                if end < 0:
+                    self.pending = data[max(pos, size - len(b'endstream') + 1):]
+                    return None
+                pos, self.state = end + len(b'endstream'), _CODE
+            elif self.state == _COMMENT:
+                match = _EOL.search(data, pos)
+                if match is None:
+                    return None
+                pos, self.state = match.end(), _CODE
+            elif self.state == _HEX:
+                end = data.find(b'>', pos)
+                if end < 0:
+                    return None
+                pos, self.state = end + 1, _CODE
+            elif self.state == _STRING:
+                match = _STRING_SPECIAL.search(data, pos)
+                if match is None:
+                    return None
+                pos = match.end()
+                char = match.group()
+                if char == b'\\':
+                    if pos == size:
+                        self.pending = char
+                        return None
+                    pos += 1
+                elif char == b'(':
+                    self.depth += 1
+                else:
+                    self.depth -= 1
+                    if self.depth == 0:
+                        self.state = _CODE
+            else:
+                match = _PDF_TOKEN.match(data, pos)
+                if match is None:
+                    rest = data[pos:]
+                    self.pending = rest if len(rest) <= _MAX_TOKEN else b''
+                    return None
+                pos = match.end()
+                kind = match.lastgroup
+                if kind == 'name':
+                    name = _NAME_ESCAPE.sub(lambda m: bytes((int(m.group(1), 16),)), match.group('name'))
+                    if name in PDF_ACTIVE_CONTENT_NAMES:
+                        return name
+                elif kind == 'word':
+                    if match.group('word') == b'stream':
+                        self.state = _STREAM
+                elif kind == 'comment':
+                    self.state = _COMMENT
+                elif kind == 'string':
+                    self.state, self.depth = _STRING, 1
+                elif kind == 'hex':
+                    self.state = _HEX
+        return None
+
+    def finish(self):
+        # Un nombre al final del archivo no tiene delimitador detrás.
+        return self.feed(b'\n')
@@ -233,4 +233,15 @@ class UsuarioService:
             
         except Exception as e:
             logger.error(f"Error al crear usuario: {str(e)}")
-            return f"Error al crear usuario: {str(e)}", "danger"
\ No newline at end of file
+            return f"Error al crear usuario: {str(e)}", "danger"
+
+    def send_welcome_emails(self, destinatarios):
+        """
+        Envía el email de bienvenida a [(email, username)] de usuarios creados
+        en bloque (carga masiva); como en create_user, un envío fallido solo se registra.
+        """
+        for email, username in destinatarios:
+            try:
+                self._email_service.send_user_welcome(email, username)
+            except Exception as e:
+                logger.warning(f"No se pudo enviar email de bienvenida a {email}: {e}")
@@ -21,6 +21,17 @@ class Config:
     if not SECRET_KEY and not DEBUG:
         raise ValueError("CRITICAL: La variable de entorno SECRET_KEY no está configurada para el entorno de producción.")
 
+    # --- SELECCIÓN DEL BACKEND DE BASE DE DATOS ---
+    # 'sqlserver' (producción) o 'sqlite' (benchmarks y pruebas de carga sin red).
+    DB_BACKEND = os.environ.get('DB_BACKEND', 'sqlserver').lower()
+    # Ruta del archivo SQLite, o ':memory:' para una base en memoria compartida por el proceso.
+    SQLITE_DATABASE = os.environ.get('SQLITE_DATABASE', ':memory:')
+    # Datos sintéticos cargados al arrancar si la base está vacía (0 = no sembrar).
+    SQLITE_SEED_PERSONAL = int(os.environ.get('SQLITE_SEED_PERSONAL', 0))
+    SQLITE_SEED_DOCUMENTS = int(os.environ.get('SQLITE_SEED_DOCUMENTS', 3))    # por empleado
+    # Contraseña de los usuarios de ejemplo (admin, legajos, rrhh); sin ella no se crean.
+    SQLITE_SEED_PASSWORD = os.environ.get('SQLITE_SEED_PASSWORD')
+
     # --- CONFIGURACIÓN DE LA BASE DE DATOS (LECTURA/ESCRITURA) ---
     # Carga todas las credenciales desde tu archivo .env
     DB_DRIVER = os.environ.get('DB_DRIVER')
@@ -39,10 +50,54 @@ class Config:
     DB_USERNAME_READ = os.environ.get('DB_USERNAME_WRITE')
     DB_PASSWORD_READ = os.environ.get('DB_PASSWORD_WRITE')
 
-    # Validación de variables de entorno de la BD
-    if not all([DB_SERVER, DB_DATABASE, DB_USERNAME_WRITE, DB_PASSWORD_WRITE, DB_USERNAME_READ, DB_PASSWORD_READ]):
+    # Validación de variables de entorno de la BD (no aplica al backend SQLite)
+    if DB_BACKEND == 'sqlserver' and not all([DB_SERVER, DB_DATABASE, DB_USERNAME_WRITE, DB_PASSWORD_WRITE, DB_USERNAME_READ, DB_PASSWORD_READ]):
         raise ValueError("Error de configuración: Faltan una o más variables de entorno para la base de datos.")
 
+    # --- CONFIGURACIÓN DEL SERVIDOR Y DEL POOL DE CONEXIONES ---
+    # Número de hilos de Waitress (run_production.py). El pool se dimensiona a partir de él.
+    WAITRESS_THREADS = int(os.environ.get('WAITRESS_THREADS', 8))
+
+    DB_POOL_ENABLED = os.environ.get('DB_POOL_ENABLED', 'true').lower() in ['true', 'on', '1']
+    # Una petición puede usar a la vez la conexión de lectura y la de escritura,
+    # que comparten credenciales (y por tanto pool): se reservan dos por hilo.
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', WAITRESS_THREADS * 2))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))                # segundos
+    DB_POOL_MAX_LIFETIME = int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800))    # segundos
+    DB_POOL_IDLE_TIMEOUT = int(os.environ.get('DB_POOL_IDLE_TIMEOUT', 300))     # segundos
+    DB_POOL_PING_AFTER = int(os.environ.get('DB_POOL_PING_AFTER', 30))          # segundos
+
+    # --- INSTRUMENTACIÓN DE CONSULTAS ---
+    # Mide cada consulta (SP o SQL), añade la cabecera Server-Timing y alimenta el
+    # panel de sentencias de "Estado del Servidor".
+    DB_INSTRUMENTATION_ENABLED = os.environ.get('DB_INSTRUMENTATION_ENABLED', 'true').lower() in ['true', 'on', '1']
+    DB_STATS_WINDOW = int(os.environ.get('DB_STATS_WINDOW', 1000))              # muestras por sentencia
+    DB_STATS_MAX_STATEMENTS = int(os.environ.get('DB_STATS_MAX_STATEMENTS', 500))
+
+    # --- LISTADO DE PERSONAL ---
+    # 'keyset': navegación Anterior/Siguiente con cursor (coste constante por página);
+    # 'offset': números de página con sp_listar_personal_paginado.
+    PERSONAL_PAGINATION_MODE = os.environ.get('PERSONAL_PAGINATION_MODE', 'keyset').lower()
+    PERSONAL_COUNT_CACHE_TTL = int(os.environ.get('PERSONAL_COUNT_CACHE_TTL', 300))     # segundos
+
+    # --- CACHÉ DE CATÁLOGOS ---
+    # Unidades, cargos, tipos de contrato, secciones, tipos de documento y roles se
+    # leen una vez y se sirven desde memoria durante CATALOG_CACHE_TTL segundos (0 = sin caché).
+    CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 3600))
+    CATALOG_CACHE_WARMUP = os.environ.get('CATALOG_CACHE_WARMUP', 'true').lower() in ['true', 'on', '1']
+
+    # --- CACHÉ DE USUARIOS DE LA SESIÓN ---
+    # load_user reutiliza el Usuario durante USER_CACHE_TTL segundos (0 = sin caché);
+    # los cambios hechos desde la aplicación lo invalidan al momento en este proceso.
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 1000))
+
+    # --- CACHÉ DEL LEGAJO ---
+    # Partes del legajo por id_personal (cabecera, secciones), LRU acotada a
+    # LEGAJO_CACHE_MAX_MB (0 = sin caché); las escrituras sobre un legajo las descartan al momento.
+    LEGAJO_CACHE_MAX_MB = int(os.environ.get('LEGAJO_CACHE_MAX_MB', 32))
+    LEGAJO_CACHE_TTL = int(os.environ.get('LEGAJO_CACHE_TTL', 600))                    # segundos
+
     # --- CONFIGURACIÓN PARA EL ENVÍO DE CORREOS ---
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
@@ -56,3 +111,56 @@ class Config:
     
     # Define el tamaño máximo del archivo en bytes (100 MB)
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024
+
+    # Bytes de cada subida que se guardan en memoria mientras se valida; el resto
+    # pasa a un archivo temporal (upload_ingest.py).
+    UPLOAD_SPOOL_MAX_MEMORY = int(os.environ.get('UPLOAD_SPOOL_MAX_MEMORY', 1024 * 1024))
+
+    # Subidas reanudables por tramos (/subidas): sesiones en disco que caducan tras
+    # RESUMABLE_UPLOAD_TTL segundos sin actividad. Cada tramo debe caber en MAX_CONTENT_LENGTH.
+    RESUMABLE_UPLOAD_PATH = os.environ.get('RESUMABLE_UPLOAD_PATH') or os.path.join(basedir, '..', 'instance', 'subidas')
+    RESUMABLE_UPLOAD_CHUNK_SIZE = int(os.environ.get('RESUMABLE_UPLOAD_CHUNK_SIZE', 4 * 1024 * 1024))
+    RESUMABLE_UPLOAD_TTL = int(os.environ.get('RESUMABLE_UPLOAD_TTL', 24 * 3600))
+
+    # Separación de PDFs de legajo en un pool de procesos (pdf_split_pool.py); 0 = en el hilo
+    # de la petición. PDF_SPLIT_TIMEOUT: segundos sin que termine ningún rango antes de abortar.
+    PDF_SPLIT_WORKERS = int(os.environ.get('PDF_SPLIT_WORKERS') or max(1, min(4, (os.cpu_count() or 2) - 1)))
+    PDF_SPLIT_TIMEOUT = int(os.environ.get('PDF_SPLIT_TIMEOUT', 120))
+
+    # Digitalización por lotes (/pdf/lotes): ZIP o manifiesto CSV con muchos legajos.
+    # BATCH_DIGITIZATION_SOURCE_DIR: carpeta del servidor con los escaneos (vacío = solo ZIP).
+    BATCH_DIGITIZATION_PATH = os.environ.get('BATCH_DIGITIZATION_PATH') or os.path.join(basedir, '..', 'instance', 'lotes')
+    BATCH_DIGITIZATION_SOURCE_DIR = os.environ.get('BATCH_DIGITIZATION_SOURCE_DIR') or None
+    BATCH_DIGITIZATION_CONCURRENCY = int(os.environ.get('BATCH_DIGITIZATION_CONCURRENCY', 2))
+    BATCH_DIGITIZATION_MAX_FILES = int(os.environ.get('BATCH_DIGITIZATION_MAX_FILES', 5000))
+
+    # Filas por lote en la carga masiva de personal (validar → transformar → persistir).
+    BULK_IMPORT_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_BATCH_SIZE', 500))
+
+    # Procesos para generar hashes de contraseñas en lote (security.generate_password_hashes,
+    # p. ej. usuarios de la carga masiva); 0 = núcleos disponibles, 1 = en el hilo de la petición.
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 0)
+
+    # Tareas en segundo plano (JobService): la tabla de tareas (SQLite) y los archivos de
+    # entrada y resultado de cada una quedan en JOBS_PATH; se borran JOBS_TTL segundos
+    # después de terminar. JOBS_WORKERS: tareas que corren a la vez.
+    JOBS_PATH = os.environ.get('JOBS_PATH') or os.path.join(basedir, '..', 'instance', 'tareas')
+    JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', 2))
+    JOBS_TTL = int(os.environ.get('JOBS_TTL', 7 * 24 * 3600))
+
+    # Tamaño de cada tramo al enviar un documento desde la BD (memoria por descarga).
+    DOCUMENT_STREAM_CHUNK_SIZE = int(os.environ.get('DOCUMENT_STREAM_CHUNK_SIZE', 1024 * 1024))
+
+    # --- ALMACÉN DE ARCHIVOS POR HASH ---
+    # Guarda cada archivo una sola vez en disco bajo su sha256; documentos.archivo
+    # queda en NULL. Los documentos existentes se mueven con migrar_blob_store.py.
+    BLOB_STORE_ENABLED = os.environ.get('BLOB_STORE_ENABLED', 'false').lower() in ['true', 'on', '1']
+    BLOB_STORE_PATH = os.environ.get('BLOB_STORE_PATH') or os.path.join(basedir, '..', 'instance', 'blob_store')
+    BLOB_STORE_FSYNC = os.environ.get('BLOB_STORE_FSYNC', 'true').lower() in ['true', 'on', '1']
+
+    # --- COMPRESIÓN DEL BINARIO DE LOS DOCUMENTOS EN LA BD ---
+    # Solo se guarda comprimido lo que ahorra al menos DOCUMENT_COMPRESSION_MIN_SAVING;
+    # las filas comprimidas se leen siempre, aunque luego se desactive.
+    DOCUMENT_COMPRESSION_ENABLED = os.environ.get('DOCUMENT_COMPRESSION_ENABLED', 'false').lower() in ['true', 'on', '1']
+    DOCUMENT_COMPRESSION_LEVEL = int(os.environ.get('DOCUMENT_COMPRESSION_LEVEL', 6))              # zlib 1-9
+    DOCUMENT_COMPRESSION_MIN_SAVING = float(os.environ.get('DOCUMENT_COMPRESSION_MIN_SAVING', 0.05))
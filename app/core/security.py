@@ -3,10 +3,19 @@
 
 from datetime import datetime, timedelta
 from math import ceil
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from werkzeug.security import generate_password_hash as werkzeug_generate_hash
 from werkzeug.security import check_password_hash as werkzeug_check_hash
+from flask import current_app, has_app_context
 from app.database.connector import get_db_write, get_db_read
+from app.infrastructure.persistence.user_cache import USER_CACHE
+import atexit
+import functools
 import logging
+import multiprocessing
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +31,79 @@ def check_password_hash(pwhash, password):
     return werkzeug_check_hash(pwhash, password)
 
 
+# --- HASHES EN LOTE ---
+# scrypt es trabajo de CPU que retiene el GIL (~100 ms por hash): para crear o
+# restablecer muchas cuentas a la vez, los hashes se reparten en un pool de
+# procesos ('spawn', creado al primer uso y compartido por la aplicación).
+_hash_pool = {'executor': None, 'workers': None}
+_hash_pool_lock = threading.Lock()
+
+
+def available_cores():
+    """Núcleos que puede usar este proceso (afinidad de CPU si el sistema la expone)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def generate_password_hashes(passwords, workers=None):
+    """
+    Genera los hashes de varias contraseñas (mismo método que
+    generate_password_hash) en paralelo y los devuelve en el orden de entrada.
+    `workers`: procesos del pool; por defecto PASSWORD_HASH_WORKERS o, si es 0,
+    los núcleos disponibles. Con un solo proceso o una sola contraseña se
+    calculan en el hilo actual. Si un proceso muere, el pool se recrea y el lote
+    se reintenta una vez.
+    """
+    passwords = list(passwords)
+    if workers is None:
+        workers = current_app.config.get('PASSWORD_HASH_WORKERS') if has_app_context() else None
+        workers = workers or available_cores()
+    if workers <= 1 or len(passwords) <= 1:
+        return [generate_password_hash(password) for password in passwords]
+
+    # La función de werkzeug se envía por referencia: los procesos hijos solo importan werkzeug.security.
+    tarea = functools.partial(werkzeug_generate_hash, method=SCRYPT_METHOD)
+    chunksize = max(1, len(passwords) // (workers * 4))
+    for intento in range(2):
+        executor = _password_hash_pool(workers)
+        try:
+            return list(executor.map(tarea, passwords, chunksize=chunksize))
+        except BrokenProcessPool:
+            _discard_password_hash_pool(executor)
+            if intento:
+                raise
+            logger.warning("Un proceso del pool de hashes terminó inesperadamente; se recrea el pool y se reintenta")
+
+
+def _password_hash_pool(workers):
+    with _hash_pool_lock:
+        executor = _hash_pool['executor']
+        if executor is not None and _hash_pool['workers'] != workers:
+            executor.shutdown(wait=False)
+            executor = None
+        if executor is None:
+            if _hash_pool['workers'] is None:
+                atexit.register(shutdown_password_hash_pool)
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _hash_pool['executor'], _hash_pool['workers'] = executor, workers
+        return executor
+
+
+def _discard_password_hash_pool(executor):
+    with _hash_pool_lock:
+        if _hash_pool['executor'] is executor:
+            _hash_pool['executor'] = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_password_hash_pool():
+    with _hash_pool_lock:
+        executor, _hash_pool['executor'] = _hash_pool['executor'], None
+    if executor:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 class AccountLockoutManager:
     """
     Gestiona el bloqueo de cuentas tras múltiples intentos fallidos.
@@ -105,7 +187,9 @@ class AccountLockoutManager:
             """
             cursor.execute(query, nuevo_intento, nuevo_bloqueado_hasta, username)
             conn.commit()
-            
+            # Cambian intentos y bloqueo: el Usuario en caché queda desactualizado.
+            USER_CACHE.bump_username(username)
+
             # Retorna True si fue bloqueado
             return nuevo_bloqueado_hasta is not None
             
@@ -131,6 +215,8 @@ class AccountLockoutManager:
             """
             cursor.execute(query, username)
             conn.commit()
+            # Cambia ultimo_login: el Usuario en caché de la sesión queda desactualizado.
+            USER_CACHE.bump_username(username)
             return True
             
         except Exception as e:
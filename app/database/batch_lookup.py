@@ -0,0 +1,108 @@
+# app/database/batch_lookup.py
+"""
+Enriquecimiento por lotes de filas con datos de tablas de búsqueda.
+
+El patrón "por cada fila, SELECT ... WHERE id = ?" cuesta una ida y vuelta a la
+BD por fila (N+1). `BatchLookup` junta las claves que faltan, las resuelve con
+una consulta `IN (...)` por bloque y devuelve un mapa clave -> registro que
+`enrich` usa para completar las filas. Con `cache_ttl` el mapa se conserva en el
+proceso entre llamadas (para catálogos que casi no cambian).
+
+    _TIPOS = BatchLookup('tipo_documento', 'id_tipo', ('nombre_tipo',), cache_ttl=300)
+    tipos = _TIPOS.resolve(cursor, (fila['id_tipo'] for fila in filas))
+    enrich(filas, 'id_tipo', tipos, {'tipo_documento': 'nombre_tipo'})
+"""
+
+import threading
+import time
+
+from app.database.row_mapper import map_rows
+
+# SQL Server admite hasta 2100 parámetros por sentencia; se deja margen.
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _check_identifier(name):
+    # Tabla y columnas se interpolan en el SQL: solo se aceptan identificadores simples.
+    if not all(part.isidentifier() for part in name.split('.')):
+        raise ValueError(f"Identificador SQL inválido: {name!r}")
+    return name
+
+
+class BatchLookup:
+    """Resuelve claves de una tabla de búsqueda con una consulta IN por bloque de claves."""
+
+    def __init__(self, table, key_column, columns, chunk_size=DEFAULT_CHUNK_SIZE,
+                 cache_ttl=None, max_entries=10000):
+        self.table = _check_identifier(table)
+        self.key_column = _check_identifier(key_column)
+        self.columns = tuple(_check_identifier(column) for column in columns)
+        self.chunk_size = chunk_size
+        self.cache_ttl = cache_ttl          # segundos; None = sin caché entre llamadas
+        self.max_entries = max_entries
+        self._cache = {}                    # clave -> (registro, instante)
+        self._lock = threading.Lock()
+
+    def resolve(self, cursor, keys):
+        """
+        Devuelve {clave: registro} para las claves dadas (se ignoran None y
+        repetidas). Las claves que no existen en la tabla no aparecen en el mapa.
+        """
+        wanted = {key for key in keys if key is not None}
+        found = {}
+        if self.cache_ttl is not None and wanted:
+            now = time.monotonic()
+            with self._lock:
+                for key in list(wanted):
+                    cached = self._cache.get(key)
+                    if cached and now - cached[1] < self.cache_ttl:
+                        found[key] = cached[0]
+                        wanted.discard(key)
+
+        pending = list(wanted)
+        select_list = ', '.join((self.key_column,) + self.columns)
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(
+                f"SELECT {select_list} FROM {self.table} WHERE {self.key_column} IN ({placeholders})",
+                *chunk
+            )
+            for record in map_rows(cursor, cursor.fetchall()):
+                found[record[0]] = record
+
+        if self.cache_ttl is not None and pending:
+            now = time.monotonic()
+            with self._lock:
+                if len(self._cache) + len(pending) > self.max_entries:
+                    self._cache.clear()
+                for key in pending:
+                    if key in found:
+                        self._cache[key] = (found[key], now)
+        return found
+
+    def invalidate(self, key=None):
+        """Descarta una clave (o todo) de la caché del proceso."""
+        with self._lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+
+def enrich(rows, key_field, lookup, fields, only_missing=True):
+    """
+    Completa cada fila (diccionario) con columnas del registro de `lookup` cuya
+    clave es fila[key_field]. `fields` es {campo destino: columna origen} o
+    {campo destino: función(registro)}. Con only_missing no se pisan valores
+    que la fila ya trae.
+    """
+    for row in rows:
+        record = lookup.get(row.get(key_field))
+        if record is None:
+            continue
+        for target, source in fields.items():
+            if only_missing and row.get(target) is not None:
+                continue
+            row[target] = source(record) if callable(source) else record[source]
+    return rows
@@ -1,84 +1,171 @@
 # app/database/connector.py
 # Importa la librería pyodbc para la conexión con SQL Server y Flask's 'g' y 'current_app'.
+import threading
 import pyodbc
 from flask import g, current_app
+from app.database import sqlite_backend
+from app.database.pool import ConnectionPool
+from app.database.instrumentation import (
+    InstrumentedConnection, QueryStatsRegistry, finish_record, summarize_request
+)
+
+# Claves de 'g' donde se guardan las conexiones de la petición actual.
+_CONNECTION_KEYS = ('db_read', 'db_write', 'db_admin')
+
+# Protege la creación de pools cuando varios hilos de Waitress llegan a la vez.
+_pools_lock = threading.Lock()
+
+# Construye la cadena de conexión usando la configuración de la aplicación.
+def _build_conn_str(config, username, password):
+    return (
+        f"DRIVER={config['DB_DRIVER']};"
+        f"SERVER={config['DB_SERVER']};"
+        f"DATABASE={config['DB_DATABASE']};"
+        f"UID={username};"
+        f"PWD={password};"
+    )
 
 # Define una función auxiliar interna para crear una conexión a la base de datos.
 def _get_db_connection(username, password):
     try:
-        # Construye la cadena de conexión usando la configuración de la aplicación.
-        conn_str = (
-            f"DRIVER={current_app.config['DB_DRIVER']};"
-            f"SERVER={current_app.config['DB_SERVER']};"
-            f"DATABASE={current_app.config['DB_DATABASE']};"
-            f"UID={username};"
-            f"PWD={password};"
-        )
         # Establece y devuelve la conexión.
-        return pyodbc.connect(conn_str)
+        return pyodbc.connect(_build_conn_str(current_app.config, username, password))
     except pyodbc.Error as ex:
         # Si hay un error, lo registra en el log de la aplicación y lo relanza.
         current_app.logger.error(f"Error de conexión a la BD con usuario {username}: {ex}")
         raise
 
+# Obtiene (o crea) un pool identificado por 'key'; 'factory' abre conexiones nuevas.
+def _get_or_create_pool(key, name, factory):
+    app = current_app._get_current_object()
+    pools = app.extensions.setdefault('db_pools', {})
+    pool = pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(
+                    factory,
+                    name=name,
+                    max_size=app.config['DB_POOL_MAX_SIZE'],
+                    timeout=app.config['DB_POOL_TIMEOUT'],
+                    max_lifetime=app.config['DB_POOL_MAX_LIFETIME'],
+                    idle_timeout=app.config['DB_POOL_IDLE_TIMEOUT'],
+                    ping_after=app.config['DB_POOL_PING_AFTER'],
+                )
+                pools[key] = pool
+    return pool
+
+# Obtiene (o crea) el pool asociado a unas credenciales.
+# Las credenciales de lectura y escritura son las mismas en esta BD, así que comparten pool.
+def _get_pool(username, password):
+    config = current_app.config
+    conn_str = _build_conn_str(config, username, password)
+    logger = current_app.logger
+
+    def factory():
+        try:
+            return pyodbc.connect(conn_str)
+        except pyodbc.Error as ex:
+            logger.error(f"Error de conexión a la BD con usuario {username}: {ex}")
+            raise
+
+    key = (config['DB_SERVER'], config['DB_DATABASE'], username)
+    return _get_or_create_pool(key, username, factory)
+
+# Devuelve una conexión del backend SQLite (DB_BACKEND=sqlite).
+# Los tres roles (lectura, escritura y administrador) comparten la misma base y pool.
+def _get_sqlite_connection():
+    database = current_app.config['SQLITE_DATABASE']
+    if not current_app.config.get('DB_POOL_ENABLED', True):
+        return sqlite_backend.connect(database)
+    return _get_or_create_pool(('sqlite', database), 'sqlite', lambda: sqlite_backend.connect(database)).acquire()
+
+# Devuelve la conexión de la petición para una clave de 'g', tomándola del pool si está activo.
+def _get_request_connection(key, username_setting, password_setting):
+    if key not in g:
+        username = current_app.config[username_setting]
+        password = current_app.config[password_setting]
+        if current_app.config.get('DB_BACKEND') == 'sqlite':
+            conn = _get_sqlite_connection()
+        elif current_app.config.get('DB_POOL_ENABLED', True):
+            conn = _get_pool(username, password).acquire()
+        else:
+            conn = _get_db_connection(username, password)
+        registry = current_app.extensions.get('db_query_stats')
+        if registry is not None:
+            # Todas las conexiones de la petición registran sus consultas en 'g.db_queries'.
+            if 'db_queries' not in g:
+                g.db_queries = []
+            conn = InstrumentedConnection(conn, registry, g.db_queries)
+        setattr(g, key, conn)
+    return g.get(key)
+
 # Define una función para obtener una conexión de SOLO LECTURA.
 # Utiliza el objeto 'g' de Flask para almacenar la conexión durante el ciclo de una petición.
 def get_db_read():
-    if 'db_read' not in g:
-        # Si no hay conexión de lectura en 'g', crea una nueva con las credenciales de lectura.
-        g.db_read = _get_db_connection(
-            current_app.config['DB_USERNAME_READ'],
-            current_app.config['DB_PASSWORD_READ']
-        )
-    return g.db_read
+    return _get_request_connection('db_read', 'DB_USERNAME_READ', 'DB_PASSWORD_READ')
 
 # Define una función para obtener una conexión de LECTURA/ESCRITURA.
 def get_db_write():
-    if 'db_write' not in g:
-        # Si no hay conexión de escritura en 'g', crea una nueva con las credenciales de escritura.
-        g.db_write = _get_db_connection(
-            current_app.config['DB_USERNAME_WRITE'],
-            current_app.config['DB_PASSWORD_WRITE']
-        )
-    return g.db_write
+    return _get_request_connection('db_write', 'DB_USERNAME_WRITE', 'DB_PASSWORD_WRITE')
 
 # Define una función para obtener una conexión con permisos de administrador de sistemas
 def get_db_admin():
-    if 'db_admin' not in g:
-        # Si no hay conexión de admin en 'g', crea una nueva con las credenciales de administrador.
-        g.db_admin = _get_db_connection(
-            current_app.config['DB_USERNAME_SYSTEMS_ADMIN'],
-            current_app.config['DB_PASSWORD_SYSTEMS_ADMIN']
-        )
-    return g.db_admin
+    return _get_request_connection('db_admin', 'DB_USERNAME_SYSTEMS_ADMIN', 'DB_PASSWORD_SYSTEMS_ADMIN')
 
-# Define una función para cerrar las conexiones al final de la petición.
+# Define una función para devolver las conexiones al final de la petición.
 def close_db(e=None):
-    # Busca y cierra la conexión de lectura si existe.
-    db_read = g.pop('db_read', None)
-    if db_read is not None:
-        try:
-            db_read.close()
-        except Exception:
-            pass  # Ignorar errores al cerrar
-    
-    # Busca y cierra la conexión de escritura si existe.
-    db_write = g.pop('db_write', None)
-    if db_write is not None:
-        try:
-            db_write.close()
-        except Exception:
-            pass  # Ignorar errores al cerrar
-    
-    # Busca y cierra la conexión de admin si existe.
-    db_admin = g.pop('db_admin', None)
-    if db_admin is not None:
+    # Cierra las mediciones que siguen abiertas (cursores que no se cerraron explícitamente).
+    registry = current_app.extensions.get('db_query_stats')
+    for record in g.pop('db_queries', None) or []:
+        finish_record(record, registry)
+
+    for key in _CONNECTION_KEYS:
+        conn = g.pop(key, None)
+        if conn is None:
+            continue
         try:
-            db_admin.close()
+            if hasattr(conn, 'release'):
+                # Checkin: el pool revierte transacciones sin confirmar y restablece autocommit.
+                conn.release()
+            else:
+                conn.close()
         except Exception:
             pass  # Ignorar errores al cerrar
 
+# Añade la cabecera Server-Timing con el tiempo total de BD de la petición.
+def add_server_timing(response):
+    records = g.get('db_queries')
+    if records:
+        totals = summarize_request(records)
+        g.db_totals = totals
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={totals["duration_ms"]};desc="{totals["queries"]} consultas, '
+            f'{totals["rows"]} filas, {totals["result_sets"]} result sets"'
+        )
+    return response
+
+# Devuelve el registro de estadísticas por sentencia (None si la instrumentación está desactivada).
+def get_query_stats(app=None):
+    app = app or current_app._get_current_object()
+    return app.extensions.get('db_query_stats')
+
+# Devuelve las estadísticas de todos los pools para el monitoreo.
+def get_pool_stats(app=None):
+    app = app or current_app._get_current_object()
+    pools = app.extensions.get('db_pools', {})
+    return [pool.stats() for pool in list(pools.values())]
+
 # Define una función para inicializar el manejo de la base de datos en la aplicación Flask.
 def init_app_db(app):
+    app.extensions.setdefault('db_pools', {})
+    if app.config.get('DB_INSTRUMENTATION_ENABLED', True):
+        app.extensions['db_query_stats'] = QueryStatsRegistry(
+            window=app.config.get('DB_STATS_WINDOW', 1000),
+            max_statements=app.config.get('DB_STATS_MAX_STATEMENTS', 500),
+        )
+        app.after_request(add_server_timing)
     # Registra la función 'close_db' para que se ejecute al final de cada contexto de aplicación.
-    app.teardown_appcontext(close_db) 
\ No newline at end of file
+    app.teardown_appcontext(close_db)
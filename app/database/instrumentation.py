@@ -0,0 +1,326 @@
+# app/database/instrumentation.py
+"""
+Instrumentación de las consultas a la base de datos.
+
+Envuelve las conexiones y cursores pyodbc para medir cada ejecución: nombre del
+procedimiento almacenado (o SQL normalizado), duración, filas leídas y número de
+result sets. Los datos se acumulan en dos lugares:
+
+- Por petición, en `g.db_queries` (para los totales y la cabecera Server-Timing).
+- Globalmente, en un `QueryStatsRegistry` con una ventana móvil de duraciones por
+  sentencia (para el panel de "Estado del Servidor").
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+# Límites (en ms) de los cubos del histograma; el último cubo es "> 1000 ms".
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_CALL_RE = re.compile(r'^\s*\{?\s*(?:CALL|EXEC(?:UTE)?)\s+([\w\.\[\]]+)', re.IGNORECASE)
+_STRING_RE = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACES_RE = re.compile(r'\s+')
+
+_MAX_STATEMENT_LENGTH = 200
+
+
+def normalize_statement(sql):
+    """
+    Devuelve una clave estable para agrupar ejecuciones de la misma sentencia.
+
+    - '{CALL sp_x(?, ?)}' y 'EXEC sp_x ...' se reducen al nombre del procedimiento.
+    - El SQL en línea se normaliza: literales a '?', listas IN (?, ?, ...) a '(?+)'
+      y espacios colapsados.
+    """
+    if not isinstance(sql, str):
+        return str(sql)
+    match = _CALL_RE.match(sql)
+    if match:
+        return match.group(1).replace('[', '').replace(']', '')
+    normalized = _STRING_RE.sub('?', sql)
+    normalized = _NUMBER_RE.sub('?', normalized)
+    normalized = _IN_LIST_RE.sub('(?+)', normalized)
+    normalized = _SPACES_RE.sub(' ', normalized).strip()
+    if len(normalized) > _MAX_STATEMENT_LENGTH:
+        normalized = normalized[:_MAX_STATEMENT_LENGTH] + '...'
+    return normalized
+
+
+class QueryRecord:
+    """Una ejecución de una sentencia; acumula el tiempo de execute y de los fetch."""
+
+    __slots__ = ('statement', 'duration', 'rows', 'result_sets', 'finished')
+
+    def __init__(self, statement):
+        self.statement = statement
+        self.duration = 0.0  # segundos
+        self.rows = 0
+        self.result_sets = 0
+        self.finished = False
+
+
+class _StatementStats:
+    __slots__ = ('count', 'total', 'rows', 'max', 'samples')
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.rows = 0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+
+class QueryStatsRegistry:
+    """
+    Estadísticas acumuladas por sentencia, compartidas por todos los hilos.
+
+    Los totales (ejecuciones, tiempo, filas) son desde el arranque; los
+    percentiles y el histograma se calculan sobre las últimas `window` muestras.
+    """
+
+    def __init__(self, window=1000, max_statements=500):
+        self.window = window
+        self.max_statements = max_statements
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement, duration, rows):
+        with self._lock:
+            stats = self._stats.get(statement)
+            if stats is None:
+                if len(self._stats) >= self.max_statements:
+                    self._evict_locked()
+                stats = self._stats[statement] = _StatementStats(self.window)
+            stats.count += 1
+            stats.total += duration
+            stats.rows += rows
+            if duration > stats.max:
+                stats.max = duration
+            stats.samples.append(duration)
+
+    def top(self, limit=10, order_by='total_ms'):
+        """Devuelve las sentencias ordenadas por 'total_ms', 'p95_ms', 'count' o 'avg_ms'."""
+        with self._lock:
+            snapshot = [
+                (statement, s.count, s.total, s.rows, s.max, list(s.samples))
+                for statement, s in self._stats.items()
+            ]
+        summaries = [self._summarize(*item) for item in snapshot]
+        summaries.sort(key=lambda item: item[order_by], reverse=True)
+        return summaries[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def _evict_locked(self):
+        # Se descarta la sentencia con menos tiempo acumulado para acotar la memoria.
+        victim = min(self._stats, key=lambda key: self._stats[key].total)
+        del self._stats[victim]
+
+    @staticmethod
+    def _summarize(statement, count, total, rows, max_duration, samples):
+        samples.sort()
+        histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        for sample in samples:
+            histogram[bisect_left(HISTOGRAM_BUCKETS_MS, sample * 1000)] += 1
+        return {
+            'statement': statement,
+            'count': count,
+            'total_ms': round(total * 1000, 2),
+            'avg_ms': round(total * 1000 / count, 2) if count else 0,
+            'p50_ms': round(_percentile(samples, 0.50) * 1000, 2),
+            'p95_ms': round(_percentile(samples, 0.95) * 1000, 2),
+            'max_ms': round(max_duration * 1000, 2),
+            'rows': rows,
+            'histogram': histogram,
+        }
+
+
+def _percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+class InstrumentedCursor:
+    """Cursor que mide cada execute y cuenta las filas y result sets leídos."""
+
+    def __init__(self, raw_cursor, registry, collector):
+        object.__setattr__(self, '_raw', raw_cursor)
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_collector', collector)
+        object.__setattr__(self, '_current', None)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        # Permite ajustar atributos del cursor real, p. ej. 'fast_executemany'.
+        setattr(self._raw, name, value)
+
+    # --- EJECUCIÓN ---
+
+    def execute(self, sql, *params):
+        self._begin(sql)
+        start = time.perf_counter()
+        try:
+            self._raw.execute(sql, *params)
+        finally:
+            self._add_time(start)
+        if self._raw.description is not None:
+            self._current.result_sets = 1
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._begin(sql)
+        start = time.perf_counter()
+        try:
+            self._raw.executemany(sql, seq_of_params)
+        finally:
+            self._add_time(start)
+        return self
+
+    def nextset(self):
+        start = time.perf_counter()
+        try:
+            has_next = self._raw.nextset()
+        finally:
+            self._add_time(start)
+        if has_next and self._current is not None and self._raw.description is not None:
+            self._current.result_sets += 1
+        return has_next
+
+    # --- LECTURA ---
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            row = self._raw.fetchone()
+        finally:
+            self._add_time(start)
+        if row is not None:
+            self._add_rows(1)
+        return row
+
+    def fetchval(self):
+        start = time.perf_counter()
+        try:
+            value = self._raw.fetchval()
+        finally:
+            self._add_time(start)
+        self._add_rows(1)
+        return value
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            rows = self._raw.fetchall()
+        finally:
+            self._add_time(start)
+        self._add_rows(len(rows))
+        return rows
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            rows = self._raw.fetchmany(size) if size is not None else self._raw.fetchmany()
+        finally:
+            self._add_time(start)
+        self._add_rows(len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._finish()
+        self._raw.close()
+
+    def __enter__(self):
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._finish()
+        return self._raw.__exit__(exc_type, exc_value, traceback)
+
+    # --- AUXILIARES INTERNOS ---
+
+    def _begin(self, sql):
+        self._finish()
+        record = QueryRecord(normalize_statement(sql))
+        object.__setattr__(self, '_current', record)
+        if self._collector is not None:
+            self._collector.append(record)
+
+    def _add_time(self, start):
+        if self._current is not None:
+            self._current.duration += time.perf_counter() - start
+
+    def _add_rows(self, count):
+        if self._current is not None:
+            self._current.rows += count
+
+    def _finish(self):
+        record = self._current
+        if record is not None:
+            object.__setattr__(self, '_current', None)
+            finish_record(record, self._registry)
+
+
+class InstrumentedConnection:
+    """Conexión que entrega cursores instrumentados; delega todo lo demás."""
+
+    def __init__(self, raw_connection, registry, collector):
+        object.__setattr__(self, '_raw', raw_connection)
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_collector', collector)
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw, name, value)
+
+    def cursor(self):
+        return InstrumentedCursor(self._raw.cursor(), self._registry, self._collector)
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def close(self):
+        self._raw.close()
+
+
+def finish_record(record, registry):
+    """Cierra una ejecución y la añade a las estadísticas globales (solo una vez)."""
+    if record.finished:
+        return
+    record.finished = True
+    if registry is not None:
+        registry.record(record.statement, record.duration, record.rows)
+
+
+def summarize_request(records):
+    """Totales de una petición a partir de sus ejecuciones."""
+    return {
+        'queries': len(records),
+        'duration_ms': round(sum(r.duration for r in records) * 1000, 2),
+        'rows': sum(r.rows for r in records),
+        'result_sets': sum(r.result_sets for r in records),
+    }
@@ -0,0 +1,287 @@
+# app/database/pool.py
+"""
+Pool de conexiones thread-safe para pyodbc.
+
+Cada pool agrupa conexiones abiertas con unas mismas credenciales. En lugar de
+abrir y cerrar una conexión por petición (con su handshake TLS y login contra
+SQL Server), las peticiones toman una conexión del pool (checkout) y la
+devuelven al terminar (checkin).
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Se lanza cuando no hay conexiones libres dentro del tiempo de espera."""
+    pass
+
+
+class PooledConnection:
+    """
+    Envoltorio de una conexión pyodbc perteneciente a un pool.
+
+    Delega todos los atributos en la conexión real. `close()` no cierra la
+    conexión: varios repositorios la llaman a mitad de petición y la conexión
+    debe seguir disponible hasta el teardown, que es quien la devuelve al pool.
+    """
+
+    def __init__(self, pool, raw_connection):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_raw', raw_connection)
+        object.__setattr__(self, 'created_at', time.monotonic())
+        object.__setattr__(self, 'last_used', time.monotonic())
+        # Estado con el que se abrió la conexión; se restaura en cada checkin.
+        object.__setattr__(self, 'initial_autocommit', raw_connection.autocommit)
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        # Permite 'conn.autocommit = False' tal como lo usan los repositorios.
+        if name in ('created_at', 'last_used', 'initial_autocommit'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._raw, name, value)
+
+    def close(self):
+        """No-op: la conexión vuelve al pool en el teardown de la petición."""
+        pass
+
+    def release(self, discard=False):
+        """Devuelve la conexión a su pool (o la descarta si está dañada)."""
+        self._pool.release(self, discard=discard)
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones con tamaño máximo, verificación de vida al hacer checkout,
+    reciclaje por antigüedad e inactividad, y estadísticas de uso.
+    """
+
+    def __init__(self, factory, name='default', max_size=16, timeout=30,
+                 max_lifetime=1800, idle_timeout=300, ping_after=30):
+        """
+        Args:
+            factory: Función sin argumentos que abre una conexión pyodbc nueva
+            name: Nombre del pool (para logs y estadísticas)
+            max_size: Número máximo de conexiones abiertas (libres + en uso)
+            timeout: Segundos de espera máxima por una conexión libre
+            max_lifetime: Segundos de vida máxima de una conexión
+            idle_timeout: Segundos que una conexión puede estar libre antes de cerrarse
+            ping_after: Segundos de inactividad a partir de los cuales se verifica
+                        la conexión con 'SELECT 1' antes de entregarla
+        """
+        self.name = name
+        self._factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+
+        self._idle = deque()  # Las más recientes a la derecha (LIFO)
+        self._size = 0        # Conexiones abiertas: libres + en uso
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'failed_pings': 0,
+            'discarded': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_time_total': 0.0,
+        }
+
+    # --- CHECKOUT / CHECKIN ---
+
+    def acquire(self):
+        """Entrega una conexión viva del pool, abriendo una nueva si hay cupo."""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        wait_start = None
+
+        while True:
+            candidate = None
+            create = False
+
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError(f"El pool '{self.name}' está cerrado.")
+
+                self._prune_idle_locked()
+
+                if self._idle:
+                    candidate = self._idle.pop()
+                elif self._size < self.max_size:
+                    # Se reserva el cupo antes de abrir la conexión fuera del lock.
+                    self._size += 1
+                    create = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Tiempo de espera agotado ({self.timeout}s) esperando una "
+                            f"conexión libre del pool '{self.name}'."
+                        )
+                    if not waited:
+                        waited = True
+                        wait_start = time.monotonic()
+                        self._stats['waits'] += 1
+                    self._cond.wait(remaining)
+                    continue
+
+            if create:
+                conn = self._open()
+                break
+
+            if self._is_expired(candidate):
+                self._close_connection(candidate, 'recycled')
+                continue
+
+            if not self._is_alive(candidate):
+                self._close_connection(candidate, 'failed_pings')
+                continue
+
+            conn = candidate
+            break
+
+        with self._cond:
+            self._stats['checkouts'] += 1
+            if waited:
+                self._stats['wait_time_total'] += time.monotonic() - wait_start
+
+        conn.last_used = time.monotonic()
+        return conn
+
+    def release(self, conn, discard=False):
+        """
+        Devuelve una conexión al pool. Revierte cualquier transacción pendiente y
+        restablece 'autocommit' al valor con el que se abrió la conexión, ya que
+        varios repositorios lo modifican.
+        """
+        if not discard:
+            discard = not self._reset(conn)
+
+        if discard or self._closed or self._is_expired(conn, check_idle=False):
+            self._close_connection(conn, 'discarded' if discard else 'recycled')
+            return
+
+        conn.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    # --- ADMINISTRACIÓN ---
+
+    def stats(self):
+        """Devuelve un diccionario con el estado actual del pool."""
+        with self._cond:
+            in_use = self._size - len(self._idle)
+            checkouts = self._stats['checkouts']
+            waits = self._stats['waits']
+            return {
+                'name': self.name,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': in_use,
+                'checkouts': checkouts,
+                'created': self._stats['created'],
+                'recycled': self._stats['recycled'],
+                'failed_pings': self._stats['failed_pings'],
+                'discarded': self._stats['discarded'],
+                'waits': waits,
+                'timeouts': self._stats['timeouts'],
+                'avg_wait_ms': round(self._stats['wait_time_total'] * 1000 / waits, 2) if waits else 0,
+                'reuse_ratio': round(1 - self._stats['created'] / checkouts, 3) if checkouts else 0,
+            }
+
+    def dispose(self):
+        """Cierra todas las conexiones libres y rechaza nuevos checkouts."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_connection(conn, 'recycled')
+
+    # --- AUXILIARES INTERNOS ---
+
+    def _open(self):
+        try:
+            raw = self._factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['created'] += 1
+        return PooledConnection(self, raw)
+
+    def _close_connection(self, conn, reason):
+        try:
+            conn.raw.close()
+        except Exception:
+            pass  # Ignorar errores al cerrar
+        with self._cond:
+            self._size -= 1
+            self._stats[reason] += 1
+            self._cond.notify()
+
+    def _prune_idle_locked(self):
+        """Cierra las conexiones libres más antiguas que superan 'idle_timeout'."""
+        now = time.monotonic()
+        while self._idle and now - self._idle[0].last_used > self.idle_timeout:
+            conn = self._idle.popleft()
+            try:
+                conn.raw.close()
+            except Exception:
+                pass
+            self._size -= 1
+            self._stats['recycled'] += 1
+
+    def _is_expired(self, conn, check_idle=True):
+        now = time.monotonic()
+        if now - conn.created_at > self.max_lifetime:
+            return True
+        return check_idle and now - conn.last_used > self.idle_timeout
+
+    def _is_alive(self, conn):
+        if time.monotonic() - conn.last_used < self.ping_after:
+            return True
+        try:
+            cursor = conn.raw.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Conexión del pool '{self.name}' descartada tras fallar la verificación: {e}")
+            return False
+
+    def _reset(self, conn):
+        try:
+            raw = conn.raw
+            if not raw.autocommit:
+                raw.rollback()
+            if raw.autocommit != conn.initial_autocommit:
+                raw.autocommit = conn.initial_autocommit
+            return True
+        except Exception as e:
+            logger.warning(f"No se pudo restablecer una conexión del pool '{self.name}': {e}")
+            return False
@@ -0,0 +1,199 @@
+# app/database/row_mapper.py
+"""
+Mapeo de filas de la base de datos a registros ligeros.
+
+`_row_to_dict` recorría `cursor.description` en cada fila para volver a armar la
+lista de columnas y luego creaba un diccionario completo. Aquí la "forma" de un
+result set (la tupla de nombres de columna) se compila una sola vez en una
+clase con `__slots__` (un slot por columna, sin `__dict__` por fila) y un
+`__init__` generado que asigna todos los slots en una sola instrucción.
+
+Los registros se comportan además como un diccionario de solo lectura, para que
+las plantillas y los servicios existentes sigan funcionando sin cambios:
+
+    fila.dni, fila['dni'], fila.get('dni'), dict(fila), fila.keys(), fila[0]
+
+El acceso por atributo es el más rápido (descriptor de slot en C); `get` y
+`['col']` pasan por Python. Para recorrer muchas filas leyendo varias columnas
+usar `values_getter`. Iterar un registro recorre sus valores (como una fila de
+pyodbc), no sus claves.
+"""
+
+import keyword
+import threading
+from operator import attrgetter
+
+
+class Record:
+    """Base de las clases de registro generadas por `record_class`."""
+
+    __slots__ = ()
+    _fields = ()        # nombres de columna en el orden del result set
+    _index = {}         # nombre de columna -> nombre del slot
+    _positions = ()     # posición -> nombre del slot
+    _values = None      # attrgetter de todos los slots, en orden de columnas
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            try:
+                return getattr(self, self._index[key])
+            except KeyError:
+                raise KeyError(key) from None
+        if isinstance(key, slice):
+            return tuple(self)[key]
+        return getattr(self, self._positions[key])
+
+    def get(self, key, default=None):
+        slot = self._index.get(key)
+        if slot is None:
+            return default
+        return getattr(self, slot)
+
+    def keys(self):
+        return self._index.keys()
+
+    def values(self):
+        return [getattr(self, slot) for slot in self._index.values()]
+
+    def items(self):
+        return [(name, getattr(self, slot)) for name, slot in self._index.items()]
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._values(self))
+
+    def __len__(self):
+        return len(self._fields)
+
+    def to_dict(self):
+        """Copia mutable de la fila, para los casos que necesitan un diccionario real."""
+        return {name: getattr(self, slot) for name, slot in self._index.items()}
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={value!r}' for name, value in self.items())
+        return f'Record({fields})'
+
+    def __reduce__(self):
+        # Las clases se generan en tiempo de ejecución: se serializa la forma, no la clase.
+        return _rebuild, (self._fields, tuple(self))
+
+
+# Nombres que no pueden ser slots porque ocultarían métodos o atributos del registro.
+_RESERVED = frozenset(dir(Record))
+
+_classes = {}
+_classes_lock = threading.Lock()
+
+
+def _slot_name(name, position):
+    if isinstance(name, str) and name.isidentifier() and not keyword.iskeyword(name) \
+            and name not in _RESERVED:
+        return name
+    # Columnas sin nombre válido (p. ej. expresiones sin alias): solo accesibles con ['...'].
+    return f'_c{position}'
+
+
+def record_class(columns):
+    """
+    Devuelve (y cachea) la clase de registro para una tupla de nombres de columna.
+
+    Si hay columnas repetidas (p. ej. 'SELECT c.*, p.*'), gana la última, igual
+    que al construir un diccionario.
+    """
+    cls = _classes.get(columns)
+    if cls is not None:
+        return cls
+    with _classes_lock:
+        cls = _classes.get(columns)
+        if cls is None:
+            cls = _compile(columns)
+            _classes[columns] = cls
+    return cls
+
+
+def _compile(columns):
+    index = {}
+    slots = []
+    for position, name in enumerate(columns):
+        if name not in index:
+            index[name] = _slot_name(name, position)
+            slots.append(index[name])
+    positions = tuple(index[name] for name in columns)
+
+    # 'self.a, self.b, ..., = values': un solo UNPACK_SEQUENCE por fila.
+    targets = ', '.join(f'self.{slot}' for slot in positions)
+    namespace = {}
+    exec(f'def __init__(self, values):\n    {targets}, = values\n', namespace)
+
+    getter = attrgetter(*positions)
+    values = getter if len(positions) > 1 else (lambda record: (getter(record),))
+    return type('Record', (Record,), {
+        '__slots__': tuple(slots),
+        '__init__': namespace['__init__'],
+        '_fields': tuple(columns),
+        '_index': index,
+        '_positions': positions,
+        '_values': staticmethod(values),
+    })
+
+
+def _rebuild(columns, values):
+    return record_class(columns)(values)
+
+
+def columns_of(cursor):
+    """Nombres de las columnas del result set actual, o None si no devuelve filas."""
+    description = cursor.description
+    if not description:
+        return None
+    return tuple(column[0] for column in description)
+
+
+def map_rows(cursor, rows):
+    """Convierte las filas del result set actual en registros (una clase por forma)."""
+    columns = columns_of(cursor)
+    if columns is None:
+        return []
+    cls = record_class(columns)
+    if rows and rows[0].__class__ is cls:
+        return rows
+    return [cls(row) for row in rows]
+
+
+def map_row(cursor, row):
+    """Versión de `map_rows` para una sola fila; devuelve None si no hay fila."""
+    if not row:
+        return None
+    columns = columns_of(cursor)
+    if columns is None:
+        return None
+    cls = record_class(columns)
+    return row if row.__class__ is cls else cls(row)
+
+
+def map_rows_as_dicts(cursor, rows):
+    """Como `map_rows`, pero con diccionarios mutables (la lista de columnas se arma una vez)."""
+    columns = columns_of(cursor)
+    if columns is None:
+        return []
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def values_getter(rows, names):
+    """
+    Devuelve una función fila -> tupla con las columnas `names` en ese orden.
+
+    Con registros y todas las columnas presentes es un `attrgetter` (en C); si
+    falta alguna columna se devuelve None en su lugar, como haría `dict.get`.
+    También acepta listas de diccionarios.
+    """
+    names = tuple(names)
+    first = rows[0] if rows else None
+    if not isinstance(first, Record):
+        return lambda row: tuple(row.get(name) for name in names)
+    slots = [first._index.get(name) for name in names]
+    if None not in slots and len(slots) > 1:
+        return attrgetter(*slots)
+    return lambda row: tuple(None if slot is None else getattr(row, slot) for slot in slots)
@@ -0,0 +1,516 @@
+# app/database/sqlite_backend.py
+"""
+Backend SQLite para ejecutar la aplicación sin SQL Server.
+
+Pensado para benchmarks, pruebas de carga y desarrollo sin red: se activa con
+DB_BACKEND=sqlite y usa un archivo (SQLITE_DATABASE=ruta) o una base en memoria
+(SQLITE_DATABASE=:memory:). Las conexiones imitan la interfaz de pyodbc que usan
+los repositorios: parámetros posicionales en `execute`, filas con acceso por
+atributo, `fetchval` y el atributo `autocommit`.
+"""
+
+import logging
+import random
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from app.database.row_mapper import record_class
+
+logger = logging.getLogger(__name__)
+
+# Tipos declarados en el esquema, o forzados en la consulta con 'AS "col [DATETIME]"'.
+_DETECT_TYPES = sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES
+
+# Nombre de la base compartida cuando se usa ':memory:'.
+_MEMORY_URI = 'file:legajo_digital?mode=memory&cache=shared'
+
+# Conexiones que mantienen vivas las bases en memoria (se destruyen al cerrarse la última).
+_memory_keepers = {}
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roles (
+    id_rol INTEGER PRIMARY KEY,
+    nombre_rol TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS unidad_administrativa (
+    id_unidad INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    ubicacion TEXT,
+    responsable TEXT
+);
+
+CREATE TABLE IF NOT EXISTS cargos (
+    id_cargo INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre_cargo TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tipos_contrato (
+    id_tipo_contrato INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre_tipo TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tipo_licencia (
+    id_tipo_licencia INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre_tipo TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS legajo_secciones (
+    id_seccion INTEGER PRIMARY KEY,
+    nombre_seccion TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tipo_documento (
+    id_tipo INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre_tipo TEXT NOT NULL,
+    id_seccion INTEGER REFERENCES legajo_secciones(id_seccion)
+);
+
+CREATE TABLE IF NOT EXISTS personal (
+    id_personal INTEGER PRIMARY KEY AUTOINCREMENT,
+    dni TEXT NOT NULL UNIQUE,
+    nombres TEXT NOT NULL,
+    apellidos TEXT NOT NULL,
+    sexo TEXT,
+    fecha_nacimiento DATE,
+    direccion TEXT,
+    telefono TEXT,
+    email TEXT,
+    estado_civil TEXT,
+    nacionalidad TEXT,
+    id_unidad INTEGER REFERENCES unidad_administrativa(id_unidad),
+    fecha_ingreso DATE,
+    activo INTEGER NOT NULL DEFAULT 1,
+    fecha_registro DATETIME DEFAULT CURRENT_TIMESTAMP,
+    id_usuario INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_personal_apellidos ON personal (apellidos, nombres, id_personal);
+
+CREATE TABLE IF NOT EXISTS usuarios (
+    id_usuario INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    email TEXT,
+    password_hash TEXT,
+    id_rol INTEGER REFERENCES roles(id_rol),
+    activo INTEGER NOT NULL DEFAULT 1,
+    fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+    ultimo_login DATETIME,
+    two_factor_code TEXT,
+    two_factor_expiry DATETIME,
+    id_personal INTEGER REFERENCES personal(id_personal),
+    intentos_fallidos INTEGER DEFAULT 0,
+    ultima_intento_fallido DATETIME,
+    bloqueado_hasta DATETIME
+);
+CREATE INDEX IF NOT EXISTS ix_usuarios_email ON usuarios (email);
+
+CREATE TABLE IF NOT EXISTS estudios (
+    id_estudio INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_personal INTEGER NOT NULL REFERENCES personal(id_personal),
+    nivel_educativo TEXT,
+    institucion TEXT,
+    carrera TEXT,
+    fecha_inicio DATE,
+    fecha_fin DATE,
+    titulo_obtenido TEXT
+);
+
+CREATE TABLE IF NOT EXISTS capacitaciones (
+    id_capacitacion INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_personal INTEGER NOT NULL REFERENCES personal(id_personal),
+    nombre_evento TEXT,
+    organizador TEXT,
+    fecha_inicio DATE,
+    fecha_fin DATE,
+    duracion_horas INTEGER,
+    ruta_certificado TEXT
+);
+
+CREATE TABLE IF NOT EXISTS contratos (
+    id_contrato INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_personal INTEGER NOT NULL REFERENCES personal(id_personal),
+    id_tipo_contrato INTEGER REFERENCES tipos_contrato(id_tipo_contrato),
+    fecha_inicio DATE,
+    fecha_fin DATE,
+    sueldo DECIMAL(10, 2),
+    resolucion TEXT,
+    modalidad TEXT
+);
+
+CREATE TABLE IF NOT EXISTS historial_laboral (
+    id_historial INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_personal INTEGER NOT NULL REFERENCES personal(id_personal),
+    id_cargo INTEGER REFERENCES cargos(id_cargo),
+    id_unidad INTEGER REFERENCES unidad_administrativa(id_unidad),
+    fecha_inicio DATE,
+    fecha_fin DATE,
+    motivo_salida TEXT
+);
+
+CREATE TABLE IF NOT EXISTS licencias (
+    id_licencia INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_personal INTEGER NOT NULL REFERENCES personal(id_personal),
+    id_tipo_licencia INTEGER REFERENCES tipo_licencia(id_tipo_licencia),
+    fecha_inicio DATE,
+    fecha_fin DATE,
+    resolucion TEXT
+);
+
+CREATE TABLE IF NOT EXISTS documentos (
+    id_documento INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_personal INTEGER NOT NULL REFERENCES personal(id_personal),
+    id_tipo INTEGER REFERENCES tipo_documento(id_tipo),
+    id_seccion INTEGER REFERENCES legajo_secciones(id_seccion),
+    nombre_archivo TEXT,
+    fecha_emision DATE,
+    fecha_vencimiento DATE,
+    descripcion TEXT,
+    archivo BLOB,
+    hash_archivo TEXT,
+    fecha_subida DATETIME DEFAULT CURRENT_TIMESTAMP,
+    activo INTEGER NOT NULL DEFAULT 1,
+    fecha_eliminacion DATETIME,
+    estado TEXT,
+    id_legajo INTEGER,
+    ruta_archivo TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_documentos_personal ON documentos (id_personal, activo);
+CREATE INDEX IF NOT EXISTS ix_documentos_vencimiento ON documentos (activo, fecha_vencimiento);
+
+-- Almacén de blobs (BLOB_STORE_ENABLED): referencias por hash de los documentos con archivo NULL.
+CREATE TABLE IF NOT EXISTS documento_blobs (
+    hash_archivo TEXT PRIMARY KEY,
+    tamanio INTEGER NOT NULL,
+    referencias INTEGER NOT NULL,
+    fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS bitacora (
+    id_bitacora INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_usuario INTEGER,
+    fecha_hora DATETIME DEFAULT CURRENT_TIMESTAMP,
+    modulo TEXT,
+    accion TEXT,
+    descripcion TEXT,
+    detalle_json TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_bitacora_fecha ON bitacora (fecha_hora);
+
+CREATE TABLE IF NOT EXISTS solicitudes_modificacion (
+    id_solicitud INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_personal INTEGER REFERENCES personal(id_personal),
+    id_usuario_solicitante INTEGER REFERENCES usuarios(id_usuario),
+    fecha_solicitud DATETIME DEFAULT CURRENT_TIMESTAMP,
+    campo_modificado TEXT,
+    valor_anterior TEXT,
+    valor_nuevo TEXT,
+    estado TEXT DEFAULT 'pendiente',
+    observaciones TEXT,
+    id_usuario_revisor INTEGER,
+    fecha_revision DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS solicitudes_eliminacion (
+    id_solicitud INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_documento INTEGER,
+    nombre_documento TEXT,
+    ruta_archivo TEXT,
+    id_legajo INTEGER,
+    solicitado_por_id INTEGER,
+    estado TEXT,
+    fecha_solicitud DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS estructura_personalizada (
+    id_estructura INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_personal INTEGER NOT NULL UNIQUE REFERENCES personal(id_personal),
+    estructura_json TEXT,
+    fecha_creacion DATETIME,
+    fecha_actualizacion DATETIME
+);
+"""
+
+# Catálogos mínimos. Los IDs de rol coinciden con los de app/domain/models/usuario.py.
+SEED_ROLES = [(1, 'RRHH'), (2, 'AdministradorLegajos'), (3, 'Sistemas'), (4, 'Personal')]
+SEED_SECCIONES = [
+    (1, 'Datos Personales'),
+    (2, 'Formación Académica'),
+    (3, 'Experiencia y Contratos'),
+    (4, 'Antecedentes y Salud'),
+    (5, 'Licencias'),
+]
+SEED_TIPOS_DOCUMENTO = [
+    ('DNI', 1), ('Curriculum', 1), ('Titulo', 2), ('Contrato', 3),
+    ('Antecedentes', 4), ('Carnet', 4), ('Licencias', 5),
+]
+SEED_UNIDADES = ['Dirección Regional', 'Recursos Humanos', 'Logística', 'Epidemiología', 'Informática']
+SEED_CARGOS = ['Director', 'Médico', 'Enfermero(a)', 'Técnico Administrativo', 'Analista de Sistemas']
+SEED_TIPOS_CONTRATO = ['Nombrado', 'CAS', 'Locación de Servicios']
+SEED_TIPOS_LICENCIA = ['Vacaciones', 'Enfermedad', 'Maternidad', 'Capacitación']
+
+
+# --- CONVERSIONES DE TIPOS ---
+
+def _convert_date(value):
+    return date.fromisoformat(value.decode()[:10])
+
+
+def _convert_datetime(value):
+    text = value.decode()
+    if len(text) == 10:
+        return datetime.fromisoformat(text)
+    return datetime.fromisoformat(text.replace('T', ' '))
+
+
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter('DATE', _convert_date)
+sqlite3.register_converter('DATETIME', _convert_datetime)
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()))
+
+
+# --- FILAS CON ACCESO POR ATRIBUTO (como pyodbc.Row) ---
+
+def _row_factory(cursor, values):
+    # Las filas ya salen como registros del mapeador, por lo que map_rows no las copia.
+    columns = tuple(column[0] for column in cursor.description)
+    return record_class(columns)(values)
+
+
+# --- ADAPTADORES DE CURSOR Y CONEXIÓN ---
+
+def _params(params):
+    # pyodbc acepta execute(sql, a, b) y execute(sql, (a, b)); sqlite3 solo la segunda forma.
+    if len(params) == 1 and isinstance(params[0], (tuple, list)):
+        return tuple(params[0])
+    return params
+
+
+class SqliteCursor:
+    """Cursor sqlite3 con la interfaz de pyodbc usada por los repositorios."""
+
+    def __init__(self, raw_cursor):
+        self._raw = raw_cursor
+        self.fast_executemany = False  # Ignorado; existe por compatibilidad con pyodbc
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    def execute(self, sql, *params):
+        self._raw.execute(sql, _params(params))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._raw.executemany(sql, seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._raw.fetchone()
+
+    def fetchall(self):
+        return self._raw.fetchall()
+
+    def fetchmany(self, size=None):
+        return self._raw.fetchmany(size) if size is not None else self._raw.fetchmany()
+
+    def fetchval(self):
+        row = self._raw.fetchone()
+        return row[0] if row else None
+
+    def nextset(self):
+        # SQLite no devuelve múltiples result sets; los repositorios SQLite no lo necesitan.
+        return False
+
+    def close(self):
+        self._raw.close()
+
+    def __iter__(self):
+        return iter(self._raw)
+
+
+class SqliteConnection:
+    """
+    Conexión sqlite3 con la semántica transaccional de pyodbc: por defecto
+    `autocommit` es False y los cambios requieren `commit()`.
+    """
+
+    def __init__(self, raw_connection):
+        self._raw = raw_connection
+        self._autocommit = False
+
+    @property
+    def autocommit(self):
+        return self._autocommit
+
+    @autocommit.setter
+    def autocommit(self, value):
+        # Como en ODBC, activar autocommit confirma la transacción abierta.
+        self._autocommit = bool(value)
+        self._raw.isolation_level = None if value else 'DEFERRED'
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def cursor(self):
+        return SqliteCursor(self._raw.cursor())
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+
+# --- APERTURA E INICIALIZACIÓN ---
+
+def _utcnow():
+    return datetime.utcnow().isoformat(' ')
+
+
+def _now():
+    return datetime.now().isoformat(' ')
+
+
+def _open_raw(database):
+    if database == ':memory:':
+        raw = sqlite3.connect(_MEMORY_URI, uri=True, detect_types=_DETECT_TYPES,
+                              check_same_thread=False)
+    else:
+        raw = sqlite3.connect(database, detect_types=_DETECT_TYPES,
+                              check_same_thread=False, timeout=30)
+        raw.execute('PRAGMA journal_mode=WAL')
+    raw.row_factory = _row_factory
+    raw.isolation_level = 'DEFERRED'
+    # Equivalentes de las funciones de SQL Server usadas en las consultas en línea.
+    raw.create_function('GETDATE', 0, _now)
+    raw.create_function('GETUTCDATE', 0, _utcnow)
+    return raw
+
+
+def connect(database):
+    """Abre una conexión al backend SQLite, creando el esquema la primera vez."""
+    if database not in _initialized:
+        with _init_lock:
+            if database not in _initialized:
+                if database == ':memory:' and database not in _memory_keepers:
+                    _memory_keepers[database] = _open_raw(database)
+                init_schema(_open_raw(database), close=True)
+                _initialized.add(database)
+    return SqliteConnection(_open_raw(database))
+
+
+def init_schema(raw, close=False):
+    """Crea las tablas (si no existen) y carga los catálogos básicos."""
+    try:
+        raw.executescript(SCHEMA)
+        if raw.execute('SELECT COUNT(*) FROM roles').fetchone()[0] == 0:
+            raw.executemany('INSERT INTO roles (id_rol, nombre_rol) VALUES (?, ?)', SEED_ROLES)
+            raw.executemany('INSERT INTO legajo_secciones (id_seccion, nombre_seccion) VALUES (?, ?)', SEED_SECCIONES)
+            raw.executemany('INSERT INTO tipo_documento (nombre_tipo, id_seccion) VALUES (?, ?)', SEED_TIPOS_DOCUMENTO)
+            raw.executemany('INSERT INTO unidad_administrativa (nombre) VALUES (?)', [(n,) for n in SEED_UNIDADES])
+            raw.executemany('INSERT INTO cargos (nombre_cargo) VALUES (?)', [(n,) for n in SEED_CARGOS])
+            raw.executemany('INSERT INTO tipos_contrato (nombre_tipo) VALUES (?)', [(n,) for n in SEED_TIPOS_CONTRATO])
+            raw.executemany('INSERT INTO tipo_licencia (nombre_tipo) VALUES (?)', [(n,) for n in SEED_TIPOS_LICENCIA])
+            raw.commit()
+            logger.info('Esquema SQLite creado y catálogos básicos cargados.')
+    finally:
+        if close:
+            raw.close()
+
+
+# --- DATOS SINTÉTICOS PARA PRUEBAS DE CARGA ---
+
+_NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Carmen', 'Jorge', 'Rosa', 'Carlos', 'Lucía', 'Miguel']
+_APELLIDOS = ['Quispe', 'Mamani', 'Flores', 'Huamán', 'Rojas', 'García', 'Torres', 'Vargas', 'Castillo', 'Ramos']
+
+
+def seed_demo_data(conn, personal_count=1000, documents_per_person=3, document_size=4096,
+                   admin_password_hash=None, rng=None):
+    """
+    Inserta personal, documentos (con blobs) y un usuario administrador de
+    ejemplo para que la aplicación pueda recorrerse y perfilarse sin SQL Server.
+    """
+    rng = rng or random.Random(0)
+    cursor = conn.cursor()
+    start_dni = (cursor.execute('SELECT COALESCE(MAX(CAST(dni AS INTEGER)), 40000000) FROM personal').fetchval() or 40000000) + 1
+    unidades = [row[0] for row in cursor.execute('SELECT id_unidad FROM unidad_administrativa').fetchall()]
+    tipos = cursor.execute('SELECT id_tipo, id_seccion FROM tipo_documento').fetchall()
+    today = date.today()
+
+    personal_rows = []
+    for i in range(personal_count):
+        personal_rows.append((
+            str(start_dni + i), rng.choice(_NOMBRES), f"{rng.choice(_APELLIDOS)} {rng.choice(_APELLIDOS)}",
+            rng.choice('MF'), date(1960 + rng.randrange(40), 1 + rng.randrange(12), 1 + rng.randrange(28)),
+            'Av. Principal 123', f"9{rng.randrange(10**8):08d}", f"empleado{start_dni + i}@diresa.gob.pe",
+            'Soltero(a)', 'Peruana', rng.choice(unidades), today - timedelta(days=rng.randrange(7000)),
+        ))
+    cursor.executemany("""
+        INSERT INTO personal (dni, nombres, apellidos, sexo, fecha_nacimiento, direccion, telefono,
+                              email, estado_civil, nacionalidad, id_unidad, fecha_ingreso)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, personal_rows)
+
+    ids = [row[0] for row in cursor.execute(
+        'SELECT id_personal FROM personal WHERE CAST(dni AS INTEGER) >= ? ORDER BY id_personal', start_dni
+    ).fetchall()]
+    blob = bytes(rng.randrange(256) for _ in range(document_size))
+    documentos = []
+    for id_personal in ids:
+        for _ in range(documents_per_person):
+            id_tipo, id_seccion = rng.choice(tipos)
+            vencimiento = today + timedelta(days=rng.randrange(-60, 400)) if rng.random() < 0.4 else None
+            documentos.append((id_personal, id_tipo, id_seccion, f"doc_{id_personal}_{id_tipo}.pdf",
+                               today - timedelta(days=rng.randrange(2000)), vencimiento, None, blob, None))
+    cursor.executemany("""
+        INSERT INTO documentos (id_personal, id_tipo, id_seccion, nombre_archivo, fecha_emision,
+                                fecha_vencimiento, descripcion, archivo, hash_archivo)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, documentos)
+
+    cargos = [row[0] for row in cursor.execute('SELECT id_cargo FROM cargos').fetchall()]
+    tipos_contrato = [row[0] for row in cursor.execute('SELECT id_tipo_contrato FROM tipos_contrato').fetchall()]
+    contratos, historial = [], []
+    for id_personal in ids:
+        inicio = today - timedelta(days=rng.randrange(3000))
+        contratos.append((id_personal, rng.choice(tipos_contrato), inicio, None,
+                          1500 + rng.randrange(60) * 100, f"RD-{id_personal:06d}", 'Presencial'))
+        historial.append((id_personal, rng.choice(cargos), rng.choice(unidades), inicio))
+    cursor.executemany("""
+        INSERT INTO contratos (id_personal, id_tipo_contrato, fecha_inicio, fecha_fin, sueldo, resolucion, modalidad)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, contratos)
+    cursor.executemany("""
+        INSERT INTO historial_laboral (id_personal, id_cargo, id_unidad, fecha_inicio)
+        VALUES (?, ?, ?, ?)
+    """, historial)
+
+    if admin_password_hash and not cursor.execute("SELECT 1 FROM usuarios WHERE username = 'admin'").fetchone():
+        for username, id_rol in (('admin', 3), ('legajos', 2), ('rrhh', 1)):
+            cursor.execute(
+                "INSERT INTO usuarios (username, email, password_hash, id_rol, activo) VALUES (?, ?, ?, ?, 1)",
+                username, f"{username}@diresa.gob.pe", admin_password_hash, id_rol
+            )
+    conn.commit()
+    return len(ids), len(documentos)
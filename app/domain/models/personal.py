@@ -1,24 +1,34 @@
 # Define la clase Personal.
 # Representa los datos de un empleado.
 class Personal:
-    def __init__(self, id_personal, dni, nombres, apellidos, **kwargs):
+    # __slots__ evita un __dict__ por instancia; los campos son las columnas de la tabla.
+    __slots__ = (
+        'id_personal', 'dni', 'nombres', 'apellidos', 'sexo', 'fecha_nacimiento',
+        'direccion', 'telefono', 'email', 'estado_civil', 'nacionalidad',
+        'id_unidad', 'activo', 'fecha_ingreso', 'fecha_registro',
+    )
+
+    def __init__(self, id_personal, dni, nombres, apellidos, sexo=None, fecha_nacimiento=None,
+                 direccion=None, telefono=None, email=None, estado_civil=None, nacionalidad=None,
+                 id_unidad=None, activo=True, fecha_ingreso=None, fecha_registro=None):
         self.id_personal = id_personal
         self.dni = dni
         self.nombres = nombres
         self.apellidos = apellidos
-        # kwargs permite manejar campos opcionales de la tabla.
-        self.sexo = kwargs.get('sexo')
-        self.fecha_nacimiento = kwargs.get('fecha_nacimiento')
-        self.direccion = kwargs.get('direccion')
-        self.telefono = kwargs.get('telefono')
-        self.email = kwargs.get('email')
-        self.estado_civil = kwargs.get('estado_civil')
-        self.nacionalidad = kwargs.get('nacionalidad')
-        self.id_unidad = kwargs.get('id_unidad')
-        self.activo = kwargs.get('activo', True)
-        self.fecha_ingreso = kwargs.get('fecha_ingreso')
-        self.fecha_registro = kwargs.get('fecha_registro')
+        self.sexo = sexo
+        self.fecha_nacimiento = fecha_nacimiento
+        self.direccion = direccion
+        self.telefono = telefono
+        self.email = email
+        self.estado_civil = estado_civil
+        self.nacionalidad = nacionalidad
+        self.id_unidad = id_unidad
+        self.activo = activo
+        self.fecha_ingreso = fecha_ingreso
+        self.fecha_registro = fecha_registro
 
     @staticmethod
     def from_dict(data):
-        return Personal(**data)
\ No newline at end of file
+        # Acepta un diccionario o un registro del mapeador de filas; las columnas
+        # adicionales que devuelva el SP se ignoran.
+        return Personal(*[data.get(name, True if name == 'activo' else None) for name in Personal.__slots__])
@@ -11,10 +11,23 @@ class Usuario(UserMixin):
     """
     Representa la entidad de un usuario, incluyendo datos de sesión y perfil.
     """
+    # Atributos en slots (load_user crea un Usuario en cada petición). UserMixin no
+    # declara __slots__, así que los atributos ocasionales siguen siendo posibles.
+    __slots__ = (
+        'id', 'id_usuario', 'username', 'id_rol', 'password_hash', 'activo', 'email',
+        'nombre_rol', 'rol', 'id_personal', 'two_factor_code', 'two_factor_expiry',
+        'nombre_completo', 'fecha_ultimo_login', 'ultimo_login', 'rol_nombre', 'last_login',
+    )
+
+    # Parámetros del constructor que se leen de una fila en from_dict.
+    _CAMPOS = (
+        'id_usuario', 'username', 'id_rol', 'password_hash', 'activo', 'email', 'nombre_rol',
+        'two_factor_code', 'two_factor_expiry', 'nombre_completo', 'ultimo_login', 'id_personal',
+    )
+
     def __init__(self, id_usuario, username, id_rol, password_hash=None, activo=True, 
                  email=None, nombre_rol=None, two_factor_code=None, two_factor_expiry=None,
-                 nombre_completo=None, ultimo_login=None, id_personal=None,
-                 **kwargs):
+                 nombre_completo=None, ultimo_login=None, id_personal=None):
         
         self.id = id_usuario
         self.id_usuario = id_usuario  # También guardar como id_usuario para compatibilidad
@@ -65,9 +78,12 @@ class Usuario(UserMixin):
 
     @staticmethod
     def from_dict(data):
-        """Crea una instancia de Usuario a partir de un diccionario de datos (ej. desde la BD)."""
+        """
+        Crea una instancia de Usuario a partir de un diccionario o de un registro
+        del mapeador de filas. Las columnas que no son del modelo se ignoran.
+        """
         if data:
-            return Usuario(**data)
+            return Usuario(*[data.get(name, True if name == 'activo' else None) for name in Usuario._CAMPOS])
         return None
 
 # Fin de app/domain/models/usuario.py
\ No newline at end of file
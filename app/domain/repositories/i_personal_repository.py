@@ -1,6 +1,9 @@
 # Importa las herramientas para crear clases abstractas (interfaces).
 from abc import ABC, abstractmethod
 
+# Partes del legajo que get_legajo_projection puede leer por separado.
+LEGAJO_SECTIONS = ('personal', 'estudios', 'capacitaciones', 'contratos', 'historial_laboral', 'licencias', 'documentos')
+
 # Define la interfaz para el Repositorio de Personal.
 # Cualquier clase que implemente esta interfaz debe definir estos métodos.
 class IPersonalRepository(ABC):
@@ -12,6 +15,16 @@ class IPersonalRepository(ABC):
     def get_all_paginated(self, page, per_page, filters=None):
         pass
 
+    @abstractmethod
+    def get_personal_keyset(self, per_page, filters=None, key=None, direction='next'):
+        """Define el contrato para paginar el listado por clave (apellidos, nombres, id_personal)."""
+        pass
+
+    @abstractmethod
+    def count_personal(self, filters=None, approximate=False):
+        """Define el contrato para contar el personal del listado (exacto o aproximado)."""
+        pass
+
     @abstractmethod
     def create(self, personal_data):
         pass
@@ -24,6 +37,31 @@ class IPersonalRepository(ABC):
     def add_document(self, document_data, file_bytes):
         pass
 
+    @abstractmethod
+    def add_document_stream(self, document_data, upload):
+        """Define el contrato para guardar un documento leyendo su archivo por tramos (SpooledBlob)."""
+        pass
+
+    @abstractmethod
+    def find_ids_by_dni(self, dnis, only_active=True):
+        """Define el contrato para resolver muchos DNI a {dni: id_personal} (solo personal activo por defecto)."""
+        pass
+
+    @abstractmethod
+    def find_taken_logins(self, usernames, emails):
+        """Define el contrato para saber qué usernames y emails ya usa alguna cuenta: (set, set)."""
+        pass
+
+    @abstractmethod
+    def register_personal_bulk(self, altas, id_rol, id_usuario_auditor):
+        """Define el contrato para registrar un tramo de altas (personal + usuario + bitácora) en una transacción."""
+        pass
+
+    @abstractmethod
+    def add_documents_bulk(self, documents):
+        """Define el contrato para guardar varios documentos [(datos, SpooledBlob), ...] en una transacción."""
+        pass
+
     @abstractmethod
     def delete_by_id(self, personal_id):
         pass
@@ -40,4 +78,29 @@ class IPersonalRepository(ABC):
     @abstractmethod
     def delete_document_by_id(self, document_id):
         """Define el contrato para la eliminación lógica de un documento."""
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def get_document_metadata(self, document_id):
+        """Define el contrato para obtener nombre y tamaño de un documento sin leer el binario."""
+        pass
+
+    @abstractmethod
+    def iter_document_chunks(self, document_id, chunk_size, start=0, end=None):
+        """Define el contrato para leer el binario de un documento por tramos."""
+        pass
+
+    @abstractmethod
+    def get_expiry_summary(self, personal_ids, today, threshold):
+        """Define el contrato para contar documentos vencidos y por vencer de un grupo de personas."""
+        pass
+
+    @abstractmethod
+    def get_legajo_projection(self, personal_id, sections, id_seccion=None):
+        """Define el contrato para leer solo algunas partes del legajo (cabecera, contratos, documentos sin binario...)."""
+        pass
+
+    @abstractmethod
+    def count_documents_by_seccion(self, personal_id):
+        """Define el contrato para contar los documentos activos de una persona por sección."""
+        pass
@@ -0,0 +1,81 @@
+# RUTA: app/infrastructure/persistence/catalog_cache.py
+"""
+Caché de los catálogos de referencia (CATALOG_CACHE_TTL).
+
+Unidades, cargos, tipos de contrato, secciones, tipos de documento y roles casi
+no cambian, pero cada formulario los pedía a la BD. Los métodos de los
+repositorios que los leen se decoran con `cached_catalog(<grupo>)` y comparten
+una caché del proceso. Cualquier código que modifique un catálogo debe llamar a
+`invalidate_catalogs(<grupo>)`; el TTL cubre los cambios hechos directamente en
+la BD.
+"""
+
+import logging
+
+from app.utils.cache import cached_method, get_cache
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE = get_cache('catalogos', ttl=3600, max_entries=512)
+
+# Grupos de claves de la caché (primer elemento de cada clave).
+CARGOS = 'cargos'
+TIPOS_CONTRATO = 'tipos_contrato'
+UNIDADES = 'unidades'
+SECCIONES = 'secciones'
+TIPOS_DOCUMENTO = 'tipos_documento'
+TIPOS_DOCUMENTO_SECCION = 'tipos_documento_seccion'
+ROLES = 'roles'
+ROL_PERSONAL = 'rol_personal'
+
+
+def cached_catalog(group):
+    """Decorador para los métodos de repositorio que leen un catálogo."""
+    return cached_method(CATALOG_CACHE, group)
+
+
+def invalidate_catalogs(*groups):
+    """
+    Descarta de la caché los catálogos indicados (todos si no se indica ninguno).
+    Invalidar los tipos de documento descarta también su lista por sección.
+    """
+    if not groups:
+        CATALOG_CACHE.invalidate()
+        return
+    for group in groups:
+        CATALOG_CACHE.invalidate(group)
+        if group == TIPOS_DOCUMENTO:
+            CATALOG_CACHE.invalidate(TIPOS_DOCUMENTO_SECCION)
+        elif group == ROLES:
+            CATALOG_CACHE.invalidate(ROL_PERSONAL)
+
+
+def warm_up_catalogs(personal_repo, usuario_repo):
+    """
+    Carga los catálogos en la caché (al arrancar, dentro de un app_context) para
+    que los primeros formularios no paguen las consultas. Ante el primer fallo
+    (BD no disponible) se deja de precargar sin impedir el arranque: cada
+    catálogo se cargará en su primer uso.
+    """
+    loaders = (
+        (CARGOS, personal_repo.get_cargos_for_select),
+        (TIPOS_CONTRATO, personal_repo.get_tipos_contrato_for_select),
+        (UNIDADES, personal_repo.get_unidades_for_select),
+        (SECCIONES, personal_repo.get_secciones_for_select),
+        (TIPOS_DOCUMENTO, personal_repo.get_tipos_documento_for_select),
+        (ROLES, usuario_repo.get_all_roles),
+    )
+    loaded = 0
+    group = TIPOS_DOCUMENTO_SECCION
+    try:
+        for group, loader in loaders:
+            loader()
+            loaded += 1
+        group = TIPOS_DOCUMENTO_SECCION
+        for id_seccion, _ in personal_repo.get_secciones_for_select():
+            personal_repo.get_tipos_documento_by_seccion(id_seccion)
+    except Exception as e:
+        logger.warning(f"Precarga de catálogos interrumpida en '{group}' ({loaded}/{len(loaders)}): {e}")
+        return loaded
+    logger.info(f"Catálogos precargados: {loaded}/{len(loaders)}")
+    return loaded
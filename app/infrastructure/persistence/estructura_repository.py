@@ -8,6 +8,7 @@ import logging
 from datetime import datetime
 from app.database.connector import get_db_write, get_db_read
 from app.domain.models.estructura_personalizada import EstructuraPersonalizada
+from app.infrastructure.persistence.legajo_cache import invalidate_legajo
 
 logger = logging.getLogger(__name__)
 
@@ -96,6 +97,7 @@ class EstructuraRepository:
             
             conn.commit()
             cursor.close()
+            invalidate_legajo(id_personal)
             
             logger.info(f"Estructura personalizada guardada para personal {id_personal}")
             return True
@@ -144,6 +146,7 @@ class EstructuraRepository:
             
             conn.commit()
             cursor.close()
+            invalidate_legajo(id_personal)
             
             logger.info(f"Estructura personalizada eliminada para personal {id_personal}")
             return True
@@ -0,0 +1,144 @@
+# RUTA: app/infrastructure/persistence/job_store.py
+"""
+Tabla de tareas en segundo plano (JobService) en un archivo SQLite local.
+
+Es independiente de la BD principal: las tareas se registran aunque SQL Server
+esté lento o caído, y su estado sobrevive a un reinicio. Cada operación abre su
+propia conexión (las usan los hilos de Waitress y los del pool de tareas); el
+modo WAL permite leer el avance mientras un hilo lo escribe.
+"""
+
+import json
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tareas (
+    id TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    descripcion TEXT,
+    id_usuario INTEGER,
+    estado TEXT NOT NULL,
+    progreso REAL NOT NULL DEFAULT 0,
+    mensaje TEXT,
+    resultado TEXT,             -- JSON devuelto por la tarea
+    error TEXT,
+    artefacto TEXT,             -- archivo de resultado dentro del directorio de la tarea
+    nombre_descarga TEXT,
+    creada REAL NOT NULL,
+    iniciada REAL,
+    terminada REAL
+);
+CREATE INDEX IF NOT EXISTS ix_tareas_usuario ON tareas (id_usuario, creada);
+CREATE INDEX IF NOT EXISTS ix_tareas_estado ON tareas (estado);
+"""
+
+_COLUMNAS = ('id', 'tipo', 'descripcion', 'id_usuario', 'estado', 'progreso', 'mensaje', 'resultado',
+             'error', 'artefacto', 'nombre_descarga', 'creada', 'iniciada', 'terminada')
+
+
+class JobStore:
+    """Altas, cambios y consultas de la tabla `tareas`."""
+
+    def __init__(self, path):
+        self.path = path
+        with self._conectar() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def crear(self, tarea):
+        """Inserta una tarea (dict con las columnas de la tabla; las que falten quedan en NULL)."""
+        columnas = [columna for columna in _COLUMNAS if columna in tarea]
+        valores = [self._a_bd(columna, tarea[columna]) for columna in columnas]
+        with self._conectar() as conn:
+            conn.execute(f"INSERT INTO tareas ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                         valores)
+
+    def actualizar(self, tarea_id, **campos):
+        if not campos:
+            return
+        for columna in campos:
+            if columna not in _COLUMNAS or columna == 'id':
+                raise ValueError(f"Columna de tarea no válida: {columna}")
+        asignaciones = ', '.join(f"{columna} = ?" for columna in campos)
+        valores = [self._a_bd(columna, valor) for columna, valor in campos.items()]
+        with self._conectar() as conn:
+            conn.execute(f"UPDATE tareas SET {asignaciones} WHERE id = ?", valores + [tarea_id])
+
+    def obtener(self, tarea_id):
+        """La tarea como dict (resultado ya decodificado), o None."""
+        with self._conectar() as conn:
+            fila = conn.execute("SELECT * FROM tareas WHERE id = ?", (tarea_id,)).fetchone()
+        return self._a_dict(fila) if fila else None
+
+    def listar(self, id_usuario=None, limite=50, tipo=None):
+        """Tareas del usuario (o de todos), de la más reciente a la más antigua; opcionalmente de un solo tipo."""
+        condiciones, parametros = [], []
+        if id_usuario is not None:
+            condiciones.append("id_usuario = ?")
+            parametros.append(id_usuario)
+        if tipo is not None:
+            condiciones.append("tipo = ?")
+            parametros.append(tipo)
+        where = f"WHERE {' AND '.join(condiciones)} " if condiciones else ""
+        with self._conectar() as conn:
+            filas = conn.execute(f"SELECT * FROM tareas {where}ORDER BY creada DESC LIMIT ?",
+                                 parametros + [limite]).fetchall()
+        return [self._a_dict(fila) for fila in filas]
+
+    def activa_de_tipo(self, tipo):
+        """Id de una tarea de ese tipo en cola o en proceso, o None."""
+        with self._conectar() as conn:
+            fila = conn.execute("SELECT id FROM tareas WHERE tipo = ? AND estado IN ('en_cola', 'en_proceso') "
+                                "ORDER BY creada LIMIT 1", (tipo,)).fetchone()
+        return fila['id'] if fila else None
+
+    def marcar_interrumpidas(self, mensaje):
+        """Las tareas que quedaron en cola o en proceso (reinicio del servidor) pasan a 'interrumpida'."""
+        with self._conectar() as conn:
+            cursor = conn.execute("UPDATE tareas SET estado = 'interrumpida', error = ?, terminada = ? "
+                                  "WHERE estado IN ('en_cola', 'en_proceso')", (mensaje, time.time()))
+            return cursor.rowcount
+
+    def eliminar_terminadas_antes_de(self, instante):
+        """Borra las tareas terminadas antes de `instante` y devuelve sus ids."""
+        with self._conectar() as conn:
+            ids = [fila['id'] for fila in conn.execute(
+                "SELECT id FROM tareas WHERE terminada IS NOT NULL AND terminada < ?", (instante,))]
+            conn.executemany("DELETE FROM tareas WHERE id = ?", [(tarea_id,) for tarea_id in ids])
+        return ids
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return _Conexion(conn)
+
+    @staticmethod
+    def _a_bd(columna, valor):
+        return json.dumps(valor, default=str) if columna == 'resultado' and valor is not None else valor
+
+    @staticmethod
+    def _a_dict(fila):
+        tarea = dict(fila)
+        if tarea['resultado']:
+            tarea['resultado'] = json.loads(tarea['resultado'])
+        return tarea
+
+
+class _Conexion:
+    """Conexión sqlite3 que confirma (o revierte) y se cierra al salir del `with`."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        return self._conn
+
+    def __exit__(self, tipo, valor, traza):
+        try:
+            if tipo is None:
+                self._conn.commit()
+            else:
+                self._conn.rollback()
+        finally:
+            self._conn.close()
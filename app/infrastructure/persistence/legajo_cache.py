@@ -0,0 +1,68 @@
+# RUTA: app/infrastructure/persistence/legajo_cache.py
+"""
+Caché de las partes del legajo por id_personal (LEGAJO_CACHE_MAX_MB).
+
+`get_legajo_projection` lee cada parte del legajo (cabecera, contratos,
+documentos de una sección...) con su propia consulta; las vistas de un mismo
+legajo durante una revisión se sirven ahora desde memoria. Cada parte se guarda
+con la clave (id_personal, parte, id_seccion), así la cabecera que abre el
+legajo, una sección del acordeón y "Mis Datos" reutilizan lo ya leído. La caché
+es LRU acotada por bytes y con TTL. Toda escritura que cambie datos de un
+legajo (personal, contratos, documentos, solicitudes aprobadas, estructura)
+debe llamar a `invalidate_legajo(id_personal)` tras confirmar: descarta todas
+las partes de esa persona.
+"""
+
+import functools
+
+from app.utils.cache import ByteLRUCache, register_cache
+
+LEGAJO_CACHE = register_cache(ByteLRUCache('legajos', max_bytes=32 * 1024 * 1024, ttl=600))
+
+
+def invalidate_legajo(personal_id):
+    """Descarta el legajo de una persona (None = sin dueño conocido: se descartan todos)."""
+    if personal_id is None:
+        LEGAJO_CACHE.invalidate()
+    else:
+        LEGAJO_CACHE.invalidate(int(personal_id))
+
+
+def cached_legajo(method):
+    """
+    Decorador para get_legajo_projection(personal_id, sections, id_seccion=None).
+    Las partes ausentes se leen de a una y se guardan por separado; `id_seccion`
+    solo forma parte de la clave de 'documentos'. Cada llamador recibe su propio
+    diccionario y listas, para que agregar o quitar elementos no altere la copia
+    en caché.
+    """
+    @functools.wraps(method)
+    def wrapper(self, personal_id, sections, id_seccion=None):
+        legajo = {}
+        for section in sections:
+            seccion = id_seccion if section == 'documentos' else None
+            part = LEGAJO_CACHE.get_or_load((int(personal_id), section, seccion),
+                                            lambda: method(self, personal_id, (section,), seccion))
+            if part is None:
+                return None
+            value = part[section]
+            legajo[section] = list(value) if isinstance(value, list) else value
+        return legajo
+    wrapper.uncached = method
+    return wrapper
+
+
+def cached_legajo_part(part):
+    """
+    Decorador para otros datos de un legajo que se leen con solo el id_personal
+    (p. ej. los contadores de documentos por sección). Se guardan con la clave
+    (id_personal, part, None) y se invalidan junto con el resto del legajo.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, personal_id):
+            value = LEGAJO_CACHE.get_or_load((int(personal_id), part, None), lambda: method(self, personal_id))
+            return dict(value) if isinstance(value, dict) else value
+        wrapper.uncached = method
+        return wrapper
+    return decorator
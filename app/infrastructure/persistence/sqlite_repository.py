@@ -0,0 +1,1369 @@
+# RUTA: app/infrastructure/persistence/sqlite_repository.py
+"""
+Implementación SQLite de los repositorios (DB_BACKEND=sqlite).
+
+Replica la interfaz de los repositorios de SQL Server. Donde la versión de SQL
+Server llama a un procedimiento almacenado, aquí se ejecuta su equivalente en
+Python/SQLite (indicado en cada método), devolviendo las mismas columnas para
+que servicios y plantillas funcionen sin cambios.
+"""
+
+import contextlib
+import itertools
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from flask import current_app
+from app.database import sqlite_backend
+from app.database.batch_lookup import BatchLookup
+from app.database.connector import get_db_read, get_db_write, get_db_admin
+from app.database.row_mapper import map_row, map_rows
+from app.domain.models.usuario import Usuario
+from app.domain.models.personal import Personal
+from app.domain.repositories.i_usuario_repository import IUsuarioRepository
+from app.domain.repositories.i_personal_repository import IPersonalRepository
+from app.domain.repositories.i_auditoria_repository import IAuditoriaRepository
+from app.infrastructure.persistence import catalog_cache
+from app.infrastructure.persistence.catalog_cache import cached_catalog
+from app.infrastructure.persistence.legajo_cache import cached_legajo, cached_legajo_part, invalidate_legajo
+from app.infrastructure.persistence.user_cache import USER_CACHE
+from app.infrastructure.storage import compression
+from app.utils.pagination import SimplePagination
+
+logger = logging.getLogger(__name__)
+
+_PERSONAL_POR_DNI = BatchLookup('personal', 'dni', ('id_personal', 'activo'))
+_USUARIO_POR_USERNAME = BatchLookup('usuarios', 'username', ('id_usuario',))
+_USUARIO_POR_EMAIL = BatchLookup('usuarios', 'email', ('id_usuario',))
+
+# Reintentos de un tramo de altas masivas cuando la base está bloqueada por otro escritor.
+BULK_REGISTER_RETRIES = 2
+
+
+def _reintentable(error):
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in str(error) or 'busy' in str(error))
+
+
+def _row_to_dict(cursor, row):
+    # Función de utilidad para convertir una fila del cursor a un diccionario
+    if not row or not cursor.description:
+        return None
+    return dict(zip([column[0] for column in cursor.description], row))
+
+
+# --- ALMACÉN DE BLOBS: mismas reglas que en sqlserver_repository (tabla documento_blobs) ---
+
+def _blob_add_ref(cursor, digest, size):
+    cursor.execute("UPDATE documento_blobs SET referencias = referencias + 1 WHERE hash_archivo = ?", digest)
+    if cursor.rowcount:
+        return False
+    cursor.execute("INSERT INTO documento_blobs (hash_archivo, tamanio, referencias) VALUES (?, ?, 1)", digest, size)
+    return True
+
+
+def _blob_release_ref(cursor, digest):
+    cursor.execute("UPDATE documento_blobs SET referencias = referencias - 1 WHERE hash_archivo = ?", digest)
+    cursor.execute("DELETE FROM documento_blobs WHERE hash_archivo = ? AND referencias <= 0", digest)
+    return cursor.rowcount > 0
+
+
+def _stored_blob_hash(cursor, document_id):
+    cursor.execute("SELECT hash_archivo FROM documentos WHERE id_documento = ? AND archivo IS NULL", document_id)
+    row = cursor.fetchone()
+    return row[0] if row and row[0] else None
+
+
+def _document_storage(cursor, document_id):
+    row = cursor.execute("""
+        SELECT CASE WHEN archivo IS NULL THEN hash_archivo END, substr(archivo, 1, ?)
+        FROM documentos WHERE id_documento = ?
+    """, compression.HEADER_SIZE, document_id).fetchone()
+    if not row:
+        return None, None
+    return row[0], compression.parse_header(row[1])
+
+
+def _apply_compression_header(metadata):
+    if metadata:
+        header = compression.parse_header(metadata.cabecera)
+        if header:
+            metadata.tamanio = header[1]
+    return metadata
+
+
+def _delete_unreferenced_blob(blob_store, cursor, digest):
+    cursor.execute("SELECT 1 FROM documento_blobs WHERE hash_archivo = ?", digest)
+    if cursor.fetchone() is None:
+        blob_store.delete(digest)
+
+
+_USUARIO_COLUMNS = """
+    u.id_usuario, u.username, u.email, u.password_hash, u.id_rol, u.activo,
+    u.two_factor_code, u.two_factor_expiry, u.id_personal, r.nombre_rol
+"""
+
+
+class SqliteUsuarioRepository(IUsuarioRepository):
+
+    def get_all_users_with_roles(self):
+        """Equivalente de sp_listar_todos_los_usuarios."""
+        cursor = get_db_read().cursor()
+        try:
+            cursor.execute("""
+                SELECT u.id_usuario, u.username, u.email, u.activo, r.nombre_rol, u.ultimo_login
+                FROM usuarios u LEFT JOIN roles r ON u.id_rol = r.id_rol
+                ORDER BY u.username
+            """)
+            usuarios = []
+            for row in cursor.fetchall():
+                usuario = Usuario(id_usuario=row.id_usuario, username=row.username, email=row.email,
+                                  id_rol=0, activo=row.activo)
+                usuario.nombre_rol = row.nombre_rol
+                usuario.ultimo_login = row.ultimo_login
+                usuarios.append(usuario)
+            return usuarios
+        finally:
+            cursor.close()
+
+    def find_all_users_with_roles(self):
+        """Lista de usuarios con rol, estado y nombre del personal asociado."""
+        cursor = get_db_read().cursor()
+        try:
+            cursor.execute("""
+                SELECT u.id_usuario, u.username, u.email, r.nombre_rol, u.activo, u.ultimo_login,
+                       COALESCE(p.nombres || ' ' || p.apellidos, 'N/A') AS nombre_completo
+                FROM usuarios u
+                JOIN roles r ON u.id_rol = r.id_rol
+                LEFT JOIN personal p ON u.id_personal = p.id_personal
+                ORDER BY u.username
+            """)
+            usuarios = []
+            for data in map_rows(cursor, cursor.fetchall()):
+                usuario = Usuario(
+                    id_usuario=data.get('id_usuario'),
+                    username=data.get('username'),
+                    id_rol=data.get('id_rol'),
+                    activo=data.get('activo'),
+                    email=data.get('email'),
+                    nombre_rol=data.get('nombre_rol'),
+                    nombre_completo=data.get('nombre_completo'),
+                    ultimo_login=data.get('ultimo_login')
+                )
+                usuario.rol_nombre = usuario.nombre_rol
+                usuario.last_login = usuario.fecha_ultimo_login
+                usuarios.append(usuario)
+            return usuarios
+        except Exception as e:
+            logger.error(f"Error al obtener usuarios: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def _find_one(self, where, value):
+        cursor = get_db_read().cursor()
+        try:
+            cursor.execute(f"""
+                SELECT {_USUARIO_COLUMNS}
+                FROM usuarios u LEFT JOIN roles r ON u.id_rol = r.id_rol
+                WHERE {where} = ?
+            """, value)
+            return Usuario.from_dict(map_row(cursor, cursor.fetchone()))
+        except Exception as e:
+            logger.error(f"Error al buscar usuario por {where}: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def find_by_id(self, user_id):
+        return self._find_one('u.id_usuario', user_id)
+
+    def find_by_username_with_email(self, username):
+        return self._find_one('u.username', username)
+
+    def find_by_username(self, username):
+        return self._find_one('u.username', username)
+
+    def find_by_email(self, email):
+        return self._find_one('u.email', email)
+
+    def set_2fa_code(self, user_id, hashed_code, expiry_date):
+        conn = get_db_write()
+        conn.cursor().execute("UPDATE usuarios SET two_factor_code = ?, two_factor_expiry = ? WHERE id_usuario = ?",
+                              hashed_code, expiry_date, user_id)
+        conn.commit()
+        USER_CACHE.bump(user_id)
+
+    def clear_2fa_code(self, user_id):
+        conn = get_db_write()
+        conn.cursor().execute("UPDATE usuarios SET two_factor_code = NULL, two_factor_expiry = NULL WHERE id_usuario = ?",
+                              user_id)
+        conn.commit()
+        USER_CACHE.bump(user_id)
+
+    def update_password_hash(self, username, new_hash):
+        conn = get_db_write()
+        conn.cursor().execute("UPDATE usuarios SET password_hash = ? WHERE username = ?", new_hash, username)
+        conn.commit()
+        USER_CACHE.bump_username(username)
+
+    def update_user_password(self, user_id, new_hash):
+        self._update_by_id("UPDATE usuarios SET password_hash = ? WHERE id_usuario = ?", new_hash, user_id)
+        USER_CACHE.bump(user_id)
+
+    def update_last_login(self, user_id):
+        """Equivalente de sp_actualizar_ultimo_login."""
+        conn = get_db_write()
+        conn.cursor().execute("UPDATE usuarios SET ultimo_login = GETUTCDATE() WHERE id_usuario = ?", user_id)
+        conn.commit()
+        USER_CACHE.bump(user_id)
+
+    def deactivate_user(self, user_id):
+        self._update_by_id("UPDATE usuarios SET activo = 0 WHERE id_usuario = ?", user_id)
+        USER_CACHE.bump(user_id)
+
+    def activate_user(self, user_id):
+        self._update_by_id("UPDATE usuarios SET activo = 1 WHERE id_usuario = ?", user_id)
+        USER_CACHE.bump(user_id)
+
+    def update_user_role(self, user_id, new_role_id):
+        """Equivalente de sp_actualizar_rol_usuario."""
+        self._update_by_id("UPDATE usuarios SET id_rol = ? WHERE id_usuario = ?", new_role_id, user_id)
+        USER_CACHE.bump(user_id)
+
+    def update_username(self, user_id, new_username):
+        conn = get_db_write()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM usuarios WHERE username = ? AND id_usuario != ?", new_username, user_id)
+        if cursor.fetchone()[0] > 0:
+            raise ValueError(f"El nombre de usuario '{new_username}' ya está en uso por otro usuario.")
+        cursor.execute("UPDATE usuarios SET username = ? WHERE id_usuario = ?", new_username, user_id)
+        conn.commit()
+        USER_CACHE.bump(user_id)
+
+    def update_email(self, user_id, new_email):
+        conn = get_db_write()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM usuarios WHERE email = ? AND id_usuario != ?", new_email, user_id)
+        if cursor.fetchone()[0] > 0:
+            raise ValueError(f"El correo electrónico '{new_email}' ya está en uso por otro usuario.")
+        cursor.execute("UPDATE usuarios SET email = ? WHERE id_usuario = ?", new_email, user_id)
+        conn.commit()
+        USER_CACHE.bump(user_id)
+
+    def create_user(self, username, email, password_hash, id_rol, activo=True, fecha_creacion=None, id_personal=None):
+        conn = get_db_admin()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO usuarios (username, email, password_hash, id_rol, activo, fecha_creacion, id_personal)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, username, email, password_hash, id_rol, activo, fecha_creacion or datetime.utcnow(), id_personal)
+            new_id = cursor.lastrowid
+            conn.commit()
+            return Usuario(id_usuario=new_id, username=username, email=email,
+                           password_hash=password_hash, id_rol=id_rol, activo=activo)
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error al crear usuario: {e}")
+            raise
+
+    def get_all_roles(self):
+        return [type('Role', (), {'id_rol': id_rol, 'nombre_rol': nombre_rol})()
+                for id_rol, nombre_rol in self._get_roles_data()]
+
+    @cached_catalog(catalog_cache.ROLES)
+    def _get_roles_data(self):
+        cursor = get_db_read().cursor()
+        cursor.execute("SELECT id_rol, nombre_rol FROM roles ORDER BY nombre_rol")
+        return [(row[0], row[1]) for row in cursor.fetchall()]
+
+    def _update_by_id(self, query, *params):
+        conn = get_db_write()
+        cursor = conn.cursor()
+        cursor.execute(query, *params)
+        if cursor.rowcount == 0:
+            raise ValueError("Usuario no encontrado.")
+        conn.commit()
+
+
+# --- REPOSITORIO DE PERSONAL ---
+class SqlitePersonalRepository(IPersonalRepository):
+
+    def __init__(self, blob_store=None, compressor=None):
+        self._blob_store = blob_store
+        self._compressor = compressor
+
+    @cached_catalog(catalog_cache.CARGOS)
+    def get_cargos_for_select(self):
+        cursor = get_db_read().cursor()
+        cursor.execute("SELECT id_cargo, nombre_cargo FROM cargos ORDER BY nombre_cargo")
+        return [(str(row.id_cargo), row.nombre_cargo) for row in cursor.fetchall()]
+
+    @cached_catalog(catalog_cache.TIPOS_CONTRATO)
+    def get_tipos_contrato_for_select(self):
+        cursor = get_db_read().cursor()
+        cursor.execute("SELECT id_tipo_contrato, nombre_tipo FROM tipos_contrato ORDER BY nombre_tipo")
+        return [(str(row.id_tipo_contrato), row.nombre_tipo) for row in cursor.fetchall()]
+
+    def registrar_contrato_inicial(self, form_data):
+        """Registra el contrato y el historial laboral inicial en una transacción."""
+        conn = get_db_write()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO contratos (id_personal, id_tipo_contrato, fecha_inicio, fecha_fin, sueldo, resolucion, modalidad)
+                VALUES (?, ?, ?, ?, ?, ?, 'Presencial')
+            """, form_data['id_personal'], form_data['id_tipo_contrato'], form_data['fecha_inicio'],
+                form_data['fecha_fin'] or None, form_data['sueldo'], form_data['resolucion'])
+            cursor.execute("""
+                INSERT INTO historial_laboral (id_personal, id_cargo, id_unidad, fecha_inicio, fecha_fin, motivo_salida)
+                VALUES (?, ?, ?, ?, NULL, 'Cargo Inicial / Ingreso')
+            """, form_data['id_personal'], form_data['id_cargo'], form_data['id_unidad'], form_data['fecha_inicio'])
+            conn.commit()
+            invalidate_legajo(form_data['id_personal'])
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def get_document_owner(self, document_id):
+        cursor = get_db_read().cursor()
+        try:
+            cursor.execute("SELECT id_personal FROM documentos WHERE id_documento = ?", document_id)
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
+
+    def check_dni_exists(self, dni):
+        cursor = get_db_read().cursor()
+        cursor.execute("SELECT 1 FROM personal WHERE dni = ?", dni)
+        return cursor.fetchone() is not None
+
+    def find_ids_by_dni(self, dnis, only_active=True):
+        cursor = get_db_read().cursor()
+        try:
+            encontrados = _PERSONAL_POR_DNI.resolve(cursor, dnis)
+        finally:
+            cursor.close()
+        return {dni: registro.id_personal for dni, registro in encontrados.items()
+                if registro.activo or not only_active}
+
+    def find_taken_logins(self, usernames, emails):
+        cursor = get_db_read().cursor()
+        try:
+            return (set(_USUARIO_POR_USERNAME.resolve(cursor, usernames)),
+                    set(_USUARIO_POR_EMAIL.resolve(cursor, emails)))
+        finally:
+            cursor.close()
+
+    def register_personal_bulk(self, altas, id_rol, id_usuario_auditor):
+        """
+        Equivalente de la versión de SQL Server: personal, usuarios y bitácora
+        del tramo con executemany en una transacción; si falla, fila a fila con
+        un SAVEPOINT por alta. Devuelve None o el mensaje de error por alta.
+        """
+        conn = get_db_admin()
+        for intento in itertools.count():
+            try:
+                return self._register_personal_bulk(conn, altas, id_rol, id_usuario_auditor)
+            except sqlite3.Error as e:
+                conn.rollback()
+                if intento >= BULK_REGISTER_RETRIES or not _reintentable(e):
+                    raise
+                logger.warning(f"Tramo de {len(altas)} altas: error pasajero ({e}); reintento {intento + 1}")
+                time.sleep(0.5 * 2 ** intento)
+
+    def _register_personal_bulk(self, conn, altas, id_rol, id_usuario_auditor):
+        cursor = conn.cursor()
+        try:
+            try:
+                self._insert_altas(cursor, altas, id_rol, id_usuario_auditor)
+                conn.commit()
+                return [None] * len(altas)
+            except sqlite3.Error as e:
+                if _reintentable(e):
+                    raise
+                conn.rollback()
+                logger.info(f"Tramo de {len(altas)} altas rechazado ({e}); se registra fila a fila")
+
+            # BEGIN explícito: un SAVEPOINT fuera de transacción se confirmaría al liberarlo.
+            cursor.execute("BEGIN")
+            resultados = []
+            for alta in altas:
+                cursor.execute("SAVEPOINT alta_masiva")
+                try:
+                    self._insert_altas(cursor, [alta], id_rol, id_usuario_auditor)
+                    resultados.append(None)
+                except sqlite3.Error as e:
+                    if _reintentable(e):
+                        raise
+                    if not conn.raw.in_transaction:
+                        # RAISE(ROLLBACK) u ON CONFLICT ROLLBACK revirtió toda la
+                        # transacción y el savepoint ya no existe.
+                        logger.info(f"Tramo de {len(altas)} altas: la transacción se revirtió ({e}); "
+                                    f"se registra una transacción por fila")
+                        return self._register_una_por_transaccion(conn, cursor, altas, id_rol, id_usuario_auditor)
+                    cursor.execute("ROLLBACK TO alta_masiva")
+                    resultados.append(str(e))
+                cursor.execute("RELEASE alta_masiva")
+            conn.commit()
+            return resultados
+        finally:
+            cursor.close()
+
+    def _register_una_por_transaccion(self, conn, cursor, altas, id_rol, id_usuario_auditor):
+        """Igual que la versión de SQL Server: cada alta en su propia transacción."""
+        resultados = []
+        for alta in altas:
+            for intento in itertools.count():
+                try:
+                    cursor.execute("BEGIN")
+                    self._insert_altas(cursor, [alta], id_rol, id_usuario_auditor)
+                    conn.commit()
+                    resultados.append(None)
+                    break
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    if _reintentable(e) and intento < BULK_REGISTER_RETRIES:
+                        time.sleep(0.5 * 2 ** intento)
+                        continue
+                    resultados.append(str(e))
+                    break
+        return resultados
+
+    @staticmethod
+    def _insert_altas(cursor, altas, id_rol, id_usuario_auditor):
+        cursor.executemany("""
+            INSERT INTO personal (dni, nombres, apellidos, sexo, fecha_nacimiento, direccion, telefono,
+                                  email, estado_civil, nacionalidad, id_unidad, fecha_ingreso)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(alta.get('dni'), alta.get('nombres'), alta.get('apellidos'), alta.get('sexo'),
+               alta.get('fecha_nacimiento'), alta.get('direccion'), alta.get('telefono'),
+               alta.get('email'), alta.get('estado_civil'), alta.get('nacionalidad'),
+               alta.get('id_unidad'), alta.get('fecha_ingreso')) for alta in altas])
+        ids = _PERSONAL_POR_DNI.resolve(cursor, [alta['dni'] for alta in altas])
+        ahora = datetime.utcnow()
+        cursor.executemany("""
+            INSERT INTO usuarios (username, email, password_hash, id_rol, activo, fecha_creacion, id_personal)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(alta['username'], alta['email'], alta['password_hash'], id_rol, True, ahora,
+               ids[alta['dni']].id_personal) for alta in altas])
+        cursor.executemany("""
+            INSERT INTO bitacora (id_usuario, fecha_hora, modulo, accion, descripcion, detalle_json)
+            VALUES (?, GETDATE(), 'Personal', 'CREAR', ?, ?)
+        """, [(id_usuario_auditor, alta['descripcion'], alta['detalle_json']) for alta in altas])
+
+    def get_expiry_summary(self, personal_ids, today, threshold):
+        """Vencidos y por vencer por persona, solo para los IDs de la página."""
+        ids = list(dict.fromkeys(personal_ids))
+        if not ids:
+            return {}
+        cursor = get_db_read().cursor()
+        try:
+            placeholders = ', '.join('?' * len(ids))
+            cursor.execute(f"""
+                SELECT id_personal,
+                       SUM(CASE WHEN fecha_vencimiento < ? THEN 1 ELSE 0 END) AS vencidos,
+                       SUM(CASE WHEN fecha_vencimiento >= ? AND fecha_vencimiento <= ? THEN 1 ELSE 0 END) AS por_vencer
+                FROM documentos
+                WHERE activo = 1 AND fecha_vencimiento IS NOT NULL AND id_personal IN ({placeholders})
+                GROUP BY id_personal
+            """, today, today, threshold, *ids)
+            return {row[0]: {'expired': row[1], 'expiring_soon': row[2]} for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def find_document_by_id(self, document_id):
+        """Equivalente de sp_obtener_documento_por_id: (nombre_archivo, archivo, ...)."""
+        cursor = get_db_read().cursor()
+        cursor.execute("""
+            SELECT nombre_archivo, archivo, id_documento, id_personal, id_tipo, id_seccion
+            FROM documentos
+            WHERE id_documento = ? AND activo = 1
+        """, document_id)
+        row = cursor.fetchone()
+        if row and row.archivo is None and self._blob_store:
+            digest = _stored_blob_hash(cursor, document_id)
+            if digest:
+                row.archivo = self._blob_store.read(digest)
+        elif row and row.archivo is not None:
+            row.archivo = compression.decode(row.archivo)
+        return row
+
+    def get_document_metadata(self, document_id):
+        """Nombre, tamaño (length() de un BLOB devuelve bytes; el original si está comprimido) y hash."""
+        cursor = get_db_read().cursor()
+        try:
+            cursor.execute("""
+                SELECT d.nombre_archivo, COALESCE(length(d.archivo), b.tamanio) AS tamanio, d.hash_archivo,
+                       substr(d.archivo, 1, ?) AS cabecera
+                FROM documentos d
+                LEFT JOIN documento_blobs b ON d.archivo IS NULL AND b.hash_archivo = d.hash_archivo
+                WHERE d.id_documento = ? AND d.activo = 1
+            """, compression.HEADER_SIZE, document_id)
+            return _apply_compression_header(map_row(cursor, cursor.fetchone()))
+        finally:
+            cursor.close()
+
+    def iter_document_chunks(self, document_id, chunk_size, start=0, end=None):
+        """Lee el BLOB por tramos con substr(), igual que la versión de SQL Server."""
+        cursor = get_db_read().cursor()
+        try:
+            digest, header = _document_storage(cursor, document_id)
+            if digest and self._blob_store:
+                yield from self._blob_store.iter_range(digest, chunk_size, start, end)
+                return
+            if header:
+                yield from compression.iter_decoded(self._iter_blob_chunks(cursor, document_id, chunk_size),
+                                                    start, end)
+                return
+            offset = start
+            while end is None or offset < end:
+                length = chunk_size if end is None else min(chunk_size, end - offset)
+                cursor.execute("SELECT substr(archivo, ?, ?) FROM documentos WHERE id_documento = ?",
+                               offset + 1, length, document_id)
+                row = cursor.fetchone()
+                chunk = row[0] if row else None
+                if not chunk:
+                    break
+                yield chunk
+                offset += len(chunk)
+        finally:
+            cursor.close()
+
+    def delete_document_by_id(self, document_id):
+        """Equivalente de sp_eliminar_documento_logico."""
+        owner = self.get_document_owner(document_id)
+        conn = get_db_write()
+        conn.cursor().execute("UPDATE documentos SET activo = 0, fecha_eliminacion = GETDATE() WHERE id_documento = ?",
+                              document_id)
+        conn.commit()
+        invalidate_legajo(owner)
+
+    def find_tipos_documento_by_seccion(self, id_seccion):
+        return self.get_tipos_documento_by_seccion(id_seccion)
+
+    def find_documents_by_personal_id(self, personal_id):
+        """Equivalente de sp_listar_documentos_por_personal."""
+        cursor = get_db_read().cursor()
+        cursor.execute(self._DOCUMENTOS_QUERY, personal_id)
+        return map_rows(cursor, cursor.fetchall())
+
+    _DOCUMENTOS_QUERY = """
+        SELECT d.id_documento, d.id_personal, d.id_tipo, t.nombre_tipo, d.id_seccion, s.nombre_seccion,
+               d.nombre_archivo, d.fecha_emision, d.fecha_vencimiento, d.descripcion,
+               d.fecha_subida, d.hash_archivo
+        FROM documentos d
+        LEFT JOIN tipo_documento t ON d.id_tipo = t.id_tipo
+        LEFT JOIN legajo_secciones s ON d.id_seccion = s.id_seccion
+        WHERE d.id_personal = ? AND d.activo = 1
+        ORDER BY d.id_seccion, d.fecha_subida DESC
+    """
+
+    _PERSONAL_QUERY = """
+        SELECT p.id_personal, p.dni, p.nombres, p.apellidos, p.sexo, p.fecha_nacimiento, p.direccion,
+               p.telefono, p.email, p.estado_civil, p.nacionalidad, p.id_unidad,
+               ua.nombre AS unidad_administrativa, p.fecha_ingreso, p.activo, p.fecha_registro
+        FROM personal p
+        LEFT JOIN unidad_administrativa ua ON p.id_unidad = ua.id_unidad
+        WHERE p.id_personal = ?
+    """
+
+    # Mismas columnas que la versión de SQL Server (nombres de sp_obtener_legajo_completo_por_personal).
+    _LEGAJO_PROJECTION_QUERIES = {
+        "personal": _PERSONAL_QUERY,
+        "estudios": "SELECT * FROM estudios WHERE id_personal = ? ORDER BY fecha_inicio DESC",
+        "capacitaciones": "SELECT * FROM capacitaciones WHERE id_personal = ? ORDER BY fecha_inicio DESC",
+        "contratos": """
+            SELECT c.*, tc.nombre_tipo AS tipo_contrato_nombre
+            FROM contratos c LEFT JOIN tipos_contrato tc ON c.id_tipo_contrato = tc.id_tipo_contrato
+            WHERE c.id_personal = ? ORDER BY c.fecha_inicio DESC
+        """,
+        "historial_laboral": """
+            SELECT h.*, ca.nombre_cargo, ua.nombre AS unidad_administrativa_nombre
+            FROM historial_laboral h
+            LEFT JOIN cargos ca ON h.id_cargo = ca.id_cargo
+            LEFT JOIN unidad_administrativa ua ON h.id_unidad = ua.id_unidad
+            WHERE h.id_personal = ? ORDER BY h.fecha_inicio DESC
+        """,
+        "licencias": """
+            SELECT l.*, tl.nombre_tipo AS tipo_licencia
+            FROM licencias l LEFT JOIN tipo_licencia tl ON l.id_tipo_licencia = tl.id_tipo_licencia
+            WHERE l.id_personal = ? ORDER BY l.fecha_inicio DESC
+        """,
+        "documentos": """
+            SELECT d.id_documento, d.id_personal, d.id_tipo, t.nombre_tipo, d.id_seccion, s.nombre_seccion,
+                   d.nombre_archivo, d.fecha_emision, d.fecha_vencimiento, d.descripcion,
+                   d.fecha_subida, d.hash_archivo
+            FROM documentos d
+            LEFT JOIN tipo_documento t ON d.id_tipo = t.id_tipo
+            LEFT JOIN legajo_secciones s ON d.id_seccion = s.id_seccion
+            WHERE d.id_personal = ? AND d.activo = 1 {filtro_seccion}
+            ORDER BY d.id_seccion, d.fecha_subida DESC
+        """,
+    }
+
+    @cached_legajo
+    def get_legajo_projection(self, personal_id, sections, id_seccion=None):
+        """Partes pedidas del legajo, igual que la versión de SQL Server."""
+        unknown = set(sections) - set(self._LEGAJO_PROJECTION_QUERIES)
+        if unknown:
+            raise ValueError(f"Partes del legajo desconocidas: {', '.join(sorted(unknown))}")
+        cursor = get_db_read().cursor()
+        try:
+            legajo = {}
+            for section in sections:
+                query = self._LEGAJO_PROJECTION_QUERIES[section]
+                params = [personal_id]
+                if section == "documentos":
+                    query = query.format(filtro_seccion="AND d.id_seccion = ?" if id_seccion is not None else "")
+                    if id_seccion is not None:
+                        params.append(id_seccion)
+                cursor.execute(query, *params)
+                if section == "personal":
+                    legajo[section] = map_row(cursor, cursor.fetchone())
+                    if not legajo[section]:
+                        return None
+                else:
+                    legajo[section] = map_rows(cursor, cursor.fetchall())
+            return legajo
+        finally:
+            cursor.close()
+
+    @cached_legajo_part('documentos_por_seccion')
+    def count_documents_by_seccion(self, personal_id):
+        cursor = get_db_read().cursor()
+        try:
+            cursor.execute("""
+                SELECT id_seccion, COUNT(*) FROM documentos
+                WHERE id_personal = ? AND activo = 1
+                GROUP BY id_seccion
+            """, personal_id)
+            return {row[0]: row[1] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def get_all_paginated(self, page, per_page, filters):
+        """Equivalente de sp_listar_personal_paginado (filas de la página + total)."""
+        cursor = get_db_read().cursor()
+        dni_filter = filters.get('dni') if filters else None
+        nombres_filter = filters.get('nombres') if filters else None
+
+        where = """
+            WHERE (? IS NULL OR ? = '' OR p.dni LIKE ? || '%')
+              AND (? IS NULL OR ? = '' OR p.nombres LIKE '%' || ? || '%' OR p.apellidos LIKE '%' || ? || '%')
+        """
+        params = (dni_filter, dni_filter, dni_filter,
+                  nombres_filter, nombres_filter, nombres_filter, nombres_filter)
+
+        cursor.execute(f"""
+            SELECT p.id_personal, p.dni, p.nombres, p.apellidos, ua.nombre AS unidad_administrativa, p.activo
+            FROM personal p
+            LEFT JOIN unidad_administrativa ua ON p.id_unidad = ua.id_unidad
+            {where}
+            ORDER BY p.apellidos, p.nombres, p.id_personal
+            LIMIT ? OFFSET ?
+        """, *params, per_page, (page - 1) * per_page)
+        results = map_rows(cursor, cursor.fetchall())
+
+        cursor.execute(f"SELECT COUNT(*) FROM personal p {where}", *params)
+        total = cursor.fetchone()[0]
+        return SimplePagination(results, page, per_page, total)
+
+    def get_personal_keyset(self, per_page, filters=None, key=None, direction='next'):
+        """Igual que la versión de SQL Server; SQLite compara la clave como tupla (row values)."""
+        cursor = get_db_read().cursor()
+        dni_filter = filters.get('dni') if filters else None
+        nombres_filter = filters.get('nombres') if filters else None
+        op, order = ('>', 'ASC') if direction == 'next' else ('<', 'DESC')
+
+        params = [dni_filter, dni_filter, dni_filter,
+                  nombres_filter, nombres_filter, nombres_filter, nombres_filter]
+        seek = ""
+        if key:
+            seek = f"AND (p.apellidos, p.nombres, p.id_personal) {op} (?, ?, ?)"
+            params += list(key)
+        try:
+            cursor.execute(f"""
+                SELECT p.id_personal, p.dni, p.nombres, p.apellidos, ua.nombre AS unidad_administrativa, p.activo
+                FROM personal p
+                LEFT JOIN unidad_administrativa ua ON p.id_unidad = ua.id_unidad
+                WHERE (? IS NULL OR ? = '' OR p.dni LIKE ? || '%')
+                  AND (? IS NULL OR ? = '' OR p.nombres LIKE '%' || ? || '%' OR p.apellidos LIKE '%' || ? || '%')
+                  {seek}
+                ORDER BY p.apellidos {order}, p.nombres {order}, p.id_personal {order}
+                LIMIT ?
+            """, *params, per_page + 1)
+            rows = map_rows(cursor, cursor.fetchall())
+        finally:
+            cursor.close()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction != 'next':
+            rows.reverse()
+        return rows, has_more
+
+    def count_personal(self, filters=None, approximate=False):
+        """SQLite no lleva conteo de filas por tabla: siempre COUNT(*)."""
+        cursor = get_db_read().cursor()
+        dni_filter = filters.get('dni') if filters else None
+        nombres_filter = filters.get('nombres') if filters else None
+        try:
+            cursor.execute("""
+                SELECT COUNT(*) FROM personal p
+                WHERE (? IS NULL OR ? = '' OR p.dni LIKE ? || '%')
+                  AND (? IS NULL OR ? = '' OR p.nombres LIKE '%' || ? || '%' OR p.apellidos LIKE '%' || ? || '%')
+            """, dni_filter, dni_filter, dni_filter, nombres_filter, nombres_filter, nombres_filter, nombres_filter)
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def create(self, form_data):
+        """Equivalente de sp_registrar_personal; devuelve el nuevo id_personal."""
+        conn = get_db_write()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO personal (dni, nombres, apellidos, sexo, fecha_nacimiento, direccion, telefono,
+                                  email, estado_civil, nacionalidad, id_unidad, fecha_ingreso)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, form_data.get('dni'), form_data.get('nombres'), form_data.get('apellidos'), form_data.get('sexo'),
+            form_data.get('fecha_nacimiento'), form_data.get('direccion'), form_data.get('telefono'),
+            form_data.get('email'), form_data.get('estado_civil'), form_data.get('nacionalidad'),
+            form_data.get('id_unidad'), form_data.get('fecha_ingreso'))
+        new_id = cursor.lastrowid
+        conn.commit()
+        return new_id
+
+    def add_document(self, doc_data, file_bytes):
+        """Equivalente de sp_subir_documento (con almacén de blobs: archivo NULL + referencia)."""
+        conn = get_db_write()
+        cursor = conn.cursor()
+        if not self._blob_store:
+            if self._compressor:
+                file_bytes, _ = self._compressor.encode(file_bytes)
+            self._insert_document(cursor, doc_data, file_bytes, doc_data.get('hash_archivo'))
+            conn.commit()
+            invalidate_legajo(doc_data.get('id_personal'))
+            return
+        self._add_document_to_blob_store(conn, cursor, doc_data, lambda: self._blob_store.put(file_bytes))
+
+    def _add_document_to_blob_store(self, conn, cursor, doc_data, store):
+        digest, size = store()
+        try:
+            with self._blob_store.lock(digest):
+                if not self._blob_store.exists(digest):
+                    store()
+                _blob_add_ref(cursor, digest, size)
+                self._insert_document(cursor, doc_data, None, digest)
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        invalidate_legajo(doc_data.get('id_personal'))
+
+    def add_document_stream(self, doc_data, upload):
+        """
+        Igual que la versión de SQL Server; en lugar de .WRITE, la fila se inserta
+        con zeroblob(tamaño) y el binario se escribe por tramos con blobopen.
+        """
+        conn = get_db_write()
+        cursor = conn.cursor()
+        if self._blob_store:
+            return self._add_document_to_blob_store(conn, cursor, doc_data,
+                                                    lambda: self._blob_store.put_stream(upload.iter_chunks()))
+        compressed = self._compressor.encode_blob(upload) if self._compressor else None
+        payload = compressed or upload
+        try:
+            self._insert_document(cursor, doc_data, b'', doc_data.get('hash_archivo'))
+            document_id = cursor.lastrowid
+            cursor.execute("UPDATE documentos SET archivo = zeroblob(?) WHERE id_documento = ?", payload.size, document_id)
+            with conn.raw.blobopen('documentos', 'archivo', document_id) as blob:
+                for chunk in payload.iter_chunks():
+                    blob.write(chunk)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            if compressed:
+                compressed.close()
+        invalidate_legajo(doc_data.get('id_personal'))
+
+    def add_documents_bulk(self, documents):
+        """Igual que la versión de SQL Server: un executemany del INSERT en una transacción."""
+        if not documents:
+            return 0
+        digests = {}
+        if self._blob_store:
+            for doc_data, upload in documents:
+                digests[id(upload)] = self._blob_store.put_stream(upload.iter_chunks())
+        conn = get_db_write()
+        cursor = conn.cursor()
+        try:
+            with self._blob_store.lock(*(d for d, _ in digests.values())) if digests else contextlib.nullcontext():
+                rows = []
+                for doc_data, upload in documents:
+                    if digests:
+                        digest, size = digests[id(upload)]
+                        if not self._blob_store.exists(digest):
+                            self._blob_store.put_stream(upload.iter_chunks())
+                        _blob_add_ref(cursor, digest, size)
+                        archivo = None
+                    else:
+                        digest = doc_data.get('hash_archivo')
+                        archivo = upload.read()
+                        if self._compressor:
+                            archivo = self._compressor.encode(archivo)[0]
+                    rows.append((doc_data.get('id_personal'), doc_data.get('id_tipo'), doc_data.get('id_seccion'),
+                                 doc_data.get('nombre_archivo'), doc_data.get('fecha_emision'),
+                                 doc_data.get('fecha_vencimiento'), doc_data.get('descripcion'), archivo, digest))
+                cursor.executemany("""
+                    INSERT INTO documentos (id_personal, id_tipo, id_seccion, nombre_archivo, fecha_emision,
+                                            fecha_vencimiento, descripcion, archivo, hash_archivo, fecha_subida, activo)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, GETDATE(), 1)
+                """, rows)
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        for personal_id in {doc_data.get('id_personal') for doc_data, _ in documents}:
+            invalidate_legajo(personal_id)
+        return len(documents)
+
+    @staticmethod
+    def _insert_document(cursor, doc_data, file_bytes, digest):
+        cursor.execute("""
+            INSERT INTO documentos (id_personal, id_tipo, id_seccion, nombre_archivo, fecha_emision,
+                                    fecha_vencimiento, descripcion, archivo, hash_archivo, fecha_subida, activo)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, GETDATE(), 1)
+        """, doc_data.get('id_personal'), doc_data.get('id_tipo'), doc_data.get('id_seccion'),
+            doc_data.get('nombre_archivo'), doc_data.get('fecha_emision'), doc_data.get('fecha_vencimiento'),
+            doc_data.get('descripcion'), file_bytes, digest)
+
+    def ensure_blob_store_schema(self):
+        """La tabla documento_blobs ya forma parte de sqlite_backend.SCHEMA."""
+
+    def migrate_documents_to_blob_store(self, batch_size=100, chunk_size=1024 * 1024):
+        """Igual que la versión de SQL Server, leyendo el BLOB por tramos con substr()."""
+        conn = get_db_write()
+        cursor = conn.cursor()
+        moved = {'documentos': 0, 'bytes': 0, 'blobs_nuevos': 0}
+        try:
+            cursor.execute("SELECT id_documento FROM documentos WHERE archivo IS NOT NULL ORDER BY id_documento LIMIT ?",
+                           batch_size)
+            ids = [row[0] for row in cursor.fetchall()]
+            for document_id in ids:
+                chunks = self._iter_blob_chunks(cursor, document_id, chunk_size)
+                if _document_storage(cursor, document_id)[1]:
+                    chunks = compression.iter_decoded(chunks)
+                digest, size = self._blob_store.put_stream(chunks)
+                with self._blob_store.lock(digest):
+                    if _blob_add_ref(cursor, digest, size):
+                        moved['blobs_nuevos'] += 1
+                    cursor.execute("UPDATE documentos SET archivo = NULL, hash_archivo = ? WHERE id_documento = ?",
+                                   digest, document_id)
+                moved['documentos'] += 1
+                moved['bytes'] += size
+            conn.commit()
+            return moved
+        except Exception:
+            conn.rollback()
+            raise
+
+    @staticmethod
+    def _iter_blob_chunks(cursor, document_id, chunk_size):
+        offset = 1
+        while True:
+            row = cursor.execute("SELECT substr(archivo, ?, ?) FROM documentos WHERE id_documento = ?",
+                                 offset, chunk_size, document_id).fetchone()
+            if not row or not row[0]:
+                break
+            yield row[0]
+            offset += len(row[0])
+
+    def recompress_documents(self, after_id=0, batch_size=50):
+        """Igual que la versión de SQL Server (comprime por lotes los binarios sin cabecera)."""
+        compressor = self._compressor or compression.DocumentCompressor()
+        conn = get_db_write()
+        cursor = conn.cursor()
+        result = {'ultimo_id': None, 'revisados': 0, 'comprimidos': 0, 'bytes_ahorrados': 0}
+        try:
+            ids = [row[0] for row in cursor.execute("""
+                SELECT id_documento FROM documentos
+                WHERE id_documento > ? AND archivo IS NOT NULL AND substr(archivo, 1, 4) <> ?
+                ORDER BY id_documento LIMIT ?
+            """, after_id, compression.MAGIC, batch_size).fetchall()]
+            for document_id in ids:
+                row = cursor.execute("SELECT archivo FROM documentos WHERE id_documento = ?", document_id).fetchone()
+                result['ultimo_id'] = document_id
+                result['revisados'] += 1
+                if not row or row[0] is None:
+                    continue
+                stored, compressed = compressor.encode(row[0])
+                if not compressed:
+                    continue
+                cursor.execute("UPDATE documentos SET archivo = ? WHERE id_documento = ? AND length(archivo) = ?",
+                               stored, document_id, len(row[0]))
+                if cursor.rowcount:
+                    result['comprimidos'] += 1
+                    result['bytes_ahorrados'] += len(row[0]) - len(stored)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+
+    def get_compression_stats(self):
+        """SQLite no convierte BLOB a entero: el tamaño original se suma leyendo las cabeceras."""
+        cursor = get_db_read().cursor()
+        try:
+            documentos, bytes_almacenados = cursor.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length(archivo)), 0) FROM documentos WHERE archivo IS NOT NULL"
+            ).fetchone()
+            comprimidos = 0
+            bytes_originales = bytes_almacenados
+            for stored_size, prefix in cursor.execute("""
+                SELECT length(archivo), substr(archivo, 1, ?) FROM documentos
+                WHERE archivo IS NOT NULL AND substr(archivo, 1, 4) = ?
+            """, compression.HEADER_SIZE, compression.MAGIC).fetchall():
+                comprimidos += 1
+                bytes_originales += compression.parse_header(prefix)[1] - stored_size
+            return {'documentos': documentos, 'comprimidos': comprimidos,
+                    'bytes_almacenados': bytes_almacenados, 'bytes_originales': bytes_originales}
+        finally:
+            cursor.close()
+
+    @cached_catalog(catalog_cache.UNIDADES)
+    def get_unidades_for_select(self):
+        cursor = get_db_read().cursor()
+        cursor.execute("SELECT id_unidad, nombre FROM unidad_administrativa ORDER BY nombre")
+        return [(row.id_unidad, row.nombre) for row in cursor.fetchall()]
+
+    @cached_catalog(catalog_cache.SECCIONES)
+    def get_secciones_for_select(self):
+        cursor = get_db_read().cursor()
+        cursor.execute("SELECT id_seccion, nombre_seccion FROM legajo_secciones ORDER BY id_seccion")
+        return [(row.id_seccion, row.nombre_seccion) for row in cursor.fetchall()]
+
+    @cached_catalog(catalog_cache.TIPOS_DOCUMENTO_SECCION)
+    def get_tipos_documento_by_seccion(self, id_seccion):
+        """Equivalente de sp_listar_tipos_documento_por_seccion, en formato JSON."""
+        cursor = get_db_read().cursor()
+        cursor.execute("SELECT id_tipo, nombre_tipo FROM tipo_documento WHERE id_seccion = ? ORDER BY nombre_tipo",
+                       id_seccion)
+        return [{"id": row.id_tipo, "nombre": row.nombre_tipo} for row in cursor.fetchall()]
+
+    @cached_catalog(catalog_cache.TIPOS_DOCUMENTO)
+    def get_tipos_documento_for_select(self):
+        cursor = get_db_read().cursor()
+        cursor.execute("SELECT id_tipo, nombre_tipo FROM tipo_documento ORDER BY nombre_tipo")
+        return [(row.id_tipo, row.nombre_tipo) for row in cursor.fetchall()]
+
+    def update(self, personal_id, form_data):
+        """Equivalente de sp_actualizar_personal."""
+        conn = get_db_write()
+        conn.cursor().execute("""
+            UPDATE personal
+            SET dni = ?, nombres = ?, apellidos = ?, sexo = ?, fecha_nacimiento = ?, direccion = ?,
+                telefono = ?, email = ?, estado_civil = ?, nacionalidad = ?, id_unidad = ?, fecha_ingreso = ?
+            WHERE id_personal = ?
+        """, form_data.get('dni'), form_data.get('nombres'), form_data.get('apellidos'), form_data.get('sexo'),
+            form_data.get('fecha_nacimiento'), form_data.get('direccion'), form_data.get('telefono'),
+            form_data.get('email'), form_data.get('estado_civil'), form_data.get('nacionalidad'),
+            form_data.get('id_unidad'), form_data.get('fecha_ingreso'), personal_id)
+        conn.commit()
+        invalidate_legajo(personal_id)
+
+    def get_all_for_report(self):
+        """Equivalente de sp_generar_reporte_general_personal (último cargo y último contrato)."""
+        cursor = get_db_read().cursor()
+        cursor.execute("""
+            SELECT p.dni, p.apellidos, p.nombres, p.sexo, p.fecha_nacimiento, p.email, p.telefono,
+                   ua.nombre AS nombre_unidad, p.fecha_ingreso, p.activo,
+                   ca.nombre_cargo AS cargo, tc.nombre_tipo AS tipo_contrato,
+                   c.modalidad, c.sueldo, c.resolucion
+            FROM personal p
+            LEFT JOIN unidad_administrativa ua ON p.id_unidad = ua.id_unidad
+            LEFT JOIN historial_laboral h ON h.id_historial = (
+                SELECT h2.id_historial FROM historial_laboral h2
+                WHERE h2.id_personal = p.id_personal
+                ORDER BY h2.fecha_inicio DESC, h2.id_historial DESC LIMIT 1)
+            LEFT JOIN cargos ca ON h.id_cargo = ca.id_cargo
+            LEFT JOIN contratos c ON c.id_contrato = (
+                SELECT c2.id_contrato FROM contratos c2
+                WHERE c2.id_personal = p.id_personal
+                ORDER BY c2.fecha_inicio DESC, c2.id_contrato DESC LIMIT 1)
+            LEFT JOIN tipos_contrato tc ON c.id_tipo_contrato = tc.id_tipo_contrato
+            ORDER BY p.apellidos, p.nombres
+        """)
+        return map_rows(cursor, cursor.fetchall())
+
+    def delete_by_id(self, personal_id):
+        """Equivalente de sp_eliminar_personal (borrado suave)."""
+        conn = get_db_write()
+        conn.cursor().execute("UPDATE personal SET activo = 0 WHERE id_personal = ?", personal_id)
+        conn.commit()
+        invalidate_legajo(personal_id)
+
+    def activate_by_id(self, personal_id):
+        """Equivalente de sp_reactivar_personal."""
+        conn = get_db_write()
+        conn.cursor().execute("UPDATE personal SET activo = 1 WHERE id_personal = ?", personal_id)
+        conn.commit()
+        invalidate_legajo(personal_id)
+
+    def find_by_id(self, personal_id):
+        """Equivalente de sp_obtener_personal_por_id."""
+        cursor = get_db_read().cursor()
+        try:
+            cursor.execute(self._PERSONAL_QUERY, personal_id)
+            row = map_row(cursor, cursor.fetchone())
+            return Personal.from_dict(row) if row else None
+        except Exception as e:
+            logger.error(f"Error al buscar Personal ID {personal_id}: {e}", exc_info=True)
+            return None
+        finally:
+            cursor.close()
+
+    def count_empleados_por_unidad(self):
+        cursor = get_db_read().cursor()
+        cursor.execute("""
+            SELECT ua.nombre AS nombre_unidad, COUNT(p.id_personal) AS cantidad
+            FROM unidad_administrativa ua
+            LEFT JOIN personal p ON ua.id_unidad = p.id_unidad AND p.activo = 1
+            GROUP BY ua.nombre, ua.id_unidad
+            ORDER BY cantidad DESC
+        """)
+        return [_row_to_dict(cursor, row) for row in cursor.fetchall()]
+
+    def count_empleados_por_estado(self):
+        cursor = get_db_read().cursor()
+        cursor.execute("""
+            SELECT CASE WHEN activo = 1 THEN 'Activos' ELSE 'Inactivos' END AS estado,
+                   COUNT(id_personal) AS cantidad
+            FROM personal
+            GROUP BY activo
+        """)
+        return [_row_to_dict(cursor, row) for row in cursor.fetchall()]
+
+    def count_empleados_por_sexo(self):
+        cursor = get_db_read().cursor()
+        cursor.execute("""
+            SELECT CASE WHEN sexo = 'M' THEN 'Masculino' WHEN sexo = 'F' THEN 'Femenino' ELSE 'No especificado' END AS sexo,
+                   COUNT(id_personal) AS cantidad
+            FROM personal
+            GROUP BY sexo
+        """)
+        return [_row_to_dict(cursor, row) for row in cursor.fetchall()]
+
+    def get_deleted_documents(self):
+        """Equivalente de sp_listar_documentos_eliminados (claves en minúsculas)."""
+        cursor = get_db_write().cursor()
+        cursor.execute("""
+            SELECT d.id_documento, d.id_personal, d.id_tipo, d.nombre_archivo, d.descripcion,
+                   d.fecha_eliminacion,
+                   p.apellidos || ', ' || p.nombres AS nombre_personal, p.dni,
+                   t.nombre_tipo AS tipo_documento
+            FROM documentos d
+            LEFT JOIN personal p ON d.id_personal = p.id_personal
+            LEFT JOIN tipo_documento t ON d.id_tipo = t.id_tipo
+            WHERE d.activo = 0
+            ORDER BY d.fecha_eliminacion DESC
+        """)
+        return [_row_to_dict(cursor, row) for row in cursor.fetchall()]
+
+    def recover_document(self, document_id):
+        """Equivalente de sp_recuperar_documento."""
+        owner = self.get_document_owner(document_id)
+        conn = get_db_write()
+        conn.cursor().execute("UPDATE documentos SET activo = 1, fecha_eliminacion = NULL WHERE id_documento = ?",
+                              document_id)
+        conn.commit()
+        invalidate_legajo(owner)
+
+    def permanently_delete_document(self, document_id):
+        """Equivalente de sp_eliminar_documento_permanente (libera la referencia al blob)."""
+        owner = self.get_document_owner(document_id)
+        conn = get_db_write()
+        cursor = conn.cursor()
+        digest = _stored_blob_hash(cursor, document_id) if self._blob_store else None
+        if not digest:
+            cursor.execute("DELETE FROM documentos WHERE id_documento = ?", document_id)
+            conn.commit()
+            invalidate_legajo(owner)
+            return
+        with self._blob_store.lock(digest):
+            cursor.execute("DELETE FROM documentos WHERE id_documento = ?", document_id)
+            released = _blob_release_ref(cursor, digest)
+            conn.commit()
+            if released:
+                _delete_unreferenced_blob(self._blob_store, cursor, digest)
+        invalidate_legajo(owner)
+
+
+class SqliteAuditoriaRepository(IAuditoriaRepository):
+
+    def log_event(self, id_usuario, modulo, accion, descripcion, detalle_json=None):
+        """Equivalente de sp_registrar_bitacora."""
+        conn = get_db_write()
+        conn.cursor().execute("""
+            INSERT INTO bitacora (id_usuario, fecha_hora, modulo, accion, descripcion, detalle_json)
+            VALUES (?, GETDATE(), ?, ?, ?, ?)
+        """, id_usuario, modulo, accion, descripcion, detalle_json)
+        conn.commit()
+
+    def get_all_logs_paginated(self, page, per_page):
+        """Equivalente de sp_listar_bitacora_paginada."""
+        cursor = get_db_read().cursor()
+        cursor.execute("""
+            SELECT b.id_bitacora, b.id_usuario, u.username, b.fecha_hora, b.modulo, b.accion,
+                   b.descripcion, b.detalle_json
+            FROM bitacora b
+            LEFT JOIN usuarios u ON b.id_usuario = u.id_usuario
+            ORDER BY b.fecha_hora DESC, b.id_bitacora DESC
+            LIMIT ? OFFSET ?
+        """, per_page, (page - 1) * per_page)
+        results = map_rows(cursor, cursor.fetchall())
+        cursor.execute("SELECT COUNT(*) FROM bitacora")
+        total = cursor.fetchone()[0]
+        return SimplePagination(results, page, per_page, total)
+
+
+class SqliteBackupRepository:
+
+    def run_db_backup(self, db_name, file_path):
+        """Copia la base SQLite completa con la API de backup de sqlite3."""
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        source = sqlite_backend.connect(current_app.config['SQLITE_DATABASE'])
+        target = sqlite3.connect(file_path)
+        try:
+            source.raw.backup(target)
+            return True
+        finally:
+            target.close()
+            source.close()
+
+    def get_backup_history(self):
+        cursor = get_db_read().cursor()
+        cursor.execute("""
+            SELECT fecha_hora AS fecha_registro, modulo, descripcion, 'FULL' AS Tipo, '-' AS Tamanio, 'Éxito' AS Estado
+            FROM bitacora WHERE accion IN ('BACKUP', 'COPIA_SEGURIDAD') ORDER BY fecha_hora DESC LIMIT 5
+        """)
+        return [_row_to_dict(cursor, row) for row in cursor.fetchall()]
+
+    def registrar_error(self, modulo, descripcion, usuario_id=None):
+        conn = None
+        try:
+            conn = get_db_write()
+            conn.cursor().execute(
+                "INSERT INTO bitacora (fecha_hora, accion, modulo, descripcion, id_usuario) VALUES (GETDATE(), ?, ?, ?, ?)",
+                'ERROR', modulo, descripcion, usuario_id
+            )
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Fallo al registrar error en la bitácora: {e}")
+            if conn:
+                conn.rollback()
+
+    def obtener_historial_errores(self):
+        cursor = get_db_read().cursor()
+        cursor.execute("""
+            SELECT b.fecha_hora, b.modulo, b.descripcion, u.username AS usuario
+            FROM bitacora b LEFT JOIN usuarios u ON b.id_usuario = u.id_usuario
+            WHERE b.accion = 'ERROR' ORDER BY b.fecha_hora DESC LIMIT 50
+        """)
+        return [_row_to_dict(cursor, row) for row in cursor.fetchall()]
+
+    def solicitar_eliminacion_documento(self, documento_id, solicitante_id):
+        """Borrado suave: marca el documento y crea la solicitud en una transacción."""
+        conn = get_db_write()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT id_legajo, nombre_archivo, ruta_archivo, id_personal FROM documentos WHERE id_documento = ?",
+                           documento_id)
+            doc_row = cursor.fetchone()
+            if not doc_row:
+                raise Exception(f"No se encontró el documento con ID {documento_id}.")
+            id_legajo, nombre_archivo, ruta_archivo, id_personal = doc_row
+            cursor.execute("UPDATE documentos SET estado = 'PENDIENTE_ELIMINACION' WHERE id_documento = ?", documento_id)
+            cursor.execute("""
+                INSERT INTO solicitudes_eliminacion
+                (id_documento, nombre_documento, ruta_archivo, id_legajo, solicitado_por_id, estado)
+                VALUES (?, ?, ?, ?, ?, 'PENDIENTE')
+            """, documento_id, nombre_archivo, ruta_archivo, id_legajo, solicitante_id)
+            conn.commit()
+            invalidate_legajo(id_personal)
+            return True
+        except Exception as e:
+            logger.error(f"Fallo en solicitud de eliminación: {e}")
+            conn.rollback()
+            return False
+
+
+# --- REPOSITORIO DE SOLICITUDES DE MODIFICACIÓN ---
+
+class SqliteSolicitudRepository:
+
+    def __init__(self, blob_store=None, compressor=None):
+        self._blob_store = blob_store
+        self._compressor = compressor
+
+    def obtener_id_personal_por_documento(self, id_documento):
+        cursor = get_db_read().cursor()
+        try:
+            cursor.execute("SELECT id_personal FROM documentos WHERE id_documento = ?", id_documento)
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
+
+    def creating_solicitud(self, data):
+        return self.crear_solicitud(data)
+
+    def crear_solicitud(self, data):
+        conn = get_db_write()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO solicitudes_modificacion
+                (id_personal, id_usuario_solicitante, fecha_solicitud, campo_modificado, valor_anterior, valor_nuevo, estado)
+                VALUES (?, ?, GETDATE(), ?, ?, ?, 'pendiente')
+            """, data['id_personal'], data['id_usuario_solicitante'], data['campo_modificado'],
+                data['valor_anterior'], data['valor_nuevo'])
+            conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error BD creando solicitud: {e}")
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def get_pending_requests(self):
+        cursor = get_db_read().cursor()
+        try:
+            cursor.execute("""
+                SELECT s.id_solicitud, s.fecha_solicitud,
+                       s.valor_anterior AS motivo, s.valor_nuevo AS ruta_nuevo_archivo,
+                       u.username, p.nombres, p.apellidos, d.nombre_archivo AS nombre_doc_original
+                FROM solicitudes_modificacion s
+                JOIN usuarios u ON s.id_usuario_solicitante = u.id_usuario
+                LEFT JOIN personal p ON u.id_personal = p.id_personal
+                LEFT JOIN documentos d ON CAST(TRIM(REPLACE(s.campo_modificado, 'Documento ID:', '')) AS INTEGER) = d.id_documento
+                WHERE s.estado = 'pendiente' AND s.valor_nuevo LIKE 'uploads/%'
+                ORDER BY s.fecha_solicitud DESC
+            """)
+            return [_row_to_dict(cursor, row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def process_request(self, request_id, action):
+        """Aprueba (reemplazando el archivo del documento) o rechaza una solicitud."""
+        conn = get_db_write()
+        cursor = conn.cursor()
+        released = None
+        owner = None
+        try:
+            if action == 'rechazar':
+                cursor.execute("UPDATE solicitudes_modificacion SET estado = 'rechazada', fecha_revision = GETDATE() WHERE id_solicitud = ?",
+                               request_id)
+            elif action == 'aprobar':
+                cursor.execute("SELECT campo_modificado, valor_nuevo FROM solicitudes_modificacion WHERE id_solicitud = ?",
+                               request_id)
+                solicitud = cursor.fetchone()
+                if not solicitud:
+                    raise Exception("Solicitud no encontrada")
+                id_doc_str, nueva_ruta = solicitud
+                id_doc = int(str(id_doc_str).replace("Documento ID:", "").strip())
+                owner = self.obtener_id_personal_por_documento(id_doc)
+
+                nuevo_nombre = nueva_ruta.replace('\\', '/').split('/')[-1]
+                ruta_fisica = os.path.join(current_app.root_path, 'presentation/static', nueva_ruta)
+                if not os.path.exists(ruta_fisica):
+                    raise FileNotFoundError(f"El archivo temporal no se encuentra en: {ruta_fisica}")
+                if self._blob_store:
+                    released = self._replace_document_blob(cursor, id_doc, ruta_fisica, nuevo_nombre)
+                else:
+                    with open(ruta_fisica, 'rb') as f:
+                        file_bytes = f.read()
+                    if self._compressor:
+                        file_bytes, _ = self._compressor.encode(file_bytes)
+                    cursor.execute("UPDATE documentos SET archivo = ?, nombre_archivo = ?, fecha_subida = GETDATE() WHERE id_documento = ?",
+                                   file_bytes, nuevo_nombre, id_doc)
+                cursor.execute("UPDATE solicitudes_modificacion SET estado = 'aprobada', fecha_revision = GETDATE() WHERE id_solicitud = ?",
+                               request_id)
+            conn.commit()
+            if action == 'aprobar':
+                invalidate_legajo(owner)
+            if released:
+                with self._blob_store.lock(released):
+                    _delete_unreferenced_blob(self._blob_store, cursor, released)
+            return True
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error procesando solicitud {request_id}: {e}")
+            return False
+        finally:
+            cursor.close()
+
+    def _replace_document_blob(self, cursor, id_doc, ruta_fisica, nuevo_nombre):
+        """Como en SQL Server: apunta el documento al nuevo hash y devuelve el anterior si quedó libre."""
+        with open(ruta_fisica, 'rb') as f:
+            digest, size = self._blob_store.put_stream(iter(lambda: f.read(1024 * 1024), b''))
+        previous = _stored_blob_hash(cursor, id_doc)
+        with self._blob_store.lock(digest):
+            if not self._blob_store.exists(digest):
+                with open(ruta_fisica, 'rb') as f:
+                    self._blob_store.put_stream(iter(lambda: f.read(1024 * 1024), b''))
+            _blob_add_ref(cursor, digest, size)
+        cursor.execute("""
+            UPDATE documentos SET archivo = NULL, hash_archivo = ?, nombre_archivo = ?, fecha_subida = GETDATE()
+            WHERE id_documento = ?
+        """, digest, nuevo_nombre, id_doc)
+        if previous and _blob_release_ref(cursor, previous):
+            return previous
+        return None
+
+    def get_by_id(self, request_id):
+        cursor = get_db_read().cursor()
+        try:
+            cursor.execute("SELECT *, valor_nuevo AS ruta_nuevo_archivo FROM solicitudes_modificacion WHERE id_solicitud = ?",
+                           request_id)
+            return _row_to_dict(cursor, cursor.fetchone())
+        finally:
+            cursor.close()
+
+    def crear_solicitud_modificacion(self, data):
+        """Equivalente de sp_solicitar_modificacion_personal."""
+        conn = get_db_write()
+        cursor = conn.cursor()
+        try:
+            if not data.get('id_personal'):
+                cursor.execute("SELECT id_personal FROM documentos WHERE id_documento = ?",
+                               int(data['campo_modificado'].split(': ')[1]))
+                row = cursor.fetchone()
+                if row:
+                    data['id_personal'] = row[0]
+            cursor.execute("""
+                INSERT INTO solicitudes_modificacion
+                (id_personal, id_usuario_solicitante, fecha_solicitud, campo_modificado, valor_anterior, valor_nuevo, estado)
+                VALUES (?, ?, GETDATE(), ?, ?, ?, 'pendiente')
+            """, data['id_personal'], data['id_usuario_solicitante'], data['campo_modificado'],
+                data['valor_anterior'], data['valor_nuevo'])
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
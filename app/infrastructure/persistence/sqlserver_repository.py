@@ -1,24 +1,166 @@
 # RUTA: app/infrastructure/persistence/sqlserver_repository.py
 
+import contextlib
+import itertools
 import logging
-from app.database.connector import get_db_read, get_db_write
+import time
+import uuid
+from datetime import datetime
+import pyodbc
+from app.database.connector import get_db_read, get_db_write, get_db_admin
+from app.database.batch_lookup import BatchLookup, enrich
+from app.database.row_mapper import map_row, map_rows
 from app.domain.models.usuario import Usuario
 from app.domain.models.personal import Personal
 from app.domain.repositories.i_usuario_repository import IUsuarioRepository
 from app.domain.repositories.i_personal_repository import IPersonalRepository
 from app.domain.repositories.i_auditoria_repository import IAuditoriaRepository
+from app.infrastructure.persistence import catalog_cache
+from app.infrastructure.persistence.catalog_cache import cached_catalog
+from app.infrastructure.persistence.legajo_cache import cached_legajo, cached_legajo_part, invalidate_legajo
+from app.infrastructure.persistence.user_cache import USER_CACHE
+from app.infrastructure.storage import compression
 from app.utils.pagination import SimplePagination
 
 logger = logging.getLogger(__name__)
 
 def _row_to_dict(cursor, row):
-    # Función de utilidad para convertir una fila del cursor a un diccionario
+    # Función de utilidad para convertir una fila del cursor a un diccionario.
+    # Para listados usar map_rows (app/database/row_mapper.py), que arma las columnas una vez.
     if not row:
         return None
     if not cursor.description:
         return None
     return dict(zip([column[0] for column in cursor.description], row))
 
+
+# Tablas de búsqueda para completar filas por lotes (app/database/batch_lookup.py).
+# El catálogo de tipos de documento casi no cambia y se conserva unos minutos.
+_PERSONAL_LOOKUP = BatchLookup('personal', 'id_personal', ('nombres', 'apellidos', 'dni'))
+_PERSONAL_POR_DNI = BatchLookup('personal', 'dni', ('id_personal', 'activo'))
+_TIPO_DOCUMENTO_LOOKUP = BatchLookup('tipo_documento', 'id_tipo', ('nombre_tipo',), cache_ttl=300)
+_USUARIO_POR_USERNAME = BatchLookup('usuarios', 'username', ('id_usuario',))
+_USUARIO_POR_EMAIL = BatchLookup('usuarios', 'email', ('id_usuario',))
+
+# --- ALTAS MASIVAS (register_personal_bulk) ---
+# SQLSTATE de errores pasajeros (interbloqueo, tiempo de espera) con los que se
+# repite el tramo completo, y cuántas veces.
+_SQLSTATE_REINTENTABLES = {'40001', 'HYT00', 'HYT01'}
+BULK_REGISTER_RETRIES = 2
+
+
+def _reintentable(error):
+    return bool(error.args) and error.args[0] in _SQLSTATE_REINTENTABLES
+
+
+def _deshacer_hasta_savepoint(cursor):
+    """
+    Vuelve al savepoint 'alta_masiva' si la transacción sigue activa. Devuelve
+    False si quedó condenada (XACT_STATE() = -1) o ya no existe (el SP hizo
+    ROLLBACK): en esos casos ROLLBACK TRANSACTION alta_masiva fallaría.
+    """
+    try:
+        cursor.execute("SELECT XACT_STATE(), @@TRANCOUNT")
+        estado, abiertas = cursor.fetchone()
+        if estado != 1 or abiertas == 0:
+            return False
+        cursor.execute("ROLLBACK TRANSACTION alta_masiva")
+        return True
+    except pyodbc.Error as e:
+        logger.warning(f"No se pudo volver al savepoint de la fila: {e}")
+        return False
+
+
+def _personal_params(form_data):
+    """Parámetros de sp_registrar_personal en el orden del procedimiento."""
+    return (form_data.get('dni'), form_data.get('nombres'), form_data.get('apellidos'), form_data.get('sexo'),
+            form_data.get('fecha_nacimiento'), form_data.get('direccion'), form_data.get('telefono'),
+            form_data.get('email'), form_data.get('estado_civil'), form_data.get('nacionalidad'),
+            form_data.get('id_unidad'), form_data.get('fecha_ingreso'))
+
+
+# --- ALMACÉN DE BLOBS (BLOB_STORE_ENABLED) ---
+# Con el almacén activo, documentos.archivo queda en NULL y hash_archivo apunta al
+# archivo en disco (app/infrastructure/storage/blob_store.py); documento_blobs
+# lleva cuántos documentos usan cada hash para borrar el archivo con el último.
+
+BLOB_STORE_DDL = (
+    """
+    IF OBJECT_ID('dbo.documento_blobs', 'U') IS NULL
+        CREATE TABLE dbo.documento_blobs (
+            hash_archivo CHAR(64) NOT NULL PRIMARY KEY,
+            tamanio BIGINT NOT NULL,
+            referencias INT NOT NULL,
+            fecha_creacion DATETIME NOT NULL DEFAULT GETDATE()
+        )
+    """,
+    # Los documentos movidos al almacén conservan la fila pero no el binario.
+    "ALTER TABLE documentos ALTER COLUMN archivo VARBINARY(MAX) NULL",
+)
+
+
+# Tramo de cada UPDATE .WRITE al guardar un documento por partes; múltiplo de
+# 8040 bytes, el tamaño que SQL Server recomienda para .WRITE.
+_WRITE_CHUNK_SIZE = 8040 * 128
+
+
+def _blob_add_ref(cursor, digest, size):
+    """Suma una referencia al blob (creando su fila si es nuevo). Devuelve True si era nuevo."""
+    cursor.execute(
+        "UPDATE documento_blobs WITH (UPDLOCK, HOLDLOCK) SET referencias = referencias + 1 WHERE hash_archivo = ?",
+        digest
+    )
+    if cursor.rowcount:
+        return False
+    cursor.execute("INSERT INTO documento_blobs (hash_archivo, tamanio, referencias) VALUES (?, ?, 1)", digest, size)
+    return True
+
+
+def _blob_release_ref(cursor, digest):
+    """Resta una referencia; si queda en cero borra la fila y devuelve True."""
+    cursor.execute("UPDATE documento_blobs SET referencias = referencias - 1 WHERE hash_archivo = ?", digest)
+    cursor.execute("DELETE FROM documento_blobs WHERE hash_archivo = ? AND referencias <= 0", digest)
+    return cursor.rowcount > 0
+
+
+def _stored_blob_hash(cursor, document_id):
+    """Hash del blob de un documento guardado en el almacén, o None si su binario sigue en la BD."""
+    cursor.execute("SELECT hash_archivo FROM documentos WHERE id_documento = ? AND archivo IS NULL", document_id)
+    row = cursor.fetchone()
+    return row[0].strip() if row and row[0] else None
+
+
+def _document_storage(cursor, document_id):
+    """
+    Dónde está el binario de un documento, en una sola consulta: devuelve
+    (hash si está en el almacén de blobs, cabecera de compresión o None).
+    """
+    cursor.execute("""
+        SELECT CASE WHEN archivo IS NULL THEN hash_archivo END, SUBSTRING(archivo, 1, ?)
+        FROM documentos WHERE id_documento = ?
+    """, compression.HEADER_SIZE, document_id)
+    row = cursor.fetchone()
+    if not row:
+        return None, None
+    return (row[0].strip() if row[0] else None), compression.parse_header(row[1])
+
+
+def _apply_compression_header(metadata):
+    # El tamaño que ve el cliente es el original, no el comprimido que mide DATALENGTH.
+    if metadata:
+        header = compression.parse_header(metadata.cabecera)
+        if header:
+            metadata.tamanio = header[1]
+    return metadata
+
+
+def _delete_unreferenced_blob(blob_store, cursor, digest):
+    """Tras el commit, borra el archivo si ningún documento volvió a referenciarlo."""
+    cursor.execute("SELECT 1 FROM documento_blobs WHERE hash_archivo = ?", digest)
+    if cursor.fetchone() is None:
+        blob_store.delete(digest)
+
+
 class SqlServerUsuarioRepository(IUsuarioRepository):
     
     # -------------------------------------------------------------
@@ -86,7 +228,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
                 u.username
             """
             cursor.execute(query)
-            results = [_row_to_dict(cursor, row) for row in cursor.fetchall()]
+            results = map_rows(cursor, cursor.fetchall())
             
             # --- CORRECCIÓN: Construcción manual y segura de objetos ---
             # Esto previene errores si el SP no devuelve todas las columnas esperadas.
@@ -143,8 +285,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
             row = cursor.fetchone()
             
             if row:
-                row_dict = _row_to_dict(cursor, row)
-                return Usuario(**row_dict) if row_dict else None
+                return Usuario.from_dict(map_row(cursor, row))
             
             return None
         except Exception as e:
@@ -173,9 +314,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
                     row = cursor.fetchone()
                     
                     if row:
-                        row_dict = _row_to_dict(cursor, row)
-                        
-                        return Usuario(**row_dict) if row_dict else None
+                        return Usuario.from_dict(map_row(cursor, row))
                     return None
                 except Exception as e2:
                     logger.error(f"Fallback también falló para user_id {user_id}: {e2}")
@@ -210,8 +349,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
             row = cursor.fetchone()
             
             if row:
-                row_dict = _row_to_dict(cursor, row)
-                return Usuario(**row_dict) if row_dict else None
+                return Usuario.from_dict(map_row(cursor, row))
             
             return None
             
@@ -241,8 +379,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
                     row = cursor.fetchone()
                     
                     if row:
-                        row_dict = _row_to_dict(cursor, row)
-                        return Usuario(**row_dict) if row_dict else None
+                        return Usuario.from_dict(map_row(cursor, row))
                     return None
                     
                 except Exception as e2:
@@ -273,8 +410,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
             WHERE u.username = ?
             """
             cursor.execute(query, username)
-            row_dict = _row_to_dict(cursor, cursor.fetchone())
-            return Usuario(**row_dict) if row_dict else None
+            return Usuario.from_dict(map_row(cursor, cursor.fetchone()))
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
@@ -297,8 +433,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
                     WHERE u.username = ?
                     """
                     cursor.execute(query_fallback, username)
-                    row_dict = _row_to_dict(cursor, cursor.fetchone())
-                    return Usuario(**row_dict) if row_dict else None
+                    return Usuario.from_dict(map_row(cursor, cursor.fetchone()))
                 except Exception as e2:
                     logger.error(f"Fallback falló para {username}: {e2}")
                     return None
@@ -327,8 +462,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
             WHERE u.email = ?
             """
             cursor.execute(query, email)
-            row_dict = _row_to_dict(cursor, cursor.fetchone())
-            return Usuario(**row_dict) if row_dict else None
+            return Usuario.from_dict(map_row(cursor, cursor.fetchone()))
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
@@ -351,8 +485,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
                     WHERE u.email = ?
                     """
                     cursor.execute(query_fallback, email)
-                    row_dict = _row_to_dict(cursor, cursor.fetchone())
-                    return Usuario(**row_dict) if row_dict else None
+                    return Usuario.from_dict(map_row(cursor, cursor.fetchone()))
                 except Exception as e2:
                     logger.error(f"Fallback falló para {email}: {e2}")
                     return None
@@ -366,6 +499,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
         query = "UPDATE usuarios SET two_factor_code = ?, two_factor_expiry = ? WHERE id_usuario = ?"
         cursor.execute(query, hashed_code, expiry_date, user_id)
         conn.commit()
+        USER_CACHE.bump(user_id)
 
     def clear_2fa_code(self, user_id):
         conn = get_db_write()
@@ -373,13 +507,15 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
         query = "UPDATE usuarios SET two_factor_code = NULL, two_factor_expiry = NULL WHERE id_usuario = ?"
         cursor.execute(query, user_id)
         conn.commit()
+        USER_CACHE.bump(user_id)
 
     def update_password_hash(self, username, new_hash):
         conn = get_db_write()
         cursor = conn.cursor()
         query = "UPDATE usuarios SET password_hash = ? WHERE username = ?"
         cursor.execute(query, new_hash, username)
-        conn.commit()     
+        conn.commit()
+        USER_CACHE.bump_username(username)
 
     def update_user_password(self, user_id, new_hash):
         """Actualiza la contraseña de un usuario por su ID."""
@@ -391,6 +527,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
         if cursor.rowcount == 0:
             raise ValueError("Usuario no encontrado.")
         conn.commit()
+        USER_CACHE.bump(user_id)
 
     def update_last_login(self, user_id):
         """Llama a un SP para actualizar la fecha del último login."""
@@ -398,6 +535,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
         cursor = conn.cursor()
         cursor.execute("{CALL sp_actualizar_ultimo_login(?)}", user_id)
         conn.commit()
+        USER_CACHE.bump(user_id)
 
     def deactivate_user(self, user_id):
         """Desactiva un usuario por su ID."""
@@ -408,6 +546,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
         if cursor.rowcount == 0:
             raise ValueError("Usuario no encontrado.")
         conn.commit()
+        USER_CACHE.bump(user_id)
 
     def activate_user(self, user_id):
         """Activa un usuario por su ID."""
@@ -418,6 +557,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
         if cursor.rowcount == 0:
             raise ValueError("Usuario no encontrado.")
         conn.commit()
+        USER_CACHE.bump(user_id)
 
     def update_user_role(self, user_id, new_role_id):
         """Actualiza el rol de un usuario."""
@@ -425,6 +565,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
         cursor = conn.cursor()
         cursor.execute("{CALL sp_actualizar_rol_usuario(?, ?)}", user_id, new_role_id)
         conn.commit()
+        USER_CACHE.bump(user_id)
 
     def update_username(self, user_id, new_username):
         """Actualiza el nombre de usuario."""
@@ -439,6 +580,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
         # Actualizar directamente en la tabla usuarios
         cursor.execute("UPDATE usuarios SET username = ? WHERE id_usuario = ?", new_username, user_id)
         conn.commit()
+        USER_CACHE.bump(user_id)
 
     def update_email(self, user_id, new_email):
         """Actualiza el correo electrónico de un usuario."""
@@ -453,6 +595,7 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
         # Actualizar directamente en la tabla usuarios
         cursor.execute("UPDATE usuarios SET email = ? WHERE id_usuario = ?", new_email, user_id)
         conn.commit()
+        USER_CACHE.bump(user_id)
 
     def create_user(self, username, email, password_hash, id_rol, activo=True, fecha_creacion=None, id_personal=None):
         """
@@ -522,15 +665,8 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
         ]
         
         try:
-            # Intenta obtener de la BD
-            conn = get_db_write()  # Usar conexión de escritura que tiene más permisos
-            cursor = conn.cursor()
-            cursor.execute("SELECT id_rol, nombre_rol FROM roles ORDER BY nombre_rol")
-            
-            roles_list = []
-            for row in cursor.fetchall():
-                roles_list.append((row[0], row[1]))
-            
+            # Intenta obtener de la BD (o de la caché de catálogos)
+            roles_list = self._get_roles_data()
             if roles_list:
                 roles_data = roles_list
         except:
@@ -545,16 +681,33 @@ class SqlServerUsuarioRepository(IUsuarioRepository):
         
         return roles
 
+    @cached_catalog(catalog_cache.ROLES)
+    def _get_roles_data(self):
+        """Pares (id_rol, nombre_rol) de la tabla roles. Los fallos no se guardan en caché."""
+        conn = get_db_write()  # Usar conexión de escritura que tiene más permisos
+        cursor = conn.cursor()
+        cursor.execute("SELECT id_rol, nombre_rol FROM roles ORDER BY nombre_rol")
+        return [(row[0], row[1]) for row in cursor.fetchall()]
+
 # --- REPOSITORIO DE PERSONAL ---
 class SqlServerPersonalRepository(IPersonalRepository):
     # ... (Métodos de personal) ...
 
+    def __init__(self, blob_store=None, compressor=None):
+        # Almacén de archivos por hash; None = el binario se guarda en documentos.archivo.
+        self._blob_store = blob_store
+        # Compresión del binario guardado en la BD; None = se guarda tal cual (la lectura
+        # descomprime siempre las filas con cabecera).
+        self._compressor = compressor
+
+    @cached_catalog(catalog_cache.CARGOS)
     def get_cargos_for_select(self):
         conn = get_db_read()
         cursor = conn.cursor()
         cursor.execute("SELECT id_cargo, nombre_cargo FROM cargos ORDER BY nombre_cargo")
         return [(str(row.id_cargo), row.nombre_cargo) for row in cursor.fetchall()]
 
+    @cached_catalog(catalog_cache.TIPOS_CONTRATO)
     def get_tipos_contrato_for_select(self):
         conn = get_db_read()
         cursor = conn.cursor()
@@ -597,6 +750,7 @@ class SqlServerPersonalRepository(IPersonalRepository):
             )
 
             conn.commit()
+            invalidate_legajo(form_data['id_personal'])
             return True
         except Exception as e:
             conn.rollback()
@@ -628,12 +782,148 @@ class SqlServerPersonalRepository(IPersonalRepository):
         cursor.execute("SELECT 1 FROM personal WHERE dni = ?", dni)
         return cursor.fetchone() is not None
 
-    def get_all_documents_with_expiration(self):
-        """Llama al SP para obtener todos los documentos activos con fecha de vencimiento."""
+    def find_ids_by_dni(self, dnis, only_active=True):
+        """{dni: id_personal} del personal (activo, o todo con only_active=False) con esos DNI; una consulta IN por bloque."""
+        cursor = get_db_read().cursor()
+        try:
+            encontrados = _PERSONAL_POR_DNI.resolve(cursor, dnis)
+        finally:
+            cursor.close()
+        return {dni: registro.id_personal for dni, registro in encontrados.items()
+                if registro.activo or not only_active}
+
+    def find_taken_logins(self, usernames, emails):
+        """(usernames, emails) de las listas que ya usa alguna cuenta de usuarios; consultas IN por bloque."""
+        cursor = get_db_read().cursor()
+        try:
+            return (set(_USUARIO_POR_USERNAME.resolve(cursor, usernames)),
+                    set(_USUARIO_POR_EMAIL.resolve(cursor, emails)))
+        finally:
+            cursor.close()
+
+    def register_personal_bulk(self, altas, id_rol, id_usuario_auditor):
+        """
+        Registra un tramo de la carga masiva en una sola transacción: el personal
+        (sp_registrar_personal), su cuenta de usuario y la entrada de bitácora,
+        cada uno con un executemany (fast_executemany envía el tramo en un viaje).
+        Cada alta es un dict con los datos del formulario más 'username',
+        'password_hash', 'descripcion' y 'detalle_json'.
+
+        Si el tramo falla por alguna fila, se repite fila a fila con un SAVE
+        TRANSACTION por alta: las filas con error se revierten y el resto se
+        confirma. Si una fila condena la transacción (o el SP la revierte), no se
+        puede volver al savepoint: se descarta y el tramo se registra con una
+        transacción por fila. Los errores pasajeros repiten el tramo (BULK_REGISTER_RETRIES).
+        Usa la conexión de administrador: el INSERT en usuarios lo requiere y las
+        tres tablas deben ir en la misma transacción.
+        Devuelve una lista alineada con `altas`: None si se registró o el mensaje de error.
+        """
+        conn = get_db_admin()
+        for intento in itertools.count():
+            try:
+                return self._register_personal_bulk(conn, altas, id_rol, id_usuario_auditor)
+            except pyodbc.Error as e:
+                conn.rollback()
+                if intento >= BULK_REGISTER_RETRIES or not _reintentable(e):
+                    raise
+                logger.warning(f"Tramo de {len(altas)} altas: error pasajero ({e}); reintento {intento + 1}")
+                time.sleep(0.5 * 2 ** intento)
+
+    def _register_personal_bulk(self, conn, altas, id_rol, id_usuario_auditor):
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        try:
+            try:
+                self._insert_altas(cursor, altas, id_rol, id_usuario_auditor)
+                conn.commit()
+                return [None] * len(altas)
+            except pyodbc.Error as e:
+                if _reintentable(e):
+                    raise
+                conn.rollback()
+                logger.info(f"Tramo de {len(altas)} altas rechazado ({e}); se registra fila a fila")
+
+            resultados = []
+            for alta in altas:
+                cursor.execute("SAVE TRANSACTION alta_masiva")
+                try:
+                    self._insert_altas(cursor, [alta], id_rol, id_usuario_auditor)
+                    resultados.append(None)
+                except pyodbc.Error as e:
+                    if _reintentable(e):
+                        raise
+                    if not _deshacer_hasta_savepoint(cursor):
+                        # La fila condenó la transacción (XACT_ABORT, error del SP) o el
+                        # SP la revirtió: se perdieron las altas anteriores del tramo.
+                        conn.rollback()
+                        logger.info(f"Tramo de {len(altas)} altas: la transacción no admite volver al "
+                                    f"savepoint ({e}); se registra una transacción por fila")
+                        return self._register_una_por_transaccion(conn, cursor, altas, id_rol, id_usuario_auditor)
+                    resultados.append(str(e))
+            conn.commit()
+            return resultados
+        finally:
+            cursor.close()
+
+    def _register_una_por_transaccion(self, conn, cursor, altas, id_rol, id_usuario_auditor):
+        """Último recurso del tramo: cada alta en su propia transacción (los errores pasajeros repiten la fila)."""
+        resultados = []
+        for alta in altas:
+            for intento in itertools.count():
+                try:
+                    self._insert_altas(cursor, [alta], id_rol, id_usuario_auditor)
+                    conn.commit()
+                    resultados.append(None)
+                    break
+                except pyodbc.Error as e:
+                    conn.rollback()
+                    if _reintentable(e) and intento < BULK_REGISTER_RETRIES:
+                        time.sleep(0.5 * 2 ** intento)
+                        continue
+                    resultados.append(str(e))
+                    break
+        return resultados
+
+    @staticmethod
+    def _insert_altas(cursor, altas, id_rol, id_usuario_auditor):
+        cursor.executemany("{CALL sp_registrar_personal(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)}",
+                           [_personal_params(alta) for alta in altas])
+        # El SP devuelve el id en un result set que executemany descarta: se resuelven por DNI.
+        ids = _PERSONAL_POR_DNI.resolve(cursor, [alta['dni'] for alta in altas])
+        ahora = datetime.utcnow()
+        cursor.executemany("""
+            INSERT INTO usuarios (username, email, password_hash, id_rol, activo, fecha_creacion, id_personal)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(alta['username'], alta['email'], alta['password_hash'], id_rol, True, ahora,
+               ids[alta['dni']].id_personal) for alta in altas])
+        cursor.executemany("{CALL sp_registrar_bitacora(?, ?, ?, ?, ?)}",
+                           [(id_usuario_auditor, 'Personal', 'CREAR', alta['descripcion'], alta['detalle_json'])
+                            for alta in altas])
+
+    def get_expiry_summary(self, personal_ids, today, threshold):
+        """
+        Cuenta por persona los documentos activos vencidos (antes de `today`) y por
+        vencer (hasta `threshold`), solo para los IDs dados: una consulta agrupada
+        en lugar de recorrer todos los documentos con vencimiento.
+        """
+        ids = list(dict.fromkeys(personal_ids))
+        if not ids:
+            return {}
         conn = get_db_read()
         cursor = conn.cursor()
-        cursor.execute("{CALL sp_listar_documentos_con_vencimiento}")
-        return [_row_to_dict(cursor, row) for row in cursor.fetchall()]
+        try:
+            placeholders = ', '.join('?' * len(ids))
+            cursor.execute(f"""
+                SELECT id_personal,
+                       SUM(CASE WHEN fecha_vencimiento < ? THEN 1 ELSE 0 END) AS vencidos,
+                       SUM(CASE WHEN fecha_vencimiento >= ? AND fecha_vencimiento <= ? THEN 1 ELSE 0 END) AS por_vencer
+                FROM documentos
+                WHERE activo = 1 AND fecha_vencimiento IS NOT NULL AND id_personal IN ({placeholders})
+                GROUP BY id_personal
+            """, today, today, threshold, *ids)
+            return {row[0]: {'expired': row[1], 'expiring_soon': row[2]} for row in cursor.fetchall()}
+        finally:
+            cursor.close()
 
 
     def find_document_by_id(self, document_id):
@@ -643,7 +933,81 @@ class SqlServerPersonalRepository(IPersonalRepository):
         conn = get_db_read()
         cursor = conn.cursor()
         cursor.execute("{CALL sp_obtener_documento_por_id(?)}", document_id)
-        return cursor.fetchone()
+        row = cursor.fetchone()
+        if row and row[1] is None and self._blob_store:
+            # El SP devuelve (nombre_archivo, archivo, ...); el binario está en el almacén.
+            digest = _stored_blob_hash(cursor, document_id)
+            if digest:
+                row[1] = self._blob_store.read(digest)
+        elif row and row[1] is not None:
+            row[1] = compression.decode(row[1])
+        return row
+
+    def get_document_metadata(self, document_id):
+        """
+        Devuelve nombre_archivo, tamanio y hash_archivo de un documento activo,
+        sin traer el binario a memoria. Si está comprimido, tamanio es el
+        original (leído de la cabecera).
+        """
+        conn = get_db_read()
+        cursor = conn.cursor()
+        try:
+            if self._blob_store:
+                # Los documentos del almacén no tienen binario: el tamaño sale de documento_blobs.
+                cursor.execute("""
+                    SELECT d.nombre_archivo, COALESCE(DATALENGTH(d.archivo), b.tamanio) AS tamanio, d.hash_archivo,
+                           SUBSTRING(d.archivo, 1, ?) AS cabecera
+                    FROM documentos d
+                    LEFT JOIN documento_blobs b ON d.archivo IS NULL AND b.hash_archivo = d.hash_archivo
+                    WHERE d.id_documento = ? AND d.activo = 1
+                """, compression.HEADER_SIZE, document_id)
+            else:
+                cursor.execute("""
+                    SELECT nombre_archivo, DATALENGTH(archivo) AS tamanio, hash_archivo,
+                           SUBSTRING(archivo, 1, ?) AS cabecera
+                    FROM documentos
+                    WHERE id_documento = ? AND activo = 1
+                """, compression.HEADER_SIZE, document_id)
+            return _apply_compression_header(map_row(cursor, cursor.fetchone()))
+        finally:
+            cursor.close()
+
+    def iter_document_chunks(self, document_id, chunk_size, start=0, end=None):
+        """
+        Generador que lee el VARBINARY(MAX) por tramos de `chunk_size` bytes con
+        SUBSTRING, desde el byte `start` hasta `end` (exclusivo; None = hasta el final).
+        Solo un tramo está en memoria a la vez. Si el documento está en el
+        almacén de blobs, los tramos se leen del archivo en disco; si está
+        comprimido, se descomprimen al vuelo.
+        """
+        conn = get_db_read()
+        cursor = conn.cursor()
+        try:
+            digest, header = _document_storage(cursor, document_id)
+            if digest and self._blob_store:
+                yield from self._blob_store.iter_range(digest, chunk_size, start, end)
+                return
+            if header:
+                yield from compression.iter_decoded(
+                    self._iter_varbinary_chunks(cursor, document_id, chunk_size), start, end
+                )
+                return
+            offset = start
+            while end is None or offset < end:
+                length = chunk_size if end is None else min(chunk_size, end - offset)
+                # SUBSTRING es 1-based.
+                cursor.execute(
+                    "SELECT SUBSTRING(archivo, ?, ?) FROM documentos WHERE id_documento = ?",
+                    offset + 1, length, document_id
+                )
+                row = cursor.fetchone()
+                chunk = row[0] if row else None
+                if not chunk:
+                    break
+                yield chunk
+                offset += len(chunk)
+        finally:
+            cursor.close()
 
     def delete_document_by_id(self, document_id):
         """
@@ -651,8 +1015,10 @@ class SqlServerPersonalRepository(IPersonalRepository):
         """
         conn = get_db_write()
         cursor = conn.cursor()
+        owner = self.get_document_owner(document_id)
         cursor.execute("{CALL sp_eliminar_documento_logico(?)}", document_id)
         conn.commit()
+        invalidate_legajo(owner)
 
 
     def find_tipos_documento_by_seccion(self, id_seccion):
@@ -676,39 +1042,99 @@ class SqlServerPersonalRepository(IPersonalRepository):
         # Este SP debe devolver la lista de documentos para un id_personal.
         cursor.execute("{CALL sp_listar_documentos_por_personal(?)}", personal_id)
         # Se asume que el SP devuelve filas que se pueden mapear al modelo Documento.
-        return [_row_to_dict(cursor, row) for row in cursor.fetchall()]
-
-    # RUTA: app/infrastructure/persistence/sqlserver_repository.py
-
-# ... dentro de class SqlServerPersonalRepository ...
-
-    def get_full_legajo_by_id(self, personal_id):
+        return map_rows(cursor, cursor.fetchall())
+
+    # Consultas por parte del legajo para get_legajo_projection. Mismas columnas
+    # que los result sets de sp_obtener_legajo_completo_por_personal; los
+    # documentos van sin el binario (solo metadatos).
+    _LEGAJO_PROJECTION_QUERIES = {
+        "personal": """
+            SELECT p.id_personal, p.dni, p.nombres, p.apellidos, p.sexo, p.fecha_nacimiento, p.direccion,
+                   p.telefono, p.email, p.estado_civil, p.nacionalidad, p.id_unidad,
+                   ua.nombre AS unidad_administrativa, p.fecha_ingreso, p.activo, p.fecha_registro
+            FROM personal p
+            LEFT JOIN unidad_administrativa ua ON p.id_unidad = ua.id_unidad
+            WHERE p.id_personal = ?
+        """,
+        "estudios": "SELECT * FROM estudios WHERE id_personal = ? ORDER BY fecha_inicio DESC",
+        "capacitaciones": "SELECT * FROM capacitaciones WHERE id_personal = ? ORDER BY fecha_inicio DESC",
+        "contratos": """
+            SELECT c.*, tc.nombre_tipo AS tipo_contrato_nombre
+            FROM contratos c LEFT JOIN tipos_contrato tc ON c.id_tipo_contrato = tc.id_tipo_contrato
+            WHERE c.id_personal = ? ORDER BY c.fecha_inicio DESC
+        """,
+        "historial_laboral": """
+            SELECT h.*, ca.nombre_cargo, ua.nombre AS unidad_administrativa_nombre
+            FROM historial_laboral h
+            LEFT JOIN cargos ca ON h.id_cargo = ca.id_cargo
+            LEFT JOIN unidad_administrativa ua ON h.id_unidad = ua.id_unidad
+            WHERE h.id_personal = ? ORDER BY h.fecha_inicio DESC
+        """,
+        "licencias": """
+            SELECT l.*, tl.nombre_tipo AS tipo_licencia
+            FROM licencias l LEFT JOIN tipo_licencia tl ON l.id_tipo_licencia = tl.id_tipo_licencia
+            WHERE l.id_personal = ? ORDER BY l.fecha_inicio DESC
+        """,
+        "documentos": """
+            SELECT d.id_documento, d.id_personal, d.id_tipo, t.nombre_tipo, d.id_seccion, s.nombre_seccion,
+                   d.nombre_archivo, d.fecha_emision, d.fecha_vencimiento, d.descripcion,
+                   d.fecha_subida, d.hash_archivo
+            FROM documentos d
+            LEFT JOIN tipo_documento t ON d.id_tipo = t.id_tipo
+            LEFT JOIN legajo_secciones s ON d.id_seccion = s.id_seccion
+            WHERE d.id_personal = ? AND d.activo = 1 {filtro_seccion}
+            ORDER BY d.id_seccion, d.fecha_subida DESC
+        """,
+    }
+
+    @cached_legajo
+    def get_legajo_projection(self, personal_id, sections, id_seccion=None):
+        """
+        Lee solo las partes pedidas del legajo ({'personal': registro,
+        'contratos': [...], ...}); cada parte queda en la caché del legajo.
+        Con 'personal' y una persona inexistente devuelve None. `id_seccion`
+        limita los documentos a una sección del legajo.
+        """
+        unknown = set(sections) - set(self._LEGAJO_PROJECTION_QUERIES)
+        if unknown:
+            raise ValueError(f"Partes del legajo desconocidas: {', '.join(sorted(unknown))}")
         conn = get_db_read()
         cursor = conn.cursor()
-        
-        try: # 💡 CORRECCIÓN: Agregar bloque try
-            cursor.execute("{CALL sp_obtener_legajo_completo_por_personal(?)}", personal_id)
-            
-            # El primer resultado es la información del personal.
-            personal_info = _row_to_dict(cursor, cursor.fetchone())
-            if not personal_info:
-                return None 
-
-            legajo = {"personal": personal_info}
-            
-            # Se procesan los siguientes conjuntos de resultados.
-            if cursor.nextset(): legajo["estudios"] = [_row_to_dict(cursor, row) for row in cursor.fetchall()]
-            if cursor.nextset(): legajo["capacitaciones"] = [_row_to_dict(cursor, row) for row in cursor.fetchall()]
-            if cursor.nextset(): legajo["contratos"] = [_row_to_dict(cursor, row) for row in cursor.fetchall()]
-            if cursor.nextset(): legajo["historial_laboral"] = [_row_to_dict(cursor, row) for row in cursor.fetchall()]
-            if cursor.nextset(): legajo["licencias"] = [_row_to_dict(cursor, row) for row in cursor.fetchall()]
-            if cursor.nextset(): legajo["documentos"] = [_row_to_dict(cursor, row) for row in cursor.fetchall()]
-                
+        try:
+            legajo = {}
+            for section in sections:
+                query = self._LEGAJO_PROJECTION_QUERIES[section]
+                params = [personal_id]
+                if section == "documentos":
+                    query = query.format(filtro_seccion="AND d.id_seccion = ?" if id_seccion is not None else "")
+                    if id_seccion is not None:
+                        params.append(id_seccion)
+                cursor.execute(query, *params)
+                if section == "personal":
+                    legajo[section] = map_row(cursor, cursor.fetchone())
+                    if not legajo[section]:
+                        return None
+                else:
+                    legajo[section] = map_rows(cursor, cursor.fetchall())
             return legajo
-        
-        finally: # 💡 CORRECCIÓN: Agregar bloque finally para cerrar la conexión.
+        finally:
             cursor.close()
-            
+
+    @cached_legajo_part('documentos_por_seccion')
+    def count_documents_by_seccion(self, personal_id):
+        """Documentos activos de una persona por sección: {id_seccion: cantidad}."""
+        conn = get_db_read()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT id_seccion, COUNT(*) FROM documentos
+                WHERE id_personal = ? AND activo = 1
+                GROUP BY id_seccion
+            """, personal_id)
+            return {row[0]: row[1] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+
     # Llama a un SP para listar, filtrar y paginar al personal.
     def get_all_paginated(self, page, per_page, filters):
         conn = get_db_read()
@@ -717,12 +1143,87 @@ class SqlServerPersonalRepository(IPersonalRepository):
         nombres_filter = filters.get('nombres') if filters else None
         
         cursor.execute("{CALL sp_listar_personal_paginado(?, ?, ?, ?)}", page, per_page, dni_filter, nombres_filter)
-        results = [_row_to_dict(cursor, row) for row in cursor.fetchall()]
+        results = map_rows(cursor, cursor.fetchall())
         
         cursor.nextset()
         total = cursor.fetchone()[0]
         return SimplePagination(results, page, per_page, total)
 
+    def get_personal_keyset(self, per_page, filters=None, key=None, direction='next'):
+        """
+        Página del listado de personal por clave (apellidos, nombres, id_personal):
+        las `per_page` filas siguientes (direction='next') o anteriores ('prev') a
+        `key`, sin OFFSET ni COUNT. Devuelve (filas en orden ascendente, hay_más
+        en esa dirección). Mismas columnas y filtros que sp_listar_personal_paginado.
+        """
+        conn = get_db_read()
+        cursor = conn.cursor()
+        dni_filter = filters.get('dni') if filters else None
+        nombres_filter = filters.get('nombres') if filters else None
+        op, order = ('>', 'ASC') if direction == 'next' else ('<', 'DESC')
+
+        params = [per_page + 1, dni_filter, dni_filter, dni_filter,
+                  nombres_filter, nombres_filter, nombres_filter, nombres_filter]
+        seek = ""
+        if key:
+            apellidos, nombres, id_personal = key
+            # El primer predicado permite el seek sobre el índice (apellidos, nombres, id_personal).
+            seek = f"""
+              AND p.apellidos {op}= ?
+              AND (p.apellidos {op} ? OR (p.apellidos = ? AND (p.nombres {op} ? OR (p.nombres = ? AND p.id_personal {op} ?))))
+            """
+            params += [apellidos, apellidos, apellidos, nombres, nombres, id_personal]
+        try:
+            cursor.execute(f"""
+                SELECT TOP (?) p.id_personal, p.dni, p.nombres, p.apellidos,
+                       ua.nombre AS unidad_administrativa, p.activo
+                FROM personal p
+                LEFT JOIN unidad_administrativa ua ON p.id_unidad = ua.id_unidad
+                WHERE (? IS NULL OR ? = '' OR p.dni LIKE ? + '%')
+                  AND (? IS NULL OR ? = '' OR p.nombres LIKE '%' + ? + '%' OR p.apellidos LIKE '%' + ? + '%')
+                  {seek}
+                ORDER BY p.apellidos {order}, p.nombres {order}, p.id_personal {order}
+            """, *params)
+            rows = map_rows(cursor, cursor.fetchall())
+        finally:
+            cursor.close()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        if direction != 'next':
+            rows.reverse()
+        return rows, has_more
+
+    def count_personal(self, filters=None, approximate=False):
+        """
+        Total de personal para el listado. Sin filtros y con approximate=True usa
+        el conteo de filas de sys.dm_db_partition_stats (sin recorrer la tabla);
+        si no hay permiso para leerlo, o con filtros, hace COUNT(*).
+        """
+        conn = get_db_read()
+        cursor = conn.cursor()
+        dni_filter = filters.get('dni') if filters else None
+        nombres_filter = filters.get('nombres') if filters else None
+        try:
+            if approximate and not dni_filter and not nombres_filter:
+                try:
+                    cursor.execute("""
+                        SELECT SUM(row_count) FROM sys.dm_db_partition_stats
+                        WHERE object_id = OBJECT_ID('dbo.personal') AND index_id IN (0, 1)
+                    """)
+                    row = cursor.fetchone()
+                    if row and row[0] is not None:
+                        return int(row[0])
+                except Exception as e:
+                    logger.debug(f"Conteo aproximado de personal no disponible: {e}")
+            cursor.execute("""
+                SELECT COUNT(*) FROM personal p
+                WHERE (? IS NULL OR ? = '' OR p.dni LIKE ? + '%')
+                  AND (? IS NULL OR ? = '' OR p.nombres LIKE '%' + ? + '%' OR p.apellidos LIKE '%' + ? + '%')
+            """, dni_filter, dni_filter, dni_filter, nombres_filter, nombres_filter, nombres_filter, nombres_filter)
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
     # Llama a un SP para crear un nuevo registro de personal.
     def create(self, form_data):
         conn = get_db_write()
@@ -738,6 +1239,8 @@ class SqlServerPersonalRepository(IPersonalRepository):
     
     # Llama a un SP para añadir un documento.
     def add_document(self, doc_data, file_bytes):
+        if self._blob_store:
+            return self._add_document_to_blob_store(doc_data, lambda: self._blob_store.put(file_bytes))
         conn = get_db_write()
         cursor = conn.cursor()
         params = (
@@ -748,19 +1251,284 @@ class SqlServerPersonalRepository(IPersonalRepository):
             doc_data.get('fecha_emision'), 
             doc_data.get('fecha_vencimiento'),
             doc_data.get('descripcion'), 
-            file_bytes, 
+            self._compressor.encode(file_bytes)[0] if self._compressor else file_bytes, 
             doc_data.get('hash_archivo')
         )
         cursor.execute("{CALL sp_subir_documento(?, ?, ?, ?, ?, ?, ?, ?, ?)}", params)
         conn.commit()
+        invalidate_legajo(doc_data.get('id_personal'))
+
+    def _add_document_to_blob_store(self, doc_data, store):
+        """
+        Guarda el archivo en el almacén (una vez por hash) y registra el documento
+        con archivo NULL; la referencia y la fila se confirman en la misma transacción.
+        `store()` escribe el archivo en el almacén y devuelve (hash, tamaño).
+        """
+        digest, size = store()
+        conn = get_db_write()
+        cursor = conn.cursor()
+        try:
+            with self._blob_store.lock(digest):
+                # Una baja concurrente pudo borrar el archivo entre store() y el bloqueo.
+                if not self._blob_store.exists(digest):
+                    store()
+                _blob_add_ref(cursor, digest, size)
+                cursor.execute("{CALL sp_subir_documento(?, ?, ?, ?, ?, ?, ?, ?, ?)}", (
+                    doc_data.get('id_personal'),
+                    doc_data.get('id_tipo'),
+                    doc_data.get('id_seccion'),
+                    doc_data.get('nombre_archivo'),
+                    doc_data.get('fecha_emision'),
+                    doc_data.get('fecha_vencimiento'),
+                    doc_data.get('descripcion'),
+                    None,
+                    digest
+                ))
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        invalidate_legajo(doc_data.get('id_personal'))
+
+    def add_document_stream(self, doc_data, upload):
+        """
+        Como add_document, pero el archivo llega validado en un SpooledBlob
+        (upload_ingest.py) y nunca se tiene entero en memoria: la fila se inserta
+        con sp_subir_documento y archivo = 0x, y el binario se agrega por tramos con
+        UPDATE ... archivo.WRITE(?, NULL, NULL), todo en una transacción.
+        """
+        if self._blob_store:
+            return self._add_document_to_blob_store(doc_data, lambda: self._blob_store.put_stream(upload.iter_chunks()))
+        compressed = self._compressor.encode_blob(upload) if self._compressor else None
+        payload = compressed or upload
+        conn = get_db_write()
+        cursor = conn.cursor()
+        try:
+            # El SP no devuelve el ID. La fila se registra con un hash provisional
+            # único (no tiene la forma de un sha256) que solo esta transacción
+            # conoce, así se la encuentra sin carreras con otra subida del mismo
+            # archivo; antes de escribir el binario se cambia por el real.
+            provisional_hash = uuid.uuid4().hex
+            cursor.execute("{CALL sp_subir_documento(?, ?, ?, ?, ?, ?, ?, ?, ?)}", (
+                doc_data.get('id_personal'),
+                doc_data.get('id_tipo'),
+                doc_data.get('id_seccion'),
+                doc_data.get('nombre_archivo'),
+                doc_data.get('fecha_emision'),
+                doc_data.get('fecha_vencimiento'),
+                doc_data.get('descripcion'),
+                b'',
+                provisional_hash
+            ))
+            cursor.execute("SELECT id_documento FROM documentos WHERE id_personal = ? AND hash_archivo = ?",
+                           doc_data.get('id_personal'), provisional_hash)
+            document_id = cursor.fetchone()[0]
+            cursor.execute("UPDATE documentos SET hash_archivo = ? WHERE id_documento = ?",
+                           doc_data.get('hash_archivo'), document_id)
+            for chunk in payload.iter_chunks(_WRITE_CHUNK_SIZE):
+                cursor.execute("UPDATE documentos SET archivo.WRITE(?, NULL, NULL) WHERE id_documento = ?",
+                               chunk, document_id)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            if compressed:
+                compressed.close()
+        invalidate_legajo(doc_data.get('id_personal'))
+
+    def add_documents_bulk(self, documents):
+        """
+        Guarda varios documentos [(doc_data, upload), ...] en una sola transacción
+        con un único executemany de sp_subir_documento (fast_executemany envía
+        todas las filas en un viaje). Pensado para las partes de un PDF separado,
+        que son pequeñas: cada binario se lee entero. Con el almacén de blobs, los
+        archivos se escriben antes y las referencias se suman en la misma
+        transacción que las filas.
+        """
+        if not documents:
+            return 0
+        digests = {}
+        if self._blob_store:
+            for doc_data, upload in documents:
+                digests[id(upload)] = self._blob_store.put_stream(upload.iter_chunks())
+        conn = get_db_write()
+        cursor = conn.cursor()
+        try:
+            with self._blob_store.lock(*(d for d, _ in digests.values())) if digests else contextlib.nullcontext():
+                rows = []
+                for doc_data, upload in documents:
+                    if digests:
+                        digest, size = digests[id(upload)]
+                        if not self._blob_store.exists(digest):
+                            self._blob_store.put_stream(upload.iter_chunks())
+                        _blob_add_ref(cursor, digest, size)
+                        archivo = None
+                    else:
+                        digest = doc_data.get('hash_archivo')
+                        archivo = upload.read()
+                        if self._compressor:
+                            archivo = self._compressor.encode(archivo)[0]
+                    rows.append((
+                        doc_data.get('id_personal'),
+                        doc_data.get('id_tipo'),
+                        doc_data.get('id_seccion'),
+                        doc_data.get('nombre_archivo'),
+                        doc_data.get('fecha_emision'),
+                        doc_data.get('fecha_vencimiento'),
+                        doc_data.get('descripcion'),
+                        archivo,
+                        digest
+                    ))
+                cursor.fast_executemany = True
+                cursor.executemany("{CALL sp_subir_documento(?, ?, ?, ?, ?, ?, ?, ?, ?)}", rows)
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        for personal_id in {doc_data.get('id_personal') for doc_data, _ in documents}:
+            invalidate_legajo(personal_id)
+        return len(documents)
+
+    def ensure_blob_store_schema(self):
+        """Crea documento_blobs y permite archivo NULL (requiere permiso ALTER)."""
+        conn = get_db_write()
+        cursor = conn.cursor()
+        try:
+            for statement in BLOB_STORE_DDL:
+                cursor.execute(statement)
+            conn.commit()
+        finally:
+            cursor.close()
+
+    def migrate_documents_to_blob_store(self, batch_size=100, chunk_size=1024 * 1024):
+        """
+        Mueve al almacén el binario de hasta `batch_size` documentos que aún lo
+        tienen en la BD (leído por tramos con SUBSTRING) y confirma el lote en una
+        transacción. Devuelve {'documentos', 'bytes', 'blobs_nuevos'}; 0 documentos
+        indica que no queda nada por migrar.
+        """
+        conn = get_db_write()
+        cursor = conn.cursor()
+        moved = {'documentos': 0, 'bytes': 0, 'blobs_nuevos': 0}
+        try:
+            cursor.execute(
+                "SELECT TOP (?) id_documento FROM documentos WHERE archivo IS NOT NULL ORDER BY id_documento",
+                batch_size
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            for document_id in ids:
+                chunks = self._iter_varbinary_chunks(cursor, document_id, chunk_size)
+                if _document_storage(cursor, document_id)[1]:
+                    # El almacén guarda el archivo original: se descomprime al moverlo.
+                    chunks = compression.iter_decoded(chunks)
+                digest, size = self._blob_store.put_stream(chunks)
+                with self._blob_store.lock(digest):
+                    if _blob_add_ref(cursor, digest, size):
+                        moved['blobs_nuevos'] += 1
+                    cursor.execute(
+                        "UPDATE documentos SET archivo = NULL, hash_archivo = ? WHERE id_documento = ?",
+                        digest, document_id
+                    )
+                moved['documentos'] += 1
+                moved['bytes'] += size
+            conn.commit()
+            return moved
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _iter_varbinary_chunks(cursor, document_id, chunk_size):
+        offset = 1
+        while True:
+            cursor.execute("SELECT SUBSTRING(archivo, ?, ?) FROM documentos WHERE id_documento = ?",
+                           offset, chunk_size, document_id)
+            row = cursor.fetchone()
+            if not row or not row[0]:
+                break
+            yield row[0]
+            offset += len(row[0])
+
+    def recompress_documents(self, after_id=0, batch_size=50):
+        """
+        Comprime (si compensa) el binario de hasta `batch_size` documentos guardados
+        sin compresión con id_documento > after_id; el lote se confirma en una
+        transacción. Devuelve {'ultimo_id', 'revisados', 'comprimidos',
+        'bytes_ahorrados'}; ultimo_id None indica que no quedan documentos.
+        """
+        compressor = self._compressor or compression.DocumentCompressor()
+        conn = get_db_write()
+        cursor = conn.cursor()
+        result = {'ultimo_id': None, 'revisados': 0, 'comprimidos': 0, 'bytes_ahorrados': 0}
+        try:
+            cursor.execute("""
+                SELECT TOP (?) id_documento FROM documentos
+                WHERE id_documento > ? AND archivo IS NOT NULL AND SUBSTRING(archivo, 1, 4) <> ?
+                ORDER BY id_documento
+            """, batch_size, after_id, compression.MAGIC)
+            ids = [row[0] for row in cursor.fetchall()]
+            for document_id in ids:
+                cursor.execute("SELECT archivo FROM documentos WHERE id_documento = ?", document_id)
+                row = cursor.fetchone()
+                result['ultimo_id'] = document_id
+                result['revisados'] += 1
+                if not row or row[0] is None:
+                    continue
+                stored, compressed = compressor.encode(row[0])
+                if not compressed:
+                    continue
+                # Si el archivo cambió mientras se comprimía, se deja como está.
+                cursor.execute(
+                    "UPDATE documentos SET archivo = ? WHERE id_documento = ? AND DATALENGTH(archivo) = ?",
+                    stored, document_id, len(row[0])
+                )
+                if cursor.rowcount:
+                    result['comprimidos'] += 1
+                    result['bytes_ahorrados'] += len(row[0]) - len(stored)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def get_compression_stats(self):
+        """Documentos con binario en la BD, cuántos están comprimidos y bytes almacenados frente a originales."""
+        conn = get_db_read()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT COUNT(*) AS documentos,
+                       ISNULL(SUM(CASE WHEN SUBSTRING(archivo, 1, 4) = ? THEN 1 ELSE 0 END), 0) AS comprimidos,
+                       ISNULL(SUM(DATALENGTH(archivo)), 0) AS bytes_almacenados,
+                       ISNULL(SUM(CASE WHEN SUBSTRING(archivo, 1, 4) = ?
+                                       THEN CAST(SUBSTRING(archivo, 6, 8) AS BIGINT)
+                                       ELSE DATALENGTH(archivo) END), 0) AS bytes_originales
+                FROM documentos
+                WHERE archivo IS NOT NULL
+            """, compression.MAGIC, compression.MAGIC)
+            return map_row(cursor, cursor.fetchone()).to_dict()
+        finally:
+            cursor.close()
     
     # Métodos para obtener listas para los formularios SelectField.
+    @cached_catalog(catalog_cache.UNIDADES)
     def get_unidades_for_select(self):
         conn = get_db_read()
         cursor = conn.cursor()
         cursor.execute("SELECT id_unidad, nombre FROM unidad_administrativa ORDER BY nombre")
         return [(row.id_unidad, row.nombre) for row in cursor.fetchall()]
 
+    @cached_catalog(catalog_cache.SECCIONES)
     def get_secciones_for_select(self):
         conn = get_db_read()
         cursor = conn.cursor()
@@ -774,6 +1542,7 @@ class SqlServerPersonalRepository(IPersonalRepository):
         return [(row.id_tipo, row.nombre_tipo) for row in cursor.fetchall()]
 
 
+    @cached_catalog(catalog_cache.TIPOS_DOCUMENTO)
     def get_tipos_documento_for_select(self):
         conn = get_db_read()
         cursor = conn.cursor()
@@ -802,6 +1571,7 @@ class SqlServerPersonalRepository(IPersonalRepository):
         )
         cursor.execute("{CALL sp_actualizar_personal(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)}", params)
         conn.commit()
+        invalidate_legajo(personal_id)
 
 
     # Llama a un SP para obtener todos los datos necesarios para el reporte general.
@@ -809,7 +1579,7 @@ class SqlServerPersonalRepository(IPersonalRepository):
         conn = get_db_read()
         cursor = conn.cursor()
         cursor.execute("{CALL sp_generar_reporte_general_personal}")
-        return [_row_to_dict(cursor, row) for row in cursor.fetchall()]     
+        return map_rows(cursor, cursor.fetchall())
     
     # Llama al SP para el borrado suave (desactivación) de un empleado.
     def delete_by_id(self, personal_id):
@@ -817,6 +1587,7 @@ class SqlServerPersonalRepository(IPersonalRepository):
         cursor = conn.cursor()
         cursor.execute("{CALL sp_eliminar_personal(?)}", personal_id)
         conn.commit()
+        invalidate_legajo(personal_id)
     
     def activate_by_id(self, personal_id):
         """Reactiva un empleado previamente desactivado."""
@@ -824,6 +1595,7 @@ class SqlServerPersonalRepository(IPersonalRepository):
         cursor = conn.cursor()
         cursor.execute("{CALL sp_reactivar_personal(?)}", personal_id)
         conn.commit()
+        invalidate_legajo(personal_id)
         
     def find_by_id(self, personal_id):
         # Aseguramos la inicialización del logger para debug si la usamos
@@ -863,6 +1635,7 @@ class SqlServerPersonalRepository(IPersonalRepository):
 
 
 
+    @cached_catalog(catalog_cache.TIPOS_DOCUMENTO_SECCION)
     def get_tipos_documento_by_seccion(self, id_seccion):
         """
         Llama a un SP para obtener los tipos de documento asociados a una sección
@@ -941,58 +1714,42 @@ class SqlServerPersonalRepository(IPersonalRepository):
 
     def get_deleted_documents(self):
         """
-        Obtiene documentos eliminados.
-        Usa print() para depurar por consola y normaliza claves a minúsculas.
+        Obtiene documentos eliminados con las claves normalizadas a minúsculas.
+        Si el SP no trae el nombre del personal o el tipo de documento, se
+        completan con una consulta IN por tabla (no una por fila).
         """
-        
-        deleted_docs = []
         conn = get_db_write()
         cursor = conn.cursor()
         
         try:
-            # INTENTO 1: Usar el SP
             cursor.execute("{CALL sp_listar_documentos_eliminados}")
-            documents = cursor.fetchall()
-            
-            for row in documents:
-                raw_dict = _row_to_dict(cursor, row)
-                if raw_dict:
-                    # Ver qué claves llegan realmente de la BD
-                    
+            columns = [column[0].lower() for column in cursor.description or ()]
+            # CONVERTIR A MINÚSCULAS (Solución al problema de tabla vacía)
+            deleted_docs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            if not deleted_docs:
+                return []
+
+            try:
+                if 'nombre_personal' not in columns and 'id_personal' in columns:
+                    personas = _PERSONAL_LOOKUP.resolve(cursor, (doc['id_personal'] for doc in deleted_docs))
+                    enrich(deleted_docs, 'id_personal', personas, {
+                        'nombre_personal': lambda p: f"{p.apellidos}, {p.nombres}",
+                        'dni': 'dni',
+                    })
+                if 'tipo_documento' not in columns and 'id_tipo' in columns:
+                    tipos = _TIPO_DOCUMENTO_LOOKUP.resolve(cursor, (doc['id_tipo'] for doc in deleted_docs))
+                    enrich(deleted_docs, 'id_tipo', tipos, {'tipo_documento': 'nombre_tipo'})
+            except Exception as e:
+                # Sin los datos complementarios la lista se sigue mostrando.
+                logger.warning(f"No se pudieron completar los documentos eliminados: {e}")
 
-                    # CONVERTIR A MINÚSCULAS (Solución al problema de tabla vacía)
-                    doc_dict = {k.lower(): v for k, v in raw_dict.items()}
-                    
-                    # Rellenar datos faltantes si es necesario
-                    if 'nombre_personal' not in doc_dict and 'id_personal' in doc_dict:
-                        try:
-                            cursor.execute("SELECT nombres, apellidos, dni FROM personal WHERE id_personal = ?", doc_dict['id_personal'])
-                            p_row = cursor.fetchone()
-                            if p_row:
-                                doc_dict['nombre_personal'] = f"{p_row[1]}, {p_row[0]}"
-                                doc_dict['dni'] = p_row[2]
-                        except:
-                            pass
-                    
-                    # Rellenar tipo si falta
-                    if 'tipo_documento' not in doc_dict and 'id_tipo' in doc_dict:
-                        try:
-                            cursor.execute("SELECT nombre_tipo FROM tipo_documento WHERE id_tipo = ?", doc_dict['id_tipo'])
-                            t_row = cursor.fetchone()
-                            if t_row:
-                                doc_dict['tipo_documento'] = t_row[0]
-                        except:
-                            pass
-
-                    deleted_docs.append(doc_dict)
-            
-            
-            
             return deleted_docs
             
         except Exception as e:
-            
-            return [] # Si falla, devolvemos lista vacía por seguridad en esta prueba
+            logger.error(f"Error al listar documentos eliminados: {e}")
+            return [] # Si falla, devolvemos lista vacía por seguridad
+        finally:
+            cursor.close()
 
 
     def recover_document(self, document_id):
@@ -1002,6 +1759,7 @@ class SqlServerPersonalRepository(IPersonalRepository):
         
         conn = get_db_write()
         cursor = conn.cursor()
+        owner = self.get_document_owner(document_id)
         
         try:
             # INTENTO 1: Usar SP si existe
@@ -1025,6 +1783,7 @@ class SqlServerPersonalRepository(IPersonalRepository):
             except Exception as update_error:
                 logger.error(f"Error al recuperar documento {document_id} (ambos métodos fallaron): {update_error}")
                 raise
+        invalidate_legajo(owner)
 
     def permanently_delete_document(self, document_id):
         """Elimina permanentemente un documento de la base de datos."""
@@ -1033,11 +1792,30 @@ class SqlServerPersonalRepository(IPersonalRepository):
         
         conn = get_db_write()
         cursor = conn.cursor()
-        
+        owner = self.get_document_owner(document_id)
+
+        # Si el binario está en el almacén, la baja resta su referencia en la misma transacción.
+        digest = _stored_blob_hash(cursor, document_id) if self._blob_store else None
+        if not digest:
+            self._delete_document_row(conn, cursor, document_id, logger)
+            invalidate_legajo(owner)
+            return
+        with self._blob_store.lock(digest):
+            released = self._delete_document_row(conn, cursor, document_id, logger, digest)
+            if released:
+                _delete_unreferenced_blob(self._blob_store, cursor, digest)
+                logger.info(f"Blob {digest} sin referencias eliminado del almacén.")
+        invalidate_legajo(owner)
+
+    @staticmethod
+    def _delete_document_row(conn, cursor, document_id, logger, digest=None):
+        released = False
         try:
             # INTENTO 1: Usar SP si existe
             logger.info(f"Intentando eliminar permanentemente documento {document_id} usando SP...")
             cursor.execute("{CALL sp_eliminar_documento_permanente(?)}", document_id)
+            if digest:
+                released = _blob_release_ref(cursor, digest)
             conn.commit()
             logger.info(f"Documento {document_id} eliminado permanentemente via SP.")
             
@@ -1047,12 +1825,15 @@ class SqlServerPersonalRepository(IPersonalRepository):
             try:
                 # INTENTO 2: Fallback - DELETE directo
                 cursor.execute("DELETE FROM documentos WHERE id_documento = ?", document_id)
+                if digest:
+                    released = _blob_release_ref(cursor, digest)
                 conn.commit()
                 logger.info(f"Documento {document_id} eliminado permanentemente via DELETE directo.")
                 
             except Exception as delete_error:
                 logger.error(f"Error al eliminar permanentemente documento {document_id} (ambos métodos fallaron): {delete_error}")
                 raise
+        return released
 
 
 # Implementación completa y corregida del repositorio de auditoría.
@@ -1071,7 +1852,7 @@ class SqlServerAuditoriaRepository(IAuditoriaRepository):
         # Llama a un SP que maneja la paginación de la tabla bitacora.
         cursor.execute("{CALL sp_listar_bitacora_paginada(?, ?)}", page, per_page)
         # Procesa los resultados.
-        results = [_row_to_dict(cursor, row) for row in cursor.fetchall()]
+        results = map_rows(cursor, cursor.fetchall())
         # Obtiene el total de registros para los controles de paginación.
         cursor.nextset()
         total = cursor.fetchone()[0]
@@ -1088,12 +1869,6 @@ from dotenv import load_dotenv
 # Carga las variables de entorno desde el archivo .env
 load_dotenv()
 
-def _row_to_dict(cursor, row):
-    """Función auxiliar para convertir una fila de base de datos en un diccionario."""
-    if not row or not cursor.description:
-        return None
-    return {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
-
 class SqlServerBackupRepository:
     
     # --- SECCIÓN DE BACKUPS (Tu código funcional, sin cambios) ---
@@ -1181,12 +1956,12 @@ class SqlServerBackupRepository:
 
             # 1. Obtener los detalles del documento antes de hacer nada
             # Nos aseguramos de obtener la llave primaria de legajo (id_legajo)
-            cursor.execute("SELECT id_legajo, nombre_archivo, ruta_archivo FROM documentos WHERE id_documento = ?", documento_id)
+            cursor.execute("SELECT id_legajo, nombre_archivo, ruta_archivo, id_personal FROM documentos WHERE id_documento = ?", documento_id)
             doc_row = cursor.fetchone()
             if not doc_row:
                 raise Exception(f"No se encontró el documento con ID {documento_id}.")
             
-            id_legajo, nombre_archivo, ruta_archivo = doc_row
+            id_legajo, nombre_archivo, ruta_archivo, id_personal = doc_row
 
             # Inicia la transacción
             conn.autocommit = False
@@ -1205,6 +1980,7 @@ class SqlServerBackupRepository:
 
             # Si todo fue bien, confirma la transacción
             conn.commit()
+            invalidate_legajo(id_personal)
             print(f"---[INFO]: Solicitud de eliminación creada para el documento ID {documento_id}")
             return True
 
@@ -1224,6 +2000,11 @@ class SqlServerBackupRepository:
 # En app/infrastructure/persistence/sqlserver_repository.py
 
 class SqlServerSolicitudRepository:
+
+    def __init__(self, blob_store=None, compressor=None):
+        # Mismo almacén y compresión que el repositorio de personal (None = desactivados).
+        self._blob_store = blob_store
+        self._compressor = compressor
     
     def obtener_id_personal_por_documento(self, id_documento):
         """Helper para obtener el id_personal dueño de un documento."""
@@ -1311,6 +2092,8 @@ class SqlServerSolicitudRepository:
         
         conn = get_db_write()
         cursor = conn.cursor()
+        released = None  # hash del blob anterior si quedó sin referencias
+        owner = None     # id_personal del documento reemplazado (su legajo cambia)
         try:
             conn.autocommit = False
 
@@ -1336,6 +2119,7 @@ class SqlServerSolicitudRepository:
                     # Si por alguna razón ya es un número o string limpio
                     id_doc = int(id_doc_str)
                 # -----------------------------------------
+                owner = self.obtener_id_personal_por_documento(id_doc)
 
                 # 2. Preparar archivo
                 nuevo_nombre = nueva_ruta.replace('\\', '/').split('/')[-1] 
@@ -1344,23 +2128,34 @@ class SqlServerSolicitudRepository:
                 if not os.path.exists(ruta_fisica):
                     raise FileNotFoundError(f"El archivo temporal no se encuentra en: {ruta_fisica}")
 
-                # Leer binario para actualizar la columna 'archivo'
-                with open(ruta_fisica, 'rb') as f:
-                    file_bytes = f.read()
-
-                # 3. Actualizar documento (VARBINARY y Nombre)
-                cursor.execute("""
-                    UPDATE documentos 
-                    SET archivo = ?, 
-                        nombre_archivo = ?, 
-                        fecha_subida = GETDATE() 
-                    WHERE id_documento = ?
-                """, (file_bytes, nuevo_nombre, id_doc))
+                if self._blob_store:
+                    # 3. Con almacén de blobs: el documento pasa a apuntar al nuevo hash.
+                    released = self._replace_document_blob(cursor, id_doc, ruta_fisica, nuevo_nombre)
+                else:
+                    # Leer binario para actualizar la columna 'archivo'
+                    with open(ruta_fisica, 'rb') as f:
+                        file_bytes = f.read()
+                    if self._compressor:
+                        file_bytes, _ = self._compressor.encode(file_bytes)
+
+                    # 3. Actualizar documento (VARBINARY y Nombre)
+                    cursor.execute("""
+                        UPDATE documentos 
+                        SET archivo = ?, 
+                            nombre_archivo = ?, 
+                            fecha_subida = GETDATE() 
+                        WHERE id_documento = ?
+                    """, (file_bytes, nuevo_nombre, id_doc))
 
                 # 4. Aprobar solicitud
                 cursor.execute("UPDATE solicitudes_modificacion SET estado = 'aprobada', fecha_revision = GETDATE() WHERE id_solicitud = ?", request_id)
 
             conn.commit()
+            if action == 'aprobar':
+                invalidate_legajo(owner)
+            if released:
+                with self._blob_store.lock(released):
+                    _delete_unreferenced_blob(self._blob_store, cursor, released)
             return True
         except Exception as e:
             conn.rollback()
@@ -1373,6 +2168,28 @@ class SqlServerSolicitudRepository:
                 conn.autocommit = True
             cursor.close()
             
+    def _replace_document_blob(self, cursor, id_doc, ruta_fisica, nuevo_nombre):
+        """
+        Guarda el archivo aprobado en el almacén, mueve la referencia del hash
+        anterior al nuevo y devuelve el hash anterior si quedó sin referencias.
+        """
+        with open(ruta_fisica, 'rb') as f:
+            digest, size = self._blob_store.put_stream(iter(lambda: f.read(1024 * 1024), b''))
+        previous = _stored_blob_hash(cursor, id_doc)
+        with self._blob_store.lock(digest):
+            if not self._blob_store.exists(digest):
+                with open(ruta_fisica, 'rb') as f:
+                    self._blob_store.put_stream(iter(lambda: f.read(1024 * 1024), b''))
+            _blob_add_ref(cursor, digest, size)
+        cursor.execute("""
+            UPDATE documentos
+            SET archivo = NULL, hash_archivo = ?, nombre_archivo = ?, fecha_subida = GETDATE()
+            WHERE id_documento = ?
+        """, (digest, nuevo_nombre, id_doc))
+        if previous and _blob_release_ref(cursor, previous):
+            return previous
+        return None
+
     def get_by_id(self, request_id):
         conn = get_db_read()
         cursor = conn.cursor()
@@ -0,0 +1,66 @@
+# RUTA: app/infrastructure/persistence/user_cache.py
+"""
+Caché de la sesión para el user_loader de Flask-Login (USER_CACHE_TTL).
+
+`load_user` reconstruía el Usuario con una consulta (JOIN a roles) en cada
+petición autenticada. Ahora lo toma de esta caché, acotada y con TTL. Cada
+usuario tiene una versión que los métodos de escritura del repositorio de
+usuarios incrementan tras confirmar (rol, activo, contraseña, correo, 2FA...):
+la entrada se descarta en el acto y una lectura que empezó antes del cambio no
+puede guardar el dato viejo, porque se guarda solo si la versión no cambió.
+"""
+
+import copy
+
+from app.utils.cache import TTLCache, register_cache
+
+
+class UserCache(TTLCache):
+    """Usuarios por id, con versión por usuario."""
+
+    def __init__(self, name='usuarios', ttl=60, max_entries=1000):
+        super().__init__(name, ttl, max_entries)
+        self._versions = {}                 # id_usuario -> versión
+        self._generation = 0                # sube con los cambios por nombre de usuario
+
+    def load(self, user_id, loader):
+        """
+        Devuelve una copia del Usuario en caché o lo obtiene con `loader()`.
+        La copia evita que un cambio hecho sobre current_user en una petición se
+        vea en las demás.
+        """
+        key = (user_id,)
+        with self._lock:
+            version = (self._generation, self._versions.get(user_id, 0))
+        user = self.get(key)
+        if user is None:
+            user = loader()
+            if user is None or self.ttl <= 0:
+                return user
+            with self._lock:
+                if (self._generation, self._versions.get(user_id, 0)) == version:
+                    self._store(key, user)
+        return copy.copy(user)
+
+    def bump(self, user_id):
+        """Marca que los datos del usuario cambiaron en la BD (llamar tras el commit)."""
+        user_id = int(user_id)
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.pop((user_id,), None)
+            self._invalidations += 1
+
+    def bump_username(self, username):
+        """
+        Como bump, para las escrituras que identifican al usuario por su nombre.
+        Sube además la generación para que ninguna lectura en curso guarde su dato.
+        """
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, (user, _) in self._entries.items() if user.username == username]:
+                self._versions[key[0]] = self._versions.get(key[0], 0) + 1
+                del self._entries[key]
+            self._invalidations += 1
+
+
+USER_CACHE = register_cache(UserCache())
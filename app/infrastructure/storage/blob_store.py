@@ -0,0 +1,135 @@
+# RUTA: app/infrastructure/storage/blob_store.py
+"""
+Almacén de archivos direccionado por contenido (BLOB_STORE_ENABLED).
+
+Cada archivo se guarda una sola vez en disco bajo su sha256, repartido en
+subdirectorios por los primeros caracteres del hash para que ningún directorio
+crezca demasiado:
+
+    <raíz>/ab/cd/abcd1234...   (64 caracteres hexadecimales)
+
+La escritura es atómica: el contenido se escribe en <raíz>/tmp, se sincroniza
+a disco y se mueve a su ruta final con os.replace. Un archivo con el mismo hash
+ya presente no se vuelve a escribir (deduplicación). El conteo de referencias
+vive en la base de datos (tabla documento_blobs); este módulo solo maneja los
+archivos y los bloqueos por hash que serializan alta y baja de un mismo blob.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Cantidad de bloqueos repartidos por hash (dos hashes distintos rara vez comparten uno).
+_LOCK_STRIPES = 64
+_HEX = frozenset('0123456789abcdef')
+
+
+class BlobStore:
+    """Archivos inmutables identificados por su sha256 en un directorio local."""
+
+    def __init__(self, root, fsync=True):
+        self.root = os.path.abspath(root)
+        self.fsync = fsync
+        self._tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        self._locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+    # --- RUTAS Y CONSULTAS ---
+
+    def path_for(self, digest):
+        """Ruta del archivo de un hash; valida el formato para no salir de la raíz."""
+        if not isinstance(digest, str) or len(digest) != 64 or not _HEX.issuperset(digest):
+            raise ValueError(f"Hash de blob inválido: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.isfile(self.path_for(digest))
+
+    def size(self, digest):
+        """Tamaño en bytes, o None si el blob no existe."""
+        try:
+            return os.path.getsize(self.path_for(digest))
+        except FileNotFoundError:
+            return None
+
+    def read(self, digest):
+        """Contenido completo del blob (solo para los llamadores que necesitan bytes)."""
+        with open(self.path_for(digest), 'rb') as f:
+            return f.read()
+
+    def iter_range(self, digest, chunk_size, start=0, end=None):
+        """Generador que lee el blob por tramos desde `start` hasta `end` (exclusivo)."""
+        with open(self.path_for(digest), 'rb') as f:
+            f.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                yield chunk
+                if remaining is not None:
+                    remaining -= len(chunk)
+
+    # --- ESCRITURA Y BORRADO ---
+
+    def put(self, data):
+        """Guarda `data` (bytes) y devuelve (sha256, tamaño)."""
+        return self.put_stream((data,))
+
+    def put_stream(self, chunks):
+        """
+        Guarda el contenido de un iterable de bloques de bytes calculando el
+        sha256 mientras se escribe. Devuelve (sha256, tamaño).
+        """
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in chunks:
+                    sha.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+                if self.fsync:
+                    tmp.flush()
+                    os.fsync(tmp.fileno())
+            digest = sha.hexdigest()
+            final_path = self.path_for(digest)
+            if os.path.isfile(final_path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(tmp_path, final_path)
+            return digest, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, digest):
+        """Borra el archivo de un blob (ya sin referencias). Devuelve True si existía."""
+        try:
+            os.remove(self.path_for(digest))
+            return True
+        except FileNotFoundError:
+            return False
+
+    # --- CONCURRENCIA ---
+
+    @contextmanager
+    def lock(self, *digests):
+        """
+        Serializa dentro del proceso las operaciones sobre los hashes dados
+        (escritura + alta de referencia frente a baja + borrado del archivo).
+        Los bloqueos se toman en orden fijo para evitar interbloqueos.
+        """
+        stripes = sorted({int(digest[:8], 16) % _LOCK_STRIPES for digest in digests if digest})
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
@@ -0,0 +1,132 @@
+# RUTA: app/infrastructure/storage/compression.py
+"""
+Compresión transparente del binario de los documentos (DOCUMENT_COMPRESSION_ENABLED).
+
+Un binario comprimido empieza con una cabecera de 13 bytes:
+
+    b'\\x89LDZ' | códec (1 byte) | tamaño original (8 bytes, big-endian)
+
+Las filas sin cabecera (todas las anteriores, y los archivos que no se
+comprimieron) se leen tal cual, por lo que la lectura no depende de que la
+compresión esté activa. Solo se comprime lo que realmente se reduce: formatos ya
+comprimidos (DOCX, XLSX, JPEG, PNG) se descartan por su firma y el resto se
+prueba primero con una muestra.
+"""
+
+import struct
+import zlib
+
+from app.infrastructure.storage.spool import SpooledBlob
+
+MAGIC = b'\x89LDZ'
+HEADER_SIZE = 13
+CODEC_ZLIB = 1
+_HEADER = struct.Struct('>4sBQ')
+
+# Firmas de formatos que ya vienen comprimidos (ZIP de Office, JPEG, PNG, GIF).
+_COMPRESSED_SIGNATURES = (b'PK\x03\x04', b'\xff\xd8\xff', b'\x89PNG', b'GIF8')
+_SAMPLE_SIZE = 256 * 1024
+
+
+def parse_header(prefix):
+    """Devuelve (códec, tamaño original) si `prefix` empieza con la cabecera, o None."""
+    if not prefix or len(prefix) < HEADER_SIZE or bytes(prefix[:4]) != MAGIC:
+        return None
+    _, codec, original_size = _HEADER.unpack(bytes(prefix[:HEADER_SIZE]))
+    return codec, original_size
+
+
+def decode(stored):
+    """Binario tal como lo usa la aplicación, a partir del almacenado en la BD."""
+    header = parse_header(stored)
+    if header is None:
+        return stored
+    if header[0] != CODEC_ZLIB:
+        raise ValueError(f"Códec de compresión desconocido: {header[0]}")
+    return zlib.decompress(bytes(stored[HEADER_SIZE:]))
+
+
+def iter_decoded(stored_chunks, start=0, end=None):
+    """
+    Descomprime por tramos un binario almacenado con cabecera y devuelve solo los
+    bytes de [start, end). Para un rango hay que descomprimir desde el principio,
+    pero la memoria sigue siendo la de un tramo.
+    """
+    decompressor = zlib.decompressobj()
+    header_pending = HEADER_SIZE
+    position = 0
+    for chunk in stored_chunks:
+        if header_pending:
+            skip = min(header_pending, len(chunk))
+            chunk = chunk[skip:]
+            header_pending -= skip
+            if not chunk:
+                continue
+        data = decompressor.decompress(chunk)
+        if not data:
+            continue
+        piece_start, position = position, position + len(data)
+        if position <= start:
+            continue
+        yield data[max(0, start - piece_start):None if end is None else end - piece_start]
+        if end is not None and position >= end:
+            return
+    tail = decompressor.flush()
+    if tail and (end is None or position < end):
+        yield tail[max(0, start - position):None if end is None else end - position]
+
+
+class DocumentCompressor:
+    """Decide por archivo si compensa comprimir y arma el binario con cabecera."""
+
+    def __init__(self, level=6, min_saving=0.05):
+        self.level = level
+        self.min_saving = min_saving    # fracción mínima de ahorro para guardar comprimido
+
+    def worth_trying(self, data):
+        """Descarta rápido lo que ya está comprimido o lo que una muestra no reduce."""
+        return self._worth_trying(data, len(data))
+
+    def _worth_trying(self, prefix, size):
+        # `prefix` son los primeros bytes (al menos _SAMPLE_SIZE si el archivo es mayor).
+        if size < 1024 or parse_header(prefix) is not None:
+            return False
+        if bytes(prefix[:4]).startswith(_COMPRESSED_SIGNATURES):
+            return False
+        if size > _SAMPLE_SIZE:
+            sample = bytes(prefix[:_SAMPLE_SIZE])
+            return len(zlib.compress(sample, 1)) <= len(sample) * (1 - self.min_saving)
+        return True
+
+    def encode(self, data):
+        """Devuelve (binario a guardar, True si quedó comprimido)."""
+        if not self.worth_trying(data):
+            return data, False
+        compressed = zlib.compress(data, self.level)
+        if HEADER_SIZE + len(compressed) > len(data) * (1 - self.min_saving):
+            return data, False
+        return _HEADER.pack(MAGIC, CODEC_ZLIB, len(data)) + compressed, True
+
+    def encode_blob(self, blob):
+        """
+        Versión por tramos de encode para un SpooledBlob: devuelve otro SpooledBlob
+        con la cabecera y el contenido comprimido, o None si no compensa. Se
+        abandona en cuanto el resultado supera el ahorro mínimo.
+        """
+        prefix = next(blob.iter_chunks(_SAMPLE_SIZE), b'')
+        if not self._worth_trying(prefix, blob.size):
+            return None
+        limit = blob.size * (1 - self.min_saving)
+        stored = SpooledBlob(hashed=False)
+        stored.write(_HEADER.pack(MAGIC, CODEC_ZLIB, blob.size))
+        compressor = zlib.compressobj(self.level)
+        for chunk in blob.iter_chunks():
+            stored.write(compressor.compress(chunk))
+            if stored.size > limit:
+                stored.close()
+                return None
+        stored.write(compressor.flush())
+        if stored.size > limit:
+            stored.close()
+            return None
+        return stored
@@ -0,0 +1,268 @@
+# RUTA: app/infrastructure/storage/resumable_upload.py
+"""
+Sesiones de subida reanudable (subidas por tramos).
+
+Un archivo grande se envía en tramos numerados de tamaño fijo, cada uno con su
+CRC32. Si la conexión se corta, el cliente consulta cuántos bytes llegaron y
+sigue desde el tramo siguiente, sin volver a enviar los ya recibidos. Los
+tramos se escriben directamente en su posición dentro de un único archivo en
+disco; al finalizar se verifica el tamaño total (y el sha256 si el cliente lo
+indicó) y el archivo se entrega a la ruta de destino (separación del PDF del
+legajo o subida de un documento).
+
+Cada sesión es un directorio bajo la raíz:
+
+    <raíz>/<upload_id>/meta.json    datos de la sesión (dueño, tamaño, recibido...)
+    <raíz>/<upload_id>/data.part    contenido ensamblado (data.final mientras se procesa)
+
+Las sesiones sin actividad durante `ttl` segundos caducan: se ignoran al
+consultarlas y `purge_expired` (llamado al crear sesiones) borra sus archivos.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+import zlib
+
+logger = logging.getLogger(__name__)
+
+_META = 'meta.json'
+_DATA = 'data.part'
+_CLAIMED = 'data.final'           # archivo reservado por una finalización en curso
+_HEX = frozenset('0123456789abcdef')
+
+
+class UploadSessionNotFound(LookupError):
+    """La sesión no existe, caducó o pertenece a otro usuario."""
+    pass
+
+
+class UploadConflict(ValueError):
+    """Tramo fuera de orden o sesión ya en proceso; el cliente debe consultar el estado."""
+    pass
+
+
+class ResumableUploadStore:
+    """Sesiones de subida por tramos guardadas en un directorio local."""
+
+    def __init__(self, root, chunk_size=4 * 1024 * 1024, ttl=24 * 3600, max_size=100 * 1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.chunk_size = chunk_size
+        self.ttl = ttl                      # segundos sin actividad antes de caducar
+        self.max_size = max_size
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()       # serializa escrituras de meta.json en el proceso
+
+    # --- SESIONES ---
+
+    def create(self, owner_id, filename, total_size, destino, params=None, sha256=None):
+        """Abre una sesión y devuelve su estado (ver `status`)."""
+        if not isinstance(total_size, int) or total_size <= 0:
+            raise ValueError("El tamaño del archivo debe ser un entero positivo.")
+        if total_size > self.max_size:
+            raise ValueError(f"Archivo demasiado grande (máx {self.max_size // (1024 * 1024)} MB)")
+        if sha256 is not None:
+            sha256 = str(sha256).lower()
+            if len(sha256) != 64 or not _HEX.issuperset(sha256):
+                raise ValueError("sha256 inválido.")
+        self.purge_expired()
+
+        upload_id = uuid.uuid4().hex
+        session_dir = self._dir(upload_id)
+        os.makedirs(session_dir)
+        with open(os.path.join(session_dir, _DATA), 'wb') as data_file:
+            data_file.truncate(total_size)
+        now = time.time()
+        meta = {
+            'upload_id': upload_id,
+            'owner_id': owner_id,
+            'nombre_archivo': filename,
+            'tamano': total_size,
+            'tamano_tramo': self.chunk_size,
+            'sha256': sha256,
+            'destino': destino,
+            'params': params or {},
+            'crc_tramos': [],               # CRC32 de cada tramo recibido, en orden
+            'creado': now,
+            'actualizado': now,
+        }
+        self._write_meta(meta)
+        logger.info(f"Subida reanudable {upload_id} creada: {filename} ({total_size} bytes, destino {destino})")
+        return self._status(meta)
+
+    def get(self, upload_id, owner_id):
+        """Metadatos de una sesión vigente del usuario; UploadSessionNotFound si no."""
+        meta = self._read_meta(upload_id)
+        if meta is None or meta['owner_id'] != owner_id:
+            raise UploadSessionNotFound(upload_id)
+        if time.time() - meta['actualizado'] >= self.ttl:
+            self.discard(upload_id)
+            raise UploadSessionNotFound(upload_id)
+        return meta
+
+    def status(self, upload_id, owner_id):
+        return self._status(self.get(upload_id, owner_id))
+
+    def put_chunk(self, upload_id, owner_id, index, data, crc32):
+        """
+        Escribe el tramo `index`. Un tramo ya recibido con el mismo CRC32 se
+        acepta sin escribir (reintento tras perder la respuesta); uno posterior
+        al siguiente esperado lanza UploadConflict.
+        """
+        try:
+            expected_crc = int(str(crc32), 16)
+        except ValueError:
+            raise ValueError("Checksum del tramo inválido.")
+        if zlib.crc32(data) != expected_crc:
+            raise ValueError(f"El checksum del tramo {index} no coincide.")
+
+        with self._lock:
+            meta = self.get(upload_id, owner_id)
+            received = len(meta['crc_tramos'])
+            total_chunks = self._total_chunks(meta)
+            if index < 0 or index >= total_chunks:
+                raise ValueError(f"Tramo {index} fuera de rango (0-{total_chunks - 1}).")
+            if index < received:
+                if meta['crc_tramos'][index] != expected_crc:
+                    raise ValueError(f"El tramo {index} ya se recibió con otro contenido.")
+                return self._status(meta)
+            if index > received:
+                raise UploadConflict(f"Se esperaba el tramo {received}, no el {index}.")
+
+            offset = index * meta['tamano_tramo']
+            expected_size = min(meta['tamano_tramo'], meta['tamano'] - offset)
+            if len(data) != expected_size:
+                raise ValueError(f"El tramo {index} debe tener {expected_size} bytes (recibidos {len(data)}).")
+
+            with open(os.path.join(self._dir(upload_id), _DATA), 'r+b') as data_file:
+                data_file.seek(offset)
+                data_file.write(data)
+                data_file.flush()
+                os.fsync(data_file.fileno())
+            meta['crc_tramos'].append(expected_crc)
+            meta['actualizado'] = time.time()
+            self._write_meta(meta)
+        return self._status(meta)
+
+    def finalize(self, upload_id, owner_id):
+        """
+        Comprueba que la sesión esté completa (y su sha256, si se indicó) y la
+        reserva para procesarla: devuelve sus metadatos con la ruta del archivo
+        ensamblado en 'ruta'. Si la sesión ya se procesó, devuelve los metadatos
+        con su 'resultado' (el cliente reintentó tras perder la respuesta).
+        Tras procesar se llama a `complete` o, si falló y puede reintentarse, a `release`.
+        """
+        meta = self.get(upload_id, owner_id)
+        if meta.get('resultado') is not None:
+            return dict(meta, ruta=None)
+        if len(meta['crc_tramos']) < self._total_chunks(meta):
+            raise ValueError("La subida no está completa.")
+        session_dir = self._dir(upload_id)
+        path = os.path.join(session_dir, _CLAIMED)
+        try:
+            # El renombrado es atómico: solo una petición se queda con el archivo.
+            os.rename(os.path.join(session_dir, _DATA), path)
+        except FileNotFoundError:
+            raise UploadConflict("La subida ya se está procesando.")
+        if meta['sha256']:
+            sha = hashlib.sha256()
+            with open(path, 'rb') as data_file:
+                for chunk in iter(lambda: data_file.read(1024 * 1024), b''):
+                    sha.update(chunk)
+            if sha.hexdigest() != meta['sha256']:
+                self.discard(upload_id)
+                raise ValueError("El sha256 del archivo recibido no coincide.")
+        return dict(meta, ruta=path)
+
+    def complete(self, upload_id, resultado):
+        """Guarda el resultado del procesamiento y borra el archivo; la sesión queda hasta caducar."""
+        with self._lock:
+            meta = self._read_meta(upload_id)
+            if meta is None:
+                return
+            meta['resultado'] = resultado
+            meta['actualizado'] = time.time()
+            self._write_meta(meta)
+        try:
+            os.remove(os.path.join(self._dir(upload_id), _CLAIMED))
+        except FileNotFoundError:
+            pass
+
+    def release(self, upload_id):
+        """Devuelve una sesión reservada por `finalize` para que pueda volver a finalizarse."""
+        session_dir = self._dir(upload_id)
+        try:
+            os.rename(os.path.join(session_dir, _CLAIMED), os.path.join(session_dir, _DATA))
+        except FileNotFoundError:
+            pass
+
+    def discard(self, upload_id):
+        """Borra la sesión y su archivo."""
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+
+    def purge_expired(self):
+        """Borra las sesiones sin actividad durante más de `ttl` segundos. Devuelve cuántas."""
+        removed = 0
+        now = time.time()
+        for upload_id in os.listdir(self.root):
+            meta = self._read_meta(upload_id) if _is_upload_id(upload_id) else None
+            if meta is None:
+                # Directorio a medio crear o ajeno: se borra cuando ya es viejo.
+                path = os.path.join(self.root, upload_id)
+                if os.path.isdir(path) and now - os.path.getmtime(path) >= self.ttl:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            if now - meta['actualizado'] >= self.ttl:
+                self.discard(upload_id)
+                removed += 1
+        if removed:
+            logger.info(f"Subidas reanudables caducadas eliminadas: {removed}")
+        return removed
+
+    # --- AUXILIARES ---
+
+    def _dir(self, upload_id):
+        if not _is_upload_id(upload_id):
+            raise UploadSessionNotFound(upload_id)
+        return os.path.join(self.root, upload_id)
+
+    def _read_meta(self, upload_id):
+        try:
+            with open(os.path.join(self._dir(upload_id), _META), encoding='utf-8') as meta_file:
+                return json.load(meta_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_meta(self, meta):
+        # Escritura atómica: un corte a mitad no deja un meta.json truncado.
+        path = os.path.join(self._dir(meta['upload_id']), _META)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _total_chunks(meta):
+        return -(-meta['tamano'] // meta['tamano_tramo'])
+
+    def _status(self, meta):
+        received_chunks = len(meta['crc_tramos'])
+        return {
+            'upload_id': meta['upload_id'],
+            'nombre_archivo': meta['nombre_archivo'],
+            'tamano': meta['tamano'],
+            'tamano_tramo': meta['tamano_tramo'],
+            'total_tramos': self._total_chunks(meta),
+            'siguiente_tramo': received_chunks,
+            'recibido': min(received_chunks * meta['tamano_tramo'], meta['tamano']),
+            'expira': meta['actualizado'] + self.ttl,
+        }
+
+
+def _is_upload_id(value):
+    return isinstance(value, str) and len(value) == 32 and _HEX.issuperset(value)
@@ -0,0 +1,59 @@
+# RUTA: app/infrastructure/storage/spool.py
+"""
+Archivo temporal que se escribe una vez y se lee por tramos.
+
+Los archivos subidos se copian aquí mientras se validan (app/application/services/
+upload_ingest.py). Hasta `max_memory` bytes quedan en memoria; por encima,
+tempfile los pasa a disco, de modo que la memoria por subida no depende del
+tamaño del archivo. El sha256 se calcula mientras se escribe.
+"""
+
+import hashlib
+import tempfile
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class SpooledBlob:
+    """Contenido binario en un SpooledTemporaryFile, con tamaño y sha256."""
+
+    def __init__(self, max_memory=DEFAULT_CHUNK_SIZE, directory=None, hashed=True):
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory, dir=directory)
+        self._sha = hashlib.sha256() if hashed else None
+        self.size = 0
+
+    @property
+    def sha256(self):
+        return self._sha.hexdigest() if self._sha else None
+
+    def write(self, chunk):
+        if not chunk:
+            return
+        self._file.write(chunk)
+        if self._sha:
+            self._sha.update(chunk)
+        self.size += len(chunk)
+
+    def iter_chunks(self, chunk_size=DEFAULT_CHUNK_SIZE, start=0):
+        """Generador que relee el contenido desde `start` en tramos de `chunk_size` bytes."""
+        self._file.seek(start)
+        while True:
+            chunk = self._file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def read(self):
+        """Contenido completo (solo para los llamadores que necesitan bytes)."""
+        self._file.seek(0)
+        return self._file.read()
+
+    def close(self):
+        """Libera la memoria o borra el archivo temporal."""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,126 @@
+# RUTA: app/presentation/routes/job_routes.py
+"""
+Seguimiento de las tareas en segundo plano (JobService).
+
+    GET /tareas                       tareas recientes del usuario
+    GET /tareas/<id>                  página de la tarea (avance, resultado, descarga)
+    GET /tareas/<id>/estado           estado en JSON (static/js/estado_tarea.js)
+    GET /tareas/<id>/eventos          estado como Server-Sent Events (clientes de la API)
+    GET /tareas/<id>/descargar        archivo de resultado
+"""
+
+import json
+import logging
+import time
+from datetime import datetime, timezone
+
+from flask import Blueprint, Response, current_app, flash, jsonify, redirect, render_template, send_file, \
+    stream_with_context, url_for
+from flask_login import current_user, login_required
+
+from app import limiter
+from app.decorators import role_required
+
+logger = logging.getLogger(__name__)
+
+tareas_bp = Blueprint('tareas', __name__, url_prefix='/tareas')
+
+ROLES_TAREAS = ('AdministradorLegajos', 'RRHH', 'Sistemas')
+
+# Una conexión de eventos ocupa un hilo de Waitress mientras dura: se cierra
+# pasados estos segundos y el cliente se vuelve a conectar (campo `retry`).
+SSE_DURACION_MAXIMA = 5
+SSE_INTERVALO = 1
+SSE_REINTENTO_MS = 3000
+
+
+def _dueno_tarea():
+    # Sistemas ve todas las tareas; el resto, solo las suyas.
+    return None if current_user.rol == 'Sistemas' else current_user.id
+
+
+def _para_vista(tarea):
+    # Las marcas de tiempo se guardan en segundos epoch; la vista usa el filtro localtime (UTC naive).
+    vista = dict(tarea)
+    for campo in ('creada', 'iniciada', 'terminada'):
+        if tarea.get(campo):
+            vista[campo] = datetime.fromtimestamp(tarea[campo], timezone.utc).replace(tzinfo=None)
+    return vista
+
+
+@tareas_bp.route('')
+@login_required
+@role_required(*ROLES_TAREAS)
+def listar_tareas():
+    tareas = current_app.config['JOB_SERVICE'].listar(_dueno_tarea())
+    return render_template('tareas/listar.html', tareas=[_para_vista(tarea) for tarea in tareas])
+
+
+@tareas_bp.route('/<tarea_id>')
+@login_required
+@role_required(*ROLES_TAREAS)
+def ver_tarea(tarea_id):
+    tarea = current_app.config['JOB_SERVICE'].estado(tarea_id, _dueno_tarea())
+    if tarea is None:
+        flash('La tarea solicitada no existe o ya caducó.', 'danger')
+        return redirect(url_for('tareas.listar_tareas'))
+    return render_template('tareas/estado.html', tarea=_para_vista(tarea))
+
+
+@tareas_bp.route('/<tarea_id>/estado')
+@login_required
+@role_required(*ROLES_TAREAS)
+# La página de la tarea consulta cada 3 s: el límite general (50 por hora) no alcanza.
+@limiter.limit("2000 per hour")
+def estado_tarea(tarea_id):
+    """Estado de la tarea en JSON."""
+    tarea = current_app.config['JOB_SERVICE'].estado(tarea_id, _dueno_tarea())
+    if tarea is None:
+        return jsonify({'exito': False, 'error': 'La tarea no existe.'}), 404
+    return jsonify(dict(tarea, exito=True))
+
+
+@tareas_bp.route('/<tarea_id>/eventos')
+@login_required
+@role_required(*ROLES_TAREAS)
+@limiter.limit("2000 per hour")
+def eventos_tarea(tarea_id):
+    """
+    Estado de la tarea como Server-Sent Events: se envía cada vez que cambia y la
+    conexión se cierra cuando la tarea termina o tras SSE_DURACION_MAXIMA segundos.
+    """
+    job_service = current_app.config['JOB_SERVICE']
+    dueno = _dueno_tarea()
+    if job_service.estado(tarea_id, dueno) is None:
+        return jsonify({'exito': False, 'error': 'La tarea no existe.'}), 404
+
+    def generar():
+        yield f"retry: {SSE_REINTENTO_MS}\n\n"
+        limite = time.monotonic() + SSE_DURACION_MAXIMA
+        anterior = None
+        while True:
+            tarea = job_service.estado(tarea_id, dueno)
+            if tarea is None:
+                return
+            datos = json.dumps(dict(tarea, exito=True), default=str)
+            if datos != anterior:
+                anterior = datos
+                yield f"data: {datos}\n\n"
+            if tarea['finalizada'] or time.monotonic() >= limite:
+                return
+            time.sleep(SSE_INTERVALO)
+
+    return Response(stream_with_context(generar()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@tareas_bp.route('/<tarea_id>/descargar')
+@login_required
+@role_required(*ROLES_TAREAS)
+def descargar_tarea(tarea_id):
+    artefacto = current_app.config['JOB_SERVICE'].artefacto(tarea_id, _dueno_tarea())
+    if artefacto is None:
+        flash('El resultado de la tarea no está disponible.', 'warning')
+        return redirect(url_for('tareas.ver_tarea', tarea_id=tarea_id))
+    ruta, nombre_descarga = artefacto
+    return send_file(ruta, as_attachment=True, download_name=nombre_descarga)
@@ -3,14 +3,16 @@
 
 import io
 import mimetypes
+import unicodedata
+from urllib.parse import quote
 import pyodbc
-from flask import Blueprint, jsonify, render_template, redirect, send_file, url_for, flash, request, current_app
+from flask import Blueprint, Response, jsonify, render_template, redirect, send_file, stream_with_context, url_for, flash, request, current_app
 from flask_login import login_required, current_user
 from app.decorators import role_required
 from app.application.forms import PersonalForm, DocumentoForm, FiltroPersonalForm, BulkUploadForm,ContratoInicialForm
-from app.application.services.file_validation_service import FileValidationService
 from app.domain.models.personal import Personal
 from app.core.security import IDORProtection
+from app.utils.http_range import MAX_RANGES, content_range, multipart_byteranges, resolve_ranges
 from datetime import datetime
 legajo_bp = Blueprint('legajo', __name__, url_prefix='/legajo')
 
@@ -23,15 +25,21 @@ def carga_masiva_personal():
         file_storage = form.excel_file.data
         try:
             legajo_service = current_app.config['LEGAJO_SERVICE']
-            resultado = legajo_service.process_bulk_upload(file_storage, current_user.id)
-            
-            flash(f"Proceso de carga masiva completado. Registros exitosos: {resultado['exitosos']}", 'success')
-            if resultado['fallidos'] > 0:
-                # Si hubo errores, se muestran en un mensaje separado.
-                errores_str = "; ".join(resultado['errores'])
-                flash(f"Registros fallidos: {resultado['fallidos']}. Detalles: {errores_str}", 'danger')
-
-            return redirect(url_for('legajo.listar_personal'))
+            job_service = current_app.config['JOB_SERVICE']
+            filename = file_storage.filename
+            entrada = 'entrada.' + filename.rsplit('.', 1)[-1].lower()
+            user_id = current_user.id
+            batch_size = current_app.config['BULK_IMPORT_BATCH_SIZE']
+
+            # El archivo se procesa en segundo plano; el avance y el informe de
+            # errores quedan en la página de la tarea.
+            def cargar(tarea):
+                return legajo_service.process_bulk_upload_job(tarea, entrada, filename, user_id, batch_size)
+
+            tarea_id = job_service.enviar('carga_masiva', user_id, f"Carga masiva de personal: {filename}",
+                                          cargar, entradas={entrada: file_storage})
+            flash("El archivo se está procesando en segundo plano. Puede seguir el avance en esta página.", 'info')
+            return redirect(url_for('tareas.ver_tarea', tarea_id=tarea_id))
         except Exception as e:
             current_app.logger.error(f"Error crítico en carga masiva: {e}")
             flash(f"Ocurrió un error inesperado al procesar el archivo: {e}", 'danger')
@@ -110,7 +118,8 @@ def ver_legajo(personal_id):
         
         legajo_service = current_app.config['LEGAJO_SERVICE']
         # Seguridad: Pasar el usuario actual al servicio para la validación de permisos (IDOR).
-        legajo_completo = legajo_service.get_personal_details(personal_id, current_user)
+        # Solo la cabecera: los documentos de cada sección los pide el acordeón al abrirse.
+        legajo_completo = legajo_service.get_legajo_header(personal_id, current_user)
     except PermissionError as e:
         # Seguridad: Capturar el error de permiso y mostrar un mensaje claro.
         flash(str(e), 'danger')
@@ -142,6 +151,30 @@ def ver_legajo(personal_id):
         today=datetime.now().date()
     )
 
+@legajo_bp.route('/api/personal/<int:personal_id>/legajo/<string:seccion>', methods=['GET'])
+@login_required
+@role_required('AdministradorLegajos', 'RRHH', 'Sistemas')
+def api_legajo_seccion(personal_id, seccion):
+    """
+    Una parte del legajo en JSON (personal, estudios, capacitaciones, contratos,
+    historial_laboral, licencias o documentos), para cargar el acordeón por
+    secciones. Con ?id_seccion=N los documentos se limitan a esa sección.
+    """
+    if not IDORProtection.can_access_personal(current_user.id, personal_id, current_user.rol):
+        current_app.logger.warning(f"SEGURIDAD: Intento IDOR detectado - Usuario {current_user.username} intentó acceder a personal_id {personal_id}")
+        return jsonify({"error": "No tienes permiso para acceder a este legajo."}), 403
+    try:
+        legajo_service = current_app.config['LEGAJO_SERVICE']
+        datos = legajo_service.get_legajo_section(personal_id, seccion, request.args.get('id_seccion', type=int))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        current_app.logger.error(f"Error en API de legajo ({seccion}) para personal {personal_id}: {e}")
+        return jsonify({"error": "No se pudieron cargar los datos"}), 500
+    if datos is None:
+        return jsonify({"error": "El legajo solicitado no existe."}), 404
+    return jsonify(datos)
+
 @legajo_bp.route('/personal')
 @login_required
 @role_required('AdministradorLegajos', 'RRHH', 'Sistemas')
@@ -151,14 +184,17 @@ def listar_personal():
     filters = {'dni': form.dni.data, 'nombres': form.nombres.data}
     
     legajo_service = current_app.config['LEGAJO_SERVICE']
-    pagination = legajo_service.get_all_personal_paginated(page, 15, filters)
+    pagination = legajo_service.get_personal_list_page(filters, page, request.args.get('cursor'), 15)
+    # Filtros actuales para los enlaces de paginación (sin la posición).
+    query_args = {k: v for k, v in request.args.items() if k not in ('page', 'cursor')}
     
     # Nueva lógica para obtener el estado de los documentos
-    document_status = legajo_service.check_document_status_for_all_personal()
+    document_status = legajo_service.get_document_status_for_page(pagination.items)
     
     return render_template('admin/listar_personal.html', 
                            form=form, 
                            pagination=pagination,
+                           query_args=query_args,
                            document_status=document_status)
 
 @legajo_bp.route('/personal/nuevo', methods=['GET', 'POST'])
@@ -275,21 +311,16 @@ def subir_documento(personal_id):
     
     if form.validate_on_submit():
         try:
-            # ✅ SEGURIDAD: Validar archivo antes de procesarlo
+            # ✅ SEGURIDAD: el servicio valida el archivo (Magic Number, contenido activo
+            # en PDFs, tamaño) en la misma lectura con la que lo guarda.
             archivo = form.archivo.data
-            is_valid, error_message = FileValidationService.validate_file(archivo)
-            if not is_valid:
-                current_app.logger.warning(f"SEGURIDAD: Intento de subir archivo inválido - {archivo.filename} - Error: {error_message} - Usuario: {current_user.username}")
-                flash(error_message or 'El archivo no es válido o contiene código malicioso.', 'danger')
-                return redirect(url_for('legajo.ver_legajo', personal_id=personal_id))
-            
             form_data = form.data
             form_data['id_personal'] = personal_id
             legajo_service.upload_document_to_personal(form_data, archivo, current_user.id)
             flash('Documento subido correctamente.', 'success')
         except ValueError as ve:
-            # Captura errores de validación específicos del servicio (ej. tamaño de archivo)
-            current_app.logger.warning(f"Error de validación al subir documento para personal {personal_id}: {ve}")
+            # Captura errores de validación específicos del servicio (ej. tipo o tamaño de archivo)
+            current_app.logger.warning(f"SEGURIDAD: Archivo rechazado al subir documento para personal {personal_id} - Error: {ve} - Usuario: {current_user.username}")
             flash(str(ve), 'danger')
         except Exception as e:
             current_app.logger.error(f"Error inesperado al subir documento para personal {personal_id}: {e}")
@@ -358,7 +389,7 @@ def editar_personal(personal_id):
     legajo_service = current_app.config['LEGAJO_SERVICE']
     
     # Se pasa current_user para validaciones de seguridad en el servicio
-    legajo_data = legajo_service.get_personal_details(personal_id, current_user)
+    legajo_data = legajo_service.get_legajo_header(personal_id, current_user)
     if not legajo_data or not legajo_data.get('personal'):
         flash('El legajo que intenta editar no existe.', 'danger')
         return redirect(url_for('legajo.listar_personal'))
@@ -400,21 +431,88 @@ def ver_documento(documento_id):
     # -------------------------------------
 
     try:
-        document = legajo_service.get_document_for_download(documento_id)
+        document = legajo_service.get_document_stream(documento_id)
         
-        if not document or not document.get('data'):
+        if not document:
             flash('El documento no fue encontrado.', 'danger')
             return redirect(request.referrer or url_for('index'))
 
-        return send_file(
-            io.BytesIO(document['data']),
-            as_attachment=False,
-            download_name=document['filename']
+        mimetype, _ = mimetypes.guess_type(document['filename'])
+        return _stream_document(
+            document,
+            mimetype or 'application/octet-stream',
+            as_attachment=request.args.get('download') == '1'
         )
     except Exception as e:
         current_app.logger.error(f"Error al visualizar documento {documento_id}: {e}")
         flash('Ocurrió un error al intentar mostrar el archivo.', 'danger')
         return redirect(request.referrer or url_for('index'))
+
+
+def _stream_document(document, mimetype, as_attachment):
+    """
+    Envía un documento de `get_document_stream` sin cargarlo entero en memoria:
+    cada tramo se lee de la BD cuando el servidor WSGI lo va a escribir.
+
+    Atiende peticiones Range (uno o varios rangos, 206 Partial Content) leyendo
+    de la BD solo los bytes pedidos, como hacen los visores de PDF.
+    """
+    size = document['size']
+    read = document['read']
+    status = 200
+    content_type = mimetype
+    headers = {'Accept-Ranges': 'bytes'}
+
+    byte_range = request.range if _if_range_matches(document) else None
+    if byte_range is not None and byte_range.units == 'bytes' and len(byte_range.ranges) <= MAX_RANGES:
+        ranges = resolve_ranges(byte_range.ranges, size)
+        if not ranges:
+            response = Response(status=416)
+            response.headers['Content-Range'] = f"bytes */{size}"
+            return response
+        status = 206
+        if len(ranges) == 1:
+            start, stop = ranges[0]
+            headers['Content-Range'] = content_range(start, stop, size)
+            length, body = stop - start, read(start, stop)
+        else:
+            content_type, length, body = multipart_byteranges(ranges, size, mimetype, read)
+    else:
+        length, body = size, read(0, size)
+
+    def generate():
+        try:
+            yield from body
+        except Exception as e:
+            # Las cabeceras ya se enviaron: solo queda registrar y cortar la respuesta.
+            current_app.logger.error(f"Error enviando el documento '{document['filename']}': {e}")
+
+    response = Response(stream_with_context(generate()), status=status, content_type=content_type, headers=headers)
+    response.content_length = length
+    if document.get('hash'):
+        response.set_etag(document['hash'])
+    _set_content_disposition(response, 'attachment' if as_attachment else 'inline', document['filename'])
+    return response
+
+
+def _if_range_matches(document):
+    # Sin If-Range se atiende el Range; con If-Range solo si coincide el ETag
+    # (hash del archivo). Si no coincide se envía el archivo completo.
+    if_range = request.if_range
+    if if_range.etag is None and if_range.date is None:
+        return True
+    return bool(document.get('hash')) and if_range.etag == document['hash']
+
+
+def _set_content_disposition(response, disposition, filename):
+    # Igual que send_file: nombre ASCII de respaldo y filename* en UTF-8 si hace falta.
+    try:
+        filename.encode('ascii')
+        names = {'filename': filename}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        names = {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='!#$&+^`|~')}"}
+    response.headers.set('Content-Disposition', disposition, **names)
     
 
 @legajo_bp.route('/documento/<int:documento_id>/eliminar', methods=['POST'])
@@ -458,9 +556,9 @@ def visualizar_documento(documento_id):
     # -------------------------------------
 
     try:
-        document = legajo_service.get_document_for_download(documento_id)
+        document = legajo_service.get_document_stream(documento_id)
         
-        if not document or not document.get('data'):
+        if not document:
             flash('El documento no fue encontrado.', 'danger')
             return redirect(request.referrer or url_for('index'))
 
@@ -475,12 +573,7 @@ def visualizar_documento(documento_id):
 
         should_be_attachment = mimetype not in SAFE_INLINE_MIMETYPES
 
-        return send_file(
-            io.BytesIO(document['data']),
-            mimetype=mimetype,
-            as_attachment=should_be_attachment,
-            download_name=document['filename']
-        )
+        return _stream_document(document, mimetype, as_attachment=should_be_attachment)
     except Exception as e:
         current_app.logger.error(f"Error al visualizar documento {documento_id}: {e}")
         flash('Error visualizando archivo.', 'danger')
@@ -503,25 +596,23 @@ def check_dni(dni):
 @role_required('AdministradorLegajos', 'RRHH', 'Sistemas')
 def exportar_lista_general_excel():
     """
-    Genera y descarga un archivo Excel con el reporte general de todo el personal.
+    Genera en segundo plano el reporte general de todo el personal en Excel;
+    el archivo se descarga desde la página de la tarea.
     """
     try:
         legajo_service = current_app.config['LEGAJO_SERVICE']
-        
-        # Llama al método existente que genera el reporte en memoria
-        excel_stream = legajo_service.generate_general_report_excel()
-        
-        # Registrar en auditoría
         audit_service = current_app.config['AUDIT_SERVICE']
-        audit_service.log(current_user.id, 'Reportes', 'EXPORTAR_GENERAL_EXCEL', "Exportó el reporte general de personal a Excel.")
-
-        # Enviar el archivo al usuario
-        return send_file(
-            excel_stream,
-            as_attachment=True,
-            download_name='Reporte_General_Personal.xlsx',
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        user_id = current_user.id
+
+        def exportar(tarea):
+            resultado = legajo_service.generate_general_report_job(tarea, 'Reporte_General_Personal.xlsx')
+            # Registrar en auditoría
+            audit_service.log(user_id, 'Reportes', 'EXPORTAR_GENERAL_EXCEL', "Exportó el reporte general de personal a Excel.")
+            return resultado
+
+        tarea_id = current_app.config['JOB_SERVICE'].enviar(
+            'reporte_excel', user_id, "Reporte general de personal (Excel)", exportar)
+        return redirect(url_for('tareas.ver_tarea', tarea_id=tarea_id))
     except Exception as e:
         current_app.logger.error(f"Error al exportar el reporte general a Excel: {e}")
         flash('Ocurrió un error al generar el reporte de Excel.', 'danger')
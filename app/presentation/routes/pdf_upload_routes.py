@@ -3,12 +3,15 @@
 Rutas para carga masiva y separación de PDFs de legajos.
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, send_file
 from flask_login import login_required, current_user
+from app import limiter
+from app.application.forms import BatchDigitizationForm
 from app.application.services.pdf_split_service import PdfSplitService
 from app.core.security import IDORProtection
+from app.decorators import role_required
 from werkzeug.utils import secure_filename
-import os
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -191,6 +194,159 @@ ESTRUCTURA_LEGAJO_DEFAULT = {
 }
 
 
+def resolver_estructura(estructura_enviada, id_personal):
+    """
+    Estructura con la que se separa el PDF: la enviada en el formulario (JSON),
+    la guardada en la BD para el personal o, si no hay ninguna, la por defecto.
+    """
+    # Obtener la estructura personalizada
+    estructura_a_usar = ESTRUCTURA_LEGAJO_DEFAULT
+
+    # PRIMERO: intentar obtener la estructura enviada en el formulario
+    if estructura_enviada and estructura_enviada != '{}':
+        try:
+            import json
+            estructura_a_usar = json.loads(estructura_enviada)
+            if not isinstance(estructura_a_usar, dict):
+                raise ValueError("Estructura debe ser un objeto JSON")
+            logger.info(f"Usando estructura personalizada recibida del cliente para personal {id_personal}")
+        except Exception as e:
+            logger.warning(f"Error validando estructura enviada: {e}, usando por defecto")
+            estructura_a_usar = ESTRUCTURA_LEGAJO_DEFAULT
+
+    # SEGUNDA OPCIÓN: Si no vino en el formulario, obtener de la BD
+    if not estructura_a_usar or estructura_a_usar == ESTRUCTURA_LEGAJO_DEFAULT:
+        try:
+            from app.infrastructure.persistence.estructura_repository import EstructuraRepository
+            estructura_bd = EstructuraRepository.obtener_estructura_json(id_personal)
+            if estructura_bd:
+                estructura_a_usar = estructura_bd
+        except Exception as e:
+            logger.warning(f"Error obteniendo estructura de BD: {e}, usando por defecto")
+            estructura_a_usar = ESTRUCTURA_LEGAJO_DEFAULT
+
+    return estructura_a_usar
+
+
+def _datos_pieza(nombre_doc, estructura_a_usar):
+    """(tipo_documento, id_seccion, descripcion) de una parte según la estructura o la por defecto."""
+    for estructura in (estructura_a_usar, ESTRUCTURA_LEGAJO_DEFAULT):
+        doc_info = estructura.get(nombre_doc)
+        if isinstance(doc_info, dict):
+            return (doc_info.get('tipo_documento', nombre_doc), doc_info.get('id_seccion'),
+                    doc_info.get('descripcion') or f"Documento: {nombre_doc}")
+    return nombre_doc, None, f"Documento: {nombre_doc}"
+
+
+def _resolver_tipo(tipo_documento, tipos_disponibles):
+    """ID del tipo de documento: coincidencia exacta, luego parcial, luego el primero (o 1)."""
+    buscado = tipo_documento.lower()
+    for tipo_id, tipo_nombre in tipos_disponibles:
+        if tipo_nombre.lower() == buscado:
+            return tipo_id
+    for tipo_id, tipo_nombre in tipos_disponibles:
+        if buscado in tipo_nombre.lower() or tipo_nombre.lower() in buscado:
+            return tipo_id
+    return tipos_disponibles[0][0] if tipos_disponibles else 1
+
+
+def procesar_pdf_legajo(origen, estructura_a_usar, id_personal, user_id):
+    """
+    Separa el PDF del legajo (ruta o archivo abierto) en memoria según la
+    estructura y guarda todas las partes en una sola transacción. Devuelve un
+    resumen con lo guardado y los tiempos (por parte y de la BD); lanza
+    ValueError si el PDF no se pudo separar.
+    """
+    legajo_service = current_app.config.get('LEGAJO_SERVICE')
+    personal_repo = current_app.config.get('PERSONAL_REPOSITORY')
+
+    pdf_service = PdfSplitService()
+    limites = {
+        'max_size': current_app.config['MAX_CONTENT_LENGTH'],
+        'max_memory': current_app.config.get('UPLOAD_SPOOL_MAX_MEMORY', 1024 * 1024),
+    }
+    splitter = current_app.config.get('PDF_SPLITTER')
+    inicio = time.perf_counter()
+    if splitter:
+        # Las páginas se extraen en el pool de procesos; este hilo no retiene el GIL mientras tanto.
+        resultados = pdf_service.separar_legajo_en_paralelo(origen, estructura_a_usar, splitter, id_personal, **limites)
+    else:
+        resultados = pdf_service.separar_legajo_en_memoria(origen, estructura_a_usar, id_personal, **limites)
+    if 'error' in resultados:
+        raise ValueError(f"Error al procesar PDF: {resultados['error']}")
+    segundos_separacion = round(time.perf_counter() - inicio, 4)
+
+    # El catálogo de tipos se consulta una sola vez para todas las partes.
+    try:
+        tipos_disponibles = personal_repo.get_tipos_documento_for_select() if personal_repo else []
+    except Exception as e:
+        logger.error(f"Error buscando tipo doc: {e}")
+        tipos_disponibles = []
+
+    documentos = []
+    piezas = []
+    try:
+        for nombre_doc, info in resultados.items():
+            pieza = {'nombre': nombre_doc, 'paginas': info.get('paginas'), 'exito': info.get('exito', False),
+                     'segundos': info.get('segundos'), 'error': info.get('error')}
+            piezas.append(pieza)
+            if not info.get('exito'):
+                continue
+            tipo_documento, id_seccion, descripcion_real = _datos_pieza(nombre_doc, estructura_a_usar)
+            form_data = {
+                'id_personal': id_personal,
+                'id_tipo': _resolver_tipo(tipo_documento, tipos_disponibles),
+                'id_seccion': id_seccion if id_seccion else 1,
+                'fecha_emision': None,
+                'fecha_vencimiento': None,
+                'descripcion': descripcion_real,
+            }
+            documentos.append((form_data, info['contenido']))
+            pieza['bytes'] = info['contenido'].size
+
+        segundos_bd = legajo_service.upload_documents_bulk(documentos, user_id) if legajo_service else 0.0
+    finally:
+        for info in resultados.values():
+            if info.get('contenido'):
+                info['contenido'].close()
+
+    resumen = {
+        'guardados': len(documentos) if legajo_service else 0,
+        'fallidos': sum(1 for pieza in piezas if not pieza['exito']),
+        'segundos_separacion': segundos_separacion,
+        'segundos_bd': segundos_bd,
+        'piezas': piezas,
+    }
+    logger.info(
+        f"[ID {id_personal}] PDF de legajo procesado: {resumen['guardados']} partes guardadas en una transacción, "
+        f"{resumen['fallidos']} con error; separación {segundos_separacion} s, BD {segundos_bd} s"
+    )
+    return resumen
+
+
+def enviar_separacion_pdf(archivo, nombre_archivo, estructura_a_usar, id_personal, user_id):
+    """
+    Registra la separación del PDF del legajo como tarea en segundo plano
+    (JobService) y devuelve su id. `archivo` es el archivo subido o la ruta del
+    archivo ya ensamblado (subida reanudable); se guarda en el directorio de la tarea.
+    """
+    def separar(tarea):
+        tarea.avanzar(5, "Separando el PDF")
+        resumen = procesar_pdf_legajo(tarea.ruta('legajo.pdf'), estructura_a_usar, id_personal, user_id)
+        tarea.avanzar(100, "Documentos guardados")
+        return {
+            'mensaje': f"PDF procesado exitosamente. {resumen['guardados']} documentos separados y guardados.",
+            'guardados': resumen['guardados'],
+            'fallidos': resumen['fallidos'],
+            'errores': [f"{pieza['nombre']}: {pieza['error'] or 'no se pudo separar'}"
+                        for pieza in resumen['piezas'] if not pieza['exito']],
+        }
+
+    return current_app.config['JOB_SERVICE'].enviar(
+        'separar_pdf', user_id, f"Separación del PDF de legajo {secure_filename(nombre_archivo)}",
+        separar, entradas={'legajo.pdf': archivo})
+
+
 @pdf_bp.route('/upload', methods=['GET', 'POST'])
 @pdf_bp.route('/upload/<int:personal_id>', methods=['GET', 'POST'])
 @login_required
@@ -215,9 +371,6 @@ def upload_legajo_pdf(personal_id=None):
         flash('No tienes permiso para acceder a este personal.', 'danger')
         return redirect(url_for('legajo.listar_personal'))
 
-    legajo_service = current_app.config.get('LEGAJO_SERVICE')
-    personal_repo = current_app.config.get('PERSONAL_REPOSITORY')
-
     if request.method == 'POST':
         try:
             # Verificar que se envió un archivo
@@ -241,160 +394,13 @@ def upload_legajo_pdf(personal_id=None):
                 flash('Solo se aceptan archivos PDF.', 'danger')
                 return redirect(request.url)
 
-            # Guardar el archivo temporalmente
-            filename = secure_filename(file.filename)
-            temp_path = os.path.join('temp_uploads', filename)
-            os.makedirs('temp_uploads', exist_ok=True)
-            file.save(temp_path)
-
-            logger.info(f"PDF cargado: {temp_path} para personal ID {id_personal}")
+            # El PDF se guarda en el directorio de la tarea y se separa en segundo plano.
+            logger.info(f"PDF cargado: {secure_filename(file.filename)} para personal ID {id_personal}")
 
-            # Obtener la estructura personalizada
-            estructura_a_usar = ESTRUCTURA_LEGAJO_DEFAULT
-            
-            # PRIMERO: intentar obtener la estructura enviada en el formulario
-            estructura_enviada = request.form.get('estructura_json')
-            
-            if estructura_enviada and estructura_enviada != '{}':
-                try:
-                    import json
-                    estructura_a_usar = json.loads(estructura_enviada)
-                    if not isinstance(estructura_a_usar, dict):
-                        raise ValueError("Estructura debe ser un objeto JSON")
-                    logger.info(f"Usando estructura personalizada recibida del cliente para personal {id_personal}")
-                except Exception as e:
-                    logger.warning(f"Error validando estructura enviada: {e}, usando por defecto")
-                    estructura_a_usar = ESTRUCTURA_LEGAJO_DEFAULT
-            
-            # SEGUNDA OPCIÓN: Si no vino en el formulario, obtener de la BD
-            if not estructura_a_usar or estructura_a_usar == ESTRUCTURA_LEGAJO_DEFAULT:
-                try:
-                    from app.infrastructure.persistence.estructura_repository import EstructuraRepository
-                    estructura_bd = EstructuraRepository.obtener_estructura_json(id_personal)
-                    if estructura_bd:
-                        estructura_a_usar = estructura_bd
-                except Exception as e:
-                    logger.warning(f"Error obteniendo estructura de BD: {e}, usando por defecto")
-                    estructura_a_usar = ESTRUCTURA_LEGAJO_DEFAULT
-
-            # Usar el servicio de separación
-            pdf_service = PdfSplitService('temp_pdfs')
-            resultados = pdf_service.separar_legajo(
-                temp_path, 
-                estructura_a_usar, 
-                id_personal
-            )
-
-            if 'error' in resultados:
-                flash(f"Error al procesar PDF: {resultados['error']}", 'danger')
-                return redirect(request.url)
-
-            documentos_guardados = 0
-            
-            for nombre_doc, info in resultados.items():
-                # Verificar que el documento se separó exitosamente
-                if isinstance(info, dict) and info.get('exito') == True:
-                    archivo_path = info.get('archivo')
-                    nombre_archivo = info.get('nombre_archivo')
-                    
-                    # --- CORRECCIÓN DE DESCRIPCIÓN ---
-                    tipo_documento = None
-                    id_seccion = None
-                    descripcion_real = None
-
-                    # Buscar en estructura personalizada
-                    for doc_key, doc_info in estructura_a_usar.items():
-                        if doc_key == nombre_doc:
-                            if isinstance(doc_info, dict):
-                                tipo_documento = doc_info.get('tipo_documento', nombre_doc)
-                                id_seccion = doc_info.get('id_seccion')
-                                descripcion_real = doc_info.get('descripcion') # Capturamos descripción
-                            break
-                    
-                    # Fallback a estructura por defecto
-                    if not tipo_documento:
-                        for doc_key, doc_info in ESTRUCTURA_LEGAJO_DEFAULT.items():
-                            if doc_key == nombre_doc:
-                                tipo_documento = doc_info.get('tipo_documento', nombre_doc)
-                                id_seccion = doc_info.get('id_seccion')
-                                descripcion_real = doc_info.get('descripcion')
-                                break
-                    
-                    if not tipo_documento:
-                        tipo_documento = nombre_doc
-                        
-                    # Si no se encontró descripción, usar una genérica
-                    if not descripcion_real:
-                        descripcion_real = f"Documento: {nombre_doc}"
-
-                    try:
-                        with open(archivo_path, 'rb') as f:
-                            archivo_binario = f.read()
-                        
-                        # Buscar ID del tipo de documento
-                        id_tipo_documento = None
-                        try:
-                            tipos_disponibles = personal_repo.get_tipos_documento_for_select() if personal_repo else []
-                            
-                            # 1. Búsqueda exacta
-                            for tipo_id, tipo_nombre in tipos_disponibles:
-                                if tipo_nombre.lower() == tipo_documento.lower():
-                                    id_tipo_documento = tipo_id
-                                    break
-                            
-                            # 2. Búsqueda parcial
-                            if not id_tipo_documento:
-                                for tipo_id, tipo_nombre in tipos_disponibles:
-                                    if tipo_documento.lower() in tipo_nombre.lower() or tipo_nombre.lower() in tipo_documento.lower():
-                                        id_tipo_documento = tipo_id
-                                        break
-                                        
-                            # 3. Default
-                            if not id_tipo_documento and tipos_disponibles:
-                                id_tipo_documento = tipos_disponibles[0][0]
-                        
-                        except Exception as e:
-                            logger.error(f"Error buscando tipo doc: {e}")
-
-                        if not id_tipo_documento:
-                            # Valor fallback seguro si falla todo
-                            id_tipo_documento = 1 
-
-                        # Guardar en BD con la descripción correcta
-                        form_data = {
-                            'id_personal': id_personal,
-                            'id_tipo': id_tipo_documento,
-                            'id_seccion': id_seccion if id_seccion else 1,
-                            'nombre_archivo': nombre_archivo,
-                            'fecha_emision': None,
-                            'fecha_vencimiento': None,
-                            'descripcion': descripcion_real,  # <--- AQUÍ ESTÁ LA CORRECCIÓN
-                            'hash_archivo': None,
-                        }
-                        
-                        # Wrapper para simular FileStorage
-                        class FileStreamWrapper:
-                            def __init__(self, filename, stream):
-                                self.filename = filename
-                                self.stream = stream
-                            def read(self): return self.stream
-                            def seek(self, pos): pass
-                        
-                        file_obj = FileStreamWrapper(nombre_archivo, archivo_binario)
-                        
-                        if legajo_service:
-                            legajo_service.upload_document_to_personal(form_data, file_obj, current_user.id)
-                            documentos_guardados += 1
-                        
-                    except Exception as e:
-                        logger.error(f"Error guardando documento {nombre_doc}: {e}")
-
-            # Limpiar temporal
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-
-            flash(f'PDF procesado exitosamente. {documentos_guardados} documentos separados y guardados.', 'success')
-            return redirect(url_for('legajo.listar_personal'))
+            estructura_a_usar = resolver_estructura(request.form.get('estructura_json'), id_personal)
+            tarea_id = enviar_separacion_pdf(file, file.filename, estructura_a_usar, id_personal, current_user.id)
+            flash('El PDF se está procesando en segundo plano.', 'info')
+            return redirect(url_for('tareas.ver_tarea', tarea_id=tarea_id))
 
         except Exception as e:
             logger.error(f"Error en upload_legajo_pdf: {e}", exc_info=True)
@@ -428,30 +434,124 @@ def procesar_pdf_api():
         if not file or not id_personal:
             return jsonify({'error': 'Archivo o personal no especificado'}), 400
 
-        # Guardar temporalmente
-        filename = secure_filename(file.filename)
-        temp_path = os.path.join('temp_uploads', filename)
-        os.makedirs('temp_uploads', exist_ok=True)
-        file.save(temp_path)
-
-        # Procesar
-        pdf_service = PdfSplitService('temp_pdfs')
-        resultados = pdf_service.separar_legajo(
-            temp_path,
+        # Se separa en memoria desde el archivo subido: nada pasa por temp_uploads ni temp_pdfs.
+        resultados = PdfSplitService().separar_legajo_en_memoria(
+            file.stream,
             ESTRUCTURA_LEGAJO_DEFAULT,
-            id_personal
+            id_personal,
+            max_size=current_app.config['MAX_CONTENT_LENGTH'],
+            max_memory=current_app.config.get('UPLOAD_SPOOL_MAX_MEMORY', 1024 * 1024),
         )
-
-        # Limpiar
-        os.remove(temp_path)
+        if 'error' in resultados:
+            return jsonify({'error': resultados['error']}), 400
+
+        # Las partes solo se informan: se cierran (y se liberan) sin guardarse.
+        documentos = {}
+        for nombre_doc, info in resultados.items():
+            contenido = info.pop('contenido', None)
+            if contenido is not None:
+                info['bytes'] = contenido.size
+                contenido.close()
+            documentos[nombre_doc] = info
 
         # Retornar JSON
         return jsonify({
             'success': True,
-            'documentos': resultados,
-            'total': len([r for r in resultados.values() if r.get('exito')])
+            'documentos': documentos,
+            'total': len([r for r in documentos.values() if r.get('exito')])
         })
 
     except Exception as e:
         logger.error(f"Error en procesar_pdf_api: {e}")
         return jsonify({'error': str(e)}), 500
+
+
+# --- DIGITALIZACIÓN POR LOTES ---
+
+def _procesador_lote(app, user_id):
+    """
+    Función que la tarea del lote llama (en sus hilos) por cada archivo:
+    separa el PDF con la estructura del trabajador y guarda sus partes.
+    """
+    def procesar(ruta, id_personal):
+        # Contexto propio: la conexión del hilo se devuelve al pool al salir.
+        with app.app_context():
+            estructura = resolver_estructura(None, id_personal)
+            return procesar_pdf_legajo(ruta, estructura, id_personal, user_id)
+    return procesar
+
+
+def _dueno_lote():
+    # Sistemas ve todos los lotes; el resto, solo los suyos.
+    return None if current_user.rol == 'Sistemas' else current_user.id
+
+
+@pdf_bp.route('/lotes', methods=['GET', 'POST'])
+@login_required
+@role_required('AdministradorLegajos')
+def digitalizacion_lote():
+    """
+    Carga de muchos legajos a la vez: un ZIP de PDFs (con o sin manifiesto) o un
+    manifiesto CSV de archivos de la carpeta del servidor. El lote se procesa en
+    segundo plano y se sigue desde su página de estado.
+    """
+    servicio = current_app.config['BATCH_DIGITIZATION_SERVICE']
+    form = BatchDigitizationForm()
+    if form.validate_on_submit():
+        archivo_zip = form.archivo_zip.data
+        manifiesto = form.manifiesto.data
+        try:
+            lote_id = servicio.crear_lote(
+                current_user.id,
+                _procesador_lote(current_app._get_current_object(), current_user.id),
+                archivo_zip=archivo_zip.stream if archivo_zip else None,
+                manifiesto=manifiesto.stream if manifiesto else None,
+            )
+        except ValueError as ve:
+            flash(str(ve), 'danger')
+        except Exception as e:
+            logger.error(f"Error al crear el lote de digitalización: {e}", exc_info=True)
+            flash('Ocurrió un error inesperado al preparar el lote.', 'danger')
+        else:
+            flash('Lote registrado. Los archivos se están procesando en segundo plano.', 'success')
+            return redirect(url_for('pdf.ver_lote', lote_id=lote_id))
+
+    return render_template('pdf/digitalizacion_lote.html', form=form,
+                           lotes=servicio.listar(_dueno_lote()),
+                           origen_habilitado=servicio.source_dir is not None)
+
+
+@pdf_bp.route('/lotes/<lote_id>')
+@login_required
+@role_required('AdministradorLegajos')
+def ver_lote(lote_id):
+    lote = current_app.config['BATCH_DIGITIZATION_SERVICE'].estado(lote_id, _dueno_lote())
+    if lote is None:
+        flash('El lote solicitado no existe o ya caducó.', 'danger')
+        return redirect(url_for('pdf.digitalizacion_lote'))
+    return render_template('pdf/estado_lote.html', lote=lote)
+
+
+@pdf_bp.route('/lotes/<lote_id>/estado')
+@login_required
+@role_required('AdministradorLegajos')
+# La página de estado consulta cada 3 s: el límite general (50 por hora) no alcanza.
+@limiter.limit("2000 per hour")
+def estado_lote(lote_id):
+    """Estado del lote en JSON (la página de estado lo consulta cada pocos segundos)."""
+    lote = current_app.config['BATCH_DIGITIZATION_SERVICE'].estado(lote_id, _dueno_lote())
+    if lote is None:
+        return jsonify({'exito': False, 'error': 'El lote no existe.'}), 404
+    return jsonify(dict(lote, exito=True))
+
+
+@pdf_bp.route('/lotes/<lote_id>/informe')
+@login_required
+@role_required('AdministradorLegajos')
+def descargar_informe_lote(lote_id):
+    ruta = current_app.config['BATCH_DIGITIZATION_SERVICE'].ruta_informe(lote_id, _dueno_lote())
+    if ruta is None:
+        flash('El informe del lote no está disponible.', 'warning')
+        return redirect(url_for('pdf.ver_lote', lote_id=lote_id))
+    return send_file(ruta, mimetype='text/csv', as_attachment=True,
+                     download_name=f"informe_lote_{lote_id[:8]}.csv")
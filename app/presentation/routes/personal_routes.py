@@ -105,8 +105,10 @@ def ver_mi_legajo():
 
         legajo_service = current_app.config['LEGAJO_SERVICE']
         
-        # 1. Obtener legajo completo
-        legajo_completo = legajo_service._personal_repo.get_full_legajo_by_id(id_personal)
+        # 1. Obtener la cabecera del legajo; cada sección del acordeón se pide al abrirse
+        legajo_completo = legajo_service.get_legajo_projection(id_personal, ('personal',))
+        if legajo_completo:
+            legajo_completo['documentos_por_seccion'] = legajo_service.count_documents_by_seccion(id_personal)
         
         # 2. Obtener lista de secciones para el acordeón (igual que en RRHH)
         secciones = legajo_service.get_secciones_for_select()
@@ -122,6 +124,25 @@ def ver_mi_legajo():
         flash('Error al cargar el legajo.', 'danger')
         return redirect(url_for('personal.inicio'))
 
+@personal_bp.route('/api/mi-legajo/<string:seccion>', methods=['GET'])
+@login_required
+def api_mi_legajo_seccion(seccion):
+    """Una parte del legajo propio en JSON, para el acordeón de 'Mi Legajo'."""
+    id_personal = getattr(current_user, 'id_personal', None)
+    if not id_personal:
+        return jsonify({'error': 'No tiene un legajo asociado.'}), 404
+    try:
+        legajo_service = current_app.config['LEGAJO_SERVICE']
+        datos = legajo_service.get_legajo_section(id_personal, seccion, request.args.get('id_seccion', type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        logger.error(f"Error en API de mi legajo ({seccion}): {e}")
+        return jsonify({'error': 'Error interno'}), 500
+    if datos is None:
+        return jsonify({'error': 'Legajo no encontrado.'}), 404
+    return jsonify(datos)
+
 @personal_bp.route('/actualizar-datos', methods=['GET', 'POST'])
 @login_required
 def actualizar_datos():
@@ -275,10 +296,10 @@ def ver_datos_personales():
             return redirect(url_for('personal.inicio'))
 
         legajo_service = current_app.config['LEGAJO_SERVICE']
-        personal_repo = legajo_service._personal_repo
         
-        # 1. Obtener el legajo completo (incluye historial, contratos, etc.)
-        legajo_completo = personal_repo.get_full_legajo_by_id(current_user.id_personal)
+        # 1. Obtener solo las partes del legajo que usa la vista
+        legajo_completo = legajo_service.get_legajo_projection(
+            current_user.id_personal, ('personal', 'historial_laboral', 'contratos'))
         
         if not legajo_completo:
             flash('Error al obtener el legajo completo.', 'danger')
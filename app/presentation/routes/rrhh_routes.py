@@ -40,13 +40,15 @@ def listar_personal():
     filters = {'dni': form.dni.data, 'nombres': form.nombres.data}
 
     legajo_service = current_app.config['LEGAJO_SERVICE']
-    pagination = legajo_service.get_all_personal_paginated(page, 15, filters)
-    document_status = legajo_service.check_document_status_for_all_personal()
+    pagination = legajo_service.get_personal_list_page(filters, page, request.args.get('cursor'), 15)
+    query_args = {k: v for k, v in request.args.items() if k not in ('page', 'cursor')}
+    document_status = legajo_service.get_document_status_for_page(pagination.items)
 
     return render_template(
         'rrhh/listar_personal.html',
         form=form,
         pagination=pagination,
+        query_args=query_args,
         document_status=document_status
     )
 
@@ -60,7 +62,8 @@ def ver_legajo(personal_id):
     legajo_service = current_app.config['LEGAJO_SERVICE']
     try:
         # Se pasa current_user para cualquier validación de permisos en el servicio
-        legajo_completo = legajo_service.get_personal_details(personal_id, current_user)
+        # Solo la cabecera: los documentos de cada sección los pide el acordeón al abrirse.
+        legajo_completo = legajo_service.get_legajo_header(personal_id, current_user)
     except PermissionError as e:
         flash(str(e), 'danger')
         return redirect(url_for('rrhh.listar_personal'))
@@ -96,16 +99,18 @@ from flask import current_app, send_file
 @login_required
 @role_required('RRHH')
 def exportar_empleados_excel():
-    """Exporta la lista de empleados a un archivo Excel (solo lectura para RRHH)."""
+    """
+    Exporta la lista de empleados a un archivo Excel (solo lectura para RRHH).
+    El reporte se genera en segundo plano y se descarga desde la página de la tarea.
+    """
     legajo_service = current_app.config['LEGAJO_SERVICE']  # recuperar instancia
-    excel_stream = legajo_service.generate_general_report_excel()
 
-    return send_file(
-        excel_stream,
-        download_name="reporte_empleados.xlsx",
-        as_attachment=True,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    def exportar(tarea):
+        return legajo_service.generate_general_report_job(tarea, "reporte_empleados.xlsx")
+
+    tarea_id = current_app.config['JOB_SERVICE'].enviar(
+        'reporte_excel', current_user.id, "Reporte de empleados (Excel)", exportar)
+    return redirect(url_for('tareas.ver_tarea', tarea_id=tarea_id))
 
 
 # Acontinuacón este será el grafico de panel: Cantidad de empleados por unidad administrativa
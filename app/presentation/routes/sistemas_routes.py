@@ -6,7 +6,6 @@ import io
 from datetime import datetime
 
 # Importamos el repositorio para los errores y backups
-from app.infrastructure.persistence.sqlserver_repository import SqlServerBackupRepository
 
 sistemas_bp = Blueprint('sistemas', __name__) 
 
@@ -187,8 +186,23 @@ def run_backup():
     try:
         if 'BACKUP_SERVICE' not in current_app.config:
             raise Exception("El servicio de backup no está inicializado.")
-        current_app.config['BACKUP_SERVICE'].execute_full_backup()
-        flash('Copia de seguridad iniciada y completada con éxito.', 'success')
+        job_service = current_app.config['JOB_SERVICE']
+        # Un solo backup a la vez: si ya hay uno en curso se muestra ese.
+        tarea_id = job_service.activa_de_tipo('backup')
+        if tarea_id:
+            flash('Ya hay una copia de seguridad en curso.', 'info')
+            return redirect(url_for('tareas.ver_tarea', tarea_id=tarea_id))
+        backup_service = current_app.config['BACKUP_SERVICE']
+        user_id = current_user.id
+
+        def respaldar(tarea):
+            tarea.avanzar(5, "Ejecutando la copia de seguridad completa")
+            backup_service.execute_full_backup(user_id)
+            return {'mensaje': 'Copia de seguridad completada con éxito.'}
+
+        tarea_id = job_service.enviar('backup', user_id, "Copia de seguridad completa (FULL)", respaldar)
+        flash('Copia de seguridad iniciada en segundo plano.', 'success')
+        return redirect(url_for('tareas.ver_tarea', tarea_id=tarea_id))
     except Exception as e:
         current_app.logger.error(f"Error al ejecutar backup manual: {e}")
         flash(f'Error al ejecutar la copia de seguridad. Detalle: {e}', 'danger')
@@ -207,17 +221,42 @@ def estado_servidor():
     # Obtener métricas de la base de datos
     db_metrics = monitoring_service.get_database_metrics()
     
+    # Obtener métricas del pool de conexiones
+    pool_metrics = monitoring_service.get_pool_metrics()
+    
+    # Obtener las sentencias SQL más costosas
+    query_metrics = monitoring_service.get_query_metrics()
+    
+    # Obtener el ahorro por compresión de documentos
+    compression_metrics = monitoring_service.get_compression_metrics()
+    
+    # Obtener aciertos y fallos de las cachés en memoria
+    cache_metrics = monitoring_service.get_cache_metrics()
+    
     # Combinar todas las métricas
-    metrics = {**system_metrics, **db_metrics}
+    metrics = {**system_metrics, **db_metrics, **pool_metrics, **query_metrics, **compression_metrics,
+               **cache_metrics}
     
     return render_template('sistemas/estado_servidor.html', **metrics)
 
+@sistemas_bp.route('/mantenimiento/recargar_catalogos', methods=['POST'])
+@login_required
+@role_required('Sistemas')
+def recargar_catalogos():
+    try:
+        loaded = current_app.config['LEGAJO_SERVICE'].refresh_catalogs()
+        flash(f'Catálogos recargados desde la base de datos ({loaded} listas).', 'success')
+    except Exception as e:
+        current_app.logger.error(f"Error al recargar los catálogos: {e}")
+        flash(f'Error al recargar los catálogos. Detalle: {e}', 'danger')
+    return redirect(url_for('sistemas.estado_servidor'))
+
 @sistemas_bp.route('/errores')
 @login_required
 @role_required('Sistemas')
 def errores():
     try:
-        repo = SqlServerBackupRepository()
+        repo = current_app.config['BACKUP_REPOSITORY']
         lista_de_errores = repo.obtener_historial_errores()
         return render_template('sistemas/registro_errores.html', errores=lista_de_errores)
     except Exception as e:
@@ -229,7 +268,7 @@ def errores():
 @login_required
 @role_required('Sistemas')
 def generar_error_prueba():
-    repo = SqlServerBackupRepository()
+    repo = current_app.config['BACKUP_REPOSITORY']
     try:
         resultado = 1 / 0
     except Exception as e:
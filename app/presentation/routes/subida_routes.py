@@ -0,0 +1,196 @@
+# RUTA: app/presentation/routes/subida_routes.py
+"""
+API de subidas reanudables por tramos (static/js/subida_reanudable.js).
+
+    POST   /subidas                          abre la sesión (destino, personal, tamaño, datos)
+    GET    /subidas/<id>                     estado: bytes recibidos y siguiente tramo
+    PUT    /subidas/<id>/tramos/<n>          tramo n (cuerpo binario, cabecera X-Chunk-CRC32)
+    POST   /subidas/<id>/finalizar           entrega el archivo ensamblado a su destino
+    DELETE /subidas/<id>                     cancela la subida
+
+Destinos: 'legajo_pdf' (separación del PDF completo del legajo como tarea en
+segundo plano, igual que pdf.upload_legajo_pdf) y 'documento' (igual que
+legajo.subir_documento).
+"""
+
+import logging
+
+from flask import Blueprint, current_app, flash, jsonify, request, url_for
+from flask_login import current_user, login_required
+from werkzeug.datastructures import FileStorage
+
+from app import limiter
+from app.core.security import IDORProtection
+from app.infrastructure.storage.resumable_upload import UploadConflict, UploadSessionNotFound
+from app.presentation.routes.pdf_upload_routes import enviar_separacion_pdf, resolver_estructura
+
+logger = logging.getLogger(__name__)
+
+subida_bp = Blueprint('subida', __name__, url_prefix='/subidas')
+
+# Roles que pueden usar cada destino (Sistemas siempre puede).
+ROLES_POR_DESTINO = {
+    'legajo_pdf': ('AdministradorLegajos', 'Sistemas'),
+    'documento': ('AdministradorLegajos', 'Sistemas'),
+}
+
+
+def _store():
+    return current_app.config['UPLOAD_SESSION_STORE']
+
+
+def _error(mensaje, status):
+    return jsonify({'exito': False, 'error': mensaje}), status
+
+
+def _validar_datos(destino, datos, filename):
+    """Normaliza los datos del formulario de cada destino; lanza ValueError si no son válidos."""
+    if destino == 'legajo_pdf':
+        if not filename.lower().endswith('.pdf'):
+            raise ValueError('Solo se aceptan archivos PDF.')
+        return {'estructura_json': datos.get('estructura_json')}
+
+    try:
+        id_seccion = int(datos.get('id_seccion') or 0)
+        id_tipo = int(datos.get('id_tipo') or 0)
+    except (TypeError, ValueError):
+        raise ValueError('Sección o tipo de documento inválido.')
+    if id_seccion < 1:
+        raise ValueError('Debe seleccionar una sección.')
+    if id_tipo < 1:
+        raise ValueError('Debe seleccionar un tipo de documento.')
+    descripcion = (datos.get('descripcion') or '').strip() or None
+    if descripcion and len(descripcion) > 500:
+        raise ValueError('La descripción no puede superar 500 caracteres.')
+    return {'id_seccion': id_seccion, 'id_tipo': id_tipo, 'descripcion': descripcion}
+
+
+@subida_bp.route('', methods=['POST'])
+@login_required
+def crear_subida():
+    payload = request.get_json(silent=True) or {}
+    destino = payload.get('destino')
+    if destino not in ROLES_POR_DESTINO:
+        return _error('Destino de subida no válido.', 400)
+    if current_user.rol not in ROLES_POR_DESTINO[destino]:
+        return _error('Permiso denegado', 403)
+
+    try:
+        id_personal = int(payload.get('id_personal'))
+    except (TypeError, ValueError):
+        return _error('Personal no especificado.', 400)
+    # SEGURIDAD: Validar IDOR
+    if not IDORProtection.can_access_personal(current_user.id, id_personal, current_user.rol):
+        logger.warning(f"SEGURIDAD: Intento IDOR detectado - Usuario {current_user.id} intenta subir al personal {id_personal}")
+        return _error('No tienes permiso para acceder a este personal.', 403)
+
+    filename = (payload.get('nombre_archivo') or '').strip()
+    if not filename:
+        return _error('No se seleccionó ningún archivo.', 400)
+    try:
+        params = _validar_datos(destino, payload.get('datos') or {}, filename)
+        params['id_personal'] = id_personal
+        estado = _store().create(current_user.id, filename, payload.get('tamano'), destino,
+                                 params=params, sha256=payload.get('sha256'))
+    except ValueError as ve:
+        return _error(str(ve), 400)
+    return jsonify(dict(estado, exito=True)), 201
+
+
+@subida_bp.route('/<upload_id>', methods=['GET'])
+@login_required
+def estado_subida(upload_id):
+    try:
+        return jsonify(dict(_store().status(upload_id, current_user.id), exito=True))
+    except UploadSessionNotFound:
+        return _error('La subida no existe o caducó.', 404)
+
+
+@subida_bp.route('/<upload_id>/tramos/<int:indice>', methods=['PUT'])
+@login_required
+# Un archivo de 100 MB son 25 tramos de 4 MB, más reintentos: el límite general no alcanza.
+@limiter.limit("1200 per hour")
+def subir_tramo(upload_id, indice):
+    store = _store()
+    crc32 = request.headers.get('X-Chunk-CRC32')
+    if not crc32:
+        return _error('Falta la cabecera X-Chunk-CRC32.', 400)
+    if request.content_length is None or request.content_length > store.chunk_size:
+        return _error(f'Cada tramo debe tener como máximo {store.chunk_size} bytes.', 413)
+    try:
+        estado = store.put_chunk(upload_id, current_user.id, indice, request.get_data(cache=False), crc32)
+    except UploadSessionNotFound:
+        return _error('La subida no existe o caducó.', 404)
+    except UploadConflict as ce:
+        # El cliente retoma desde 'siguiente_tramo'.
+        return jsonify(dict(store.status(upload_id, current_user.id), exito=False, error=str(ce))), 409
+    except ValueError as ve:
+        return _error(str(ve), 400)
+    return jsonify(dict(estado, exito=True))
+
+
+@subida_bp.route('/<upload_id>/finalizar', methods=['POST'])
+@login_required
+def finalizar_subida(upload_id):
+    store = _store()
+    try:
+        sesion = store.finalize(upload_id, current_user.id)
+    except UploadSessionNotFound:
+        return _error('La subida no existe o caducó.', 404)
+    except UploadConflict as ce:
+        return _error(str(ce), 409)
+    except ValueError as ve:
+        return _error(str(ve), 400)
+    if sesion['ruta'] is None:
+        # Reintento de una finalización que ya terminó.
+        return jsonify(sesion['resultado'])
+
+    params = sesion['params']
+    id_personal = params['id_personal']
+    try:
+        if sesion['destino'] == 'legajo_pdf':
+            # La separación corre como tarea; la sesión se cierra al registrarla.
+            estructura = resolver_estructura(params.get('estructura_json'), id_personal)
+            tarea_id = enviar_separacion_pdf(sesion['ruta'], sesion['nombre_archivo'], estructura,
+                                             id_personal, current_user.id)
+            mensaje, categoria = 'El PDF se está procesando en segundo plano.', 'info'
+            redirect_url = url_for('tareas.ver_tarea', tarea_id=tarea_id)
+        else:
+            form_data = {
+                'id_personal': id_personal,
+                'id_seccion': params['id_seccion'],
+                'id_tipo': params['id_tipo'],
+                'descripcion': params['descripcion'],
+            }
+            with open(sesion['ruta'], 'rb') as archivo:
+                current_app.config['LEGAJO_SERVICE'].upload_document_to_personal(
+                    form_data, FileStorage(stream=archivo, filename=sesion['nombre_archivo']), current_user.id)
+            mensaje, categoria = 'Documento subido correctamente.', 'success'
+            redirect_url = url_for('legajo.ver_legajo', personal_id=id_personal)
+    except ValueError as ve:
+        # Archivo rechazado: reintentar no cambia nada, la sesión se descarta.
+        logger.warning(f"SEGURIDAD: Archivo rechazado en subida reanudable {upload_id} para personal {id_personal} - Error: {ve} - Usuario: {current_user.username}")
+        store.discard(upload_id)
+        return _error(str(ve), 400)
+    except Exception as e:
+        # Error inesperado (p. ej. la BD): el archivo se conserva para reintentar la finalización.
+        logger.error(f"Error al finalizar la subida reanudable {upload_id}: {e}", exc_info=True)
+        store.release(upload_id)
+        return _error('Ocurrió un error inesperado al procesar el archivo.', 500)
+
+    resultado = {'exito': True, 'mensaje': mensaje, 'redirect': redirect_url}
+    store.complete(upload_id, resultado)
+    flash(mensaje, categoria)
+    return jsonify(resultado)
+
+
+@subida_bp.route('/<upload_id>', methods=['DELETE'])
+@login_required
+def cancelar_subida(upload_id):
+    store = _store()
+    try:
+        store.get(upload_id, current_user.id)
+    except UploadSessionNotFound:
+        return _error('La subida no existe o caducó.', 404)
+    store.discard(upload_id)
+    return jsonify({'exito': True})
@@ -0,0 +1,77 @@
+// RUTA: app/presentation/static/js/estado_lote.js
+//
+// Página de estado de un lote de digitalización (pdf/estado_lote.html): consulta
+// la API de estado cada pocos segundos y actualiza el avance, el resumen y la
+// fila de cada archivo hasta que el lote termina.
+//
+// El contenedor #loteEstado declara:
+//   data-estado-url   URL de la API de estado (JSON)
+//   data-terminado    no vacío si el lote ya terminó (no se consulta)
+//   data-etiquetas    {estado: [etiqueta, clases del badge]}
+
+const LOTE_INTERVALO_MS = 3000;
+
+document.addEventListener('DOMContentLoaded', function () {
+    const contenedor = document.getElementById('loteEstado');
+    if (contenedor && !contenedor.dataset.terminado) {
+        setTimeout(() => actualizarLote(contenedor), LOTE_INTERVALO_MS);
+    }
+});
+
+async function actualizarLote(contenedor) {
+    let lote = null;
+    try {
+        const respuesta = await fetch(contenedor.dataset.estadoUrl, {
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json' },
+        });
+        if (respuesta.ok) {
+            lote = await respuesta.json();
+        }
+    } catch (error) {
+        console.error('Error consultando el estado del lote:', error);
+    }
+    if (lote) {
+        pintarLote(contenedor, lote);
+    }
+    if (!lote || !lote.terminado) {
+        setTimeout(() => actualizarLote(contenedor), LOTE_INTERVALO_MS);
+    }
+}
+
+function pintarLote(contenedor, lote) {
+    const etiquetas = JSON.parse(contenedor.dataset.etiquetas);
+    const porcentaje = lote.total ? Math.floor(lote.procesados * 100 / lote.total) : 100;
+    const barra = contenedor.querySelector('[data-campo="barra"]');
+    barra.style.width = porcentaje + '%';
+    barra.textContent = porcentaje + '%';
+    contenedor.querySelector('[data-campo="procesados"]').textContent = lote.procesados;
+    contenedor.querySelector('[data-campo="documentos"]').textContent = lote.documentos;
+    Object.entries(lote.resumen).forEach(([estado, cantidad]) => {
+        const celda = contenedor.querySelector(`[data-resumen="${estado}"]`);
+        if (celda) {
+            celda.textContent = cantidad;
+        }
+    });
+
+    lote.archivos.forEach((archivo, indice) => {
+        const fila = contenedor.querySelector(`tr[data-indice="${indice}"]`);
+        if (!fila) {
+            return;
+        }
+        const [etiqueta, clases] = etiquetas[archivo.estado] || [archivo.estado, 'bg-secondary'];
+        const badge = fila.querySelector('[data-campo="estado"]');
+        badge.className = 'badge ' + clases;
+        badge.textContent = etiqueta;
+        fila.querySelector('[data-campo="documentos"]').textContent = archivo.documentos;
+        fila.querySelector('[data-campo="segundos"]').textContent = archivo.segundos ?? '';
+        fila.querySelector('[data-campo="error"]').textContent = archivo.error || '';
+    });
+
+    if (lote.terminado) {
+        barra.classList.remove('progress-bar-striped', 'progress-bar-animated');
+    }
+    if (lote.descargable) {
+        document.getElementById('loteInforme').classList.remove('d-none');
+    }
+}
@@ -0,0 +1,60 @@
+// RUTA: app/presentation/static/js/estado_tarea.js
+//
+// Página de una tarea en segundo plano (tareas/estado.html): consulta la API de
+// estado cada pocos segundos (cada consulta ocupa un hilo del servidor solo lo
+// que tarda en responder). Cuando la tarea termina se recarga la página para
+// mostrar el resultado y el botón de descarga.
+//
+// El contenedor #tareaEstado declara:
+//   data-estado-url   URL de la API de estado (JSON)
+//   data-finalizada   no vacío si la tarea ya terminó (no se consulta)
+//   data-etiquetas    {estado: [etiqueta, clases del badge]}
+
+const TAREA_INTERVALO_MS = 3000;
+
+document.addEventListener('DOMContentLoaded', function () {
+    const contenedor = document.getElementById('tareaEstado');
+    if (!contenedor || contenedor.dataset.finalizada) {
+        return;
+    }
+    setTimeout(() => consultarTarea(contenedor), TAREA_INTERVALO_MS);
+});
+
+async function consultarTarea(contenedor) {
+    let tarea = null;
+    try {
+        const respuesta = await fetch(contenedor.dataset.estadoUrl, {
+            credentials: 'same-origin',
+            headers: { 'Accept': 'application/json' },
+        });
+        if (respuesta.status === 404) {
+            return;
+        }
+        if (respuesta.ok) {
+            tarea = await respuesta.json();
+        }
+    } catch (error) {
+        console.error('Error consultando el estado de la tarea:', error);
+    }
+    if (tarea) {
+        pintarTarea(contenedor, tarea);
+        if (tarea.finalizada) {
+            window.location.reload();
+            return;
+        }
+    }
+    setTimeout(() => consultarTarea(contenedor), TAREA_INTERVALO_MS);
+}
+
+function pintarTarea(contenedor, tarea) {
+    const etiquetas = JSON.parse(contenedor.dataset.etiquetas);
+    const porcentaje = Math.round(tarea.progreso || 0);
+    const barra = contenedor.querySelector('[data-campo="barra"]');
+    barra.style.width = porcentaje + '%';
+    barra.textContent = porcentaje + '%';
+    const [etiqueta, clases] = etiquetas[tarea.estado] || [tarea.estado, 'bg-secondary'];
+    const badge = contenedor.querySelector('[data-campo="estado"]');
+    badge.className = 'badge ' + clases;
+    badge.textContent = etiqueta;
+    contenedor.querySelector('[data-campo="mensaje"]').textContent = tarea.mensaje || '';
+}
@@ -0,0 +1,154 @@
+// RUTA: app/presentation/static/js/legajo_secciones.js
+//
+// Acordeón del legajo con carga por sección: la página llega solo con la
+// cabecera y cada sección pide sus documentos (JSON) la primera vez que se abre.
+//
+// El contenedor del acordeón declara:
+//   data-secciones-url   URL de la API de documentos (se le añade ?id_seccion=N)
+//   data-url-ver         URL para visualizar un documento, con 0 en lugar del ID
+//   data-url-descargar   (opcional) igual, para descargar
+//   data-url-solicitar   (opcional) igual, para solicitar un cambio
+//   data-puede-eliminar  (opcional) muestra el botón que abre #confirmDeleteModal
+//   data-tabla-clase     (opcional) clases de la tabla
+// y cada panel (.accordion-collapse) su data-id-seccion.
+
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('[data-secciones-url]').forEach(initAcordeonLegajo);
+});
+
+function initAcordeonLegajo(acordeon) {
+    acordeon.querySelectorAll('.accordion-collapse[data-id-seccion]').forEach(panel => {
+        panel.addEventListener('show.bs.collapse', () => cargarSeccion(acordeon, panel));
+        if (panel.classList.contains('show')) {
+            cargarSeccion(acordeon, panel);
+        }
+    });
+}
+
+function cargarSeccion(acordeon, panel) {
+    if (panel.dataset.cargado) {
+        return;
+    }
+    panel.dataset.cargado = '1';
+    const cuerpo = panel.querySelector('.accordion-body');
+    cuerpo.innerHTML = '<div class="text-center text-muted p-3"><span class="spinner-border spinner-border-sm me-2"></span>Cargando documentos...</div>';
+
+    const url = acordeon.dataset.seccionesUrl + '?id_seccion=' + encodeURIComponent(panel.dataset.idSeccion);
+    fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(response => {
+            if (!response.ok) { throw new Error('Respuesta ' + response.status); }
+            return response.json();
+        })
+        .then(documentos => {
+            cuerpo.replaceChildren(documentos.length ? tablaDocumentos(acordeon, documentos) : sinDocumentos());
+        })
+        .catch(error => {
+            console.error('Error al cargar la sección del legajo:', error);
+            delete panel.dataset.cargado;   // se reintenta al volver a abrirla
+            cuerpo.innerHTML = '<div class="alert alert-danger text-center mb-0"><i class="bi bi-exclamation-triangle me-2"></i>No se pudieron cargar los documentos de esta sección.</div>';
+        });
+}
+
+function urlDocumento(plantilla, idDocumento) {
+    // El 0 puede ir en la ruta (/documento/0/ver) o en la consulta (?documento_id=0).
+    return plantilla.replace(/([\/=])0(?=[\/?&]|$)/, '$1' + idDocumento);
+}
+
+function formatearFecha(iso) {
+    // 'AAAA-MM-DD' o 'AAAA-MM-DDTHH:MM:SS' -> 'DD/MM/AAAA'
+    if (!iso) { return '-'; }
+    const [anio, mes, dia] = iso.substring(0, 10).split('-');
+    return `${dia}/${mes}/${anio}`;
+}
+
+function elemento(tag, clase, texto) {
+    const el = document.createElement(tag);
+    if (clase) { el.className = clase; }
+    if (texto !== undefined) { el.textContent = texto; }
+    return el;
+}
+
+function boton(href, clase, icono, titulo) {
+    const a = elemento('a', clase);
+    a.href = href;
+    a.title = titulo;
+    a.appendChild(elemento('i', 'bi ' + icono));
+    return a;
+}
+
+function sinDocumentos() {
+    const aviso = elemento('div', 'alert alert-light text-center mb-0');
+    aviso.setAttribute('role', 'alert');
+    aviso.appendChild(elemento('i', 'bi bi-info-circle me-2'));
+    aviso.appendChild(document.createTextNode('No hay documentos registrados en esta categoría.'));
+    return aviso;
+}
+
+function tablaDocumentos(acordeon, documentos) {
+    const opciones = acordeon.dataset;
+    const contenedor = elemento('div', 'table-responsive');
+    const tabla = elemento('table', opciones.tablaClase || 'table table-bordered table-sm table-hover align-middle mb-0');
+    const encabezado = elemento('tr', 'text-center');
+    ['#', 'Tipo de Documento', 'Descripción / Contenido', 'Fecha', 'Acciones'].forEach(titulo => {
+        encabezado.appendChild(elemento('th', null, titulo));
+    });
+    const thead = elemento('thead', 'table-light');
+    thead.appendChild(encabezado);
+    tabla.appendChild(thead);
+
+    const tbody = elemento('tbody');
+    documentos.forEach((doc, indice) => {
+        const fila = elemento('tr');
+        if (doc.estado_vencimiento === 'vencido') { fila.className = 'table-danger'; }
+        if (doc.estado_vencimiento === 'por_vencer') { fila.className = 'table-warning'; }
+
+        fila.appendChild(elemento('td', 'text-center', String(indice + 1)));
+
+        const tipo = elemento('td', null, doc.nombre_tipo || '');
+        if (doc.estado_vencimiento === 'vencido') {
+            tipo.appendChild(elemento('span', 'badge bg-danger ms-2', 'Vencido'));
+        } else if (doc.estado_vencimiento === 'por_vencer') {
+            tipo.appendChild(elemento('span', 'badge bg-warning text-dark ms-2', 'Vence pronto'));
+        }
+        fila.appendChild(tipo);
+
+        const descripcion = elemento('td', null, doc.descripcion || 'Sin descripción');
+        descripcion.appendChild(elemento('small', 'text-muted d-block', doc.nombre_archivo || ''));
+        fila.appendChild(descripcion);
+
+        fila.appendChild(elemento('td', 'text-center', formatearFecha(doc.fecha_emision || doc.fecha_subida)));
+
+        const acciones = elemento('td', 'text-center');
+        const grupo = elemento('div', 'btn-group');
+        const ver = boton(urlDocumento(opciones.urlVer, doc.id_documento), 'btn btn-sm btn-outline-info',
+                          'bi-eye-fill', 'Visualizar Documento: ' + (doc.nombre_archivo || ''));
+        ver.target = '_blank';
+        grupo.appendChild(ver);
+        if (opciones.urlDescargar) {
+            grupo.appendChild(boton(urlDocumento(opciones.urlDescargar, doc.id_documento) + '?download=1',
+                                    'btn btn-sm btn-outline-success', 'bi-download', 'Descargar'));
+        }
+        if (opciones.urlSolicitar) {
+            grupo.appendChild(boton(urlDocumento(opciones.urlSolicitar, doc.id_documento),
+                                    'btn btn-sm btn-warning text-dark', 'bi-pencil-square', 'Solicitar Corrección o Cambio'));
+        }
+        if (opciones.puedeEliminar) {
+            // El modal #confirmDeleteModal (main.js) lee data-doc-id y data-doc-name del botón.
+            const eliminar = elemento('button', 'btn btn-sm btn-outline-danger');
+            eliminar.type = 'button';
+            eliminar.title = 'Eliminar Documento';
+            eliminar.setAttribute('data-bs-toggle', 'modal');
+            eliminar.setAttribute('data-bs-target', '#confirmDeleteModal');
+            eliminar.setAttribute('data-doc-id', doc.id_documento);
+            eliminar.setAttribute('data-doc-name', doc.nombre_archivo || '');
+            eliminar.appendChild(elemento('i', 'bi bi-trash-fill'));
+            grupo.appendChild(eliminar);
+        }
+        acciones.appendChild(grupo);
+        fila.appendChild(acciones);
+        tbody.appendChild(fila);
+    });
+    tabla.appendChild(tbody);
+    contenedor.appendChild(tabla);
+    return contenedor;
+}
@@ -0,0 +1,215 @@
+// RUTA: app/presentation/static/js/subida_reanudable.js
+//
+// Subida reanudable por tramos (API /subidas, subida_routes.py). Los formularios
+// con data-subida-destino ('legajo_pdf' o 'documento') y data-personal-id no se
+// envían en un solo POST: el archivo viaja en tramos con su CRC32 y, si la
+// conexión se corta, se consulta qué llegó y se sigue desde ahí. El id de la
+// sesión se recuerda en localStorage, así que recargar la página y volver a
+// elegir el mismo archivo también retoma la subida.
+//
+// El resto de campos del formulario (menos el archivo y csrf_token) se envían
+// como 'datos' al abrir la sesión.
+
+const SUBIDA_REINTENTOS = 8;            // intentos por tramo antes de rendirse
+const SUBIDA_ESPERA_MAX_MS = 30000;
+
+document.addEventListener('submit', function (e) {
+    // Escucha en document para correr después de los manejadores propios del
+    // formulario (p. ej. el que completa estructura_json).
+    const form = e.target;
+    if (!form.matches('form[data-subida-destino]') || e.defaultPrevented) {
+        return;
+    }
+    const input = form.querySelector('input[type="file"]');
+    if (!input || !input.files.length) {
+        return;     // el servidor responde con el mensaje de validación de siempre
+    }
+    e.preventDefault();
+    subirFormularioReanudable(form, input.files[0]);
+});
+
+async function subirFormularioReanudable(form, archivo) {
+    const boton = form.querySelector('button[type="submit"]');
+    const textoBoton = boton ? boton.innerHTML : '';
+    const progreso = barraProgreso(form);
+    if (boton) {
+        boton.disabled = true;
+        boton.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Subiendo...';
+    }
+    try {
+        const resultado = await subirArchivoReanudable(form, archivo, progreso);
+        window.location.href = resultado.redirect;
+    } catch (error) {
+        console.error('Error en la subida reanudable:', error);
+        progreso.error(error.message);
+        if (boton) {
+            boton.disabled = false;
+            boton.innerHTML = textoBoton;
+        }
+    }
+}
+
+async function subirArchivoReanudable(form, archivo, progreso) {
+    const csrf = form.querySelector('input[name="csrf_token"]').value;
+    const clave = ['subida', form.dataset.subidaDestino, form.dataset.personalId,
+                   archivo.name, archivo.size, archivo.lastModified].join(':');
+
+    let estado = null;
+    const guardada = localStorage.getItem(clave);
+    if (guardada) {
+        const respuesta = await peticion('GET', '/subidas/' + guardada, csrf);
+        if (respuesta.ok) {
+            estado = await respuesta.json();
+        }
+    }
+    if (!estado) {
+        const respuesta = await peticion('POST', '/subidas', csrf, JSON.stringify({
+            destino: form.dataset.subidaDestino,
+            id_personal: form.dataset.personalId,
+            nombre_archivo: archivo.name,
+            tamano: archivo.size,
+            datos: datosFormulario(form),
+        }), { 'Content-Type': 'application/json' });
+        estado = await respuesta.json();
+        if (!respuesta.ok) {
+            throw new Error(estado.error || 'No se pudo iniciar la subida.');
+        }
+        localStorage.setItem(clave, estado.upload_id);
+    }
+
+    const id = estado.upload_id;
+    while (estado.siguiente_tramo < estado.total_tramos) {
+        progreso.avance(estado.recibido, estado.tamano);
+        estado = await enviarTramo(id, estado, archivo, csrf, progreso);
+    }
+    progreso.avance(estado.tamano, estado.tamano, 'Procesando archivo...');
+
+    const resultado = await conReintentos(async () => {
+        const respuesta = await peticion('POST', '/subidas/' + id + '/finalizar', csrf);
+        if (respuesta.status >= 500 || respuesta.status === 409) {
+            // 409: otra petición (la que perdió su respuesta) sigue procesándolo.
+            throw new Error('El servidor aún no terminó de procesar el archivo.');
+        }
+        return { respuesta: respuesta, cuerpo: await respuesta.json() };
+    }, progreso);
+    if (!resultado.respuesta.ok) {
+        localStorage.removeItem(clave);
+        throw new Error(resultado.cuerpo.error || 'No se pudo procesar el archivo.');
+    }
+    localStorage.removeItem(clave);
+    return resultado.cuerpo;
+}
+
+async function enviarTramo(id, estado, archivo, csrf, progreso) {
+    const indice = estado.siguiente_tramo;
+    const inicio = indice * estado.tamano_tramo;
+    const datos = new Uint8Array(await archivo.slice(inicio, inicio + estado.tamano_tramo).arrayBuffer());
+    const crc = crc32(datos).toString(16).padStart(8, '0');
+
+    return conReintentos(async () => {
+        const respuesta = await peticion('PUT', '/subidas/' + id + '/tramos/' + indice, csrf, datos,
+                                         { 'Content-Type': 'application/octet-stream', 'X-Chunk-CRC32': crc });
+        const cuerpo = await respuesta.json();
+        if (respuesta.ok || respuesta.status === 409) {
+            return cuerpo;      // 409: el servidor indica desde qué tramo seguir
+        }
+        if (respuesta.status >= 500 || respuesta.status === 429) {
+            throw new Error(cuerpo.error || 'Error del servidor.');
+        }
+        throw Object.assign(new Error(cuerpo.error || 'Tramo rechazado.'), { definitivo: true });
+    }, progreso);
+}
+
+async function conReintentos(accion, progreso) {
+    // Reintenta cortes de red y errores 5xx con espera creciente.
+    let espera = 1000;
+    for (let intento = 1; ; intento++) {
+        try {
+            return await accion();
+        } catch (error) {
+            if (error.definitivo || intento >= SUBIDA_REINTENTOS) {
+                throw error;
+            }
+            progreso.aviso(`Conexión interrumpida, reintentando en ${Math.round(espera / 1000)} s...`);
+            await new Promise(resolver => setTimeout(resolver, espera));
+            espera = Math.min(espera * 2, SUBIDA_ESPERA_MAX_MS);
+        }
+    }
+}
+
+function peticion(metodo, url, csrf, cuerpo, cabeceras) {
+    return fetch(url, {
+        method: metodo,
+        body: cuerpo,
+        credentials: 'same-origin',
+        headers: Object.assign({ 'Accept': 'application/json', 'X-CSRFToken': csrf }, cabeceras || {}),
+    });
+}
+
+function datosFormulario(form) {
+    const datos = {};
+    new FormData(form).forEach((valor, campo) => {
+        if (campo !== 'csrf_token' && !(valor instanceof File)) {
+            datos[campo] = valor;
+        }
+    });
+    return datos;
+}
+
+function barraProgreso(form) {
+    let contenedor = form.querySelector('.subida-progreso');
+    if (!contenedor) {
+        contenedor = document.createElement('div');
+        contenedor.className = 'subida-progreso mt-3';
+        contenedor.innerHTML = '<div class="progress"><div class="progress-bar progress-bar-striped progress-bar-animated" role="progressbar"></div></div>'
+                             + '<small class="text-muted d-block mt-1"></small>';
+        form.appendChild(contenedor);
+    }
+    const barra = contenedor.querySelector('.progress-bar');
+    const texto = contenedor.querySelector('small');
+    contenedor.classList.remove('d-none');
+    barra.classList.remove('bg-danger');
+    return {
+        avance(recibido, total, mensaje) {
+            const porcentaje = total ? Math.floor(recibido * 100 / total) : 0;
+            barra.style.width = porcentaje + '%';
+            barra.textContent = porcentaje + '%';
+            texto.className = 'text-muted d-block mt-1';
+            texto.textContent = mensaje || `${formatearMB(recibido)} de ${formatearMB(total)} MB`;
+        },
+        aviso(mensaje) {
+            texto.className = 'text-warning d-block mt-1';
+            texto.textContent = mensaje;
+        },
+        error(mensaje) {
+            barra.classList.add('bg-danger');
+            texto.className = 'text-danger d-block mt-1';
+            texto.textContent = mensaje;
+        },
+    };
+}
+
+function formatearMB(bytes) {
+    return (bytes / (1024 * 1024)).toFixed(1);
+}
+
+let tablaCrc32 = null;
+
+function crc32(datos) {
+    // CRC-32 (IEEE), el mismo que zlib.crc32 en el servidor.
+    if (!tablaCrc32) {
+        tablaCrc32 = new Uint32Array(256);
+        for (let n = 0; n < 256; n++) {
+            let c = n;
+            for (let k = 0; k < 8; k++) {
+                c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+            }
+            tablaCrc32[n] = c >>> 0;
+        }
+    }
+    let crc = 0xFFFFFFFF;
+    for (let i = 0; i < datos.length; i++) {
+        crc = tablaCrc32[(crc ^ datos[i]) & 0xFF] ^ (crc >>> 8);
+    }
+    return (crc ^ 0xFFFFFFFF) >>> 0;
+}
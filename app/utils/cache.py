@@ -0,0 +1,292 @@
+# app/utils/cache.py
+"""
+Cachés en memoria del proceso con caducidad (TTL) y contadores de aciertos.
+
+Cada caché tiene un nombre y queda registrada para que el panel de "Estado del
+Servidor" muestre sus estadísticas (`all_cache_stats`). Las claves son tuplas
+cuyo primer elemento agrupa las entradas (p. ej. ('unidades',) o
+('tipos_documento_seccion', 3)), lo que permite invalidar un grupo completo.
+
+    CATALOGOS = get_cache('catalogos', ttl=3600)
+    unidades = CATALOGOS.get_or_load(('unidades',), repo.consultar_unidades)
+    CATALOGOS.invalidate('unidades')
+"""
+
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Diccionario con caducidad por entrada, seguro entre hilos."""
+
+    def __init__(self, name, ttl=300, max_entries=1024):
+        self.name = name
+        self.ttl = ttl                      # segundos; 0 = caché desactivada
+        self.max_entries = max_entries
+        self._entries = {}                  # clave -> (valor, instante de carga)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def configure(self, ttl=None, max_entries=None):
+        """Ajusta la caché con la configuración de la aplicación (en create_app)."""
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if max_entries is not None:
+                self.max_entries = max_entries
+            self._entries.clear()
+
+    def get(self, key, default=None):
+        """Valor vigente de `key` o `default`; cuenta como acierto o fallo."""
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_load(self, key, loader):
+        """
+        Devuelve el valor en caché o lo obtiene con `loader()` y lo guarda.
+        Un resultado None no se guarda (suele indicar un fallo de la consulta).
+        """
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def invalidate(self, group=None):
+        """Descarta las entradas cuyo primer elemento de clave es `group` (o todas)."""
+        with self._lock:
+            if group is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                keys = [key for key in self._entries if key[0] == group]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+            self._invalidations += 1
+        return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'nombre': self.name,
+                'ttl': self.ttl,
+                'entradas': len(self._entries),
+                'aciertos': self._hits,
+                'fallos': self._misses,
+                'invalidaciones': self._invalidations,
+                'porcentaje_aciertos': round(self._hits / lookups * 100, 2) if lookups else 0,
+            }
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if time.monotonic() - entry[1] < self.ttl:
+                    self._hits += 1
+                    return entry[0]
+                del self._entries[key]
+            self._misses += 1
+            return _MISSING
+
+    def _store(self, key, value):
+        # Se llama con self._lock tomado.
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            self._evict_expired()
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+        self._entries[key] = (value, time.monotonic())
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [key for key, (_, loaded) in self._entries.items() if now - loaded >= self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+
+def estimate_size(value, _seen=None):
+    """
+    Tamaño aproximado en bytes de un valor y lo que contiene (diccionarios,
+    listas, tuplas y registros con values()). Suficiente para acotar una caché.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in value)
+    elif hasattr(value, 'values') and callable(value.values):
+        size += sum(estimate_size(item, _seen) for item in value.values())
+    return size
+
+
+class ByteLRUCache:
+    """
+    Caché LRU acotada por memoria (suma de `estimate_size` de sus valores) y con
+    TTL. Como en TTLCache, las claves son tuplas y se invalidan por grupo (primer
+    elemento). Invalidar un grupo sube su versión: una carga que empezó antes no
+    guarda su resultado, así que nunca queda en caché un dato anterior a la
+    escritura que la invalidó.
+    """
+
+    def __init__(self, name, max_bytes=32 * 1024 * 1024, ttl=600, sizeof=estimate_size):
+        self.name = name
+        self.max_bytes = max_bytes          # 0 = caché desactivada
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._entries = OrderedDict()       # clave -> (valor, tamaño, instante de carga)
+        self._groups = {}                   # grupo -> claves guardadas
+        self._bytes = 0
+        self._versions = {}                 # grupo -> versión (solo los invalidados)
+        self._generation = 0                # sube al invalidar todo
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._evictions = 0
+
+    def configure(self, max_bytes=None, ttl=None):
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if ttl is not None:
+                self.ttl = ttl
+            self._clear()
+
+    def get_or_load(self, key, loader):
+        """Valor en caché (pasa a ser el más reciente) o el que devuelve `loader()`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] < self.ttl:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+            self._misses += 1
+            version = (self._generation, self._versions.get(key[0], 0))
+
+        value = loader()
+        if value is None or self.max_bytes <= 0:
+            return value
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if (self._generation, self._versions.get(key[0], 0)) != version:
+                return value
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and self._bytes + size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+            self._entries[key] = (value, size, time.monotonic())
+            self._groups.setdefault(key[0], set()).add(key)
+            self._bytes += size
+        return value
+
+    def invalidate(self, group=None):
+        """Descarta las claves de un grupo (o todas) e impide que una carga en curso las vuelva a guardar."""
+        with self._lock:
+            if group is None:
+                self._generation += 1
+                self._versions.clear()
+                self._clear()
+            else:
+                self._versions[group] = self._versions.get(group, 0) + 1
+                for key in list(self._groups.get(group, ())):
+                    self._remove(key)
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'nombre': self.name,
+                'ttl': self.ttl,
+                'entradas': len(self._entries),
+                'aciertos': self._hits,
+                'fallos': self._misses,
+                'invalidaciones': self._invalidations,
+                'porcentaje_aciertos': round(self._hits / lookups * 100, 2) if lookups else 0,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'desalojos': self._evictions,
+            }
+
+    def _remove(self, key):
+        # Se llama con self._lock tomado.
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        keys = self._groups[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._groups[key[0]]
+
+    def _clear(self):
+        self._entries.clear()
+        self._groups.clear()
+        self._bytes = 0
+
+
+_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_cache(name, ttl=300, max_entries=1024):
+    """Devuelve la caché registrada con ese nombre, creándola la primera vez."""
+    with _REGISTRY_LOCK:
+        cache = _REGISTRY.get(name)
+        if cache is None:
+            cache = _REGISTRY[name] = TTLCache(name, ttl, max_entries)
+        return cache
+
+
+def register_cache(cache):
+    """Registra una caché creada aparte (UserCache, ByteLRUCache...) para el monitoreo."""
+    with _REGISTRY_LOCK:
+        _REGISTRY[cache.name] = cache
+    return cache
+
+
+def all_cache_stats():
+    """Estadísticas de todas las cachés registradas, para el panel de monitoreo."""
+    with _REGISTRY_LOCK:
+        caches = list(_REGISTRY.values())
+    return [cache.stats() for cache in caches]
+
+
+def cached_method(cache, group):
+    """
+    Decorador para métodos de repositorio que devuelven listas de referencia.
+    La clave es (group, *argumentos); se entrega una copia de la lista para que
+    el llamador pueda ampliarla sin alterar la versión en caché.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            value = cache.get_or_load((group,) + args, lambda: method(self, *args))
+            return list(value) if isinstance(value, list) else value
+        wrapper.uncached = method
+        return wrapper
+    return decorator
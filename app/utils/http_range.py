@@ -0,0 +1,65 @@
+# Utilidades para responder peticiones HTTP Range (206 Partial Content).
+#
+# Los visores de PDF de los navegadores piden primero los rangos que necesitan
+# para dibujar la primera página. Estas funciones resuelven los rangos pedidos
+# contra el tamaño del archivo y arman el cuerpo multipart/byteranges cuando se
+# pide más de uno; la lectura de cada rango la hace quien llama (p. ej. con
+# SUBSTRING sobre la columna del documento).
+import secrets
+
+# Más rangos que esto en una sola petición se ignora y se envía el archivo completo
+# (el RFC 9110 permite ignorar Range; evita respuestas con miles de partes).
+MAX_RANGES = 20
+
+
+def resolve_ranges(ranges, size):
+    """
+    Convierte los rangos de la cabecera (lista de (inicio, fin) como los da
+    werkzeug: fin exclusivo o None, inicio negativo = sufijo) en una lista de
+    (inicio, fin) absolutos dentro de [0, size).
+
+    Devuelve [] si ningún rango es satisfacible (respuesta 416).
+    """
+    resolved = []
+    for start, stop in ranges:
+        if start < 0:
+            # 'bytes=-500': los últimos 500 bytes.
+            start = max(0, size + start)
+            stop = size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start < stop:
+            resolved.append((start, stop))
+    return resolved
+
+
+def content_range(start, stop, size):
+    """Valor de la cabecera Content-Range para un rango (fin exclusivo)."""
+    return f"bytes {start}-{stop - 1}/{size}"
+
+
+def multipart_byteranges(ranges, size, content_type, read_range):
+    """
+    Prepara una respuesta multipart/byteranges.
+
+    `read_range(inicio, fin)` debe devolver un iterable de bloques de bytes.
+    Devuelve (content_type, content_length, generador); el Content-Length se
+    calcula de antemano porque se conocen todas las cabeceras de las partes.
+    """
+    boundary = secrets.token_hex(16)
+    heads = [
+        (f"\r\n--{boundary}\r\n"
+         f"Content-Type: {content_type}\r\n"
+         f"Content-Range: {content_range(start, stop, size)}\r\n\r\n").encode('ascii')
+        for start, stop in ranges
+    ]
+    tail = f"\r\n--{boundary}--\r\n".encode('ascii')
+    length = sum(len(head) for head in heads) + sum(stop - start for start, stop in ranges) + len(tail)
+
+    def generate():
+        for head, (start, stop) in zip(heads, ranges):
+            yield head
+            yield from read_range(start, stop)
+        yield tail
+
+    return f"multipart/byteranges; boundary={boundary}", length, generate()
@@ -1,8 +1,15 @@
 # Importa la librería math para la operación de techo (ceiling).
 import math
+# base64 y json codifican el cursor opaco de la paginación por clave.
+import base64
+import binascii
+import json
 
 # Define una clase simple para manejar la lógica de la paginación.
 class SimplePagination:
+    # Las plantillas usan este indicador para elegir entre números de página o Anterior/Siguiente.
+    is_keyset = False
+
     # El constructor recibe los resultados de la consulta, la página actual, items por página y el total de registros.
     def __init__(self, query_result, page, per_page, total):
         self.items = query_result
@@ -45,4 +52,63 @@ class SimplePagination:
                 if last + 1 != num:
                     yield None
                 yield num
-                last = num
\ No newline at end of file
+                last = num
+
+
+# Paginación por clave (keyset / seek): en lugar de OFFSET, cada página empieza
+# después (o antes) de la clave de la última fila vista, por lo que la página N
+# cuesta lo mismo que la primera. La posición viaja en un cursor opaco.
+class KeysetPagination(SimplePagination):
+    is_keyset = True
+
+    # `total` puede ser aproximado (total_is_estimate); `page` solo se usa para mostrar.
+    def __init__(self, query_result, per_page, total, next_cursor=None, prev_cursor=None,
+                 page=1, total_is_estimate=False):
+        super().__init__(query_result, page, per_page, total)
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total_is_estimate = total_is_estimate
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    # Con cursores no se puede saltar a una página arbitraria: solo Anterior/Siguiente.
+    def iter_pages(self, *args, **kwargs):
+        return iter(())
+
+
+def encode_cursor(key, direction, page):
+    """Cursor opaco (base64 url-safe) con la clave de la fila límite, la dirección y el número de página."""
+    payload = json.dumps([list(key), direction, page], separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Devuelve (clave, dirección, página) o None si el cursor falta o no es válido."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        key, direction, page = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        return None
+    if direction not in ('next', 'prev') or not _is_personal_key(key) or not _is_int(page):
+        return None
+    return tuple(key), direction, max(page, 1)
+
+
+def _is_int(value):
+    # bool es subclase de int: true/false en el JSON no es un número de página ni un id.
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_personal_key(key):
+    # La clave del listado de personal es [apellidos, nombres, id_personal]; un cursor
+    # manipulado con otra forma llegaría tal cual al repositorio.
+    return (isinstance(key, list) and len(key) == 3
+            and isinstance(key[0], str) and isinstance(key[1], str) and _is_int(key[2]))
@@ -0,0 +1,119 @@
+# Verifica que get_deleted_documents (SqlServerPersonalRepository) haga un
+# número fijo de consultas aunque crezca la cantidad de documentos eliminados:
+# el SP más una consulta IN por tabla de búsqueda (personal y tipo_documento),
+# en lugar de dos consultas por fila (app/database/batch_lookup.py).
+#
+# Uso:  python benchmark_batch_lookup.py [filas ...]      (por defecto 10 100 1000 2000)
+#
+# Corre sobre el backend SQLite en memoria (app/database/sqlite_backend.py), sin
+# SQL Server. Un cursor que cuenta las llamadas a execute() reemplaza a
+# get_db_write y responde al SP con las columnas de documentos sin el nombre
+# del personal ni el tipo, para que el repositorio tenga que completarlos.
+# Termina con código 1 si el número de consultas cambia con N.
+#
+# BatchLookup parte las claves en bloques de 1000: el conteo es fijo mientras
+# los documentos eliminados sean de hasta 1000 personas distintas (aquí, 3
+# documentos por persona).
+
+import os
+import sys
+import time
+
+# La configuración exige SECRET_KEY y las credenciales de SQL Server salvo en modo debug/SQLite.
+os.environ.setdefault('FLASK_DEBUG', 'true')
+os.environ.setdefault('DB_BACKEND', 'sqlite')
+
+from app.database import sqlite_backend
+from app.infrastructure.persistence import sqlserver_repository
+from app.infrastructure.persistence.sqlserver_repository import SqlServerPersonalRepository, _TIPO_DOCUMENTO_LOOKUP
+
+DOCUMENTS_PER_PERSON = 3
+
+# Lo que devolvería sp_listar_documentos_eliminados sin las columnas ya resueltas.
+SP_SIN_NOMBRES = """
+    SELECT id_documento, id_personal, id_tipo, nombre_archivo, descripcion, fecha_eliminacion
+    FROM documentos WHERE activo = 0 ORDER BY fecha_eliminacion DESC
+"""
+
+
+class CountingCursor:
+    """Cursor del backend SQLite que cuenta las sentencias y traduce el SP."""
+
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def execute(self, sql, *params):
+        self._counter.append(sql)
+        if sql.strip() == '{CALL sp_listar_documentos_eliminados}':
+            sql = SP_SIN_NOMBRES
+        self._cursor.execute(sql, *params)
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class CountingConnection:
+    def __init__(self, conn):
+        self._conn = conn
+        self.statements = []
+
+    def cursor(self):
+        return CountingCursor(self._conn.cursor(), self.statements)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def prepare(conn, deleted):
+    """Deja `deleted` documentos marcados como eliminados (los primeros por id)."""
+    cursor = conn.cursor()
+    cursor.execute("UPDATE documentos SET activo = 1, fecha_eliminacion = NULL")
+    cursor.execute("""
+        UPDATE documentos SET activo = 0, fecha_eliminacion = GETDATE()
+        WHERE id_documento IN (SELECT id_documento FROM documentos ORDER BY id_documento LIMIT ?)
+    """, deleted)
+    conn.commit()
+
+
+def measure(repo, conn, deleted):
+    prepare(conn, deleted)
+    # El catálogo de tipos se cachea entre llamadas: se descarta para contar su consulta.
+    _TIPO_DOCUMENTO_LOOKUP.invalidate()
+    counting = CountingConnection(conn)
+    sqlserver_repository.get_db_write = lambda: counting
+    start = time.perf_counter()
+    docs = repo.get_deleted_documents()
+    elapsed = time.perf_counter() - start
+    if len(docs) != deleted:
+        raise AssertionError(f"Se esperaban {deleted} documentos eliminados y se obtuvieron {len(docs)}")
+    incompletos = [doc['id_documento'] for doc in docs if not doc.get('nombre_personal') or not doc.get('tipo_documento')]
+    if incompletos:
+        raise AssertionError(f"Documentos sin nombre o tipo completados: {incompletos[:5]}")
+    return len(counting.statements), elapsed
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 100, 1000, 2000]
+    people = max(1, -(-max(sizes) // DOCUMENTS_PER_PERSON))
+    conn = sqlite_backend.connect(':memory:')
+    sqlite_backend.seed_demo_data(conn, personal_count=people, documents_per_person=DOCUMENTS_PER_PERSON,
+                                  document_size=16)
+    repo = SqlServerPersonalRepository()
+
+    print(f"get_deleted_documents: {people} personas, {DOCUMENTS_PER_PERSON} documentos por persona\n")
+    counts = set()
+    for deleted in sizes:
+        statements, elapsed = measure(repo, conn, deleted)
+        counts.add(statements)
+        print(f"{deleted:>6} eliminados   {statements} consultas   {elapsed * 1000:8.1f} ms")
+
+    if len(counts) != 1:
+        print(f"\nERROR: el número de consultas cambia con N: {sorted(counts)}")
+        sys.exit(1)
+    print(f"\nOK: {counts.pop()} consultas para cualquier N.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# Benchmark del mapeo de filas: _row_to_dict (dict por fila) frente a los
+# registros compilados de app/database/row_mapper.py.
+#
+# Uso:  python benchmark_row_mapper.py [filas] [repeticiones]
+#
+# Simula el reporte general de personal (15 columnas) con un cursor al estilo
+# pyodbc, por lo que no necesita SQL Server.
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date
+from decimal import Decimal
+
+# La configuración exige SECRET_KEY y las credenciales de SQL Server salvo en modo debug/SQLite.
+os.environ.setdefault('FLASK_DEBUG', 'true')
+os.environ.setdefault('DB_BACKEND', 'sqlite')
+
+from app.database.row_mapper import map_rows, map_rows_as_dicts, values_getter
+
+COLUMNS = ('dni', 'apellidos', 'nombres', 'sexo', 'fecha_nacimiento', 'email', 'telefono',
+           'nombre_unidad', 'fecha_ingreso', 'activo', 'cargo', 'tipo_contrato', 'modalidad',
+           'sueldo', 'resolucion')
+
+
+class FakeCursor:
+    """Solo lo que usan los mapeadores: description y las filas ya leídas."""
+
+    def __init__(self, rows):
+        self.description = [(name, str, None, None, None, None, True) for name in COLUMNS]
+        self.rows = rows
+
+
+def build_rows(count):
+    rng = random.Random(0)
+    return [
+        (str(40000000 + i), 'Quispe Rojas', 'María', rng.choice('MF'), date(1980, 1, 1),
+         f'empleado{i}@diresa.gob.pe', '987654321', 'Recursos Humanos', date(2015, 3, 1), True,
+         'Técnico Administrativo', 'CAS', 'Presencial', Decimal('2500.00'), f'RD-{i:06d}')
+        for i in range(count)
+    ]
+
+
+def legacy_row_to_dict(cursor, row):
+    # Copia de la implementación anterior: reconstruye la lista de columnas en cada fila.
+    if not row or not cursor.description:
+        return None
+    return dict(zip([column[0] for column in cursor.description], row))
+
+
+def map_legacy(cursor):
+    return [legacy_row_to_dict(cursor, row) for row in cursor.rows]
+
+
+def map_dicts(cursor):
+    return map_rows_as_dicts(cursor, cursor.rows)
+
+
+def map_records(cursor):
+    return map_rows(cursor, cursor.rows)
+
+
+def consume_get(items):
+    # Patrón anterior de generate_general_report_excel: un .get() por columna.
+    for persona in items:
+        [persona.get(name) for name in COLUMNS]
+
+
+def consume_getter(items):
+    # Patrón actual: extractor compilado una vez por forma de result set.
+    extraer = values_getter(items, COLUMNS)
+    for persona in items:
+        list(extraer(persona))
+
+
+def measure(label, mapper, consume, cursor, repeats):
+    best_map = best_total = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        items = mapper(cursor)
+        mapped = time.perf_counter()
+        consume(items)
+        end = time.perf_counter()
+        best_map = min(best_map, mapped - start)
+        best_total = min(best_total, end - start)
+
+    tracemalloc.start()
+    items = mapper(cursor)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+
+    rows = len(cursor.rows)
+    print(f"{label:<30} mapeo {best_map / rows * 1e6:7.3f} µs/fila   "
+          f"mapeo+lectura {best_total / rows * 1e6:7.3f} µs/fila   "
+          f"memoria {memory / rows:7.1f} B/fila")
+    return best_map, best_total
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    cursor = FakeCursor(build_rows(rows))
+
+    print(f"Reporte simulado: {rows} filas x {len(COLUMNS)} columnas, mejor de {repeats} repeticiones\n")
+    legacy = measure('_row_to_dict + .get()', map_legacy, consume_get, cursor, repeats)
+    measure('map_rows_as_dicts + .get()', map_dicts, consume_get, cursor, repeats)
+    measure('map_rows + .get()', map_records, consume_get, cursor, repeats)
+    records = measure('map_rows + values_getter', map_records, consume_getter, cursor, repeats)
+    print(f"\nCoste de mapeo por fila: {legacy[0] / records[0]:.1f}x menor con registros; "
+          f"mapeo+lectura: {legacy[1] / records[1]:.1f}x.")
+
+
+if __name__ == '__main__':
+    main()
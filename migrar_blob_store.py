@@ -0,0 +1,61 @@
+# Mueve el binario de los documentos existentes (documentos.archivo) al almacén
+# de archivos por hash, por lotes. Requiere BLOB_STORE_ENABLED=true en el .env.
+#
+# Uso:  python migrar_blob_store.py [--lote 100] [--max-lotes N] [--sin-esquema]
+#
+# Cada lote se confirma en su propia transacción, así que el proceso puede
+# interrumpirse y volver a lanzarse: continúa con los documentos que aún tienen
+# el binario en la BD. Conviene ejecutarlo fuera del horario de uso.
+
+import argparse
+import sys
+import time
+
+from app import create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra documentos.archivo al almacén de blobs.")
+    parser.add_argument('--lote', type=int, default=100, help="documentos por transacción")
+    parser.add_argument('--max-lotes', type=int, default=None, help="detenerse tras N lotes")
+    parser.add_argument('--sin-esquema', action='store_true',
+                        help="no crear documento_blobs (ya creada por un administrador)")
+    args = parser.parse_args()
+
+    app = create_app()
+    if not app.config.get('BLOB_STORE_ENABLED'):
+        print("BLOB_STORE_ENABLED no está activo; no hay almacén al que migrar.")
+        return 1
+
+    repo = app.config['PERSONAL_REPOSITORY']
+    chunk_size = app.config.get('DOCUMENT_STREAM_CHUNK_SIZE', 1024 * 1024)
+    print(f"Almacén: {app.config['BLOB_STORE'].root}")
+
+    totals = {'documentos': 0, 'bytes': 0, 'blobs_nuevos': 0}
+    lotes = 0
+    start = time.perf_counter()
+    with app.app_context():
+        if not args.sin_esquema:
+            # Requiere permiso ALTER; si el usuario de la app no lo tiene, ejecutar
+            # BLOB_STORE_DDL (sqlserver_repository.py) como administrador y usar --sin-esquema.
+            repo.ensure_blob_store_schema()
+
+        while args.max_lotes is None or lotes < args.max_lotes:
+            moved = repo.migrate_documents_to_blob_store(args.lote, chunk_size)
+            if not moved['documentos']:
+                break
+            lotes += 1
+            for key in totals:
+                totals[key] += moved[key]
+            print(f"Lote {lotes}: {moved['documentos']} documentos, {moved['bytes'] / 1048576:.1f} MB, "
+                  f"{moved['blobs_nuevos']} blobs nuevos")
+
+    elapsed = time.perf_counter() - start
+    duplicados = totals['documentos'] - totals['blobs_nuevos']
+    print(f"\nMigrados {totals['documentos']} documentos ({totals['bytes'] / 1048576:.1f} MB) "
+          f"en {elapsed:.1f} s; {duplicados} eran copias de un archivo ya almacenado.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
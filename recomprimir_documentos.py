@@ -0,0 +1,54 @@
+# Comprime en segundo plano el binario de los documentos ya guardados en la BD
+# (documentos.archivo) que aún no tienen cabecera de compresión.
+#
+# Uso:  python recomprimir_documentos.py [--lote 50] [--pausa 0.5] [--desde ID]
+#
+# Recorre la tabla por id_documento, un lote por transacción, y espera --pausa
+# segundos entre lotes para no competir con los usuarios. Los archivos que no se
+# reducen se dejan como están. Puede interrumpirse y retomarse con --desde.
+
+import argparse
+import sys
+import time
+
+from app import create_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprime los documentos existentes en la BD.")
+    parser.add_argument('--lote', type=int, default=50, help="documentos por transacción")
+    parser.add_argument('--pausa', type=float, default=0.5, help="segundos de espera entre lotes")
+    parser.add_argument('--desde', type=int, default=0, help="continuar después de este id_documento")
+    args = parser.parse_args()
+
+    app = create_app()
+    repo = app.config['PERSONAL_REPOSITORY']
+
+    totals = {'revisados': 0, 'comprimidos': 0, 'bytes_ahorrados': 0}
+    last_id = args.desde
+    start = time.perf_counter()
+    with app.app_context():
+        while True:
+            result = repo.recompress_documents(last_id, args.lote)
+            if result['ultimo_id'] is None:
+                break
+            last_id = result['ultimo_id']
+            for key in totals:
+                totals[key] += result[key]
+            print(f"Hasta id {last_id}: {result['comprimidos']}/{result['revisados']} comprimidos, "
+                  f"{result['bytes_ahorrados'] / 1048576:.1f} MB ahorrados")
+            time.sleep(args.pausa)
+
+        stats = repo.get_compression_stats()
+
+    elapsed = time.perf_counter() - start
+    print(f"\nRevisados {totals['revisados']} documentos en {elapsed:.1f} s; comprimidos {totals['comprimidos']}, "
+          f"{totals['bytes_ahorrados'] / 1048576:.1f} MB ahorrados en esta ejecución.")
+    saved = stats['bytes_originales'] - stats['bytes_almacenados']
+    print(f"Total en la BD: {stats['comprimidos']}/{stats['documentos']} documentos comprimidos, "
+          f"{saved / 1048576:.1f} MB ahorrados.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
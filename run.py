@@ -2,12 +2,13 @@
 from app import create_app
 import os
 
-# Crea una instancia de la aplicación llamando a la factoría.
-app = create_app()
-
 # Punto de entrada para ejecutar la aplicación.
 # Se activa solo cuando el script es ejecutado directamente.
 if __name__ == "__main__":
+    # Crea una instancia de la aplicación llamando a la factoría (dentro del guard:
+    # los procesos 'spawn' del pool de separación de PDFs importan este módulo).
+    app = create_app()
+
     # ADVERTENCIA: Este es un servidor de desarrollo.
     # No lo uses en un entorno de producción.
     # Para producción, utiliza un servidor WSGI como Gunicorn o Waitress.
@@ -12,9 +12,11 @@ import sys
 from waitress import serve
 from app import create_app
 
-app = create_app()
-
 if __name__ == "__main__":
+    # La app se crea dentro del guard: los procesos del pool de separación de PDFs
+    # (método 'spawn') importan este módulo y no deben crear otra aplicación.
+    app = create_app()
+
     # Configurar host y puerto desde argumentos de línea de comandos
     host = "localhost"  # localhost o 127.0.0.1 para acceder desde este PC
     port = 5001         # Puerto por defecto
@@ -46,7 +48,7 @@ if __name__ == "__main__":
     🌐 Host: {actual_host}
     🔌 Puerto: {port}
     🔒 HTTPS: No (usar con proxy reverso como Nginx)
-    📊 Workers: Auto (según CPU disponible)
+    📊 Threads: {app.config['WAITRESS_THREADS']} (pool BD: {app.config['DB_POOL_MAX_SIZE']} conexiones)
     
     📍 Accede a: http://{host}:{port}
     
@@ -60,7 +62,7 @@ if __name__ == "__main__":
         app,
         host=actual_host,
         port=port,
-        threads=8,           # Número de threads para manejar conexiones
+        threads=app.config['WAITRESS_THREADS'],  # Número de threads (WAITRESS_THREADS)
         channel_timeout=300, # Timeout de conexión (5 minutos)
         log_socket_errors=False,  # Evitar logs de errores de socket SSL
         _quiet=False         # Mostrar logs de acceso